@@ -0,0 +1,309 @@
+# seq_arduino.py - arduino-cli backends for board listing, compiling and uploading.
+#
+# SubprocessBackend runs one `arduino-cli` process per command (the original
+# behavior). DaemonBackend starts `arduino-cli daemon` once and sends the same
+# requests over its gRPC API, so the configuration, package index and
+# platform metadata are loaded only once per session; compile / upload
+# progress is streamed back while the command runs.
+#
+# The daemon backend is optional: it needs the `grpcio` package and the
+# Python stubs generated from arduino-cli's rpc/cc/arduino/cli/commands/v1
+# .proto files (importable as cc.arduino.cli.commands.v1). Whenever the daemon
+# cannot be started or stops answering, the backend falls back to the
+# subprocess path. Both backends return subprocess.CompletedProcess objects
+# with the same stdout format, so callers do not care which one ran; with
+# json_output, compile stdout is the `--format json` document (compiler
+# output plus builder_result.executable_sections_size) for both.
+
+import json
+import socket
+import subprocess
+
+try:
+    import grpc
+    from cc.arduino.cli.commands.v1 import (
+        board_pb2,
+        commands_pb2,
+        commands_pb2_grpc,
+        compile_pb2,
+        port_pb2,
+        upload_pb2,
+    )
+except ImportError:  # optional dependency
+    grpc = None
+
+
+class DaemonUnavailable(Exception):
+    """Raised when the arduino-cli daemon cannot be started or reached."""
+
+
+def _default_runner(cmd, name, **kwargs):
+    return subprocess.run(cmd, **kwargs)
+
+
+class SubprocessBackend:
+    """
+    One arduino-cli process per command.
+    runner(cmd, name, **subprocess_kwargs) runs the command; the GUI passes
+    its tracing wrapper so every call is timed.
+    """
+
+    name = "subprocess"
+
+    def __init__(self, cli: str = "arduino-cli", runner=None):
+        self.cli = cli
+        self.runner = runner or _default_runner
+
+    def _run(self, args, name: str):
+        return self.runner([self.cli] + args, name, capture_output=True, text=True, check=False)
+
+    def board_list(self):
+        """`board list --format json`."""
+        return self._run(["board", "list", "--format", "json"], "arduino-cli board list")
+
+    def compile(self, fqbn: str, sketch_dir: str, progress=None, build_path=None,
+                json_output=False):
+        args = ["compile", "--fqbn", fqbn]
+        if build_path:
+            args += ["--build-path", build_path]
+        if json_output:
+            args += ["--format", "json"]
+        return self._run(args + [sketch_dir], "arduino-cli compile")
+
+    def upload(self, port: str, fqbn: str, sketch_dir: str, progress=None, build_path=None):
+        args = ["upload", "-p", port, "--fqbn", fqbn]
+        if build_path:
+            args += ["--input-dir", build_path]
+        return self._run(args + [sketch_dir], "arduino-cli upload")
+
+    def close(self):
+        pass
+
+
+# =========================
+# gRPC session
+# =========================
+def _drain(stream, progress, sections=None):
+    """
+    Collect the out_stream / err_stream chunks of a streamed compile or
+    upload response; task progress goes to progress(message, level) and the
+    executable section sizes of a compile result are appended to `sections`.
+    Returns (returncode, stdout, stderr).
+    """
+    out, err = [], []
+    last = None
+    try:
+        for resp in stream:
+            chunk = getattr(resp, "out_stream", b"")
+            if chunk:
+                out.append(chunk.decode("utf-8", "replace"))
+            chunk = getattr(resp, "err_stream", b"")
+            if chunk:
+                err.append(chunk.decode("utf-8", "replace"))
+            task = getattr(resp, "progress", None)
+            if progress is not None and task is not None and (task.name or task.message):
+                line = f"{task.name or task.message} {task.percent:.0f}%"
+                if line != last:
+                    progress(line, "debug")
+                    last = line
+            if sections is not None:
+                # BuilderResult in the final message (older daemons: on the response)
+                result = getattr(resp, "result", None)
+                sizes = getattr(result, "executable_sections_size", None) or \
+                    getattr(resp, "executable_sections_size", None)
+                for s in sizes or ():
+                    sections.append({"name": s.name, "size": s.size, "max_size": s.max_size})
+    except grpc.RpcError as e:
+        if e.code() in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.CANCELLED):
+            raise DaemonUnavailable(e.details() or str(e.code())) from e
+        err.append(e.details() or str(e.code()))
+        return 1, "".join(out), "".join(err)
+    return 0, "".join(out), "".join(err)
+
+
+class GrpcClient:
+    """
+    One arduino-cli daemon session: a channel and an initialized instance.
+    DaemonBackend only uses board_list(), compile(), upload() and close(), so
+    any object with these methods (e.g. an in-process fake daemon) can stand
+    in for it.
+    """
+
+    def __init__(self, address: str, timeout: float = 15.0):
+        if grpc is None:
+            raise DaemonUnavailable("grpcio or the arduino-cli gRPC stubs are not installed")
+        self.channel = grpc.insecure_channel(address)
+        try:
+            grpc.channel_ready_future(self.channel).result(timeout=timeout)
+            self.stub = commands_pb2_grpc.ArduinoCoreServiceStub(self.channel)
+            self.instance = self.stub.Create(commands_pb2.CreateRequest()).instance
+            for _ in self.stub.Init(commands_pb2.InitRequest(instance=self.instance)):
+                pass
+        except (grpc.RpcError, grpc.FutureTimeoutError) as e:
+            self.channel.close()
+            raise DaemonUnavailable(f"no answer from arduino-cli daemon at {address}") from e
+
+    def board_list(self) -> dict:
+        """Detected ports, in the same shape as `board list --format json`."""
+        try:
+            resp = self.stub.BoardList(board_pb2.BoardListRequest(instance=self.instance))
+        except grpc.RpcError as e:
+            raise DaemonUnavailable(e.details() or str(e.code())) from e
+        ports = []
+        for item in resp.ports:
+            ports.append({
+                "port": {
+                    "address": item.port.address,
+                    "label": item.port.label,
+                    "protocol": item.port.protocol,
+                    "protocol_label": item.port.protocol_label,
+                },
+                "matching_boards": [{"name": b.name, "fqbn": b.fqbn} for b in item.matching_boards],
+            })
+        return {"detected_ports": ports}
+
+    def compile(self, fqbn: str, sketch_dir: str, progress=None, build_path=None,
+                json_output=False):
+        req = compile_pb2.CompileRequest(
+            instance=self.instance, fqbn=fqbn, sketch_path=sketch_dir, build_path=build_path or "",
+        )
+        sections = []
+        code, out, err = _drain(self.stub.Compile(req), progress, sections)
+        if not json_output:
+            return code, out, err
+        # Same document as `arduino-cli compile --format json`
+        doc = {
+            "compiler_out": out,
+            "compiler_err": err,
+            "builder_result": {"executable_sections_size": sections},
+            "success": code == 0,
+        }
+        return code, json.dumps(doc), ""
+
+    def upload(self, port: str, fqbn: str, sketch_dir: str, progress=None, build_path=None):
+        req = upload_pb2.UploadRequest(
+            instance=self.instance, fqbn=fqbn, sketch_path=sketch_dir,
+            port=port_pb2.Port(address=port, protocol="serial"),
+            import_dir=build_path or "",
+        )
+        return _drain(self.stub.Upload(req), progress)
+
+    def close(self):
+        try:
+            self.stub.Destroy(commands_pb2.DestroyRequest(instance=self.instance))
+        except grpc.RpcError:
+            pass
+        self.channel.close()
+
+
+def _stop(proc, timeout: float = 5.0):
+    """Terminate a daemon process and reap it (killing it if it does not exit)."""
+    proc.terminate()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class DaemonBackend:
+    """
+    Commands sent to a long-running arduino-cli daemon through `client`
+    (a GrpcClient). If the daemon goes away, the session is closed and this
+    and all later calls use `fallback` (a SubprocessBackend); `note` then
+    says why.
+    """
+
+    name = "daemon"
+
+    def __init__(self, client, fallback, proc=None):
+        self.client = client
+        self.fallback = fallback
+        self.proc = proc
+        self.note = None
+
+    @classmethod
+    def start(cls, fallback, cli: str = "arduino-cli", timeout: float = 15.0, connect=None):
+        """
+        Spawn `arduino-cli daemon` on a free local port and connect to it with
+        connect(address, timeout) (default: GrpcClient).
+        """
+        if connect is None:
+            if grpc is None:
+                raise DaemonUnavailable("grpcio or the arduino-cli gRPC stubs are not installed")
+            connect = GrpcClient
+        port = _free_port()
+        try:
+            proc = subprocess.Popen(
+                [cli, "daemon", "--port", str(port)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise DaemonUnavailable(f"cannot start '{cli} daemon': {e}") from e
+        try:
+            client = connect(f"127.0.0.1:{port}", timeout)
+        except DaemonUnavailable:
+            _stop(proc)
+            raise
+        return cls(client, fallback, proc)
+
+    def _call(self, method: str, args):
+        """client.method(*args), or None once the daemon is gone."""
+        if self.client is not None:
+            try:
+                return getattr(self.client, method)(*args)
+            except DaemonUnavailable as e:
+                self.note = f"arduino-cli daemon lost ({e}); using subprocesses."
+                self.close()
+        return None
+
+    def board_list(self):
+        data = self._call("board_list", ())
+        if data is None:
+            return self.fallback.board_list()
+        return subprocess.CompletedProcess(["daemon", "board list"], 0, json.dumps(data), "")
+
+    def compile(self, fqbn: str, sketch_dir: str, progress=None, build_path=None,
+                json_output=False):
+        res = self._call("compile", (fqbn, sketch_dir, progress, build_path, json_output))
+        if res is None:
+            return self.fallback.compile(fqbn, sketch_dir, progress, build_path, json_output)
+        return subprocess.CompletedProcess(["daemon", "compile", fqbn, sketch_dir], *res)
+
+    def upload(self, port: str, fqbn: str, sketch_dir: str, progress=None, build_path=None):
+        res = self._call("upload", (port, fqbn, sketch_dir, progress, build_path))
+        if res is None:
+            return self.fallback.upload(port, fqbn, sketch_dir, progress, build_path)
+        return subprocess.CompletedProcess(["daemon", "upload", port, fqbn, sketch_dir], *res)
+
+    def close(self):
+        if self.client is not None:
+            try:
+                self.client.close()
+            except DaemonUnavailable:
+                pass
+            self.client = None
+        if self.proc is not None:
+            _stop(self.proc)
+            self.proc = None
+
+
+def open_backend(use_daemon: bool, runner=None, cli: str = "arduino-cli", connect=None):
+    """
+    Return (backend, note). With use_daemon, try the daemon first and fall
+    back to subprocesses; note explains which backend is used (or None).
+    connect is passed to DaemonBackend.start().
+    """
+    fallback = SubprocessBackend(cli, runner)
+    if not use_daemon:
+        return fallback, None
+    try:
+        return DaemonBackend.start(fallback, cli, connect=connect), "Using the arduino-cli daemon."
+    except DaemonUnavailable as e:
+        return fallback, f"arduino-cli daemon unavailable ({e}); using subprocesses."
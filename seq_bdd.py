@@ -0,0 +1,439 @@
+# seq_bdd.py - reduced ordered BDDs for .seq designs and equivalence checking.
+# Used by SeqEditor to prove that an edited design behaves exactly like the one
+# last flashed (so compile + upload can be skipped), and to produce a minimal
+# counterexample when the two designs differ.
+
+from seq_design import expr_names, fold_tree
+
+FALSE = 0
+TRUE = 1
+
+
+class BDDError(Exception):
+    """Raised when a design cannot be turned into BDDs (e.g. combinational loop)."""
+
+
+# ============================================
+# BDD manager
+# ============================================
+class BDD:
+    """
+    Reduced ordered BDD manager.
+
+    Nodes are integers indexing parallel lists (var level, low, high);
+    0 and 1 are the terminal nodes. A unique table guarantees that every
+    function has exactly one node, so equivalence is an integer compare.
+    ITE results are memoized in a bounded computed cache; when it is full
+    the oldest half of the entries is evicted.
+    """
+
+    def __init__(self, var_names=(), cache_size=1 << 18):
+        self._var = [None, None]   # level of each node (None for terminals)
+        self._lo = [0, 1]
+        self._hi = [0, 1]
+        self._unique = {}          # (level, lo, hi) -> node
+        self._cache = {}           # (f, g, h) -> node
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.names = []            # level -> variable name
+        self.levels = {}           # variable name -> level
+        for name in var_names:
+            self.add_var(name)
+
+    # ---------- variables ----------
+    def add_var(self, name: str) -> int:
+        """Append a variable at the bottom of the order; return its level."""
+        if name not in self.levels:
+            self.levels[name] = len(self.names)
+            self.names.append(name)
+        return self.levels[name]
+
+    def var(self, name: str) -> int:
+        """Return the node of the projection function for a variable."""
+        return self._mk(self.add_var(name), FALSE, TRUE)
+
+    @property
+    def node_count(self) -> int:
+        return len(self._var)
+
+    def _level(self, f: int) -> int:
+        lvl = self._var[f]
+        return len(self.names) if lvl is None else lvl
+
+    def _mk(self, lvl: int, lo: int, hi: int) -> int:
+        if lo == hi:
+            return lo
+        key = (lvl, lo, hi)
+        node = self._unique.get(key)
+        if node is None:
+            node = len(self._var)
+            self._var.append(lvl)
+            self._lo.append(lo)
+            self._hi.append(hi)
+            self._unique[key] = node
+        return node
+
+    # ---------- operations ----------
+    def ite(self, f: int, g: int, h: int) -> int:
+        """If-then-else: (f AND g) OR (NOT f AND h)."""
+        # Terminal cases
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+
+        key = (f, g, h)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+
+        lvl = min(self._level(f), self._level(g), self._level(h))
+        f0, f1 = self._cofactors(f, lvl)
+        g0, g1 = self._cofactors(g, lvl)
+        h0, h1 = self._cofactors(h, lvl)
+        node = self._mk(lvl, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+
+        if len(self._cache) >= self.cache_size:
+            self._evict()
+        self._cache[key] = node
+        return node
+
+    def _cofactors(self, f: int, lvl: int):
+        if self._var[f] == lvl:
+            return self._lo[f], self._hi[f]
+        return f, f
+
+    def _evict(self):
+        """Drop the oldest half of the computed cache (dicts keep insertion order)."""
+        drop = len(self._cache) // 2
+        for key in list(self._cache)[:drop]:
+            del self._cache[key]
+
+    def NOT(self, f: int) -> int:
+        return self.ite(f, FALSE, TRUE)
+
+    def AND(self, f: int, g: int) -> int:
+        return self.ite(f, g, FALSE)
+
+    def OR(self, f: int, g: int) -> int:
+        return self.ite(f, TRUE, g)
+
+    def XOR(self, f: int, g: int) -> int:
+        return self.ite(f, self.NOT(g), g)
+
+    # ---------- queries ----------
+    def support(self, f: int):
+        """Return the set of variable names f depends on."""
+        seen = set()
+        levels = set()
+        stack = [f]
+        while stack:
+            n = stack.pop()
+            if n <= TRUE or n in seen:
+                continue
+            seen.add(n)
+            levels.add(self._var[n])
+            stack.append(self._lo[n])
+            stack.append(self._hi[n])
+        return {self.names[lvl] for lvl in levels}
+
+    def size(self, f: int) -> int:
+        """Number of internal nodes reachable from f."""
+        seen = set()
+        stack = [f]
+        while stack:
+            n = stack.pop()
+            if n <= TRUE or n in seen:
+                continue
+            seen.add(n)
+            stack.append(self._lo[n])
+            stack.append(self._hi[n])
+        return len(seen)
+
+    def min_sat(self, f: int):
+        """
+        Return a satisfying assignment of f with the fewest variables set to 1,
+        as {name: 0/1} over the support of f, or None if f is unsatisfiable.
+        """
+        if f == FALSE:
+            return None
+
+        # cost[n] = min number of 1-literals on a path from n to TRUE
+        inf = float("inf")
+        cost = {FALSE: inf, TRUE: 0}
+        stack = [(f, False)]
+        while stack:
+            n, done = stack.pop()
+            if n in cost:
+                continue
+            if done:
+                cost[n] = min(cost[self._lo[n]], cost[self._hi[n]] + 1)
+                continue
+            stack.append((n, True))
+            stack.append((self._lo[n], False))
+            stack.append((self._hi[n], False))
+
+        assignment = {}
+        n = f
+        while n > TRUE:
+            name = self.names[self._var[n]]
+            if cost[self._lo[n]] <= cost[self._hi[n]] + 1:
+                assignment[name] = 0
+                n = self._lo[n]
+            else:
+                assignment[name] = 1
+                n = self._hi[n]
+        for name in self.support(f):
+            assignment.setdefault(name, 0)
+        return assignment
+
+    def evaluate(self, f: int, values) -> int:
+        """Evaluate f under {name: 0/1}; missing variables count as 0."""
+        while f > TRUE:
+            name = self.names[self._var[f]]
+            f = self._hi[f] if values.get(name, 0) else self._lo[f]
+        return f
+
+
+# ============================================
+# Variable ordering heuristics
+# ============================================
+def dfs_order(designs):
+    """
+    Depth-first fan-in ordering: walk each output and next-state cone from the
+    outputs back to the inputs and number free variables in first-visit order.
+    Variables that feed the same gate end up adjacent, which keeps most
+    datapath-like functions small.
+    """
+    order = []
+    seen = set()
+    for design in designs:
+        comb = design.comb_defs()
+        nxt = design.next_state_defs()
+        roots = [("VAR", pin) for pin in sorted(design.pin_outputs)]
+        roots += [nxt[q] for q in design.q_names]
+        visiting = set()
+        for root in roots:
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                if node[0] == "CONST":
+                    continue
+                if node[0] != "VAR":
+                    stack.extend(reversed(node[1:]))
+                    continue
+                name = node[1]
+                if name in comb:
+                    if name not in visiting:
+                        visiting.add(name)
+                        stack.append(comb[name])
+                elif name not in seen:
+                    seen.add(name)
+                    order.append(name)
+        for name in sorted(design.pin_inputs) + design.q_names:
+            if name not in seen:
+                seen.add(name)
+                order.append(name)
+    return order
+
+
+def fanout_order(designs):
+    """
+    Most-referenced-first ordering: variables with the largest number of
+    references across all equations go to the top of the BDD.
+    """
+    counts = {}
+    free = set()
+    for design in designs:
+        comb = design.comb_lhs
+        free |= design.pin_inputs | design.seq_lhs
+        for _, node, _ in design.comb_eqs + design.seq_eqs:
+            for name in expr_names(node):
+                if name not in comb:
+                    counts[name] = counts.get(name, 0) + 1
+    return sorted(free, key=lambda n: (-counts.get(n, 0), n))
+
+
+ORDERINGS = {"dfs": dfs_order, "fanout": fanout_order}
+
+
+# ============================================
+# Design → BDDs
+# ============================================
+class DesignBDDs:
+    """
+    BDDs of every combinational signal and next-state function of a design,
+    as functions of the input pins and the current register values.
+    """
+
+    def __init__(self, bdd: BDD, design):
+        self.bdd = bdd
+        self.design = design
+        self._comb = design.comb_defs()
+        self._next = design.next_state_defs()
+        self._signals = {}
+
+        both = set(self._comb) & set(self._next)
+        if both:
+            raise BDDError(
+                f"'{sorted(both)[0]}' is defined both as a combinational signal and a register"
+            )
+
+    def signal(self, name: str) -> int:
+        """BDD of a signal's current value (inputs and registers are variables)."""
+        if name in self._signals:
+            return self._signals[name]
+        if name not in self._comb:
+            f = self.bdd.var(name)
+            self._signals[name] = f
+            return f
+
+        # Iterative post-order evaluation through combinational definitions
+        in_progress = set()
+        stack = [name]
+        while stack:
+            cur = stack[-1]
+            if cur in self._signals:
+                stack.pop()
+                continue
+            if cur not in self._comb:
+                self._signals[cur] = self.bdd.var(cur)
+                stack.pop()
+                continue
+            pending = [n for n in expr_names(self._comb[cur])
+                       if n not in self._signals]
+            if pending:
+                if cur in in_progress:
+                    raise BDDError(f"combinational loop through '{cur}'")
+                in_progress.add(cur)
+                stack.extend(pending)
+                continue
+            self._signals[cur] = self.expr(self._comb[cur])
+            in_progress.discard(cur)
+            stack.pop()
+        return self._signals[name]
+
+    def next_state(self, qname: str) -> int:
+        """BDD of the D input of register qname."""
+        return self.expr(self._next[qname])
+
+    def expr(self, node) -> int:
+        """BDD of an expression tree over this design's signals."""
+        bdd = self.bdd
+
+        def leaf(n):
+            if n[0] == "CONST":
+                return TRUE if n[1] else FALSE
+            return self.signal(n[1])
+
+        def gate(op, args):
+            if op == "NOT":
+                return bdd.NOT(args[0])
+            apply = {"AND": bdd.AND, "OR": bdd.OR, "XOR": bdd.XOR}[op]
+            f = args[0]
+            for g in args[1:]:
+                f = apply(f, g)
+            return f
+
+        return fold_tree(node, leaf, gate)
+
+    def observable_registers(self):
+        """
+        Registers that can influence an output pin, directly or through
+        other registers (transitive closure over BDD supports).
+        """
+        regs = self.design.seq_lhs
+        todo = []
+        for pin in self.design.pin_outputs:
+            todo.extend(self.bdd.support(self.signal(pin)) & regs)
+        seen = set()
+        while todo:
+            q = todo.pop()
+            if q in seen:
+                continue
+            seen.add(q)
+            todo.extend(self.bdd.support(self.next_state(q)) & regs)
+        return seen
+
+
+# ============================================
+# Equivalence checking
+# ============================================
+class EquivalenceResult:
+    """
+    Outcome of check_equivalence():
+      equivalent:     True when every observable function matches
+      reason:         human-readable summary
+      counterexample: {name: 0/1} over inputs / register values, or None
+    """
+
+    def __init__(self, equivalent, reason, counterexample=None):
+        self.equivalent = equivalent
+        self.reason = reason
+        self.counterexample = counterexample
+
+    def __bool__(self):
+        return self.equivalent
+
+    def describe(self) -> str:
+        if self.counterexample is None:
+            return self.reason
+        assign = ", ".join(f"{k}={v}" for k, v in sorted(self.counterexample.items()))
+        return f"{self.reason}\n  counterexample: {assign or '(all signals 0)'}"
+
+
+def check_equivalence(old, new, ordering: str = "dfs", cache_size=1 << 18):
+    """
+    Prove that two parsed designs behave identically on the board.
+
+    Both designs start from the same reset state (all registers 0), so they are
+    equivalent when they use the same pin mapping, the same set of observable
+    registers, and every output pin and observable next-state function is the
+    same Boolean function of the inputs and register values.
+    Registers that never reach an output are ignored.
+    Returns an EquivalenceResult.
+    """
+    if old.pin_defs != new.pin_defs:
+        return EquivalenceResult(False, "Pin mapping differs.")
+    if old.pin_inputs != new.pin_inputs:
+        return EquivalenceResult(False, "Input/output pin directions differ.")
+
+    bdd = BDD(ORDERINGS[ordering]([old, new]), cache_size=cache_size)
+    try:
+        a = DesignBDDs(bdd, old)
+        b = DesignBDDs(bdd, new)
+
+        checks = [(f"output pin '{pin}'", a.signal(pin), b.signal(pin))
+                  for pin in sorted(old.pin_outputs)]
+
+        regs_a = a.observable_registers()
+        regs_b = b.observable_registers()
+        if regs_a != regs_b:
+            diff = sorted(regs_a ^ regs_b)
+            return EquivalenceResult(
+                False, f"Observable registers differ: {', '.join(diff)}"
+            )
+        checks += [(f"register '{q}.D'", a.next_state(q), b.next_state(q))
+                   for q in sorted(regs_a)]
+    except BDDError as e:
+        return EquivalenceResult(False, f"Cannot analyze design: {e}")
+
+    for what, fa, fb in checks:
+        if fa != fb:
+            cex = bdd.min_sat(bdd.XOR(fa, fb))
+            va = bdd.evaluate(fa, cex)
+            vb = bdd.evaluate(fb, cex)
+            return EquivalenceResult(
+                False, f"{what} differs (old={va}, new={vb})", cex
+            )
+
+    return EquivalenceResult(
+        True, f"Designs are equivalent ({len(checks)} functions, {bdd.node_count} BDD nodes)."
+    )
@@ -0,0 +1,887 @@
+# seq_bench.py - performance benchmarks for the SeqEditor front end.
+#
+# Usage:
+#   python seq_bench.py parser [--max-tokens 100000]
+#   python seq_bench.py suite [--scales small,medium,large] [--baseline bench.json]
+#                             [--save-baseline bench.json] [--threshold 0.25]
+#   python seq_bench.py design --pins 16 --comb 200 --regs 16 -o big.seq
+#   python seq_bench.py netlist [--scales medium,large]
+#   python seq_bench.py vm [--scales small] [--port /dev/ttyACM0]
+#   python seq_bench.py regress [--scales medium] [--workers 1,2,4,8] [--cycles 200]
+#   python seq_bench.py faults [--scales small,medium] [--max-tests 1000]
+#   python seq_bench.py coverage [--scales small,medium] [--regs 16,64] [--cycles 500]
+#   python seq_bench.py highlight [--lines 50000] [--keystrokes 200]
+#
+# The parser benchmark times tokenizing, parsing and C emission of
+# expressions growing from 1k to 100k tokens, both deeply nested
+# (NOT(AND(b, NOT(...)))) and wide (AND(a, b, c, ...)). Per-token cost should
+# stay flat as the size grows; a growing ratio means superlinear behavior.
+#
+# The suite generates synthetic designs at several scales and times each
+# stage of the Check / Flash pipeline headlessly, reporting throughput and
+# peak memory. Results can be stored as a JSON baseline; later runs are
+# compared against it and fail when a stage got slower than the threshold.
+#
+# The netlist benchmark compares parsing .seq text with loading the compiled
+# binary netlist (seq_netlist.py): load time and the Python memory each form
+# keeps alive.
+#
+# The vm benchmark compiles designs to interpreter bytecode (seq_vm.py) and
+# times a design swap (download + checksum + acknowledgement) against a pty
+# stand-in board, or a real board running the interpreter with --port. The
+# loop time of the interpreter and of the native sketch is estimated from an
+# AVR cycle model; with --port the interpreter loop is also measured on the
+# board.
+#
+# The regress benchmark runs the sharded regression (seq_regress.py) of a
+# design against itself with increasing worker counts and reports
+# vector-cycles per second and the speedup over one worker.
+#
+# The faults benchmark runs stuck-at fault simulation and test generation
+# (seq_fault.py) and reports fault coverage, the compacted test set and the
+# number of (fault, candidate test) pairs simulated per second.
+#
+# The coverage benchmark times a one-worker regression with and without
+# coverage collection (seq_coverage.py) and reports the overhead factor and
+# the size of the state / transition tables.
+#
+# The highlight benchmark attaches the editor highlighter (seq_highlight.py)
+# to a headless stand-in for the Tk text widget holding a generated design,
+# and times indexing the buffer, the widget command on each typed character,
+# the highlighting pass that follows it, a large paste and scrolling.
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from seq_codegen import generate_ino_source
+from seq_fault import generate_tests
+from seq_design import expr_to_c, parse_design, parse_expr, tokenize_expr
+from seq_netlist import Netlist
+from seq_regress import run_regression
+from seq_vm import StandInBoard, VMError, bench_board, compile_program, download, estimate_loop_cycles
+
+
+def deep_expr(tokens: int) -> str:
+    """Nested expression of roughly `tokens` tokens: NOT(AND(B, NOT(...)))."""
+    openers = []
+    count = 1
+    while count < tokens:
+        if len(openers) % 2:
+            openers.append("AND(B, ")
+            count += 5
+        else:
+            openers.append("NOT(")
+            count += 3
+    # the last wrapper applied is the outermost one
+    return "".join(reversed(openers)) + "A" + ")" * len(openers)
+
+
+def wide_expr(tokens: int) -> str:
+    """Flat n-ary expression of roughly `tokens` tokens: AND(s0, s1, ...)."""
+    n = max(2, (tokens - 3) // 2)
+    return "AND(" + ", ".join(f"s{i}" for i in range(n)) + ")"
+
+
+def _best_of(fn, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, result
+
+
+def bench_parser_scaling(max_tokens: int = 100_000, repeat: int = 3):
+    """
+    Time tokenize_expr / parse_expr / expr_to_c at sizes from 1k up to
+    max_tokens. Returns a list of row dicts (shape, tokens, seconds per stage).
+    """
+    sizes = []
+    size = 1000
+    while size < max_tokens:
+        sizes.append(size)
+        size *= 10
+    sizes.append(max_tokens)
+
+    rows = []
+    for shape, make in (("deep", deep_expr), ("wide", wide_expr)):
+        for size in sizes:
+            text = make(size)
+            t_tok, (tokens, err) = _best_of(lambda: tokenize_expr(text), repeat)
+            assert err is None, err
+            t_parse, (node, pos, err) = _best_of(lambda: parse_expr(tokens, 0), repeat)
+            assert err is None and pos == len(tokens), err
+            t_emit, _ = _best_of(lambda: expr_to_c(node), repeat)
+            rows.append({
+                "shape": shape,
+                "tokens": len(tokens),
+                "tokenize_s": t_tok,
+                "parse_s": t_parse,
+                "emit_s": t_emit,
+            })
+    return rows
+
+
+def print_parser_scaling(rows):
+    print(f"{'shape':<6}{'tokens':>9}{'tokenize':>12}{'parse':>12}{'emit C':>12}{'ns/token':>10}")
+    first = {}
+    for r in rows:
+        total = r["tokenize_s"] + r["parse_s"] + r["emit_s"]
+        per_tok = total / r["tokens"] * 1e9
+        first.setdefault(r["shape"], per_tok)
+        print(f"{r['shape']:<6}{r['tokens']:>9}"
+              f"{r['tokenize_s'] * 1e3:>10.2f}ms{r['parse_s'] * 1e3:>10.2f}ms"
+              f"{r['emit_s'] * 1e3:>10.2f}ms{per_tok:>10.0f}")
+    for shape, base in first.items():
+        last = [r for r in rows if r["shape"] == shape][-1]
+        per_tok = (last["tokenize_s"] + last["parse_s"] + last["emit_s"]) / last["tokens"] * 1e9
+        print(f"{shape}: per-token cost ratio largest/smallest = {per_tok / base:.2f} (1.0 = linear)")
+
+
+# ============================================
+# Synthetic design generator
+# ============================================
+def generate_design(pins: int = 16, comb: int = 100, regs: int = 8,
+                    depth: int = 3, fanin: int = 2, seed: int = 0) -> str:
+    """
+    Return the text of a random, valid and acyclic .seq design.
+
+      pins:  total pins; a quarter (at least one) are outputs
+      comb:  combinational equations n0..n{comb-1}
+      regs:  registers Q0..Q{regs-1} with a D equation each
+      depth: nesting depth of every right-hand side
+      fanin: arguments per AND / OR / XOR call
+    Each equation only reads inputs, registers and earlier signals.
+    """
+    rng = random.Random(seed)
+    n_out = max(1, pins // 4)
+    inputs = [f"I{i}" for i in range(max(1, pins - n_out))]
+    outputs = [f"O{i}" for i in range(n_out)]
+    registers = [f"Q{i}" for i in range(regs)]
+
+    lines = []
+    for i, name in enumerate(inputs + outputs):
+        lines.append(f"PIN {name} = {i}")
+
+    def rhs(pool, level):
+        if level == 0:
+            return rng.choice(pool)
+        fn = rng.choice(("AND", "OR", "XOR", "NOT"))
+        if fn == "NOT":
+            return f"NOT({rhs(pool, level - 1)})"
+        args = ", ".join(rhs(pool, level - 1) for _ in range(max(2, fanin)))
+        return f"{fn}({args})"
+
+    pool = inputs + registers
+    for i in range(comb):
+        lines.append(f"n{i} = {rhs(pool, depth)}")
+        pool.append(f"n{i}")
+    for q in registers:
+        lines.append(f"{q}.D = {rhs(pool, depth)}")
+    for i, name in enumerate(outputs):
+        src = pool[-1 - i] if len(pool) > i else pool[0]
+        lines.append(f"{name} = {src}")
+    return "\n".join(lines) + "\n"
+
+
+SCALES = {
+    "small": dict(pins=8, comb=50, regs=4, depth=2, fanin=2),
+    "medium": dict(pins=24, comb=1000, regs=24, depth=3, fanin=3),
+    "large": dict(pins=32, comb=10000, regs=64, depth=3, fanin=3),
+}
+
+_CLOCK = {"use_internal": 1, "clk_pin": 4, "freq_hz": 2, "mirror": 1}
+
+
+# ============================================
+# Pipeline benchmark suite
+# ============================================
+def _peak_kb(fn) -> float:
+    """Peak traced Python memory (KiB) while running fn once."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_pipeline(text: str, repeat: int = 3):
+    """
+    Time each pipeline stage on one design text:
+      check      parse_design() - what check_code_syntax() runs
+      tokenize   tokenize_expr() on every right-hand side
+      parse      parse_expr() on every token list
+      emit_c     expr_to_c() on every expression tree
+      generate   generate_ino_source() (folding, pruning, emission)
+    Returns {stage: {"seconds", "per_s", "unit", "peak_kb"}}.
+    """
+    design, err = parse_design(text)
+    if err:
+        raise ValueError(err)
+
+    n_lines = text.count("\n")
+    rhs = [line.split("=", 1)[1] for line in text.splitlines()
+           if "=" in line and not line.lstrip().upper().startswith("PIN")]
+    token_lists = [tokenize_expr(r)[0] for r in rhs]
+    n_tokens = sum(len(t) for t in token_lists)
+    nodes = [parse_expr(t, 0)[0] for t in token_lists]
+
+    stages = {
+        "check": (lambda: parse_design(text), n_lines, "lines"),
+        "tokenize": (lambda: [tokenize_expr(r) for r in rhs], n_tokens, "tokens"),
+        "parse": (lambda: [parse_expr(t, 0) for t in token_lists], n_tokens, "tokens"),
+        "emit_c": (lambda: [expr_to_c(n) for n in nodes], n_tokens, "tokens"),
+        "generate": (lambda: generate_ino_source(design, _CLOCK), n_lines, "lines"),
+    }
+
+    results = {}
+    for stage, (fn, amount, unit) in stages.items():
+        seconds, _ = _best_of(fn, repeat)
+        results[stage] = {
+            "seconds": seconds,
+            "per_s": amount / seconds if seconds > 0 else float("inf"),
+            "unit": unit,
+            "peak_kb": _peak_kb(fn),
+        }
+    return results
+
+
+def run_suite(scales=("small", "medium", "large"), repeat: int = 3, seed: int = 0):
+    """Run bench_pipeline() on a generated design per scale: {scale: {stage: ...}}."""
+    return {
+        scale: bench_pipeline(generate_design(seed=seed, **SCALES[scale]), repeat)
+        for scale in scales
+    }
+
+
+def compare_to_baseline(results, baseline, threshold: float = 0.25):
+    """
+    Return a list of (scale, stage, old_seconds, new_seconds) for every stage
+    that is more than `threshold` (0.25 = 25%) slower than the baseline.
+    """
+    regressions = []
+    for scale, stages in results.items():
+        for stage, r in stages.items():
+            old = baseline.get(scale, {}).get(stage)
+            if old and r["seconds"] > old["seconds"] * (1 + threshold):
+                regressions.append((scale, stage, old["seconds"], r["seconds"]))
+    return regressions
+
+
+def print_suite(results, baseline=None):
+    print(f"{'scale':<8}{'stage':<10}{'time':>11}{'throughput':>22}{'peak mem':>12}{'vs base':>9}")
+    for scale, stages in results.items():
+        for stage, r in stages.items():
+            delta = ""
+            old = (baseline or {}).get(scale, {}).get(stage)
+            if old:
+                delta = f"{(r['seconds'] / old['seconds'] - 1) * 100:+.0f}%"
+            print(f"{scale:<8}{stage:<10}{r['seconds'] * 1e3:>9.2f}ms"
+                  f"{r['per_s']:>14,.0f} {r['unit']}/s{r['peak_kb']:>9.0f}KiB{delta:>9}")
+
+
+# ============================================
+# Netlist IR benchmark
+# ============================================
+def _retained_kb(fn) -> float:
+    """Python memory (KiB) still held by the result of fn() (mmap'd pages are not counted)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current / 1024
+
+
+def bench_netlist(text: str, repeat: int = 3):
+    """
+    Compare the text front end with the binary netlist on one design:
+      parse      parse_design() on the .seq text
+      build      Netlist.from_design()
+      load_mmap  Netlist.load() with mmap (arrays stay in the mapped file)
+      load_read  Netlist.load() reading the file into arrays
+      load_trust Netlist.load(check=False): mmap without the per-node checks
+      decode     expression tuples rebuilt from a loaded netlist
+      gen_text   parse_design() + generate_ino_source(), end to end
+      gen_net    Netlist.load() + generate_ino_source() (codegen decodes
+                 the netlist to expression tuples first)
+    Returns ({stage: {"seconds", "retained_kb"}}, {"text_bytes", "netlist_bytes", "nodes"}).
+    """
+    design, err = parse_design(text)
+    if err:
+        raise ValueError(err)
+    net = Netlist.from_design(design)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.seqn")
+        net.save(path)
+        stages = {
+            "parse": lambda: parse_design(text),
+            "build": lambda: Netlist.from_design(design),
+            "load_mmap": lambda: Netlist.load(path),
+            "load_read": lambda: Netlist.load(path, use_mmap=False),
+            "load_trust": lambda: Netlist.load(path, check=False),
+            "decode": lambda: Netlist.load(path).decode_nodes(),
+            "gen_text": lambda: generate_ino_source(parse_design(text)[0], _CLOCK),
+            "gen_net": lambda: generate_ino_source(Netlist.load(path), _CLOCK),
+        }
+        results = {}
+        for stage, fn in stages.items():
+            seconds, _ = _best_of(fn, repeat)
+            results[stage] = {"seconds": seconds, "retained_kb": _retained_kb(fn)}
+        sizes = {
+            "text_bytes": len(text.encode("utf-8")),
+            "netlist_bytes": os.path.getsize(path),
+            "nodes": net.node_count,
+        }
+    return results, sizes
+
+
+def print_netlist_bench(rows):
+    print(f"{'scale':<8}{'stage':<11}{'time':>11}{'retained':>12}")
+    for scale, (results, sizes) in rows.items():
+        for stage, r in results.items():
+            print(f"{scale:<8}{stage:<11}{r['seconds'] * 1e3:>9.2f}ms{r['retained_kb']:>9.0f}KiB")
+        parse_s = results["parse"]["seconds"]
+        load_s = results["load_mmap"]["seconds"]
+        print(f"{scale:<8}text {sizes['text_bytes']:,} B, netlist {sizes['netlist_bytes']:,} B "
+              f"({sizes['nodes']:,} nodes); mmap load {parse_s / load_s:,.0f}x faster than parsing")
+
+
+# ============================================
+# Bytecode interpreter
+# ============================================
+AVR_MHZ = 16
+
+
+def bench_vm(text: str, repeat: int = 20, port: str = None):
+    """
+    Compile one design to bytecode and download it `repeat` times, to `port`
+    or a stand-in board. Returns a dict (compile_s, bytes, ops, download_s
+    (best), download_median_s, est_vm_us, est_native_us, board_us) or
+    {"error": ...} when the design does not fit the interpreter.
+    """
+    design, err = parse_design(text)
+    if err:
+        raise ValueError(err)
+    try:
+        compile_program(design, _CLOCK)
+    except VMError as e:
+        return {"error": str(e)}
+    compile_s, program = _best_of(lambda: compile_program(design, _CLOCK), 3)
+    vm_cycles, native_cycles = estimate_loop_cycles(program)
+    row = {
+        "compile_s": compile_s,
+        "bytes": program.stats["program_bytes"],
+        "ops": program.stats["ops"],
+        "est_vm_us": vm_cycles / AVR_MHZ,
+        "est_native_us": native_cycles / AVR_MHZ,
+        "board_us": None,
+    }
+
+    board = StandInBoard() if port is None else None
+    target = board.port if board is not None else port
+    try:
+        times = []
+        for _ in range(repeat):
+            seconds, msg = download(target, program)
+            if seconds is None:
+                raise RuntimeError(msg)
+            times.append(seconds)
+        if port is not None:
+            row["board_us"], msg = bench_board(target)
+            if row["board_us"] is None:
+                raise RuntimeError(msg)
+    finally:
+        if board is not None:
+            board.close()
+    times.sort()
+    row["download_s"] = times[0]
+    row["download_median_s"] = times[len(times) // 2]
+    return row
+
+
+def print_vm_bench(rows, target: str):
+    print(f"Design swap target: {target}")
+    print(f"{'scale':<8}{'bytes':>7}{'ops':>6}{'compile':>10}{'swap':>10}{'median':>10}"
+          f"{'loop vm':>10}{'native':>10}{'measured':>10}")
+    for scale, r in rows.items():
+        if "error" in r:
+            print(f"{scale:<8}does not fit: {r['error']}")
+            continue
+        measured = f"{r['board_us']:.0f}us" if r["board_us"] is not None else "-"
+        print(f"{scale:<8}{r['bytes']:>7}{r['ops']:>6}{r['compile_s'] * 1e3:>8.2f}ms"
+              f"{r['download_s'] * 1e3:>8.2f}ms{r['download_median_s'] * 1e3:>8.2f}ms"
+              f"{r['est_vm_us']:>8.0f}us{r['est_native_us']:>8.0f}us{measured:>10}")
+    print(f"Loop times are estimates for a {AVR_MHZ} MHz AVR (interpreter vs native sketch); "
+          "'measured' is the interpreter on the board.")
+
+
+# ============================================
+# Sharded regression
+# ============================================
+def bench_regress(text: str, workers=(1, 2, 4), cycles: int = 200, lanes: int = 1 << 18,
+                  seed: int = 0):
+    """
+    Regression throughput of one design (compared with itself, so every
+    output is checked) for each worker count: [(workers, report)].
+    """
+    design, err = parse_design(text)
+    if err:
+        raise ValueError(err)
+    return [(w, run_regression(design, design, cycles, lanes, workers=w, seed=seed))
+            for w in workers]
+
+
+def print_regress_bench(rows):
+    print(f"{'scale':<8}{'workers':>8}{'shards':>8}{'time':>10}{'M vec-cyc/s':>13}{'speedup':>9}")
+    for scale, results in rows.items():
+        base = results[0][1].throughput
+        for w, r in results:
+            print(f"{scale:<8}{r.workers:>8}{r.shards:>8}{r.seconds:>9.2f}s"
+                  f"{r.throughput / 1e6:>13.2f}{r.throughput / base:>8.2f}x")
+    print(f"({os.cpu_count()} CPUs; the worker count is capped by the number of shards)")
+
+
+def bench_faults(text: str, max_tests: int = 1000, seed: int = 0):
+    """Fault simulation and test generation of one design: the FaultReport."""
+    design, err = parse_design(text)
+    if err:
+        raise ValueError(err)
+    return generate_tests(design, max_tests=max_tests, seed=seed)
+
+
+def print_faults_bench(rows):
+    print(f"{'scale':<8}{'faults':>8}{'coverage':>10}{'tests':>7}{'vectors':>9}{'time':>9}"
+          f"{'k fault-tests/s':>17}")
+    for scale, r in rows.items():
+        rate = len(r.faults) * r.candidates / r.seconds / 1e3 if r.seconds else 0.0
+        print(f"{scale:<8}{len(r.faults):>8,}{r.coverage:>9.1f}%{len(r.tests):>7}{r.vectors:>9}"
+              f"{r.seconds:>8.2f}s{rate:>17,.0f}")
+
+
+# ============================================
+# Coverage collection overhead
+# ============================================
+def bench_coverage(text: str, cycles: int = 500, lanes: int = 4096, seed: int = 0):
+    """
+    A one-worker regression of a design without and with coverage:
+    (seconds without, seconds with, CoverageDB).
+    """
+    design, err = parse_design(text)
+    if err:
+        raise ValueError(err)
+    plain = run_regression(design, None, cycles, lanes, workers=1, seed=seed)
+    covered = run_regression(design, None, cycles, lanes, workers=1, seed=seed, coverage=True)
+    return plain.seconds, covered.seconds, covered.coverage
+
+
+def print_coverage_bench(rows):
+    print(f"{'design':<10}{'regs':>6}{'plain':>9}{'coverage':>10}{'overhead':>10}"
+          f"{'states':>9}{'transitions':>13}{'dropped':>10}")
+    for name, (plain, covered, db) in rows.items():
+        print(f"{name:<10}{len(db.registers):>6}{plain:>8.2f}s{covered:>9.2f}s"
+              f"{covered / plain if plain else 0.0:>9.1f}x{len(db.states):>9,}"
+              f"{len(db.transitions):>13,}{sum(db.dropped):>10,}")
+
+
+# ============================================
+# Editor highlighting
+# ============================================
+BENCH_LINE_PX = 16  # pixel height of one line in BenchText
+
+
+class _BenchTcl:
+    """The part of a Tcl interpreter Highlighter uses: command lookup and rename."""
+
+    def __init__(self):
+        self.commands = {}
+
+    def createcommand(self, name, fn):
+        self.commands[name] = fn
+
+    def call(self, cmd, *args):
+        if cmd == "rename":
+            self.commands[args[1]] = self.commands.pop(args[0])
+            return ""
+        return self.commands[cmd](*args)
+
+
+_INDEX_RE = re.compile(r"^(@\d+,\d+|end|\d+\.(?:\d+|end))((?:\s*[+-]\s*\d+\s*(?:chars|lines))*)$")
+_OFFSET_RE = re.compile(r"([+-])\s*(\d+)\s*(chars|lines)")
+
+
+class BenchText:
+    """
+    Headless stand-in for the editor's tk.Text: the text as a list of lines,
+    the index forms and commands seq_highlight uses (index, get, insert,
+    delete, replace, tag, yview, see), a viewport of `view_lines` lines and
+    an after() queue that run_pending() drains. Tag calls are only counted.
+    """
+
+    def __init__(self, text: str, view_lines: int = 50):
+        self.lines = text.split("\n")
+        self.top = 1
+        self.view_lines = view_lines
+        self.tag_calls = 0
+        self._w = ".bench_text"
+        self.tk = _BenchTcl()
+        self.tk.createcommand(self._w, self._command)
+        self._after = {}
+        self._after_ids = 0
+
+    # ---------- Tk widget methods ----------
+    def tag_configure(self, tag, **options):
+        pass
+
+    def tag_raise(self, tag):
+        pass
+
+    def winfo_height(self) -> int:
+        return self.view_lines * BENCH_LINE_PX
+
+    def after(self, ms, fn):
+        self._after_ids += 1
+        self._after[self._after_ids] = fn
+        return self._after_ids
+
+    def after_cancel(self, job):
+        self._after.pop(job, None)
+
+    def run_pending(self) -> int:
+        """Run scheduled callbacks (and those they schedule) until none is left."""
+        runs = 0
+        while self._after:
+            job = min(self._after)
+            self._after.pop(job)()
+            runs += 1
+        return runs
+
+    def command(self, *args):
+        """Call the widget command as Tk would (through any wrapper installed on it)."""
+        return self.tk.call(self._w, *args)
+
+    # ---------- Tcl command ----------
+    def _command(self, op, *args):
+        if op == "index":
+            return "%d.%d" % self._index(args[0])
+        if op == "get":
+            return self._get(self._index(args[0]), self._index(args[1]))
+        if op == "insert":
+            self._insert(self._index(args[0]), args[1])
+        elif op == "delete":
+            a = self._index(args[0])
+            b = self._index(args[1]) if len(args) > 1 else self._move(a, 1)
+            self._delete(a, b)
+        elif op == "replace":
+            a, b = self._index(args[0]), self._index(args[1])
+            self._delete(a, b)
+            self._insert(a, args[2])
+        elif op == "tag":
+            self.tag_calls += 1
+        elif op == "yview" and args[:1] == ("moveto",):
+            self.top = max(1, min(len(self.lines), int(float(args[1]) * len(self.lines)) + 1))
+        return ""
+
+    def _index(self, spec: str):
+        m = _INDEX_RE.match(spec.strip())
+        if not m:
+            raise ValueError(f"bad text index \"{spec}\"")
+        base = m.group(1)
+        n = len(self.lines)
+        end = base == "end"
+        if end:  # one past the newline Tk keeps after the last line
+            pos = (n, len(self.lines[-1]))
+        elif base.startswith("@"):
+            y = int(base.split(",")[1])
+            line = min(n, self.top + y // BENCH_LINE_PX)
+            pos = (line, 0)
+        else:
+            line, col = base.split(".")
+            line = max(1, min(n, int(line)))
+            length = len(self.lines[line - 1])
+            pos = (line, length if col == "end" else min(int(col), length))
+        for sign, count, unit in _OFFSET_RE.findall(m.group(2)):
+            delta = int(count) if sign == "+" else -int(count)
+            if end and unit == "chars" and delta < 0:
+                delta, end = delta + 1, False
+            if unit == "lines":
+                line = max(1, min(n, pos[0] + delta))
+                pos = (line, min(pos[1], len(self.lines[line - 1])))
+            else:
+                pos = self._move(pos, delta)
+        return pos
+
+    def _move(self, pos, delta: int):
+        """pos moved by delta characters, a line end counting as one."""
+        line, col = pos
+        lines = self.lines
+        while delta > 0:
+            step = min(delta, len(lines[line - 1]) - col)
+            col += step
+            delta -= step
+            if delta and line < len(lines):
+                line, col, delta = line + 1, 0, delta - 1
+            elif delta:
+                break
+        while delta < 0:
+            step = min(-delta, col)
+            col -= step
+            delta += step
+            if delta and line > 1:
+                line, col, delta = line - 1, len(lines[line - 2]), delta + 1
+            elif delta:
+                break
+        return line, col
+
+    def _get(self, a, b) -> str:
+        if b <= a:
+            return ""
+        if a[0] == b[0]:
+            return self.lines[a[0] - 1][a[1]:b[1]]
+        parts = [self.lines[a[0] - 1][a[1]:]] + self.lines[a[0]:b[0] - 1] + [self.lines[b[0] - 1][:b[1]]]
+        return "\n".join(parts)
+
+    def _insert(self, pos, text: str):
+        line, col = pos
+        old = self.lines[line - 1]
+        new = (old[:col] + text + old[col:]).split("\n")
+        self.lines[line - 1:line] = new
+
+    def _delete(self, a, b):
+        if b <= a:
+            return
+        head = self.lines[a[0] - 1][:a[1]]
+        tail = self.lines[b[0] - 1][b[1]:]
+        self.lines[a[0] - 1:b[0]] = [head + tail]
+
+
+def bench_highlight(text: str, keystrokes: int = 200, seed: int = 0):
+    """
+    Highlighter on a BenchText holding `text`:
+      attach     wrapping the widget and indexing the whole buffer
+      key        one typed character: _dispatch (the widget command)
+      key_pass   the highlighting pass after it (_run, viewport + commit)
+      paste      dispatch + passes for 1,000 pasted lines in the middle
+      scroll     yview to a random place + the repaint pass
+    Returns {stage: {"median_s", "max_s", "n"}} and the line count.
+    """
+    from seq_highlight import Highlighter, scan_line  # imports no Tk
+
+    scan_line.cache_clear()
+    rng = random.Random(seed)
+    widget = BenchText(text)
+    times = {}
+
+    def timed(stage, fn):
+        t0 = time.perf_counter()
+        fn()
+        times.setdefault(stage, []).append(time.perf_counter() - t0)
+
+    def attach():
+        widget.highlighter = Highlighter(widget)
+        widget.run_pending()
+
+    timed("attach", attach)
+    n = len(widget.lines)
+    for _ in range(keystrokes):
+        line = rng.randrange(widget.top, min(n, widget.top + widget.view_lines))
+        timed("key", lambda: widget.command("insert", f"{line}.end", rng.choice("abQ_(,) ")))
+        timed("key_pass", widget.run_pending)
+    block = "\n".join(widget.lines[:1000]) + "\n"
+    timed("paste", lambda: (widget.command("insert", f"{n // 2}.0", block), widget.run_pending()))
+    for _ in range(20):
+        timed("scroll", lambda: (widget.command("yview", "moveto", str(rng.random())), widget.run_pending()))
+    stats = {}
+    for stage, values in times.items():
+        values.sort()
+        stats[stage] = {"median_s": values[len(values) // 2], "max_s": values[-1], "n": len(values)}
+    return stats, len(widget.lines)
+
+
+def print_highlight_bench(stats, lines: int):
+    print(f"{'stage':<10}{'median':>11}{'max':>11}{'runs':>6}")
+    for stage, r in stats.items():
+        print(f"{stage:<10}{r['median_s'] * 1e3:>9.3f}ms{r['max_s'] * 1e3:>9.3f}ms{r['n']:>6}")
+    print(f"({lines:,} lines in the buffer; key is the cost on the Tk thread per keystroke, "
+          f"key_pass runs once typing pauses)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="seq_bench", description="SeqEditor benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("parser", help="tokenizer / parser / C emission scaling")
+    p.add_argument("--max-tokens", type=int, default=100_000)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("suite", help="time the Check / Flash pipeline on generated designs")
+    p.add_argument("--scales", default="small,medium,large",
+                   help=f"comma separated, from: {', '.join(SCALES)}")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--baseline", help="compare against this JSON baseline")
+    p.add_argument("--save-baseline", help="write the results as a JSON baseline")
+    p.add_argument("--threshold", type=float, default=0.25,
+                   help="allowed slowdown vs baseline (0.25 = 25%%)")
+
+    p = sub.add_parser("design", help="write a synthetic .seq design")
+    p.add_argument("--pins", type=int, default=16)
+    p.add_argument("--comb", type=int, default=100)
+    p.add_argument("--regs", type=int, default=8)
+    p.add_argument("--depth", type=int, default=3)
+    p.add_argument("--fanin", type=int, default=2)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("-o", "--output", help="output .seq path (default: stdout)")
+
+    p = sub.add_parser("netlist", help="text parsing vs binary netlist loading")
+    p.add_argument("--scales", default="medium,large",
+                   help=f"comma separated, from: {', '.join(SCALES)}")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("vm", help="bytecode interpreter: design swap time and loop cost")
+    p.add_argument("--scales", default="small",
+                   help=f"comma separated, from: {', '.join(SCALES)}")
+    p.add_argument("--repeat", type=int, default=20, help="downloads per design")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--port", help="board running the interpreter (default: pty stand-in)")
+
+    p = sub.add_parser("regress", help="sharded regression throughput vs worker count")
+    p.add_argument("--scales", default="medium",
+                   help=f"comma separated, from: {', '.join(SCALES)}")
+    p.add_argument("--workers", default="",
+                   help="comma separated worker counts (default: 1, 2, 4, ... up to the CPU count)")
+    p.add_argument("--cycles", type=int, default=200)
+    p.add_argument("--lanes", type=int, default=1 << 18)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("faults", help="stuck-at fault simulation and test compaction")
+    p.add_argument("--scales", default="small,medium",
+                   help=f"comma separated, from: {', '.join(SCALES)}")
+    p.add_argument("--max-tests", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("coverage", help="coverage collection overhead on a regression")
+    p.add_argument("--scales", default="small,medium",
+                   help=f"comma separated, from: {', '.join(SCALES)}")
+    p.add_argument("--regs", default="16,64",
+                   help="also medium-sized designs with these register counts (comma separated)")
+    p.add_argument("--cycles", type=int, default=500)
+    p.add_argument("--lanes", type=int, default=4096)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("highlight", help="editor highlighting: keystroke and scroll cost on a large buffer")
+    p.add_argument("--lines", type=int, default=50000)
+    p.add_argument("--keystrokes", type=int, default=200)
+    p.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "parser":
+        print_parser_scaling(bench_parser_scaling(args.max_tokens, args.repeat))
+        return 0
+
+    if args.command == "design":
+        text = generate_design(args.pins, args.comb, args.regs, args.depth,
+                               args.fanin, args.seed)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+        return 0
+
+    if args.command == "highlight":
+        text = generate_design(pins=64, comb=max(1, args.lines - 320), regs=128, seed=args.seed)
+        print_highlight_bench(*bench_highlight(text, args.keystrokes, args.seed))
+        return 0
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    if args.command == "netlist":
+        print_netlist_bench({
+            scale: bench_netlist(generate_design(seed=args.seed, **SCALES[scale]), args.repeat)
+            for scale in scales
+        })
+        return 0
+
+    if args.command == "regress":
+        if args.workers:
+            counts = [int(w) for w in args.workers.split(",") if w.strip()]
+        else:
+            counts = [1]
+            while counts[-1] * 2 <= (os.cpu_count() or 1):
+                counts.append(counts[-1] * 2)
+        print_regress_bench({
+            scale: bench_regress(generate_design(seed=args.seed, **SCALES[scale]), counts,
+                                 args.cycles, args.lanes, args.seed)
+            for scale in scales
+        })
+        return 0
+
+    if args.command == "faults":
+        print_faults_bench({
+            scale: bench_faults(generate_design(seed=args.seed, **SCALES[scale]), args.max_tests, args.seed)
+            for scale in scales
+        })
+        return 0
+
+    if args.command == "coverage":
+        designs = {scale: generate_design(seed=args.seed, **SCALES[scale]) for scale in scales}
+        for regs in [int(r) for r in args.regs.split(",") if r.strip()]:
+            designs[f"regs={regs}"] = generate_design(
+                seed=args.seed, **dict(SCALES["medium"], comb=200, regs=regs))
+        print_coverage_bench({
+            name: bench_coverage(text, args.cycles, args.lanes, args.seed)
+            for name, text in designs.items()
+        })
+        return 0
+
+    if args.command == "vm":
+        print_vm_bench({
+            scale: bench_vm(generate_design(seed=args.seed, **SCALES[scale]), args.repeat, args.port)
+            for scale in scales
+        }, args.port or "pty stand-in")
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_suite(scales, args.repeat, args.seed)
+    print_suite(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for scale, stage, old, new in regressions:
+            print(f"REGRESSION {scale}/{stage}: {old * 1e3:.2f}ms -> {new * 1e3:.2f}ms")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# seq_build.py - persistent arduino-cli build directories.
+#
+# arduino-cli compiles into a temporary cache by default, which is keyed on
+# the sketch path and cleaned at arbitrary times, so the Arduino core
+# (core.a) and libraries are often rebuilt from scratch. SeqEditor instead
+# passes one stable --build-path per board (FQBN) and sketch directory, kept
+# under a managed root with a total size cap. The sketch is only rewritten when its content
+# changes, so arduino-cli's incremental build sees unchanged timestamps.
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+_json_lock = threading.Lock()  # serializes update_json() between the GUI and watch threads
+
+
+def default_build_root():
+    """$SEQEDITOR_BUILD_DIR, else ~/.cache/seqeditor/build."""
+    return os.environ.get("SEQEDITOR_BUILD_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "seqeditor", "build"
+    )
+
+
+def default_size_cap() -> int:
+    """Size cap in bytes for all build directories ($SEQEDITOR_BUILD_CAP_MB, default 512)."""
+    try:
+        mb = int(os.environ.get("SEQEDITOR_BUILD_CAP_MB", "512"))
+    except ValueError:
+        mb = 512
+    return mb * 1024 * 1024
+
+
+def _board_prefix(fqbn: str) -> str:
+    """Readable FQBN plus a short hash of it; shared by all its build directories."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", fqbn).strip("_") or "board"
+    return f"{safe}-{hashlib.sha1(fqbn.encode('utf-8')).hexdigest()[:8]}"
+
+
+def build_path_for(fqbn: str, root: str, sketch_dir: str) -> str:
+    """
+    Stable build directory for one sketch on one board: the board prefix plus
+    a short hash of the absolute sketch path, so two sketches compiled for the
+    same board never share (and keep invalidating) one directory.
+    """
+    digest = hashlib.sha1(os.path.abspath(sketch_dir).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(root, f"{_board_prefix(fqbn)}-{digest}")
+
+
+def dir_size(path: str) -> int:
+    """Total size in bytes of the files below path (0 if missing)."""
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def is_warm(build_path: str) -> bool:
+    """True when a previous build left its artifacts (e.g. core.a) in build_path."""
+    return os.path.isdir(os.path.join(build_path, "core"))
+
+
+def enforce_size_cap(root: str, max_bytes: int, keep: str = None):
+    """
+    Delete the least recently used build directories under root until their
+    total size is at most max_bytes; `keep` is never deleted.
+    Returns the list of (path, size) removed.
+    """
+    if not os.path.isdir(root):
+        return []
+    entries = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            entries.append((os.path.getmtime(path), path, dir_size(path)))
+    total = sum(size for _, _, size in entries)
+    removed = []
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append((path, size))
+    return removed
+
+
+def clean_build_dirs(root: str, fqbn: str = None):
+    """Delete the build directories of one board (or all of them). Returns bytes freed."""
+    names = os.listdir(root) if os.path.isdir(root) else []
+    if fqbn is not None:
+        prefix = _board_prefix(fqbn)
+        names = [n for n in names if n == prefix or n.startswith(prefix + "-")]
+    paths = [os.path.join(root, n) for n in names]
+    freed = 0
+    for path in paths:
+        if os.path.isdir(path):
+            freed += dir_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+    return freed
+
+
+def discard_partial_build(build_path: str, was_warm: bool):
+    """
+    Clean up after a compile that was killed: its sketch objects may be
+    truncated but newer than the sources, so they are removed; if the core
+    was being built too (cold directory), the whole directory goes.
+    """
+    if was_warm:
+        shutil.rmtree(os.path.join(build_path, "sketch"), ignore_errors=True)
+    else:
+        shutil.rmtree(build_path, ignore_errors=True)
+
+
+def write_if_changed(path: str, text: str) -> bool:
+    """
+    Atomically replace path with text (temp file + os.replace) unless it
+    already holds exactly that text. Returns True if the file was written.
+    Raises OSError like open().
+    """
+    data = text.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def update_json(path: str, update):
+    """
+    Read-modify-write of a small JSON store that the GUI thread and the
+    watch worker both record into: under a lock, load path ({} when missing
+    or unreadable), call update(data) and write data back atomically
+    (write_if_changed). Returns (data, update's result); write errors are
+    ignored, as the stores are only informative.
+    """
+    with _json_lock:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        result = update(data)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_if_changed(path, json.dumps(data, indent=2))
+        except OSError:
+            pass
+    return data, result
+
+
+# =========================
+# Warm / cold compile times
+# =========================
+class CompileTimes:
+    """
+    Last cold (empty build directory) and warm compile time per FQBN, kept
+    in <root>/compile_times.json.
+    """
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, "compile_times.json")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.data = {}
+
+    def record(self, fqbn: str, warm: bool, seconds: float) -> str:
+        """Store one compile time and return a one-line report comparing warm and cold."""
+        def update(data):
+            entry = data.setdefault(fqbn, {})
+            entry["warm_s" if warm else "cold_s"] = round(seconds, 3)
+            entry["updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            return entry
+
+        self.data, entry = update_json(self.path, update)
+
+        msg = f"Compile time: {seconds:.1f} s ({'warm' if warm else 'cold'} build directory"
+        other = entry.get("cold_s" if warm else "warm_s")
+        if other:
+            msg += f"; last {'cold' if warm else 'warm'}: {other:.1f} s"
+        return msg + ")."
@@ -0,0 +1,629 @@
+# seq_cli.py - headless command-line front end for SeqEditor analyses.
+#
+# Usage:
+#   python seq_cli.py equiv old.seq new.seq [--ordering dfs|fanout]
+#   python seq_cli.py reach design.seq [--dot graph.dot] [--json graph.json]
+#   python seq_cli.py regress new.seq [--reference old.seq] [--cycles 1000] [--lanes 65536] [--workers 8]
+#   python seq_cli.py coverage design.seq [--cycles 1000 --lanes 4096 | --trace cap.csv ...] [--merge db.json ...] [-o db.json]
+#   python seq_cli.py faults design.seq [--max-tests 1000] [--length 16] [--tests tests.txt] [--json report.json]
+#   python seq_cli.py gen design.seq [-o sketch.ino] [--keep f1,Q3] [--trace t.json] [clock options]
+#   python seq_cli.py netlist design.seq -o design.seqn
+#   python seq_cli.py build design.seq --fqbn arduino:avr:leonardo [--sketch-dir d] [clock options]
+#   python seq_cli.py watch design.seq [--fqbn arduino:avr:leonardo --compile] [--poll]
+#   python seq_cli.py upload design.seq --fqbn arduino:avr:leonardo --port /dev/ttyACM0 [--no-verify]
+#   python seq_cli.py ident /dev/ttyACM0
+#   python seq_cli.py vm design.seq [--port /dev/ttyACM0 | --stand-in] [--dump] [clock options]
+#   python seq_cli.py vm --write-sketch seq_vm     (interpreter sketch, flashed once)
+#
+# Every command also accepts a compiled .seqn netlist instead of a .seq file.
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from seq_modules import ModuleCache, default_cache_dir, load_design
+from seq_netlist import Netlist, NetlistError
+from seq_codegen import describe_prune_stats, generate_ino_source
+from seq_arduino import SubprocessBackend, open_backend
+from seq_build import (
+    CompileTimes,
+    build_path_for,
+    default_build_root,
+    default_size_cap,
+    discard_partial_build,
+    enforce_size_cap,
+    is_warm,
+    write_if_changed,
+)
+from seq_ident import query_build_id, stamp_build_id
+from seq_upload import BOOTLOADER_TIMEOUT_S, FastUploader, find_avrdude, hex_for
+from seq_size import DEFAULT_MIN_SRAM_FREE, SizeHistory, parse_compile_output, size_report
+from seq_coverage import CoverageDB, CoverageError, coverage_report, simulate_coverage, trace_coverage
+from seq_fault import FaultError, generate_tests
+from seq_bdd import ORDERINGS, check_equivalence
+from seq_reach import ReachError, explore
+from seq_regress import RegressionError, run_regression
+from seq_sim import SimError
+from seq_trace import Tracer, maybe_span
+from seq_watch import FileWatch, JobCancelled, LatestJob
+from seq_vm import StandInBoard, VMError, compile_program, download, interpreter_ino_source, vm_hello
+
+
+def _read_design(path: str, tracer=None, cache=None):
+    """
+    Read and parse a .seq file (or mmap a .seqn netlist).
+    Returns (design, None) or (None, error_message).
+    """
+    if path.endswith(".seqn"):
+        try:
+            with maybe_span(tracer, "load netlist"):
+                return Netlist.load(path), None
+        except (OSError, NetlistError) as e:
+            return None, f"Error opening netlist: {e}"
+
+    try:
+        with maybe_span(tracer, "read"):
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+    except OSError as e:
+        return None, f"Error opening file: {e}"
+
+    with maybe_span(tracer, "parse + check", chars=len(text)):
+        design, err = load_design(text, os.path.dirname(os.path.abspath(path)),
+                                  cache or ModuleCache(default_cache_dir()))
+    if err:
+        return None, f"{path}: {err}"
+    return design, None
+
+
+def _load_design(path: str, tracer=None):
+    """_read_design(), exiting with the checker message on error."""
+    design, err = _read_design(path, tracer)
+    if err:
+        sys.exit(err)
+    return design
+
+
+# =========================
+# Subcommands
+# =========================
+def cmd_equiv(args) -> int:
+    """Prove two designs equivalent, or print a minimal counterexample."""
+    old = _load_design(args.old)
+    new = _load_design(args.new)
+    result = check_equivalence(old, new, ordering=args.ordering)
+    print(result.describe())
+    return 0 if result else 1
+
+
+def cmd_reach(args) -> int:
+    """Explore the reachable register states and optionally export the graph."""
+    design = _load_design(args.design)
+    want_graph = bool(args.dot or args.json)
+    try:
+        result = explore(design, max_registers=args.max_registers,
+                         collect_edges=want_graph)
+    except (ReachError, SimError) as e:
+        print(f"Cannot explore state space: {e}")
+        return 1
+
+    print(result.summary())
+    if args.dot:
+        result.write_dot(args.dot)
+        print(f"Wrote {args.dot}")
+    if args.json:
+        result.write_json(args.json)
+        print(f"Wrote {args.json}")
+    return 0
+
+
+def cmd_regress(args) -> int:
+    """Random-stimulus regression of a design against a reference, sharded over processes."""
+    design = _load_design(args.design)
+    reference = _load_design(args.reference) if args.reference else None
+
+    def progress(done, total):
+        print(f"\r{done:,} / {total:,} cycles", end="", file=sys.stderr, flush=True)
+
+    try:
+        report = run_regression(design, reference, args.cycles, args.lanes, args.workers,
+                                args.seed, progress=progress if sys.stderr.isatty() else None)
+    except (RegressionError, SimError) as e:
+        print(f"\nCannot run the regression: {e}", file=sys.stderr)
+        return 2
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(report.summary())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+        print(f"Wrote {args.json}")
+    return 1 if report.mismatches else 0
+
+
+def cmd_coverage(args) -> int:
+    """Toggle / state / transition coverage from random simulation or captured traces."""
+    design = _load_design(args.design)
+    try:
+        if args.trace:
+            db = trace_coverage(design, args.trace)
+        elif args.workers == 1:
+            db = simulate_coverage(design, args.cycles, args.lanes, args.seed)
+        else:
+            db = run_regression(design, None, args.cycles, args.lanes, args.workers, args.seed,
+                                coverage=True).coverage
+        for path in args.merge or []:
+            db.merge(CoverageDB.load(path))
+    except (CoverageError, RegressionError, SimError) as e:
+        print(f"Cannot collect coverage: {e}", file=sys.stderr)
+        return 2
+    print("\n".join(coverage_report(db, design, limit=args.limit)))
+    if args.output:
+        db.save(args.output)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+def cmd_faults(args) -> int:
+    """Stuck-at fault simulation and a compacted test set for the design's pins."""
+    design = _load_design(args.design)
+
+    def progress(candidates, detected, total):
+        print(f"\r{candidates:,} candidates, {detected:,} / {total:,} faults detected",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        report = generate_tests(design, args.max_tests, args.length, args.patience, args.seed,
+                                progress=progress if sys.stderr.isatty() else None)
+    except (FaultError, SimError) as e:
+        print(f"\nCannot fault simulate: {e}", file=sys.stderr)
+        return 2
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(report.summary(args.limit))
+    if args.tests:
+        with open(args.tests, "w", encoding="utf-8") as f:
+            f.write("\n".join(report.format_tests()) + "\n")
+        print(f"Wrote {args.tests}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+        print(f"Wrote {args.json}")
+    return 0
+
+
+def _clock_from_args(args) -> dict:
+    """Clock configuration dict, same keys as SeqEditorApp._clock_config()."""
+    return {
+        "use_internal": 0 if args.external else 1,
+        "clk_pin": args.clk_pin,
+        "freq_hz": args.freq,
+        "mirror": 0 if args.no_mirror else 1,
+    }
+
+
+def _add_clock_args(p):
+    p.add_argument("--external", action="store_true", help="use an external clock")
+    p.add_argument("--clk-pin", type=int, default=4)
+    p.add_argument("--freq", type=int, default=2, help="internal clock frequency (Hz)")
+    p.add_argument("--no-mirror", action="store_true", help="do not mirror the clock on pin 13")
+    p.add_argument("--keep", default="", help="debug taps kept in the firmware ('*' = all)")
+
+
+def _add_build_args(p):
+    p.add_argument("--sketch-dir", help="sketch folder (default: seq_sketch next to the design)")
+    p.add_argument("--min-sram-free", type=int, default=DEFAULT_MIN_SRAM_FREE,
+                   help="warn when less SRAM (bytes) is left for the stack")
+    p.add_argument("-v", "--verbose", action="store_true", help="print the compiler output")
+    _add_clock_args(p)
+
+
+def _keep_from_args(args):
+    return [n for n in args.keep.replace(",", " ").split() if n]
+
+
+def cmd_gen(args) -> int:
+    """Generate the .ino source for a design."""
+    tracer = Tracer(profile=bool(args.profile)) if (args.trace or args.profile) else None
+    with maybe_span(tracer, "gen"):
+        design = _load_design(args.design, tracer)
+        with maybe_span(tracer, "codegen"):
+            source, stats = generate_ino_source(design, _clock_from_args(args),
+                                                _keep_from_args(args))
+        with maybe_span(tracer, "write"):
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(source)
+            else:
+                sys.stdout.write(source)
+    print(describe_prune_stats(stats), file=sys.stderr)
+
+    if tracer is not None:
+        print(tracer.summary(), file=sys.stderr)
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+            print(f"Wrote {args.trace}", file=sys.stderr)
+        if args.profile:
+            tracer.write_profile(args.profile)
+            print(tracer.profile_summary(10), file=sys.stderr)
+    return 0
+
+
+def cmd_netlist(args) -> int:
+    """Compile a design into the binary netlist format."""
+    design = _load_design(args.design)
+    net = Netlist.from_design(design)
+    net.save(args.output)
+    print(f"Wrote {args.output}: {net.node_count} nodes, {len(net.names)} names, "
+          f"{net.nbytes} bytes")
+    return 0
+
+
+def _find_isr_clock(sketch_dir: str, design_path: str):
+    """isrClock.h from the sketch dir, the design's dir or SeqEditor's own dir."""
+    for folder in (sketch_dir, os.path.dirname(os.path.abspath(design_path)),
+                   os.path.dirname(os.path.abspath(__file__))):
+        path = os.path.join(folder, "isrClock.h")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _build(args, design, job=None, compile_sketch: bool = True) -> int:
+    """
+    Generate the sketch for `design` next to args.design (or in
+    args.sketch_dir) and compile it with args.fqbn, reporting time and size.
+    With a seq_watch.Job, compiles through job.run() so that a newer save can
+    cancel it (JobCancelled propagates).
+    """
+    clock = _clock_from_args(args)
+    keep = _keep_from_args(args)
+    sketch_dir = os.path.abspath(args.sketch_dir or os.path.join(
+        os.path.dirname(os.path.abspath(args.design)), "seq_sketch"))
+    hdr = _find_isr_clock(sketch_dir, args.design)
+    if hdr is None:
+        print("Required library 'isrClock.h' was not found.", file=sys.stderr)
+        return 1
+
+    source, stats = generate_ino_source(design, clock, keep, build_id=True)
+    print(describe_prune_stats(stats))
+    try:
+        # Same build ID salt as the editor: device + isrClock.h
+        with open(hdr, "r", encoding="utf-8", errors="replace") as f:
+            source, build_id = stamp_build_id(source, args.fqbn + "\0" + f.read())
+    except OSError as e:
+        print(f"Cannot read {hdr}: {e}", file=sys.stderr)
+        return 1
+    print(f"Build ID: {build_id}")
+    if job is not None:
+        job.check()
+
+    build_path = build_path_for(args.fqbn, default_build_root(), sketch_dir)
+    try:
+        os.makedirs(sketch_dir, exist_ok=True)
+        if os.path.dirname(hdr) != sketch_dir:
+            shutil.copy2(hdr, os.path.join(sketch_dir, "isrClock.h"))
+        write_if_changed(os.path.join(sketch_dir, os.path.basename(sketch_dir) + ".ino"), source)
+        if compile_sketch:
+            os.makedirs(build_path, exist_ok=True)
+            os.utime(build_path)
+    except OSError as e:
+        print(f"Cannot prepare sketch: {e}", file=sys.stderr)
+        return 1
+    if not compile_sketch:
+        print(f"Wrote {sketch_dir}")
+        return 0
+    enforce_size_cap(default_build_root(), default_size_cap(), keep=build_path)
+
+    if job is not None:
+        backend = SubprocessBackend(runner=job.run)
+    else:
+        backend, note = open_backend(args.daemon)
+        if note:
+            print(note)
+    warm = is_warm(build_path)
+    t0 = time.perf_counter()
+    try:
+        result = backend.compile(args.fqbn, sketch_dir, build_path=build_path, json_output=True)
+    except JobCancelled:
+        discard_partial_build(build_path, warm)
+        print("Stale build cancelled.")
+        raise
+    except FileNotFoundError:
+        print("arduino-cli not found. Install it or add it to PATH.", file=sys.stderr)
+        return 1
+    finally:
+        backend.close()
+    compile_s = time.perf_counter() - t0
+
+    size, out, err = parse_compile_output(result.stdout)
+    if result.returncode != 0:
+        print("Compile failed.", file=sys.stderr)
+        for text in (out, err, result.stderr):
+            if text.strip():
+                print(text.strip(), file=sys.stderr)
+        return 1
+
+    if args.verbose and out.strip():
+        print(out.strip())
+    print("Compile succeeded.")
+    print(CompileTimes(default_build_root()).record(args.fqbn, warm, compile_s))
+    if size is None:
+        print("arduino-cli did not report the firmware size.")
+        return 0
+    options = dict(clock, keep=keep, device=args.fqbn)
+    history = SizeHistory(default_build_root())
+    for message, level in size_report(size, design.fingerprint(), options, history,
+                                      args.min_sram_free):
+        print(f"Warning: {message}" if level == "warning" else message)
+    return 0
+
+
+def cmd_build(args) -> int:
+    """Generate and compile the firmware; report flash / SRAM usage and deltas."""
+    return _build(args, _load_design(args.design))
+
+
+def cmd_watch(args) -> int:
+    """Re-check and regenerate (and with --compile, compile) the design on every save."""
+    if args.compile and not args.fqbn:
+        print("--compile needs --fqbn.", file=sys.stderr)
+        return 2
+    path = os.path.abspath(args.design)
+    cache = ModuleCache(default_cache_dir())
+    jobs = LatestJob(on_error=lambda e: print(f"Rebuild failed: {e}", file=sys.stderr))
+    watch = None
+
+    def rebuild(job):
+        design, err = _read_design(path, cache=cache)
+        if design is not None:
+            watch.set_paths([path, *design.sources])  # follow INCLUDE changes
+        print(f"[{time.strftime('%H:%M:%S')}] {err or 'Check passed.'}", flush=True)
+        if err:
+            return
+        job.check()
+        _build(args, design, job, compile_sketch=args.compile)
+        sys.stdout.flush()
+
+    watch = FileWatch([path], lambda changed: jobs.submit(rebuild),
+                      debounce=args.debounce, use_inotify=not args.poll)
+    print(f"Watching {path} ({watch.watcher.name}); Ctrl+C to stop.")
+    if watch.note:
+        print(watch.note)
+    jobs.submit(rebuild)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watch.stop()
+        jobs.close()
+    return 0
+
+
+def cmd_upload(args) -> int:
+    """Upload the firmware compiled by 'build', with avrdude directly or arduino-cli."""
+    sketch_dir = os.path.abspath(args.sketch_dir or os.path.join(
+        os.path.dirname(os.path.abspath(args.design)), "seq_sketch"))
+    build_path = build_path_for(args.fqbn, default_build_root(), sketch_dir)
+    hex_path = hex_for(build_path, sketch_dir)
+    if hex_path is None:
+        print(f"No compiled firmware in {build_path}; run 'build' first.", file=sys.stderr)
+        return 1
+
+    avrdude, conf = (None, None) if args.arduino_cli else find_avrdude()
+    if avrdude is None:
+        if not args.arduino_cli:
+            print("avrdude not found; using arduino-cli upload.")
+        t0 = time.perf_counter()
+        try:
+            result = SubprocessBackend().upload(args.port, args.fqbn, sketch_dir,
+                                                build_path=build_path)
+        except FileNotFoundError:
+            print("arduino-cli not found. Install it or add it to PATH.", file=sys.stderr)
+            return 1
+        print(f"arduino-cli upload: {time.perf_counter() - t0:.2f} s")
+        if result.returncode != 0:
+            print((result.stderr or result.stdout).strip(), file=sys.stderr)
+            print("Upload failed.", file=sys.stderr)
+            return 1
+        print("Upload succeeded.")
+        return 0
+
+    result = FastUploader(avrdude, conf, timeout=args.timeout).upload(
+        args.port, hex_path, verify=not args.no_verify)
+    for warning in result.warnings:
+        print(f"Warning: {warning}")
+    print(result.describe())
+    if args.verbose and result.stderr.strip():
+        print(result.stderr.strip())
+    if not result.ok:
+        print(result.message, file=sys.stderr)
+        if result.stderr.strip() and not args.verbose:
+            print(result.stderr.strip(), file=sys.stderr)
+        return 1
+    print(result.message)
+    return 0
+
+
+def cmd_ident(args) -> int:
+    """Print the build ID reported by the firmware on a serial port."""
+    build_id, msg = query_build_id(args.port, timeout=args.timeout)
+    if build_id is None:
+        print(f"No build ID: {msg}")
+        return 1
+    print(build_id)
+    return 0
+
+
+def cmd_vm(args) -> int:
+    """Compile a design to interpreter bytecode and download it to the board."""
+    if args.write_sketch:
+        folder = os.path.abspath(args.write_sketch)
+        os.makedirs(folder, exist_ok=True)
+        ino = os.path.join(folder, os.path.basename(folder) + ".ino")
+        with open(ino, "w", encoding="utf-8") as f:
+            f.write(interpreter_ino_source())
+        hdr = _find_isr_clock(folder, folder)
+        if hdr is not None and os.path.dirname(hdr) != folder:
+            shutil.copy2(hdr, os.path.join(folder, "isrClock.h"))
+        print(f"Wrote {ino}; compile and upload it once, then download designs with 'vm'.")
+        if not args.design:
+            return 0
+    if not args.design:
+        print("vm needs a design (or --write-sketch).", file=sys.stderr)
+        return 2
+
+    design = _load_design(args.design)
+    try:
+        program = compile_program(design, _clock_from_args(args), _keep_from_args(args))
+    except VMError as e:
+        print(f"Does not fit the interpreter: {e}", file=sys.stderr)
+        return 1
+    stats = program.stats
+    print(f"{stats['program_bytes']} bytes, {stats['ops']} ops, {stats['slots']} slots, "
+          f"build ID {program.build_id}")
+    if args.dump:
+        print("\n".join(program.disassemble()))
+    if not (args.port or args.stand_in):
+        return 0
+
+    board = StandInBoard() if args.stand_in else None
+    port = board.port if board is not None else args.port
+    try:
+        info, msg = vm_hello(port)
+        if info is None:
+            print(f"No interpreter on {port}: {msg}", file=sys.stderr)
+            return 1
+        seconds, msg = download(port, program)
+        if seconds is None:
+            print(msg, file=sys.stderr)
+            return 1
+        print(f"Downloaded to {port} in {seconds * 1000:.1f} ms.")
+    finally:
+        if board is not None:
+            board.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="seq_cli", description="SeqEditor headless tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("equiv", help="check two .seq designs for functional equivalence")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--ordering", choices=sorted(ORDERINGS), default="dfs",
+                   help="BDD variable ordering heuristic")
+    p.set_defaults(func=cmd_equiv)
+
+    p = sub.add_parser("reach", help="explore reachable register states from reset")
+    p.add_argument("design")
+    p.add_argument("--dot", help="write the state-transition graph as Graphviz DOT")
+    p.add_argument("--json", help="write the state-transition graph as JSON")
+    p.add_argument("--max-registers", type=int, default=28)
+    p.set_defaults(func=cmd_reach)
+
+    p = sub.add_parser("regress", help="random-stimulus regression against a reference design")
+    p.add_argument("design")
+    p.add_argument("--reference", help="golden design; outputs are compared every cycle")
+    p.add_argument("--cycles", type=int, default=1000)
+    p.add_argument("--lanes", type=int, default=65536, help="independent stimulus streams")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", help="write the merged report as JSON")
+    p.set_defaults(func=cmd_regress)
+
+    p = sub.add_parser("coverage", help="toggle, state and transition coverage of a design")
+    p.add_argument("design")
+    p.add_argument("--trace", nargs="+", help="captured traces (CSV) instead of random simulation")
+    p.add_argument("--cycles", type=int, default=1000)
+    p.add_argument("--lanes", type=int, default=4096, help="independent stimulus streams")
+    p.add_argument("--workers", type=int, default=1, help="processes for the simulation")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--merge", nargs="+", help="coverage databases (JSON) to add")
+    p.add_argument("--limit", type=int, default=20, help="uncovered items listed per kind")
+    p.add_argument("-o", "--output", help="write the coverage database as JSON")
+    p.set_defaults(func=cmd_coverage)
+
+    p = sub.add_parser("faults", help="stuck-at fault simulation and compact test generation")
+    p.add_argument("design")
+    p.add_argument("--max-tests", type=int, default=1000, help="candidate tests to try")
+    p.add_argument("--length", type=int, default=None,
+                   help="cycles per test (default: 1, or 16 with registers)")
+    p.add_argument("--patience", type=int, default=128,
+                   help="stop after this many candidates without new detections")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--limit", type=int, default=20, help="undetected faults listed")
+    p.add_argument("--tests", help="write the test vectors as text")
+    p.add_argument("--json", help="write the report and test vectors as JSON")
+    p.set_defaults(func=cmd_faults)
+
+    p = sub.add_parser("gen", help="generate the Arduino .ino source")
+    p.add_argument("design")
+    p.add_argument("-o", "--output", help="output .ino path (default: stdout)")
+    p.add_argument("--trace", help="write stage timings as a Chrome/Perfetto trace JSON")
+    p.add_argument("--profile", help="run the stages under cProfile and dump stats here")
+    _add_clock_args(p)
+    p.set_defaults(func=cmd_gen)
+
+    p = sub.add_parser("netlist", help="compile a design into a .seqn netlist file")
+    p.add_argument("design")
+    p.add_argument("-o", "--output", required=True, help="output .seqn path")
+    p.set_defaults(func=cmd_netlist)
+
+    p = sub.add_parser("build", help="compile the firmware with arduino-cli and report its size")
+    p.add_argument("design")
+    p.add_argument("--fqbn", required=True, help="board FQBN, e.g. arduino:avr:leonardo")
+    p.add_argument("--daemon", action="store_true", help="use the arduino-cli gRPC daemon")
+    _add_build_args(p)
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("watch", help="re-check and regenerate (optionally compile) on every save")
+    p.add_argument("design")
+    p.add_argument("--fqbn", default="", help="board FQBN (part of the build ID)")
+    p.add_argument("--compile", action="store_true", help="also compile ahead of time")
+    p.add_argument("--debounce", type=float, default=0.3,
+                   help="seconds of quiet after a save before rebuilding")
+    p.add_argument("--poll", action="store_true", help="poll for changes instead of inotify")
+    _add_build_args(p)
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("upload", help="upload the firmware compiled by 'build'")
+    p.add_argument("design")
+    p.add_argument("--fqbn", required=True, help="board FQBN, e.g. arduino:avr:leonardo")
+    p.add_argument("--port", required=True, help="serial port of the running sketch")
+    p.add_argument("--sketch-dir", help="sketch folder (default: seq_sketch next to the design)")
+    p.add_argument("--no-verify", action="store_true", help="skip reading the flash back")
+    p.add_argument("--timeout", type=float, default=BOOTLOADER_TIMEOUT_S,
+                   help="seconds to wait for the bootloader port")
+    p.add_argument("--arduino-cli", action="store_true",
+                   help="use 'arduino-cli upload' instead of avrdude")
+    p.add_argument("-v", "--verbose", action="store_true", help="print the avrdude output")
+    p.set_defaults(func=cmd_upload)
+
+    p = sub.add_parser("ident", help="ask the board on a serial port for its build ID")
+    p.add_argument("port")
+    p.add_argument("--timeout", type=float, default=1.0, help="seconds to wait for the answer")
+    p.set_defaults(func=cmd_ident)
+
+    p = sub.add_parser("vm", help="compile to interpreter bytecode and download it over serial")
+    p.add_argument("design", nargs="?")
+    p.add_argument("--port", help="serial port of a board running the interpreter")
+    p.add_argument("--stand-in", action="store_true",
+                   help="download to a simulated board on a pseudo-terminal instead")
+    p.add_argument("--dump", action="store_true", help="print the disassembled program")
+    p.add_argument("--write-sketch", metavar="DIR", help="write the interpreter sketch to DIR")
+    _add_clock_args(p)
+    p.set_defaults(func=cmd_vm)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# seq_codegen.py - .ino code generation for parsed .seq designs.
+#
+# Expressions are first constant-folded and flattened (seq_design.simplify);
+# combinational signals that fold to a constant are propagated into their
+# readers.
+# Before emitting, a cone-of-influence pass walks back from the output pins
+# (plus an optional list of signals kept as debug taps) and drops every
+# combinational signal and register that cannot reach them. Each dropped
+# signal saves one byte of SRAM (two for a register and its D_ input) and its
+# gate evaluations in loop().
+
+from seq_design import Design, count_gates, expr_to_c, simplify
+from seq_ident import BUILD_ID_PLACEHOLDER, QUERY_BYTE, REPLY_PREFIX
+
+
+def fold_design(design):
+    """
+    Return (folded_design, gates_before, gates_after).
+
+    Every equation is simplified; combinational signals that fold to a
+    constant (and are assigned only once) are substituted into the other
+    equations until nothing changes.
+    """
+    counts = {}
+    for lhs, _, _ in design.comb_eqs:
+        counts[lhs] = counts.get(lhs, 0) + 1
+    comb = design.comb_defs()
+
+    consts = {}
+    cache = {}  # lhs -> (len(consts) when folded, folded node)
+    changed = True
+    while changed:
+        changed = False
+        for lhs, node in comb.items():
+            if lhs in consts or counts[lhs] != 1 or lhs in design.seq_lhs:
+                continue
+            folded = simplify(node, consts)
+            cache[lhs] = (len(consts), folded)
+            if folded[0] == "CONST":
+                consts[lhs] = folded[1]
+                changed = True
+
+    def fold(lhs, node):
+        # consts only grows, so a result folded with the final set is reusable
+        hit = cache.get(lhs)
+        if hit is not None and hit[0] == len(consts) and comb[lhs] is node:
+            return hit[1]
+        return simplify(node, consts)
+
+    folded = Design()
+    folded.pin_defs = dict(design.pin_defs)
+    folded.comb_eqs = [(lhs, fold(lhs, node), ln) for lhs, node, ln in design.comb_eqs]
+    folded.seq_eqs = [(q, simplify(node, consts), ln) for q, node, ln in design.seq_eqs]
+
+    before = sum(count_gates(n) for _, n, _ in design.comb_eqs + design.seq_eqs)
+    after = sum(count_gates(n) for _, n, _ in folded.comb_eqs + folded.seq_eqs)
+    return folded, before, after
+
+
+def prune_design(design, keep=()):
+    """
+    Compute the live signals of a design.
+
+    Roots are the output pins plus the names in `keep`; '*' in `keep`
+    disables pruning entirely.
+    Returns (live_signal_set, stats_dict) where stats counts what was removed:
+      signals:      combinational signals
+      registers:    registers (each also frees its D_ input)
+      variables:    uint8_t globals (one byte of SRAM each)
+      equations:    emitted assignments
+      gates:        gate evaluations per loop()
+      input_reads:  digitalRead() calls for unused input pins
+      unknown_keep: names in `keep` that the design does not define
+    """
+    keep = list(keep)
+    known = design.signal_names
+    stats = {
+        "signals": 0,
+        "registers": 0,
+        "variables": 0,
+        "equations": 0,
+        "gates": 0,
+        "input_reads": 0,
+        "unknown_keep": sorted(k for k in keep if k != "*" and k not in known),
+    }
+    if "*" in keep:
+        return set(known), stats
+
+    live = design.cone_of_influence(set(design.pin_outputs) | set(keep))
+
+    dead = known - live
+    dead_regs = design.seq_lhs - live
+    stats["signals"] = len(dead - design.pin_inputs - dead_regs)
+    stats["registers"] = len(dead_regs)
+    # every dead signal is one uint8_t; a dead register also frees its D_ input
+    stats["variables"] = len(dead) + len(dead_regs)
+    stats["input_reads"] = len(design.pin_inputs - live)
+    for name, node, _ in design.comb_eqs + design.seq_eqs:
+        if name not in live:
+            stats["equations"] += 1
+            stats["gates"] += count_gates(node)
+    return live, stats
+
+
+def generate_ino_source(design, clock, keep=(), build_id=False):
+    """
+    Build the .ino source from a parsed design and the clock configuration
+    dict (use_internal, clk_pin, freq_hz, mirror).
+    With build_id, the sketch answers build ID queries over USB serial; the
+    ID is a placeholder until seq_ident.stamp_build_id() fills it in.
+    Returns (source, stats) - see prune_design(); stats also holds
+    gates_before_folding / gates_after_folding.
+    """
+    use_internal = clock["use_internal"]
+    clk_pin = clock["clk_pin"]
+    freq_hz = clock["freq_hz"]
+    mirror = clock["mirror"]
+
+    design, before, after = fold_design(design)
+    live, stats = prune_design(design, keep)
+    stats["gates_before_folding"] = before
+    stats["gates_after_folding"] = after
+
+    pin_defs = design.pin_defs       # name -> pin number
+    comb_eqs = [eq for eq in design.comb_eqs if eq[0] in live]
+    seq_eqs = [eq for eq in design.seq_eqs if eq[0] in live]
+
+    # Names of all live logic signals
+    signal_names = design.signal_names & live
+
+    # Pin classification:
+    #  - Inputs: declared as pin, never driven by any equation
+    #  - Outputs: declared as pin and driven by some equation
+    pin_inputs = design.pin_inputs
+    pin_outputs = design.pin_outputs
+
+    # Sequential register names (Q variables)
+    q_names = [q for q in design.q_names if q in live]
+
+    lines_out = []
+    o = lines_out.append
+
+    # --- Configuration from clock section ---
+    o("// --- Configuration ---")
+    o(f"#define USE_INTERNAL_CLOCK   {use_internal}      // 1 = internal Timer1 clock, 0 = external")
+    o(f"#define CLOCK_HZ             {freq_hz}      // frequency in Hz")
+    o(f"#define PIN_CLK              {clk_pin}      // clock pin")
+    o(f"#define CLOCK_LED_MIRROR     {mirror}      // mirror clock to LED (pin 13)")
+    o("")
+    o('#include "isrClock.h"')
+    o("")
+
+    if build_id:
+        o("// --- Build ID, sent back on a query byte (see seq_ident.py) ---")
+        o(f'const char SEQ_BUILD_ID[] PROGMEM = "{BUILD_ID_PLACEHOLDER}";')
+        o("")
+
+    # --- Pin mapping from .seq ---
+    if pin_defs:
+        o("// --- Pin mapping from .seq ---")
+        for name in sorted(pin_defs.keys()):
+            num = pin_defs[name]
+            o(f"const uint8_t PIN_{name} = {num};")
+        o("")
+
+    # --- Signal declarations ---
+    if signal_names or q_names:
+        o("// --- Logic signals ---")
+        for name in sorted(signal_names):
+            o(f"uint8_t {name} = 0;")
+        for q in q_names:
+            o(f"uint8_t D_{q} = 0;")
+        o("")
+
+    # Clock edge detection state
+    o("int __clk_prev = LOW;")
+    o("")
+
+    # --- setup() ---
+    o("void setup() {")
+    o("  // Initialize clock pin for edge detection")
+    o("  pinMode(PIN_CLK, INPUT);")
+    o("  __clk_prev = digitalRead(PIN_CLK);")
+    o("")
+
+    if build_id:
+        o("  Serial.begin(115200);")
+        o("")
+
+    if pin_defs:
+        o("  // Configure user pins from .seq")
+        for name in sorted(pin_inputs):
+            o(f"  pinMode(PIN_{name}, INPUT);")
+        for name in sorted(pin_outputs):
+            o(f"  pinMode(PIN_{name}, OUTPUT);")
+        o("")
+
+    o("  // Start the hardware Timer1 clock on PIN_CLK if internal mode is enabled")
+    o("#if USE_INTERNAL_CLOCK")
+    o("  T1Clock_begin(PIN_CLK, CLOCK_HZ);")
+    o("#endif")
+    o("}")
+    o("")
+
+    # --- loop() ---
+    o("void loop() {")
+    o("  int clk_now = digitalRead(PIN_CLK);")
+    o("  bool rising = (__clk_prev == LOW && clk_now == HIGH);")
+    o("  __clk_prev = clk_now;")
+    o("")
+
+    if build_id:
+        o("  // Answer build ID queries from SeqEditor")
+        o(f"  if (Serial.available() > 0 && Serial.read() == 0x{QUERY_BYTE[0]:02X}) {{")
+        o(f'    Serial.print(F("{REPLY_PREFIX}"));')
+        o("    Serial.println((const __FlashStringHelper *)SEQ_BUILD_ID);")
+        o("  }")
+        o("")
+
+    # Read pin inputs (only those feeding live logic)
+    live_inputs = sorted(pin_inputs & live)
+    if live_inputs:
+        o("  // Read input pins")
+        for name in live_inputs:
+            o(f"  {name} = (digitalRead(PIN_{name}) == HIGH) ? 1 : 0;")
+        o("")
+
+    # Combinational logic
+    if comb_eqs:
+        o("  // Combinational logic")
+        for lhs, node, _ in comb_eqs:
+            o(f"  {lhs} = {expr_to_c(node)};")
+        o("")
+
+    # Sequential next-state logic
+    if seq_eqs:
+        o("  // Compute D inputs for flip-flops")
+        for qname, node, _ in seq_eqs:
+            o(f"  D_{qname} = {expr_to_c(node)};")
+        o("")
+        o("  if (rising) {")
+        for qname in q_names:
+            o(f"    {qname} = D_{qname};")
+        o("  }")
+        o("")
+
+    # Drive outputs
+    if pin_outputs:
+        o("  // Drive output pins")
+        for name in sorted(pin_outputs):
+            o(f"  digitalWrite(PIN_{name}, {name} ? HIGH : LOW);")
+    o("}")
+    o("")
+
+    return "\n".join(lines_out), stats
+
+
+def describe_prune_stats(stats) -> str:
+    """Short summary of generate_ino_source() statistics for the output box."""
+    if not stats["variables"] and not stats["gates"] and not stats["input_reads"]:
+        msg = "Dead-logic elimination: nothing to remove."
+    else:
+        msg = (
+            f"Dead-logic elimination: removed {stats['variables']} variables and "
+            f"{stats['gates']} gate evaluations ({stats['signals']} signals, "
+            f"{stats['registers']} registers, {stats['input_reads']} input reads)."
+        )
+    before = stats.get("gates_before_folding", 0)
+    after = stats.get("gates_after_folding", 0)
+    if after < before:
+        msg += f"\nConstant folding: {before} -> {after} gate evaluations."
+    if stats["unknown_keep"]:
+        msg += f"\nUnknown debug taps ignored: {', '.join(stats['unknown_keep'])}"
+    return msg
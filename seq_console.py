@@ -0,0 +1,204 @@
+# seq_console.py - bounded, batched log console for the SeqEditor output box.
+#
+# Messages are queued by log() (from any thread) and written to the Tk text
+# widget in one batch per timer tick, so a burst of compiler output costs one
+# widget update instead of one per line. The widget only keeps the last
+# max_lines lines; the last max_lines records (all levels) stay in a ring
+# buffer for re-filtering, and the full log goes to rotating files on disk.
+
+import logging
+import logging.handlers
+import os
+import re
+import threading
+from collections import deque
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+_LEVEL_COLORS = {
+    logging.DEBUG: "gray45",
+    logging.WARNING: "dark orange",
+    logging.ERROR: "red3",
+}
+
+
+def default_log_dir():
+    """$SEQEDITOR_LOG_DIR (empty = no log files), else ~/.cache/seqeditor/logs."""
+    env = os.environ.get("SEQEDITOR_LOG_DIR")
+    if env is not None:
+        return env or None
+    return os.path.join(os.path.expanduser("~"), ".cache", "seqeditor", "logs")
+
+
+def _file_logger(log_dir: str, max_bytes: int, backups: int):
+    """Logger writing to log_dir/seqeditor.log (rotated), or None if unusable."""
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, "seqeditor.log"),
+            maxBytes=max_bytes, backupCount=backups, encoding="utf-8",
+        )
+    except OSError:
+        return None
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+    logger = logging.getLogger(f"seqeditor.console.{id(handler)}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+class LogConsole:
+    """
+    Log view on a Tk / CustomTkinter text widget.
+
+        console = LogConsole(textbox, max_lines=2000)
+        console.log("Compile failed.", "error")
+        console.set_level("warning")   # hide debug / info lines
+        console.search("undefined")    # highlight matches, returns the count
+
+    log() only queues; the widget is updated every flush_ms milliseconds on
+    the Tk thread (or by an explicit flush()).
+    """
+
+    def __init__(self, widget, max_lines: int = 2000, flush_ms: int = 100,
+                 log_dir=None, max_bytes: int = 1 << 20, backups: int = 3):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        self.min_level = logging.DEBUG
+        self.records = deque(maxlen=max_lines)  # (levelno, line), all levels
+        self._shown = deque(maxlen=max_lines)   # lines currently in the widget
+        self._pending = []
+        self._lock = threading.Lock()
+        self._pattern = ""
+        self._regex = None  # case-insensitive matcher of _pattern
+        self._matches = 0
+        self._logger = _file_logger(log_dir, max_bytes, backups) if log_dir else None
+
+        for levelno, color in _LEVEL_COLORS.items():
+            widget.tag_config(logging.getLevelName(levelno), foreground=color)
+        widget.tag_config("match", background="#ffe066")
+        widget.after(flush_ms, self._tick)
+
+    @property
+    def log_path(self):
+        if self._logger is None:
+            return None
+        return self._logger.handlers[0].baseFilename
+
+    # ---------- producers (any thread) ----------
+    def log(self, message, level: str = "info"):
+        """Queue a (possibly multi-line) message."""
+        levelno = LEVELS[level]
+        lines = str(message).split("\n")
+        with self._lock:
+            self._pending.extend((levelno, line) for line in lines)
+        if self._logger is not None:
+            self._logger.log(levelno, message)
+
+    def clear(self):
+        """Empty the widget and the ring buffer (the log files are kept)."""
+        with self._lock:
+            self._pending = []
+        self.records.clear()
+        self._shown.clear()
+        self._matches = 0
+        self.widget.delete("1.0", "end")
+
+    # ---------- Tk thread ----------
+    def _tick(self):
+        self.flush()
+        self.widget.after(self.flush_ms, self._tick)
+
+    def flush(self):
+        """Write every queued line to the widget in one batch."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.records.extend(batch)
+        visible = [r for r in batch if r[0] >= self.min_level][-self.max_lines:]
+        if visible:
+            self._insert(visible)
+
+    def _insert(self, records):
+        widget = self.widget
+        # One insert per run of lines with the same level
+        run_level = records[0][0]
+        run = []
+        for levelno, line in records + [(None, None)]:
+            if levelno != run_level:
+                tag = logging.getLevelName(run_level) if run_level in _LEVEL_COLORS else None
+                text = "".join(f"{ln}\n" for ln in run)
+                if tag:
+                    widget.insert("end", text, tag)
+                else:
+                    widget.insert("end", text)
+                run_level = levelno
+                run = []
+            run.append(line)
+
+        excess = len(self._shown) + len(records) - self.max_lines
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+            if self._pattern:
+                # the trimmed lines take their highlighted matches with them
+                for i in range(min(excess, len(self._shown))):
+                    self._matches -= len(self._regex.findall(self._shown[i]))
+        self._shown.extend(line for _, line in records)
+        if self._pattern:
+            self._highlight(len(self._shown) - len(records))
+        widget.see("end")
+
+    def set_level(self, level: str):
+        """Show only records at `level` or above; re-renders from the ring buffer."""
+        self.flush()
+        self.min_level = LEVELS[level]
+        self._shown.clear()
+        self.widget.delete("1.0", "end")
+        visible = [r for r in self.records if r[0] >= self.min_level]
+        if visible:
+            self._insert(visible)
+
+    def search(self, pattern: str) -> int:
+        """Highlight every case-insensitive match in the widget; returns the count."""
+        self.flush()
+        self._pattern = pattern
+        self._regex = re.compile(re.escape(pattern), re.IGNORECASE) if pattern else None
+        self.widget.tag_remove("match", "1.0", "end")
+        if not self._pattern:
+            return 0
+        first = self._highlight(0)
+        if first is not None:
+            self.widget.see(first)
+        return self._matches
+
+    def _highlight(self, from_line: int):
+        """
+        Tag matches of the current pattern on widget lines from_line..
+        (0-based). Matching runs on the original line, so columns stay right
+        for characters whose lower case has another length (e.g. 'İ').
+        """
+        regex = self._regex
+        first = None
+        if from_line == 0:
+            self._matches = 0
+        for i in range(from_line, len(self._shown)):
+            for m in regex.finditer(self._shown[i]):
+                start = f"{i + 1}.{m.start()}"
+                self.widget.tag_add("match", start, f"{i + 1}.{m.end()}")
+                if first is None:
+                    first = start
+                self._matches += 1
+        return first
+
+    def text(self) -> str:
+        """The lines currently shown."""
+        self.flush()
+        return "\n".join(self._shown)
@@ -0,0 +1,489 @@
+# seq_coverage.py - toggle, state and transition coverage of the Q registers.
+#
+# Coverage says how much of a design a stimulus exercised:
+#   toggle      every signal (pins, combinational signals, registers) seen
+#               rising 0->1 and falling 1->0
+#   state       register states (bit j of the index = registers[j], as in
+#               seq_reach.py) that were visited
+#   transition  (state, next state) pairs that were taken
+#
+# Samples arrive packed: one Python int per signal whose bits are either
+# independent lanes at one cycle (bit-parallel simulation, seq_sim.py) or
+# consecutive samples of one captured trace. Toggles are counted with
+# int.bit_count() on (prev ^ cur) and its rising part. With a few registers,
+# states are counted by splitting the lane mask on one register at a time
+# (partition_counts(): the work grows with the number of distinct states).
+# Wider designs visit too many distinct states for that, so the register
+# ints are transposed into one state code per lane instead (state_codes():
+# a few C-level passes per register) and counted with collections.Counter;
+# a cycle's codes are reused as the "from" side of the next cycle's
+# transitions.
+#
+# A CoverageDB is plain counts, saved as JSON and merged across runs (several
+# simulations, board captures) of the same design. The state and transition
+# tables hold at most max_entries keys each; samples of states or
+# transitions first seen once a table is full are counted as dropped.
+
+import csv
+import json
+import random
+import sys
+from collections import Counter
+
+from seq_reach import ReachError, explore
+from seq_sim import BitParallelModel
+
+
+class CoverageError(Exception):
+    """Raised for coverage databases that cannot be merged or traces that do not fit a design."""
+
+
+def partition_counts(bits, mask: int):
+    """
+    Split the lanes of `mask` by the values of `bits` (ints, one per bit of
+    the key): returns {key: number of lanes}, key bit j = bits[j] in the lane.
+    """
+    groups = [(mask, 0)]
+    for j, b in enumerate(bits):
+        split = []
+        for lanes, key in groups:
+            one = lanes & b
+            if one:
+                split.append((one, key | (1 << j)))
+            zero = lanes & ~b
+            if zero:
+                split.append((zero, key))
+        groups = split
+    return {key: lanes.bit_count() for lanes, key in groups}
+
+
+PARTITION_MAX_BITS = 6  # keys up to this many bits are counted with partition_counts()
+_BIT_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+_CODE_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+def state_codes(bits, width: int):
+    """
+    Per-lane keys of `bits` over lanes 0..width-1: a sequence of `width`
+    ints, element i = sum of ((bits[j] >> i) & 1) << j.
+    """
+    n = len(bits)
+    size = 1  # bytes per lane
+    while size * 8 < n:
+        size *= 2
+    if size > 8:
+        size = -(-n // 8)
+    mask = (1 << width) - 1
+    out = bytearray(width * size)
+    for s in range(0, n, 8):
+        acc = 0  # byte i = bits s..s+7 of lane i
+        for j, b in enumerate(bits[s:s + 8]):
+            column = format(b & mask, f"0{width}b").encode("ascii").translate(_BIT_BYTES)
+            acc |= int.from_bytes(column, "big") << j
+        slot = s // 8
+        if size <= 8 and sys.byteorder == "big":
+            slot = size - 1 - slot
+        out[slot::size] = acc.to_bytes(width, "little")
+    if size <= 8:
+        return memoryview(out).cast(_CODE_FORMATS[size])
+    return [int.from_bytes(out[i:i + size], "little") for i in range(0, len(out), size)]
+
+
+def lane_counts(bits, mask: int):
+    """partition_counts(), through state_codes() for wide keys over contiguous lanes."""
+    if len(bits) <= PARTITION_MAX_BITS or mask & (mask + 1):
+        return partition_counts(bits, mask)
+    return Counter(state_codes(bits, mask.bit_length()))
+
+
+def _tally(table: Counter, counts, limit: int) -> int:
+    """Add counts into table, creating at most `limit` keys; returns the count left out."""
+    dropped = 0
+    for key, n in counts.items():
+        if key in table:
+            table[key] += n
+        elif len(table) < limit:
+            table[key] = n
+        else:
+            dropped += n
+    return dropped
+
+
+def _count_keys(table: Counter, keys, n: int, limit: int) -> int:
+    """_tally() for an iterable of n keys, one per sample, counted in C unless the table fills up."""
+    room = limit - len(table)
+    if n <= room:
+        table.update(keys)
+        return 0
+    if room <= 0:  # full: only keys already present are counted
+        known = list(filter(table.__contains__, keys))
+        table.update(known)
+        return n - len(known)
+    return _tally(table, Counter(keys), limit)
+
+
+class CoverageDB:
+    """
+    Coverage counts of one design:
+      signals:      names with toggle counts
+      registers:    register names (state index bit order)
+      toggles:      name -> [rises, falls]
+      states:       state index -> samples in that state
+      transitions:  (state, next_state) -> times taken
+      samples:      lane-cycles / trace samples seen
+      unsampled:    lane-cycles left out of the state / transition counts
+                    (CoverageCollector with state_lanes)
+      dropped:      [state samples, transitions] not counted because their
+                    table already held max_entries keys
+      design:       Design.fingerprint() of the design, "" if unknown
+    """
+
+    MAX_ENTRIES = 1 << 16
+
+    def __init__(self, signals, registers, design: str = "", max_entries: int = MAX_ENTRIES):
+        self.signals = list(signals)
+        self.registers = list(registers)
+        self.design = design
+        self.max_entries = max_entries
+        self.toggles = {name: [0, 0] for name in self.signals}
+        self.states = Counter()
+        self.transitions = Counter()
+        self.samples = 0
+        self.unsampled = 0
+        self.dropped = [0, 0]
+
+    # ---------- accumulation ----------
+    def _add_state_counts(self, counts):
+        self.dropped[0] += _tally(self.states, counts, self.max_entries)
+
+    def _add_transition_counts(self, counts):
+        self.dropped[1] += _tally(self.transitions, counts, self.max_entries)
+
+    def add_states(self, regs, mask: int):
+        """Count the register state of every lane in mask (regs: one int per register)."""
+        self.samples += mask.bit_count()
+        self._add_state_counts(lane_counts(regs, mask))
+
+    def add_state_codes(self, codes, prev_codes=None):
+        """
+        Count one state per lane (codes: state index per lane, see
+        state_codes()) and, with the codes of the same lanes one sample
+        earlier, the transitions taken.
+        """
+        n = len(codes)
+        self.samples += n
+        self.dropped[0] += _count_keys(self.states, codes, n, self.max_entries)
+        if prev_codes is not None:
+            self.dropped[1] += _count_keys(self.transitions, zip(prev_codes, codes), n,
+                                           self.max_entries)
+
+    def add_changes(self, prev, cur, mask: int, prev_regs=None, cur_regs=None):
+        """
+        Count toggles between two samples of every signal (prev / cur: one
+        int per entry of `signals`), and state transitions when the register
+        values are given.
+        """
+        toggles = self.toggles
+        for name, p, c in zip(self.signals, prev, cur):
+            changed = (p ^ c) & mask
+            if changed:
+                rises = (changed & c).bit_count()
+                t = toggles[name]
+                t[0] += rises
+                t[1] += changed.bit_count() - rises
+        if prev_regs is not None:
+            self.add_transitions(prev_regs, cur_regs, mask)
+
+    def add_transitions(self, prev_regs, cur_regs, mask: int):
+        """Count the state transition of every lane in mask between two samples of the registers."""
+        if self.registers:
+            k = len(self.registers)
+            low = (1 << k) - 1
+            counts = lane_counts(list(prev_regs) + list(cur_regs), mask)
+            self._add_transition_counts({(key & low, key >> k): n for key, n in counts.items()})
+
+    def add_trace(self, columns, length: int):
+        """
+        One captured trace: columns maps signal names to ints whose bit t is
+        the value at sample t. Signals not in the trace are left untouched;
+        states need every register.
+        """
+        if length <= 0:
+            return
+        full = (1 << length) - 1
+        pairs = full >> 1  # samples t that have a successor t + 1
+        prev = [columns.get(name, 0) for name in self.signals]
+        cur = [v >> 1 for v in prev]
+        present = [name in columns for name in self.signals]
+        toggles = self.toggles
+        for name, p, c, ok in zip(self.signals, prev, cur, present):
+            if ok:
+                t = toggles[name]
+                t[0] += (~p & c & pairs).bit_count()
+                t[1] += (p & ~c & pairs).bit_count()
+        if self.registers and all(q in columns for q in self.registers):
+            regs = [columns[q] for q in self.registers]
+            if len(regs) <= PARTITION_MAX_BITS:
+                self.add_states(regs, full)
+                k = len(self.registers)
+                low = (1 << k) - 1
+                counts = partition_counts(regs + [v >> 1 for v in regs], pairs)
+                self._add_transition_counts({(key & low, key >> k): n for key, n in counts.items()})
+            else:
+                codes = state_codes(regs, length)
+                self.add_state_codes(codes)
+                self.dropped[1] += _count_keys(self.transitions, zip(codes, codes[1:]), length - 1,
+                                               self.max_entries)
+        else:
+            self.samples += length
+
+    # ---------- merge / persistence ----------
+    def merge(self, other: "CoverageDB"):
+        """Add the counts of another database of the same design."""
+        if other.registers != self.registers:
+            raise CoverageError("coverage databases have different registers")
+        if self.design and other.design and self.design != other.design:
+            raise CoverageError("coverage databases are from different designs")
+        self.design = self.design or other.design
+        for name in other.signals:
+            if name not in self.toggles:
+                self.signals.append(name)
+                self.toggles[name] = [0, 0]
+            mine, theirs = self.toggles[name], other.toggles[name]
+            mine[0] += theirs[0]
+            mine[1] += theirs[1]
+        self._add_state_counts(other.states)
+        self._add_transition_counts(other.transitions)
+        self.dropped[0] += other.dropped[0]
+        self.dropped[1] += other.dropped[1]
+        self.samples += other.samples
+        self.unsampled += other.unsampled
+
+    def to_dict(self) -> dict:
+        return {
+            "design": self.design,
+            "signals": self.signals,
+            "registers": self.registers,
+            "samples": self.samples,
+            "unsampled": self.unsampled,
+            "dropped": self.dropped,
+            "toggles": self.toggles,
+            "states": {str(k): n for k, n in sorted(self.states.items())},
+            "transitions": [[s, t, n] for (s, t), n in sorted(self.transitions.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        db = cls(data["signals"], data["registers"], data.get("design", ""))
+        db.samples = data.get("samples", 0)
+        db.unsampled = data.get("unsampled", 0)
+        db.dropped = list(data.get("dropped", [0, 0]))
+        for name, counts in data.get("toggles", {}).items():
+            db.toggles[name] = list(counts)
+        db.states = Counter({int(k): n for k, n in data.get("states", {}).items()})
+        db.transitions = Counter({(s, t): n for s, t, n in data.get("transitions", [])})
+        return db
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CoverageError(f"cannot read coverage database {path}: {e}") from e
+
+    # ---------- report ----------
+    def state_label(self, state: int) -> str:
+        return " ".join(f"{q}={state >> j & 1}" for j, q in enumerate(self.registers))
+
+    def uncovered_toggles(self):
+        """[(name, 'never rises' / 'never falls' / 'never toggles')]."""
+        out = []
+        for name in self.signals:
+            rises, falls = self.toggles[name]
+            if not rises and not falls:
+                out.append((name, "never toggles"))
+            elif not rises:
+                out.append((name, "never rises"))
+            elif not falls:
+                out.append((name, "never falls"))
+        return out
+
+
+def _pct(hit: int, total: int) -> str:
+    return f"{hit}/{total} ({100 * hit / total:.1f}%)" if total else "0/0"
+
+
+def coverage_report(db: CoverageDB, design=None, limit: int = 20, max_registers: int = 20):
+    """
+    Report lines: toggle / state / transition coverage and the first `limit`
+    uncovered items of each kind. With the design (and at most max_registers
+    registers), state and transition goals are the reachable ones
+    (seq_reach.explore()); otherwise all 2 ** registers states.
+    """
+    lines = [f"Samples: {db.samples:,}"]
+    if db.unsampled:
+        lines.append(f"(states and transitions sampled from {db.samples:,} of "
+                     f"{db.samples + db.unsampled:,} lane-cycles: states not visited and "
+                     f"transitions not taken may have occurred on the other lanes)")
+    toggled = sum((r > 0) + (f > 0) for r, f in db.toggles.values())
+    lines.append(f"Toggle coverage: {_pct(toggled, 2 * len(db.signals))}")
+    for name, what in db.uncovered_toggles()[:limit]:
+        lines.append(f"  {name}: {what}")
+    missing = len(db.uncovered_toggles()) - limit
+    if missing > 0:
+        lines.append(f"  ... and {missing} more signals")
+
+    if not db.registers:
+        return lines
+    reach = None
+    if design is not None:
+        try:
+            reach = explore(design, max_registers=max_registers, collect_edges=True)
+        except ReachError as e:
+            lines.append(f"(reachable states not computed: {e})")
+    if reach is not None:
+        goal_states = [s for s in range(reach.total) if reach.is_reachable(s)]
+        goal_edges = reach.edges
+    else:
+        goal_states = range(1 << len(db.registers)) if len(db.registers) <= max_registers else None
+        goal_edges = None
+
+    if goal_states is None:
+        lines.append(f"State coverage: {len(db.states)} states visited "
+                     f"(of 2^{len(db.registers)})")
+    else:
+        hit = sum(1 for s in goal_states if s in db.states)
+        what = "reachable states" if reach is not None else "states"
+        lines.append(f"State coverage: {_pct(hit, len(goal_states))} {what}")
+        for s in [s for s in goal_states if s not in db.states][:limit]:
+            lines.append(f"  not visited: {db.state_label(s)}")
+
+    if db.dropped[0] or db.dropped[1]:
+        lines.append(f"(tables full at {db.max_entries:,} entries: {db.dropped[0]:,} state and "
+                     f"{db.dropped[1]:,} transition samples of new keys not recorded)")
+    if goal_edges is None:
+        lines.append(f"Transition coverage: {len(db.transitions)} transitions taken")
+    else:
+        hit = sum(1 for e in goal_edges if e in db.transitions)
+        lines.append(f"Transition coverage: {_pct(hit, len(goal_edges))} reachable transitions")
+        for s, t in sorted(e for e in goal_edges if e not in db.transitions)[:limit]:
+            lines.append(f"  not taken: {db.state_label(s)} -> {db.state_label(t)}")
+    return lines
+
+
+# =========================
+# Sources
+# =========================
+class CoverageCollector:
+    """
+    Collects coverage from a bit-parallel simulation (seq_sim.BitParallelModel
+    built with probe=True): call sample(mask, inputs, registers, probes)
+    once per cycle with the values step() was given / returned. `prev`
+    (signal values, register values) of the last sample may be set to
+    continue a simulation. Toggles are counted on every lane; states and
+    transitions on every lane, or only on the first `state_lanes` lanes of
+    each sample, which bounds their cost per cycle for wide simulations (the
+    lanes left out are counted in db.unsampled and noted in the report).
+    """
+
+    def __init__(self, model: BitParallelModel, design_hash: str = "", state_lanes=None):
+        order = model.inputs + model.registers + model.probes
+        names = list(dict.fromkeys(order))
+        index = {}
+        for i, name in enumerate(order):
+            index.setdefault(name, i)
+        self._pick = [index[name] for name in names]  # sample position of each signal
+        self.db = CoverageDB(names, model.registers, design_hash)
+        self.prev = None
+        self.state_lanes = state_lanes
+        self._codes = None  # (register list, its state codes) of the last sample
+
+    def sample(self, mask: int, inputs, registers, probes):
+        values = list(inputs) + list(registers) + list(probes)
+        cur = [values[i] for i in self._pick]
+        regs = list(registers)
+        db = self.db
+        if self.prev is not None:
+            db.add_changes(self.prev[0], cur, mask)
+        smask = mask & ((1 << self.state_lanes) - 1) if self.state_lanes else mask
+        if smask != mask:
+            db.unsampled += (mask ^ smask).bit_count()
+        if len(regs) <= PARTITION_MAX_BITS or smask & (smask + 1):
+            db.add_states(regs, smask)
+            if self.prev is not None:
+                db.add_transitions(self.prev[1], regs, smask)
+        else:
+            width = smask.bit_length()
+            codes = state_codes(regs, width)
+            prev_codes = None
+            if self.prev is not None:
+                prev_regs = self.prev[1]
+                if self._codes is not None and self._codes[0] is prev_regs:
+                    prev_codes = self._codes[1]
+                else:  # prev was set from outside
+                    prev_codes = state_codes(prev_regs, width)
+            db.add_state_codes(codes, prev_codes)
+            self._codes = (regs, codes)
+        self.prev = (cur, regs)
+
+
+def simulate_coverage(design, cycles: int = 1000, lanes: int = 4096, seed: int = 0) -> CoverageDB:
+    """Coverage of `lanes` random stimulus streams run for `cycles` cycles from reset."""
+    model = BitParallelModel(design, probe=True)
+    collector = CoverageCollector(model, design.fingerprint() if hasattr(design, "fingerprint") else "")
+    rng = random.Random(seed)
+    mask = (1 << lanes) - 1
+    state = [0] * len(model.registers)
+    for _ in range(cycles):
+        ins = [rng.getrandbits(lanes) for _ in model.inputs]
+        _, nxt, probes = model.step(mask, *ins, *state)
+        collector.sample(mask, ins, state, probes)
+        state = list(nxt)
+    return collector.db
+
+
+def read_trace_csv(path: str):
+    """
+    A captured trace as (columns, length): a CSV file with a header row of
+    signal names and one row of 0/1 values per sample; columns are packed
+    ints (bit t = sample t).
+    """
+    columns = {}
+    length = 0
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = [h.strip() for h in next(reader, [])]
+            bits = {name: [] for name in header if name}
+            for row in reader:
+                if not row:
+                    continue
+                for name, value in zip(header, row):
+                    if name:
+                        bits[name].append("1" if value.strip() not in ("", "0") else "0")
+                length += 1
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise CoverageError(f"cannot read trace {path}: {e}") from e
+    for name, values in bits.items():
+        # bit t = sample t: reverse so that sample 0 is the least significant bit
+        columns[name] = int("".join(reversed(values)) or "0", 2)
+    return columns, length
+
+
+def trace_coverage(design, paths) -> CoverageDB:
+    """Coverage of captured traces (CSV, see read_trace_csv()) of a design."""
+    model = BitParallelModel(design, probe=True)
+    names = list(dict.fromkeys(model.inputs + model.registers + model.probes))
+    db = CoverageDB(names, model.registers, design.fingerprint() if hasattr(design, "fingerprint") else "")
+    for path in paths:
+        columns, length = read_trace_csv(path)
+        unknown = sorted(set(columns) - set(names))
+        if unknown:
+            raise CoverageError(f"{path}: columns not in the design: {', '.join(unknown)}")
+        db.add_trace(columns, length)
+    return db
@@ -0,0 +1,572 @@
+# seq_design.py - headless front end for the SeqEditor `.seq` DSL.
+# Tokenizer, expression parser, design checker and expression → C translation,
+# shared by the GUI (seq_editor.py) and the analysis tools (seq_bdd.py, seq_cli.py).
+# INCLUDE / MODULE / INST directives are handled on top of this in seq_modules.py.
+
+import hashlib
+import re
+
+# Line patterns of the .seq language
+PIN_RE = re.compile(r"^(pin|PIN)\s+([A-Za-z][A-Za-z0-9_]*)\s*=\s*(\d+)\s*$")
+SEQ_RE = re.compile(r"^([qQ][A-Za-z0-9_]*)\.D\s*=\s*(.+)$")
+COMB_RE = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s*=\s*(.+)$")
+
+KEYWORDS = ("NOT", "AND", "OR", "XOR")
+
+
+# =========================
+# Expression tokenizer
+# =========================
+# One alternation per token kind; BAD catches any other character so that
+# finditer() never silently skips input.
+_TOKEN_RE = re.compile(
+    r"(?P<WS>\s+)"
+    r"|(?P<IDENT>[A-Za-z][A-Za-z0-9_]*)"
+    r"|(?P<NUMBER>[0-9]+)"
+    r"|(?P<LPAREN>\()"
+    r"|(?P<RPAREN>\))"
+    r"|(?P<COMMA>,)"
+    r"|(?P<BAD>.)",
+    re.DOTALL,
+)
+
+
+def tokenize_expr(text: str):
+    """
+    Turn an expression like:
+        OR(f2, NOT(Q3))
+    into a list of tokens: ('IDENT','OR'), ('LPAREN','('), ...
+    Returns (tokens, error_message or None).
+    """
+    tokens = []
+    append = tokens.append
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "WS":
+            continue
+        if kind == "BAD":
+            # Unknown character
+            return None, f"Invalid character '{m.group()}' in expression"
+        append((kind, m.group()))
+    return tokens, None
+
+
+def token_spans(text: str):
+    """
+    Same tokens as tokenize_expr() with their positions, for the editor's
+    highlighter: a list of (kind, value, start, end). Invalid characters are
+    kept as 'BAD' tokens instead of stopping the scan.
+    """
+    return [(m.lastgroup, m.group(), m.start(), m.end())
+            for m in _TOKEN_RE.finditer(text) if m.lastgroup != "WS"]
+
+
+# =========================
+# Expression parser (explicit stack, no recursion)
+# =========================
+def parse_expr(tokens, pos: int):
+    """
+    Parse tokens into an expression tree.
+
+    Grammar:
+      expr := IDENT [ '(' args ')' ] | '0' | '1'
+      args := expr { ',' expr }
+
+    Rules:
+      - NOT must have exactly 1 argument
+      - AND / OR / XOR take 2 or more arguments
+      - NOT / AND / OR / XOR (any case) are not operands on their own
+
+    Nodes are tuples: ('VAR', name), ('CONST', 0/1), ('NOT', a),
+    ('AND', a, b, ...), ('OR', ...), ('XOR', ...).
+    Open calls are kept on an explicit stack, so nesting depth is only
+    limited by memory.
+    Returns (node, new_pos, error_message or None).
+    """
+    n = len(tokens)
+    calls = []  # open function calls: (fn, args)
+
+    while True:
+        # ---- read one operand ----
+        if pos >= n:
+            return None, pos, "Unexpected end of expression"
+
+        tok_type, tok_val = tokens[pos]
+        if tok_type == "NUMBER":
+            if tok_val not in ("0", "1"):
+                return None, pos, f"Invalid constant '{tok_val}' (only 0 and 1 are allowed)"
+            node = ("CONST", int(tok_val))
+            pos += 1
+        elif tok_type != "IDENT":
+            return None, pos, f"Expected identifier, got '{tok_val}'"
+        else:
+            pos += 1
+            # Function call?
+            if pos < n and tokens[pos][0] == "LPAREN":
+                fn = tok_val.upper()
+                if fn not in KEYWORDS:
+                    return None, pos, f"Unknown function '{tok_val}'"
+                pos += 1  # consume '('
+                if pos < n and tokens[pos][0] == "RPAREN":
+                    return None, pos, f"{fn} requires arguments"
+                calls.append((fn, []))
+                continue  # parse the first argument
+
+            # Simple variable like f2, y_3, Q3
+            fn = tok_val.upper()
+            if fn in KEYWORDS:
+                example = "NOT(a)" if fn == "NOT" else f"{fn}(a, b)"
+                return None, pos - 1, f"{fn} requires arguments, e.g. {example}"
+            node = ("VAR", tok_val)
+
+        # ---- attach the finished operand to the enclosing calls ----
+        while True:
+            if not calls:
+                return node, pos, None
+
+            fn, args = calls[-1]
+            args.append(node)
+
+            if pos < n and tokens[pos][0] == "COMMA":
+                pos += 1  # consume ','
+                break     # parse the next argument
+
+            # Expect closing ')'
+            if pos >= n or tokens[pos][0] != "RPAREN":
+                return None, pos, f"Missing ')' in call to {fn}"
+            pos += 1  # consume ')'
+
+            # Argument count rules
+            if fn == "NOT":
+                if len(args) != 1:
+                    return None, pos, "NOT must have exactly 1 argument"
+            else:  # AND / OR / XOR
+                if len(args) < 2:
+                    return None, pos, f"{fn} must have at least 2 arguments"
+
+            calls.pop()
+            node = (fn, *args)
+
+
+def parse_expr_text(expr: str, line_no: int):
+    """
+    High-level helper: parse a right-hand side expression string.
+    Returns (node, error_message_or_None); errors carry the line number.
+    """
+    expr = expr.strip()
+    if not expr:
+        return None, f"Line {line_no}: missing expression on right-hand side"
+
+    tokens, err = tokenize_expr(expr)
+    if err:
+        return None, f"Line {line_no}: {err}"
+
+    node, pos, err = parse_expr(tokens, 0)
+    if err:
+        return None, f"Line {line_no}: {err}"
+
+    if pos != len(tokens):
+        extra = tokens[pos][1]
+        return None, f"Line {line_no}: unexpected token '{extra}' after expression"
+
+    return node, None
+
+
+# =========================
+# Expression tree helpers
+# =========================
+LEAVES = ("VAR", "CONST")
+
+
+def fold_tree(node, leaf, gate):
+    """
+    Rebuild an expression tree bottom-up without recursion.
+    leaf(node) maps 'VAR' / 'CONST' nodes, gate(op, args) maps gates whose
+    arguments have already been mapped. Returns the mapped root.
+    """
+    out = []
+    stack = [(node, False)]
+    while stack:
+        n, ready = stack.pop()
+        if n[0] in LEAVES:
+            out.append(leaf(n))
+        elif ready:
+            k = len(n) - 1
+            args = out[-k:]
+            del out[-k:]
+            out.append(gate(n[0], args))
+        else:
+            stack.append((n, True))
+            stack.extend((c, False) for c in reversed(n[1:]))
+    return out[0]
+
+
+def expr_names(node):
+    """Return the variable names referenced by an expression tree, in order of appearance."""
+    names = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if n[0] == "VAR":
+            names.append(n[1])
+        elif n[0] != "CONST":
+            stack.extend(reversed(n[1:]))
+    return names
+
+
+def count_gates(node) -> int:
+    """
+    Number of two-input gate evaluations in an expression tree: an n-ary
+    AND/OR/XOR counts n - 1, NOT counts 1.
+    """
+    count = 0
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if n[0] not in LEAVES:
+            count += max(1, len(n) - 2)
+            stack.extend(n[1:])
+    return count
+
+
+def simplify(node, consts=None):
+    """
+    Constant folding and flattening:
+      - signals listed in consts ({name: 0/1}) become constants
+      - NOT of a constant / double NOT is removed
+      - nested AND/OR/XOR of the same kind become one n-ary gate
+      - constants, duplicate and complementary operands are folded
+    Returns an equivalent, never larger, expression tree.
+
+    Rebuilt nodes are hash-consed: every distinct node gets a small integer id
+    (keyed by operator and argument ids), so duplicate detection never hashes
+    a whole subtree and deep expressions fold in linear time.
+    """
+    consts = consts or {}
+    table = {}  # (op, *arg_ids) or leaf tuple -> (id, node, arg_items)
+
+    def make(op, items):
+        key = (op, *[i for i, _, _ in items])
+        hit = table.get(key)
+        if hit is None:
+            hit = (len(table), (op, *[nd for _, nd, _ in items]), items)
+            table[key] = hit
+        return hit
+
+    def const(value):
+        key = ("CONST", value)
+        hit = table.get(key)
+        if hit is None:
+            hit = table[key] = (len(table), key, ())
+        return hit
+
+    def leaf(n):
+        if n[0] == "VAR" and n[1] in consts:
+            return const(consts[n[1]])
+        hit = table.get(n)
+        if hit is None:
+            hit = table[n] = (len(table), n, ())
+        return hit
+
+    def negate(a):
+        if a[1][0] == "CONST":
+            return const(1 - a[1][1])
+        if a[1][0] == "NOT":
+            return a[2][0]
+        return make("NOT", [a])
+
+    def gate(op, args):
+        if op == "NOT":
+            return negate(args[0])
+
+        # Flatten nested gates of the same kind: AND(a, AND(b, c)) -> AND(a, b, c)
+        flat = []
+        for a in args:
+            if a[1][0] == op:
+                flat.extend(a[2])
+            else:
+                flat.append(a)
+
+        if op == "XOR":
+            # Constants fold into a final inversion; equal operands cancel in pairs
+            parity = 0
+            odd = {}
+            for a in flat:
+                if a[1][0] == "CONST":
+                    parity ^= a[1][1]
+                elif a[0] in odd:
+                    del odd[a[0]]
+                else:
+                    odd[a[0]] = a
+            terms = list(odd.values())
+            if not terms:
+                return const(parity)
+            res = terms[0] if len(terms) == 1 else make("XOR", terms)
+            return negate(res) if parity else res
+
+        # AND / OR: absorbing element wins, identity is dropped, duplicates
+        # merge, and x together with NOT(x) gives the absorbing element
+        absorbing = 0 if op == "AND" else 1
+        terms = {}
+        for a in flat:
+            if a[1][0] == "CONST":
+                if a[1][1] == absorbing:
+                    return const(absorbing)
+                continue
+            terms.setdefault(a[0], a)
+        for a in terms.values():
+            neg = table.get(("NOT", a[0]))
+            if neg is not None and neg[0] in terms:
+                return const(absorbing)
+        terms = list(terms.values())
+        if not terms:
+            return const(1 - absorbing)
+        return terms[0] if len(terms) == 1 else make(op, terms)
+
+    return fold_tree(node, leaf, gate)[1]
+
+
+# =========================
+# Expression → C translator
+# =========================
+def render_expr(node, leaf, syntax) -> str:
+    """
+    Render an expression tree as text in a single pass.
+
+    leaf(node) gives the text of 'VAR' / 'CONST' nodes; syntax maps each
+    gate operator to (open, separator, close) strings wrapped around its
+    arguments. Pieces are collected in a list and joined once, so the cost
+    is linear in the size of the result, whatever the nesting depth.
+    """
+    out = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            continue
+        op = item[0]
+        if op in LEAVES:
+            out.append(leaf(item))
+            continue
+        open_, sep, close = syntax[op]
+        stack.append(close)
+        args = item[1:]
+        for i in range(len(args) - 1, 0, -1):
+            stack.append(args[i])
+            stack.append(sep)
+        stack.append(args[0])
+        stack.append(open_)
+    return "".join(out)
+
+
+_C_SYNTAX = {
+    "NOT": ("(!(", "", "))"),
+    "AND": ("((", ") && (", "))"),
+    "OR": ("((", ") || (", "))"),
+    "XOR": ("((", ") ^ (", "))"),
+}
+
+
+def _c_leaf(node) -> str:
+    return node[1] if node[0] == "VAR" else str(node[1])
+
+
+def expr_to_c(node) -> str:
+    """Translate an expression tree into a C/Arduino expression string."""
+    return render_expr(node, _c_leaf, _C_SYNTAX)
+
+
+# =========================
+# Parsed design
+# =========================
+class Design:
+    """
+    A parsed .seq design:
+      pin_defs: name -> pin number
+      comb_eqs: [(lhs_name, expr_node, line_no)]
+      seq_eqs:  [(qname, expr_node, line_no)]
+    """
+
+    def __init__(self):
+        self.pin_defs = {}
+        self.comb_eqs = []
+        self.seq_eqs = []
+        self.sources = {}  # INCLUDEd file path -> text (see seq_modules.py)
+
+    @property
+    def comb_lhs(self):
+        return {lhs for (lhs, _, _) in self.comb_eqs}
+
+    @property
+    def seq_lhs(self):
+        return {q for (q, _, _) in self.seq_eqs}
+
+    @property
+    def signal_names(self):
+        """Names of all logic signals (pins, combinational and registered)."""
+        return set(self.pin_defs) | self.comb_lhs | self.seq_lhs
+
+    @property
+    def pin_inputs(self):
+        """Pins never driven by any equation."""
+        driven = self.comb_lhs | self.seq_lhs
+        return {n for n in self.pin_defs if n not in driven}
+
+    @property
+    def pin_outputs(self):
+        """Pins driven by some equation."""
+        return set(self.pin_defs) - self.pin_inputs
+
+    @property
+    def q_names(self):
+        """Sorted sequential register names (Q variables)."""
+        return sorted(self.seq_lhs)
+
+    def comb_defs(self):
+        """Map each combinational signal to its (last) expression tree."""
+        return {lhs: node for (lhs, node, _) in self.comb_eqs}
+
+    def next_state_defs(self):
+        """Map each register to its (last) D-input expression tree."""
+        return {q: node for (q, node, _) in self.seq_eqs}
+
+    def cone_of_influence(self, roots):
+        """
+        Return the set of signals that can affect any of `roots`: walk back
+        through combinational definitions and register D inputs down to the
+        input pins. Unknown root names are ignored.
+        """
+        comb = self.comb_defs()
+        nxt = self.next_state_defs()
+        known = self.signal_names
+        live = set()
+        todo = [r for r in roots if r in known]
+        while todo:
+            name = todo.pop()
+            if name in live:
+                continue
+            live.add(name)
+            for node in (comb.get(name), nxt.get(name)):
+                if node is not None:
+                    todo.extend(expr_names(node))
+        return live
+
+    def fingerprint(self) -> str:
+        """
+        SHA-256 (hex) of the design logic: pins, combinational and register
+        equations in name order. Comments, formatting, equation order and
+        INCLUDE file layout do not change it.
+        """
+        h = hashlib.sha256()
+        for name in sorted(self.pin_defs):
+            h.update(f"pin {name}={self.pin_defs[name]}\n".encode("utf-8"))
+        for prefix, defs in (("", self.comb_defs()), (".D", self.next_state_defs())):
+            for name in sorted(defs):
+                h.update(f"{name}{prefix}={expr_to_c(defs[name])}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def comb_order(self):
+        """
+        Order the combinational signals so that every signal comes after the
+        signals it reads (the settled value the firmware loop converges to).
+        Returns (list_of_names, error_message_or_None); a cycle is an error.
+        """
+        comb = self.comb_defs()
+        order = []
+        state = {}  # name -> 1 while being visited, 2 when done
+        for root in comb:
+            if state.get(root) == 2:
+                continue
+            stack = [(root, iter(expr_names(comb[root])))]
+            state[root] = 1
+            while stack:
+                name, deps = stack[-1]
+                for dep in deps:
+                    if dep not in comb or state.get(dep) == 2:
+                        continue
+                    if state.get(dep) == 1:
+                        return None, f"combinational loop through '{dep}'"
+                    state[dep] = 1
+                    stack.append((dep, iter(expr_names(comb[dep]))))
+                    break
+                else:
+                    stack.pop()
+                    state[name] = 2
+                    order.append(name)
+        return order, None
+
+
+def parse_statement(text_ln: str, line_no: int):
+    """
+    Parse one stripped, non-blank line: a pin definition, a sequential
+    (Qname.D = expr) or a combinational (name = expr) equation.
+    Returns (kind, name, value, error_message_or_None) where kind is 'pin'
+    (value = pin number), 'seq' or 'comb' (value = expression tree).
+    """
+    # a) PIN definitions: pin Y=8 or PIN Q = 3
+    m = PIN_RE.match(text_ln)
+    if m:
+        return "pin", m.group(2), int(m.group(3)), None
+
+    # b) Sequential: Qname.D = expr  (Q or q at start)
+    # c) Combinational: name = expr
+    m = SEQ_RE.match(text_ln)
+    kind = "seq"
+    if not m:
+        m = COMB_RE.match(text_ln)
+        kind = "comb"
+    if m:
+        node, err = parse_expr_text(m.group(2), line_no)
+        if err:
+            return None, None, None, err
+        return kind, m.group(1), node, None
+
+    # If none of the patterns matched: invalid syntax
+    return None, None, None, f"Line {line_no}: invalid syntax"
+
+
+def parse_design(text: str):
+    """
+    1st pass: line-by-line syntax check, building the Design.
+    2nd pass: ensure every used symbol is either:
+        - declared as a pin, or
+        - defined on the left-hand side of some equation
+          (combinational or sequential Qname.D).
+    Stops at the first error.
+    Returns (design, error_message_or_None).
+    """
+    design = Design()
+    used_idents = {}  # ident -> first line where it appears in an expression
+
+    # ---------- 1st pass: syntax + collect symbols ----------
+    for i, line in enumerate(text.splitlines(), start=1):
+        text_ln = line.strip()
+        if not text_ln:
+            continue
+
+        kind, name, value, err = parse_statement(text_ln, i)
+        if err:
+            return None, err
+        if kind == "pin":
+            design.pin_defs[name] = value
+            continue
+        target = design.seq_eqs if kind == "seq" else design.comb_eqs
+        target.append((name, value, i))
+
+        # Collect identifiers used on RHS
+        for ident in expr_names(value):
+            if ident not in used_idents:
+                used_idents[ident] = i
+
+    # ---------- 2nd pass: symbol resolution ----------
+    defined = design.signal_names
+
+    for ident, line_no in used_idents.items():
+        if ident not in defined:
+            return None, (
+                f"Line {line_no}: symbol '{ident}' is used but never "
+                f"declared as a pin or defined on the left-hand side"
+            )
+
+    return design, None
@@ -6,11 +6,50 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog
-import re
 import subprocess
+import re
 import json
 import os
+import queue
 import shutil
+import time
+
+from seq_design import Design
+from seq_modules import ModuleCache, default_cache_dir, load_design
+from seq_console import LEVELS, LogConsole, default_log_dir
+from seq_highlight import Highlighter
+from seq_codegen import generate_ino_source, describe_prune_stats
+from seq_bdd import check_equivalence
+from seq_arduino import SubprocessBackend, open_backend
+from seq_build import (
+    CompileTimes,
+    build_path_for,
+    clean_build_dirs,
+    default_build_root,
+    default_size_cap,
+    discard_partial_build,
+    enforce_size_cap,
+    is_warm,
+    write_if_changed,
+)
+from seq_reach import ReachError, explore
+from seq_sim import SimError
+from seq_size import SizeHistory, parse_compile_output, size_report
+from seq_ident import query_build_id, stamp_build_id
+from seq_watch import FileWatch, JobCancelled, LatestJob
+from seq_upload import FastUploader, find_avrdude, hex_for
+from seq_vm import VMError, compile_program, download, interpreter_ino_source, vm_hello
+from seq_trace import Tracer, maybe_span
+
+# Watch mode: quiet time before a rebuild, and how often the Tk thread
+# picks up results from the watch / rebuild threads
+WATCH_DEBOUNCE_S = 0.3
+WATCH_POLL_MS = 100
+
+# Interpreter target: how long to wait for the board to come back on its
+# serial port after the interpreter sketch was uploaded
+VM_REBOOT_TIMEOUT_S = 8.0
+
 
 class SeqEditorApp(ctk.CTk):
 
@@ -32,6 +71,28 @@ class SeqEditorApp(ctk.CTk):
         self.grid_rowconfigure(2, weight=1)  # code
         self.grid_rowconfigure(3, weight=0)  # bottom buttons
 
+        # Parsed / flattened .seq modules (INCLUDE, MODULE, INST), see seq_modules.py
+        self._module_cache = ModuleCache(default_cache_dir())
+        self._seq_path = ""  # last opened / saved .seq file
+
+        # arduino-cli backend (subprocess per command, or a persistent daemon);
+        # created on first use, see _arduino()
+        self._backend = None
+        self._backend_daemon = None
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # Watch mode (see seq_watch.py): file watcher, background rebuild
+        # worker, and the queue their results reach the Tk thread through.
+        # _precompiled is (device, build_id, build_path) of the last
+        # ahead-of-time build, which Flash then uploads without compiling;
+        # the rebuild thread publishes it through _watch_queue.
+        self._watch = None
+        self._watch_jobs = None
+        self._watch_queue = queue.Queue()
+        self._watch_cache = ModuleCache(default_cache_dir())  # used by the rebuild thread only
+        self._precompiled = None
+        self._flash_waiting = False  # Flash deferred until the rebuild is idle
+
         # ---------- Hardware section ----------
         self._create_hardware_section()
 
@@ -45,7 +106,11 @@ class SeqEditorApp(ctk.CTk):
         self._create_bottom_buttons()
 
         # ---------- Board scan ------------
-        self._initial_board_scan()
+        # SEQEDITOR_TRACE=1 times the startup scan as well
+        self._begin_trace()
+        with self._span("board scan"):
+            self._initial_board_scan()
+        self._end_trace("startup")
 
     # ============================================
     # Hardware section
@@ -87,6 +152,33 @@ class SeqEditorApp(ctk.CTk):
            home_dir = ""
         self.entry_sketch_dir.insert(0, home_dir)
 
+        # Keep (debug taps) label + entry: signals kept in the firmware even
+        # when they do not feed an output pin ('*' keeps everything)
+        lbl_keep = ctk.CTkLabel(hw_frame, text="Keep:")
+        lbl_keep.grid(row=1, column=0, padx=5, pady=5, sticky="e")
+
+        self.entry_keep = ctk.CTkEntry(
+            hw_frame, width=400, placeholder_text="debug taps, e.g. f1, Q3 (* = keep all)"
+        )
+        self.entry_keep.grid(row=1, column=1, columnspan=3, padx=5, pady=5, sticky="w")
+
+        # Keep one arduino-cli daemon running instead of one process per command
+        self.daemon_var = tk.BooleanVar(value=bool(os.environ.get("SEQEDITOR_DAEMON")))
+        chk_daemon = ctk.CTkCheckBox(hw_frame, text="arduino-cli daemon", variable=self.daemon_var)
+        chk_daemon.grid(row=1, column=4, columnspan=2, padx=5, pady=5, sticky="w")
+
+        # Upload with avrdude directly (own reset + bootloader port tracking,
+        # see seq_upload.py) instead of `arduino-cli upload`
+        self.direct_upload_var = tk.BooleanVar(value=bool(os.environ.get("SEQEDITOR_DIRECT_UPLOAD")))
+        chk_direct = ctk.CTkCheckBox(hw_frame, text="Direct upload (avrdude)",
+                                     variable=self.direct_upload_var)
+        chk_direct.grid(row=2, column=4, padx=5, pady=5, sticky="w")
+
+        # Read the flash back after writing it (avrdude verification)
+        self.verify_var = tk.BooleanVar(value=True)
+        chk_verify = ctk.CTkCheckBox(hw_frame, text="Verify", variable=self.verify_var)
+        chk_verify.grid(row=2, column=5, padx=5, pady=5, sticky="w")
+
     # ============================================
     # Clock section
     # ============================================
@@ -180,10 +272,40 @@ class SeqEditorApp(ctk.CTk):
         btn_save = ctk.CTkButton(file_frame, text="Save", width=80, command=self.on_save)
         btn_save.grid(row=2, column=0, padx=5, pady=5)
 
+        btn_states = ctk.CTkButton(file_frame, text="States", width=80, command=self.on_states)
+        btn_states.grid(row=3, column=0, padx=5, pady=5)
+
+        # Timing instrumentation for Check / Flash (see seq_trace.py)
+        self.timing_var = tk.BooleanVar(value=bool(os.environ.get("SEQEDITOR_TRACE")))
+        chk_timing = ctk.CTkCheckBox(file_frame, text="Timing", width=80, variable=self.timing_var)
+        chk_timing.grid(row=4, column=0, padx=5, pady=(10, 5), sticky="w")
+
+        self.profile_var = tk.BooleanVar(value=False)
+        chk_profile = ctk.CTkCheckBox(file_frame, text="Profile", width=80, variable=self.profile_var)
+        chk_profile.grid(row=5, column=0, padx=5, pady=5, sticky="w")
+
+        btn_clean = ctk.CTkButton(file_frame, text="Clean", width=80, command=self.on_clean_build)
+        btn_clean.grid(row=6, column=0, padx=5, pady=(10, 5))
+
+        # Watch mode: re-check / regenerate (and optionally compile) on save
+        self.watch_var = tk.BooleanVar(value=False)
+        chk_watch = ctk.CTkCheckBox(file_frame, text="Watch", width=80, variable=self.watch_var,
+                                    command=self.on_watch_toggle)
+        chk_watch.grid(row=7, column=0, padx=5, pady=(10, 5), sticky="w")
+
+        self.precompile_var = tk.BooleanVar(value=False)
+        chk_precompile = ctk.CTkCheckBox(file_frame, text="Precompile", width=80,
+                                         variable=self.precompile_var)
+        chk_precompile.grid(row=8, column=0, padx=5, pady=5, sticky="w")
+
         # --- Code textbox ---
         self.code_text = ctk.CTkTextbox(container, width=600, height=300)
         self.code_text.grid(row=0, column=1, pady=5, sticky="nsew")
 
+        # Syntax highlighting and error marks, updated incrementally after
+        # edits and scrolling (see seq_highlight.py)
+        self._highlighter = Highlighter(self.code_text)
+
     # ============================================
     # Bottom buttons + error label
     # ============================================
@@ -196,9 +318,29 @@ class SeqEditorApp(ctk.CTk):
         bottom.grid_columnconfigure(2, weight=0)
         bottom.grid_rowconfigure(0, weight=1)
 
-        # Error box (empty initially)
+        # Error box (empty initially); written through a bounded, batched console
         self.error_box = ctk.CTkTextbox(bottom, width=350, height=60)
         self.error_box.grid(row=0, column=0, padx=5, sticky="nsew")
+        self.console = LogConsole(self.error_box, max_lines=2000, log_dir=default_log_dir())
+
+        # Console tools: level filter + search
+        tools = ctk.CTkFrame(bottom, fg_color="transparent")
+        tools.grid(row=1, column=0, padx=5, pady=(5, 0), sticky="ew")
+
+        ctk.CTkLabel(tools, text="Show:").grid(row=0, column=0, padx=(0, 5))
+        self.log_level_var = tk.StringVar(value="debug")
+        level_menu = ctk.CTkOptionMenu(
+            tools, values=list(LEVELS), variable=self.log_level_var, width=100,
+            command=self.console.set_level,
+        )
+        level_menu.grid(row=0, column=1, padx=5)
+
+        self.entry_log_search = ctk.CTkEntry(tools, width=180, placeholder_text="Search output")
+        self.entry_log_search.grid(row=0, column=2, padx=5)
+        self.entry_log_search.bind("<Return>", lambda _event: self.on_log_search())
+
+        btn_find = ctk.CTkButton(tools, text="Find", width=60, command=self.on_log_search)
+        btn_find.grid(row=0, column=3, padx=5)
 
         # Check button
         self.check_button = ctk.CTkButton(bottom, text="Check", command=self.on_check)
@@ -209,25 +351,150 @@ class SeqEditorApp(ctk.CTk):
         self.flash_button.grid(row=0, column=2)
         self.flash_button.configure(state="disabled")
 
+        # Force: compile and upload even when the board already runs this build
+        self.force_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(bottom, text="Force", variable=self.force_var).grid(
+            row=1, column=2, pady=(5, 0)
+        )
+
+        # Interpreter: download the design as bytecode to the interpreter
+        # sketch (see seq_vm.py) instead of compiling a sketch per design
+        self.vm_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(bottom, text="Interpreter", variable=self.vm_var).grid(
+            row=1, column=1, pady=(5, 0)
+        )
+
     # =========================
     # Error handling helpers
     # =========================
     def _clear_error(self):
         """Clear the error/output box."""
-        if hasattr(self, "error_box"):
-            self.error_box.delete("1.0", "end")
+        if hasattr(self, "console"):
+            self.console.clear()
 
-    def _set_error(self, message: str):
+    def _set_error(self, message: str, level: str = "info"):
         """Write a message into the error/output box."""
-        if hasattr(self, "error_box"):
-            self.error_box.delete("1.0", "end")
-            self.error_box.insert("end", message + "\n")
+        if hasattr(self, "console"):
+            self.console.clear()
+            self.console.log(message, level)
 
-    def _append_error(self, message: str):
-        """Append a line to the error/output box without clearing it."""
-        if hasattr(self, "error_box"):
-            self.error_box.insert("end", message + "\n")
-            self.error_box.see("end")
+    def _append_error(self, message: str, level: str = "info"):
+        """
+        Append a line to the error/output box without clearing it. The line
+        is queued and shown on the console's next flush (see seq_console.py).
+        """
+        if hasattr(self, "console"):
+            self.console.log(message, level)
+
+    def _progress(self, message: str, level: str = "info"):
+        """
+        Progress callback for compile and upload: these block the Tk thread,
+        so the line is flushed and drawn now instead of on the next tick.
+        """
+        self._append_error(message, level)
+        if hasattr(self, "console"):
+            self.console.flush()
+            self.update_idletasks()
+
+    def on_log_search(self):
+        """Highlight the search text in the output box."""
+        if not hasattr(self, "console"):
+            return
+        pattern = self.entry_log_search.get().strip()
+        count = self.console.search(pattern)
+        if pattern and not count:
+            self.console.log(f"No match for '{pattern}'.", "warning")
+
+    # =========================
+    # Timing instrumentation
+    # =========================
+    def _begin_trace(self):
+        """Start a Tracer for this run if 'Timing' or 'Profile' is checked."""
+        timing = hasattr(self, "timing_var") and self.timing_var.get()
+        profile = hasattr(self, "profile_var") and self.profile_var.get()
+        self._tracer = Tracer(profile=profile) if (timing or profile) else None
+        return self._tracer
+
+    def _span(self, name: str, **args):
+        """Timed span when tracing, a no-op context otherwise."""
+        return maybe_span(getattr(self, "_tracer", None), name, **args)
+
+    def _run(self, cmd, name: str, **kwargs):
+        """subprocess.run(), recorded as a span (with child CPU time) when tracing."""
+        tracer = getattr(self, "_tracer", None)
+        if tracer is None:
+            return subprocess.run(cmd, **kwargs)
+        return tracer.run(cmd, name=name, **kwargs)
+
+    def _end_trace(self, label: str):
+        """
+        Stop tracing: append the timing tree (and the profile, if enabled) to
+        the error box and write trace_<label>.json (Chrome / Perfetto format)
+        plus profile_<label>.prof into the sketch directory when it exists.
+        """
+        tracer = getattr(self, "_tracer", None)
+        self._tracer = None
+        if tracer is None:
+            return
+
+        self._append_error(tracer.summary())
+
+        out_dir = ""
+        if hasattr(self, "entry_sketch_dir"):
+            base_dir = self.entry_sketch_dir.get().strip() or os.path.expanduser("~")
+            if os.path.isdir(os.path.join(base_dir, "seq_sketch")):
+                out_dir = os.path.join(base_dir, "seq_sketch")
+        if out_dir:
+            trace_path = os.path.join(out_dir, f"trace_{label}.json")
+            try:
+                tracer.write_chrome_trace(trace_path)
+                self._append_error(f"Trace written to: {trace_path}")
+            except OSError as e:
+                self._append_error(f"Could not write trace: {e}")
+
+        if tracer.profiling_enabled:
+            if out_dir:
+                prof_path = os.path.join(out_dir, f"profile_{label}.prof")
+                try:
+                    tracer.write_profile(prof_path)
+                    self._append_error(f"Profile written to: {prof_path}")
+                except OSError as e:
+                    self._append_error(f"Could not write profile: {e}")
+            self._append_error(tracer.profile_summary(10))
+
+    # =========================
+    # arduino-cli backend
+    # =========================
+    def _arduino(self):
+        """
+        The arduino-cli backend for the current 'arduino-cli daemon' setting.
+        The daemon is started on first use and kept until the setting changes
+        or the window closes; if it cannot be used, commands run as
+        subprocesses (see seq_arduino.py).
+        """
+        want_daemon = bool(hasattr(self, "daemon_var") and self.daemon_var.get())
+        if self._backend is None or self._backend_daemon != want_daemon:
+            if self._backend is not None:
+                self._backend.close()
+            with self._span("start arduino-cli backend"):
+                self._backend, note = open_backend(want_daemon, runner=self._run)
+            self._backend_daemon = want_daemon
+            if note:
+                self._append_error(note, "warning" if self._backend.name != "daemon" else "info")
+        return self._backend
+
+    def _backend_note(self):
+        """Report a daemon -> subprocess fallback that happened during the last call."""
+        note = getattr(self._backend, "note", None)
+        if note:
+            self._append_error(note, "warning")
+            self._backend.note = None
+
+    def _on_close(self):
+        self._stop_watch()
+        if self._backend is not None:
+            self._backend.close()
+        self.destroy()
 
     # =========================
     # Arduino CLI board detection on startup
@@ -246,23 +513,19 @@ class SeqEditorApp(ctk.CTk):
             self.entry_device.delete(0, "end")
             self.entry_device.insert(0, "adafruit:avr:itsybitsy32u4_5V")
 
-        if not hasattr(self, "error_box"):
+        if not hasattr(self, "console"):
             return
 
         try:
-            result = subprocess.run(
-                ["arduino-cli", "board", "list", "--format", "json"],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
+            result = self._arduino().board_list()
+            self._backend_note()
         except FileNotFoundError:
-            self._set_error("arduino-cli not found. Install it or add it to PATH.")
+            self._set_error("arduino-cli not found. Install it or add it to PATH.", "error")
             return
 
         if result.returncode != 0:
             msg = result.stderr.strip() or "arduino-cli returned an error."
-            self._set_error(f"arduino-cli error: {msg}")
+            self._set_error(f"arduino-cli error: {msg}", "error")
             return
 
         try:
@@ -363,274 +626,359 @@ class SeqEditorApp(ctk.CTk):
     def _write_sketch_ino(self, sketch_dir: str, ino_source: str) -> str:
         """
         Write the .ino file into the given sketch_dir and return its full path.
+        The write is atomic and skipped when the content is unchanged, so the
+        file keeps its timestamp and arduino-cli can reuse the previous build.
         """
         ino_path = os.path.join(sketch_dir, "seq_sketch.ino")
         try:
-            with open(ino_path, "w", encoding="utf-8") as f:
-                f.write(ino_source)
+            written = write_if_changed(ino_path, ino_source)
         except OSError as e:
-            self._set_error(f"Error writing .ino file:\n{e}")
+            self._set_error(f"Error writing .ino file:\n{e}", "error")
             return ""
+        if not written:
+            self._append_error("Sketch unchanged; existing .ino file kept.")
         return ino_path
 
     # =========================
-    # Expression tokenizer
+    # Persistent build directories
     # =========================
-    def _tokenize_expr(self, text: str):
+    def _build_path(self, device: str, sketch_dir: str) -> str:
         """
-        Turn an expression like:
-            OR(f2, NOT(Q3))
-        into a list of tokens: ('IDENT','OR'), ('LPAREN','('), ...
-        Returns (tokens, error_message or None).
+        Persistent --build-path for this FQBN and sketch (see seq_build.py). Older build
+        directories are removed when all of them exceed the size cap.
+        Returns "" when the directory cannot be created (arduino-cli then
+        uses its own temporary cache).
         """
-        tokens = []
-        i = 0
-        n = len(text)
-
-        while i < n:
-            ch = text[i]
-
-            if ch.isspace():
-                i += 1
-                continue
-
-            if ch.isalpha():
-                start = i
-                while i < n and (text[i].isalnum() or text[i] == "_"):
-                    i += 1
-                ident = text[start:i]
-                tokens.append(("IDENT", ident))
-                continue
-
-            if ch.isdigit():
-                start = i
-                while i < n and text[i].isdigit():
-                    i += 1
-                num = text[start:i]
-                tokens.append(("NUMBER", num))
-                continue
-
-            if ch == "(":
-                tokens.append(("LPAREN", ch))
-                i += 1
-                continue
-
-            if ch == ")":
-                tokens.append(("RPAREN", ch))
-                i += 1
-                continue
-
-            if ch == ",":
-                tokens.append(("COMMA", ch))
-                i += 1
-                continue
-
-            # Unknown character
-            return None, f"Invalid character '{ch}' in expression"
-
-        return tokens, None
+        root = default_build_root()
+        path = build_path_for(device, root, sketch_dir)
+        try:
+            os.makedirs(path, exist_ok=True)
+            os.utime(path)  # most recently used
+        except OSError as e:
+            self._append_error(f"Cannot create build directory '{path}': {e}", "warning")
+            return ""
+        for old, size in enforce_size_cap(root, default_size_cap(), keep=path):
+            self._append_error(f"Removed old build directory {old} ({size / 2**20:.1f} MiB).")
+        return path
+
+    def on_clean_build(self):
+        """Delete the persistent build directory of the current device (all if empty)."""
+        device = self.entry_device.get().strip() if hasattr(self, "entry_device") else ""
+        freed = clean_build_dirs(default_build_root(), device or None)
+        what = f"for {device}" if device else "for all devices"
+        self._set_error(f"Removed build directories {what} ({freed / 2**20:.1f} MiB). "
+                        "The next compile rebuilds the Arduino core.")
 
     # =========================
-    # Recursive expression parser
+    # Last flashed design (equivalence-based reflash skip)
     # =========================
-    def _parse_expr_tokens(self, tokens, pos: int):
+    def _flash_record(self, device: str, port: str) -> dict:
+        """Everything besides the .seq logic that ends up on the board."""
+        record = self._clock_config()
+        record["keep"] = self._debug_taps()
+        record["device"] = device
+        record["port"] = port
+        return record
+
+    def _load_last_flash(self, sketch_dir: str):
+        """Return the JSON record written after the last successful upload, or None."""
+        path = os.path.join(sketch_dir, "last_flash.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _save_last_flash(self, sketch_dir: str, seq_text: str, record: dict, build_id: str):
+        """Remember what was just uploaded; failures only cost a future skip."""
+        path = os.path.join(sketch_dir, "last_flash.json")
+        # INCLUDEd files are saved too: the old design must not change when they do
+        design, _ = self._parse_design(seq_text)
+        sources = design.sources if design is not None else {}
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"seq": seq_text, "sources": sources, "config": record,
+                           "build_id": build_id}, f, indent=2)
+        except OSError as e:
+            self._append_error(f"Could not save flash record: {e}")
+
+    def _board_up_to_date(self, sketch_dir: str, seq_text: str, record: dict, build_id: str) -> bool:
         """
-        expr := IDENT [ '(' args ')' ]
-        args := expr [ ',' expr ]
-        Rules:
-          - NOT must have exactly 1 argument
-          - AND / OR / XOR must have exactly 2 arguments
-        Returns (new_pos, error_message or None).
+        True when compile + upload can be skipped. The board is asked for the
+        build ID of its firmware (seq_ident.py): the same ID means this exact
+        build is running. Otherwise, if the board runs the build recorded in
+        last_flash.json, fall back to the equivalence check against that
+        record. A silent board is only trusted for records written before
+        build IDs; when the record has one, silence means reflash.
         """
-        if pos >= len(tokens):
-            return None, "Unexpected end of expression"
-
-        tok_type, tok_val = tokens[pos]
-        if tok_type != "IDENT":
-            return None, f"Expected identifier, got '{tok_val}'"
-
-        name = tok_val
-        pos += 1
-
-        # Function call?
-        if pos < len(tokens) and tokens[pos][0] == "LPAREN":
-            fn = name.upper()
-            if fn not in ("NOT", "AND", "OR", "XOR"):
-                return None, f"Unknown function '{name}'"
-
-            pos += 1  # consume '('
-
-            # First argument
-            if pos < len(tokens) and tokens[pos][0] == "RPAREN":
-                return None, f"{fn} requires arguments"
-
-            args_count = 0
-
-            # First arg
-            new_pos, err = self._parse_expr_tokens(tokens, pos)
-            if err:
-                return None, err
-            pos = new_pos
-            args_count += 1
-
-            # Optional second arg
-            if pos < len(tokens) and tokens[pos][0] == "COMMA":
-                pos += 1  # consume ','
-                new_pos, err = self._parse_expr_tokens(tokens, pos)
-                if err:
-                    return None, err
-                pos = new_pos
-                args_count += 1
-
-            # Expect ')'
-            if pos >= len(tokens) or tokens[pos][0] != "RPAREN":
-                return None, f"Missing ')' in call to {fn}"
-            pos += 1  # consume ')'
-
-            # Argument count rules
-            if fn == "NOT":
-                if args_count != 1:
-                    return None, "NOT must have exactly 1 argument"
-            else:  # AND/OR/XOR
-                if args_count != 2:
-                    return None, f"{fn} must have exactly 2 arguments"
-
-            return pos, None
-
-        # Simple variable like f2, y_3, Q3
-        return pos, None
-
-    def _check_expr_syntax(self, expr: str, line_no: int):
-        """Syntax check for the right-hand side expression."""
-        expr = expr.strip()
-        if not expr:
-            return f"Line {line_no}: missing expression on right-hand side"
-
-        tokens, err = self._tokenize_expr(expr)
-        if err:
-            return f"Line {line_no}: {err}"
+        port = record.get("port")
+        board_id = None
+        if port:
+            with self._span("query build ID"):
+                board_id, msg = query_build_id(port)
+            if board_id is None:
+                self._append_error(f"Build ID query: {msg}.", "debug")
+        if board_id == build_id:
+            self._append_error(
+                f"Board already runs this build (ID {build_id}); skipping compile and upload."
+            )
+            return True
+        last = self._load_last_flash(sketch_dir) or {}
+        if board_id is not None:
+            self._append_error(f"Board runs build {board_id}.")
+            if last.get("build_id") != board_id:
+                return False  # flashed from somewhere else since
+        elif last.get("build_id"):
+            self._append_error("Board did not report its build ID; flashing.")
+            return False  # a board flashed with a build ID always answers
+
+        with self._span("equivalence check"):
+            same = self._same_as_last_flash(sketch_dir, seq_text, record)
+        if same:
+            self._append_error(
+                "Design is equivalent to the one last flashed; skipping compile and upload."
+            )
+        return same
 
-        pos, err = self._parse_expr_tokens(tokens, 0)
-        if err:
-            return f"Line {line_no}: {err}"
+    def _same_as_last_flash(self, sketch_dir: str, seq_text: str, record: dict) -> bool:
+        """
+        True when the board already runs a functionally identical design
+        with the same clock / device / port configuration. Uses BDD-based
+        equivalence checking, so reformatting or rewriting equations into an
+        equivalent form does not trigger a reflash.
+        """
+        last = self._load_last_flash(sketch_dir)
+        if not last or last.get("config") != record:
+            return False
 
-        if pos != len(tokens):
-            extra = tokens[pos][1]
-            return f"Line {line_no}: unexpected token '{extra}' after expression"
+        old, err_old = self._parse_design(last.get("seq", ""), last.get("sources") or {})
+        new, err_new = self._parse_design(seq_text)
+        if err_old or err_new:
+            return False
 
-        return None  # no error
+        result = check_equivalence(old, new)
+        if not result:
+            self._append_error("Design differs from the last flashed one:")
+            self._append_error("  " + result.describe())
+        return bool(result)
 
     # =========================
-    # Expression → C translator
+    # Watch mode (external editor)
     # =========================
-    def _parse_expr_to_c(self, tokens, pos: int):
-        """
-        Parse tokens into a C expression string.
-
-        Grammar:
-          expr := IDENT [ '(' args ')' ]
-          args := expr [ ',' expr ]
-
-        Rules:
-          - NOT must have exactly 1 argument
-          - AND / OR / XOR must have exactly 2 arguments
+    def on_watch_toggle(self):
+        """Start / stop watching the open .seq file and its INCLUDEd files."""
+        if not self.watch_var.get():
+            self._stop_watch()
+            self._set_error("Watch mode off.")
+            return
+        if not self._seq_path:
+            self.watch_var.set(False)
+            self._set_error("Open or save a .seq file before turning on Watch.", "error")
+            return
 
-        Returns (c_expr, new_pos, error_message or None).
+        self._stop_watch()
+        self._watch_jobs = LatestJob(
+            on_error=lambda e: self._append_error(f"Background rebuild failed: {e}", "error")
+        )
+        self._watch = FileWatch(
+            [self._seq_path], lambda changed: self._watch_queue.put(("changed", changed)),
+            debounce=WATCH_DEBOUNCE_S,
+        )
+        self._set_error(f"Watching {self._seq_path} ({self._watch.watcher.name}).")
+        if self._watch.note:
+            self._append_error(self._watch.note, "warning")
+        self.after(WATCH_POLL_MS, self._poll_watch, self._watch)
+        self._submit_rebuild()
+
+    def _stop_watch(self):
+        if self._watch is not None:
+            self._watch.stop()
+            self._watch = None
+        if self._watch_jobs is not None:
+            self._watch_jobs.close()
+            self._watch_jobs = None
+
+    def _poll_watch(self, watch):
+        """Tk thread: apply what the watch / rebuild threads queued."""
+        if watch is not self._watch:
+            return  # watch stopped or restarted
+        if self._drain_watch_queue():
+            self._submit_rebuild()
+        self.after(WATCH_POLL_MS, self._poll_watch, watch)
+
+    def _drain_watch_queue(self) -> bool:
+        """Tk thread: apply the queued reloads and builds; True when a watched file changed."""
+        changed = False
+        while True:
+            try:
+                kind, *data = self._watch_queue.get_nowait()
+            except queue.Empty:
+                return changed
+            if kind == "changed":
+                changed = True
+            elif kind == "loaded":
+                self._apply_reload(*data)
+            elif kind == "precompiled":
+                self._precompiled = tuple(data)
+
+    def _submit_rebuild(self):
+        """Snapshot the GUI settings and queue a rebuild (cancelling a stale one)."""
+        if self._watch_jobs is None:
+            return
+        base_dir, sketch_dir = self._prepare_sketch_dir()
+        if not sketch_dir:
+            return
+        device = self.entry_device.get().strip() if hasattr(self, "entry_device") else ""
+        precompile = bool(self.precompile_var.get()) and bool(device)
+        settings = {
+            "path": self._seq_path,
+            "clock": self._clock_config(),
+            "keep": self._debug_taps(),
+            "device": device,
+            "base_dir": base_dir,
+            "sketch_dir": sketch_dir,
+            "build_path": self._build_path(device, sketch_dir) if precompile else "",
+        }
+        self._precompiled = None
+        self._watch_jobs.submit(lambda job: self._rebuild(job, settings))
+
+    def _apply_reload(self, text: str, err, sources):
         """
-        if pos >= len(tokens):
-            return None, pos, "Unexpected end of expression"
-
-        tok_type, tok_val = tokens[pos]
-        if tok_type != "IDENT":
-            return None, pos, f"Expected identifier, got '{tok_val}'"
-
-        name = tok_val
-        pos += 1
-
-        # Function call?
-        if pos < len(tokens) and tokens[pos][0] == "LPAREN":
-            fn = name.upper()
-            if fn not in ("NOT", "AND", "OR", "XOR"):
-                return None, pos, f"Unknown function '{name}'"
-
-            pos += 1  # consume '('
-
-            # First argument
-            arg1, pos, err = self._parse_expr_to_c(tokens, pos)
-            if err:
-                return None, pos, err
-            args_count = 1
-            arg2 = None
-
-            # Optional second argument
-            if pos < len(tokens) and tokens[pos][0] == "COMMA":
-                pos += 1  # consume ','
-                arg2, pos, err = self._parse_expr_to_c(tokens, pos)
-                if err:
-                    return None, pos, err
-                args_count = 2
-
-            # Expect closing ')'
-            if pos >= len(tokens) or tokens[pos][0] != "RPAREN":
-                return None, pos, f"Missing ')' in call to {fn}"
-            pos += 1  # consume ')'
-
-            # Argument count rules
-            if fn == "NOT":
-                if args_count != 1:
-                    return None, pos, "NOT must have exactly 1 argument"
-                c_expr = f"(!({arg1}))"
-            else:  # AND / OR / XOR
-                if args_count != 2:
-                    return None, pos, f"{fn} must have exactly 2 arguments"
-                if fn == "AND":
-                    c_expr = f"(({arg1}) && ({arg2}))"
-                elif fn == "OR":
-                    c_expr = f"(({arg1}) || ({arg2}))"
-                else:  # XOR
-                    c_expr = f"(({arg1}) ^ ({arg2}))"
-
-            return c_expr, pos, None
-
-        # Simple variable like f2, y_3, Q3
-        return name, pos, None
-
-    def _expr_to_c(self, expr: str, line_no: int):
+        Tk thread: show the reloaded file and its check result. A buffer with
+        unsaved edits is left alone; otherwise the cursor and view are kept.
         """
-        High-level helper: given a .seq expression string, return
-        a C/Arduino expression string.
+        if self.code_text.get("1.0", "end").rstrip("\n") != text.rstrip("\n"):
+            widget = self._code_widget()
+            if widget.edit_modified():
+                self._append_error("File changed on disk; unsaved edits kept "
+                                   "(the background build uses the file).", "warning")
+            else:
+                cursor, view = widget.index("insert"), widget.yview()[0]
+                self.code_text.delete("1.0", "end")
+                self.code_text.insert("1.0", text)
+                widget.mark_set("insert", cursor)
+                widget.yview_moveto(view)
+                widget.edit_modified(False)
+        if err:
+            self._append_error(err, "error")
+        else:
+            self._append_error("Reloaded; check passed.")
+        if hasattr(self, "flash_button"):
+            self.flash_button.configure(state="disabled" if err else "normal")
+        if sources is not None and self._watch is not None:
+            self._watch.set_paths([self._seq_path, *sources])
 
-        Returns (c_expr, error_message_or_None).
-        """
-        expr = expr.strip()
-        if not expr:
-            return "0", f"Line {line_no}: missing expression"
+    def _code_widget(self):
+        """The tk.Text inside the code CTkTextbox (for its modified flag, marks and view)."""
+        return getattr(self.code_text, "_textbox", self.code_text)
 
-        tokens, err = self._tokenize_expr(expr)
+    def _rebuild(self, job, settings: dict):
+        """
+        Rebuild thread: reload + check the file, regenerate the sketch and,
+        with a device in `settings`, compile it ahead of time. Only talks to
+        the GUI through the console and _watch_queue; job.check() /
+        job.run() abort when a newer save made this rebuild stale.
+        """
+        path = settings["path"]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            self._append_error(f"Watch: cannot read {path}: {e}", "error")
+            return
+        design, err = load_design(text, os.path.dirname(path), self._watch_cache)
+        self._watch_queue.put(("loaded", text, err, None if err else sorted(design.sources)))
         if err:
-            return "0", f"Line {line_no}: {err}"
+            return
+        job.check()
 
-        c_expr, pos, err = self._parse_expr_to_c(tokens, 0)
-        if err:
-            return "0", f"Line {line_no}: {err}"
+        sketch_dir, device = settings["sketch_dir"], settings["device"]
+        sketch_hdr = os.path.join(sketch_dir, "isrClock.h")
+        base_hdr = os.path.join(settings["base_dir"], "isrClock.h")
+        try:
+            if not os.path.isfile(sketch_hdr) and os.path.isfile(base_hdr):
+                shutil.copy2(base_hdr, sketch_hdr)
+            with open(sketch_hdr, "r", encoding="utf-8", errors="replace") as f:
+                salt = device + "\0" + f.read()
+        except OSError:
+            self._append_error("Watch: 'isrClock.h' not found; sketch not regenerated.", "warning")
+            return
 
-        if pos != len(tokens):
-            extra = tokens[pos][1]
-            return "0", f"Line {line_no}: unexpected token '{extra}' after expression"
+        source, _ = generate_ino_source(design, settings["clock"], settings["keep"], build_id=True)
+        source, build_id = stamp_build_id(source, salt)
+        job.check()
+        try:
+            write_if_changed(os.path.join(sketch_dir, "seq_sketch.ino"), source)
+        except OSError as e:
+            self._append_error(f"Watch: error writing .ino file: {e}", "error")
+            return
+        self._append_error(f"Regenerated sketch (build ID {build_id}).")
 
-        return c_expr, None
+        build_path = settings["build_path"]
+        if not build_path:
+            return
+        warm = is_warm(build_path)
+        backend = SubprocessBackend(runner=job.run)
+        t0 = time.perf_counter()
+        try:
+            result = backend.compile(device, sketch_dir, build_path=build_path, json_output=True)
+        except JobCancelled:
+            discard_partial_build(build_path, warm)
+            self._append_error("Stale background build cancelled.", "debug")
+            raise
+        except FileNotFoundError:
+            self._append_error("arduino-cli not found. Install it or add it to PATH.", "error")
+            return
+        compile_s = time.perf_counter() - t0
 
+        size, out, compile_err = parse_compile_output(result.stdout)
+        if result.returncode != 0:
+            self._append_error("Background compile failed.", "error")
+            for message in (out.strip(), compile_err.strip(), result.stderr.strip()):
+                if message:
+                    self._append_error(message, "error")
+            return
+        self._watch_queue.put(("precompiled", device, build_id, build_path))
+        self._append_error(f"Precompiled {build_id}; Flash will only upload.")
+        self._append_error(CompileTimes(default_build_root()).record(device, warm, compile_s))
+        if size is not None:
+            options = dict(settings["clock"], keep=settings["keep"], device=device)
+            history = SizeHistory(default_build_root())
+            for message, level in size_report(size, design.fingerprint(), options, history):
+                self._append_error(message, level)
 
     # =========================
-    # Identifier extraction for semantic checks
+    # Firmware size history
     # =========================
-    def _extract_idents_from_expr(self, expr: str):
+    def _report_size(self, device: str, seq_text: str, size):
         """
-        Return all identifier-like names from an expression.
-        We will later filter out NOT/AND/OR/XOR.
+        Print flash / SRAM usage, the deltas from the size history (keyed by
+        design fingerprint + codegen options) and low-SRAM warnings.
         """
-        names = re.findall(r"[A-Za-z][A-Za-z0-9_]*", expr)
-        return names
+        design, err = self._parse_design(seq_text)
+        if err:
+            design = Design()
+        options = dict(self._clock_config(), keep=self._debug_taps(), device=device)
+        history = SizeHistory(default_build_root())
+        for message, level in size_report(size, design.fingerprint(), options, history):
+            self._append_error(message, level)
+
+    # =========================
+    # Parsing with INCLUDE / MODULE support
+    # =========================
+    def _seq_base_dir(self) -> str:
+        """Directory INCLUDE paths are relative to: that of the open .seq file."""
+        if self._seq_path:
+            return os.path.dirname(self._seq_path)
+        if hasattr(self, "entry_sketch_dir"):
+            base_dir = self.entry_sketch_dir.get().strip()
+            if base_dir and os.path.isdir(base_dir):
+                return base_dir
+        return os.path.expanduser("~")
+
+    def _parse_design(self, text: str, sources=None):
+        """seq_modules.load_design() with the editor's base directory and cache."""
+        return load_design(text, self._seq_base_dir(), self._module_cache, sources)
 
     # =========================
     # Full code checker (syntax + second-pass symbol checks)
@@ -643,102 +991,26 @@ class SeqEditorApp(ctk.CTk):
             - defined on the left-hand side of some equation
               (combinational or sequential Qname.D).
         Stops at the first error and writes it to error_box.
+        The parser itself lives in seq_design.parse_design(); INCLUDE,
+        MODULE and INST lines are expanded by seq_modules.load_design().
         """
         self._clear_error()
 
-        raw_text = self.code_text.get("1.0", "end")
-        lines = raw_text.splitlines()
+        with self._span("read editor"):
+            raw_text = self.code_text.get("1.0", "end")
 
         # Treat completely empty / whitespace-only code as valid
-        if all(not ln.strip() for ln in lines):
+        if not raw_text.strip():
             return True
 
-        pin_names = set()
-        comb_lhs = set()
-        seq_lhs = set()
-        used_idents = {}  # ident -> first line where it appears in an expression
-
-        keywords = {"NOT", "AND", "OR", "XOR"}
-
-        # ---------- 1st pass: syntax + collect symbols ----------
-        for i, line in enumerate(lines, start=1):
-            text = line.strip()
-            if not text:
-                continue
-
-            # a) PIN definitions: pin Y=8 or PIN Q = 3
-            m = re.match(
-                r"^(pin|PIN)\s+([A-Za-z][A-Za-z0-9_]*)\s*=\s*(\d+)\s*$",
-                text
-            )
-            if m:
-                name = m.group(2)
-                pin_names.add(name)
-                continue
-
-            # b) Sequential: Qname.D = expr  (Q or q at start)
-            m = re.match(
-                r"^([qQ][A-Za-z0-9_]*)\.D\s*=\s*(.+)$",
-                text
-            )
-            if m:
-                qname = m.group(1)
-                rhs = m.group(2)
-                err = self._check_expr_syntax(rhs, i)
-                if err:
-                    self._set_error(err)
-                    return False
-
-                seq_lhs.add(qname)
-
-                # Collect identifiers used on RHS
-                for ident in self._extract_idents_from_expr(rhs):
-                    if ident.upper() in keywords:
-                        continue
-                    if ident not in used_idents:
-                        used_idents[ident] = i
-
-                continue
-
-            # c) Combinational: name = expr
-            m = re.match(
-                r"^([A-Za-z][A-Za-z0-9_]*)\s*=\s*(.+)$",
-                text
-            )
-            if m:
-                lhs = m.group(1)
-                rhs = m.group(2)
-                err = self._check_expr_syntax(rhs, i)
-                if err:
-                    self._set_error(err)
-                    return False
-
-                comb_lhs.add(lhs)
-
-                # Collect identifiers used on RHS
-                for ident in self._extract_idents_from_expr(rhs):
-                    if ident.upper() in keywords:
-                        continue
-                    if ident not in used_idents:
-                        used_idents[ident] = i
-
-                continue
-
-            # If none of the patterns matched: invalid syntax
-            self._set_error(f"Line {i}: invalid syntax")
+        with self._span("parse + check", chars=len(raw_text)):
+            _, err = self._parse_design(raw_text)
+        if hasattr(self, "_highlighter"):
+            self._highlighter.mark_check_error(err)
+        if err:
+            self._set_error(err, "error")
             return False
 
-        # ---------- 2nd pass: symbol resolution ----------
-        defined = pin_names | comb_lhs | seq_lhs
-
-        for ident, line_no in used_idents.items():
-            if ident not in defined:
-                self._set_error(
-                    f"Line {line_no}: symbol '{ident}' is used but never "
-                    f"declared as a pin or defined on the left-hand side"
-                )
-                return False
-
         # All good
         return True
 
@@ -746,15 +1018,8 @@ class SeqEditorApp(ctk.CTk):
     # Generate .ino source (from .seq content)
     # ============================================
 
-    def _generate_ino_source(self) -> str:
-        """
-        Build the .ino source using:
-          - Clock section configuration
-          - .seq code (pin declarations, combinational and sequential equations)
-        """
-        # ---------------------------------
-        # 1. Read clock UI state
-        # ---------------------------------
+    def _clock_config(self) -> dict:
+        """Read the clock section into a plain dict (with fallbacks)."""
         mode = self.clock_mode_var.get() if hasattr(self, "clock_mode_var") else "internal"
         use_internal = 1 if mode == "internal" else 0
 
@@ -770,184 +1035,44 @@ class SeqEditorApp(ctk.CTk):
 
         mirror = 1 if (hasattr(self, "mirror_var") and self.mirror_var.get()) else 0
 
-        # ---------------------------------
-        # 2. Parse .seq code into structures
-        # ---------------------------------
+        return {
+            "use_internal": use_internal,
+            "clk_pin": clk_pin,
+            "freq_hz": freq_hz,
+            "mirror": mirror,
+        }
+
+    def _debug_taps(self):
+        """Signals listed in the 'Keep' entry (comma or space separated)."""
+        if not hasattr(self, "entry_keep"):
+            return []
+        return [n for n in re.split(r"[,\s]+", self.entry_keep.get().strip()) if n]
+
+    def _generate_ino_source(self, salt: str = ""):
+        """
+        Build the .ino source using:
+          - Clock section configuration
+          - .seq code (pin declarations, combinational and sequential equations)
+        Logic outside the cone of influence of the output pins (and of the
+        debug taps in 'Keep') is left out; see seq_codegen.generate_ino_source().
+        The sketch embeds a build ID hashed from its source and `salt`
+        (device + isrClock.h); returns (source, build_id).
+        """
+        # Flash should only be enabled after a successful Check, so a parse
+        # error here is unexpected; fall back to an empty design to keep the
+        # generated code compilable.
         raw_text = self.code_text.get("1.0", "end")
-        lines = raw_text.splitlines()
-
-        pin_defs = {}        # name -> pin number
-        comb_eqs = []        # (lhs_name, rhs_expr, line_no)
-        seq_eqs = []         # (qname, rhs_expr, line_no)
-        comb_lhs = set()
-        seq_lhs = set()
-
-        for i, line in enumerate(lines, start=1):
-            text = line.strip()
-            if not text:
-                continue
-
-            # PIN definitions: pin Y=8 or PIN Q = 3
-            m = re.match(
-                r"^(pin|PIN)\s+([A-Za-z][A-Za-z0-9_]*)\s*=\s*(\d+)\s*$",
-                text
-            )
-            if m:
-                name = m.group(2)
-                num = int(m.group(3))
-                pin_defs[name] = num
-                continue
-
-            # Sequential: Qname.D = expr  (Q or q at start)
-            m = re.match(
-                r"^([qQ][A-Za-z0-9_]*)\.D\s*=\s*(.+)$",
-                text
-            )
-            if m:
-                qname = m.group(1)
-                rhs = m.group(2)
-                seq_eqs.append((qname, rhs, i))
-                seq_lhs.add(qname)
-                continue
-
-            # Combinational: name = expr
-            m = re.match(
-                r"^([A-Za-z][A-Za-z0-9_]*)\s*=\s*(.+)$",
-                text
-            )
-            if m:
-                lhs = m.group(1)
-                rhs = m.group(2)
-                comb_eqs.append((lhs, rhs, i))
-                comb_lhs.add(lhs)
-                continue
-
-            # If the code reached here, the line is syntactically invalid,
-            # but in practice Flash should only be enabled after a successful
-            # Check, so we simply ignore it here.
-            continue
-
-        # Names of all logic signals
-        signal_names = set(pin_defs.keys()) | comb_lhs | seq_lhs
-
-        # Pin classification:
-        #  - Inputs: declared as pin, never driven by any equation
-        #  - Outputs: declared as pin and driven by some equation
-        pin_inputs = {n for n in pin_defs if n not in comb_lhs and n not in seq_lhs}
-        pin_outputs = set(pin_defs.keys()) - pin_inputs
-
-        # Sequential register names (Q variables)
-        q_names = sorted({q for (q, _, _) in seq_eqs})
-
-        # ---------------------------------
-        # 3. Emit .ino code
-        # ---------------------------------
-        lines_out = []
-        o = lines_out.append
-
-        # --- Configuration from clock section ---
-        o("// --- Configuration ---")
-        o(f"#define USE_INTERNAL_CLOCK   {use_internal}      // 1 = internal Timer1 clock, 0 = external")
-        o(f"#define CLOCK_HZ             {freq_hz}      // frequency in Hz")
-        o(f"#define PIN_CLK              {clk_pin}      // clock pin")
-        o(f"#define CLOCK_LED_MIRROR     {mirror}      // mirror clock to LED (pin 13)")
-        o("")
-        o('#include "isrClock.h"')
-        o("")
-
-        # --- Pin mapping from .seq ---
-        if pin_defs:
-            o("// --- Pin mapping from .seq ---")
-            for name in sorted(pin_defs.keys()):
-                num = pin_defs[name]
-                o(f"const uint8_t PIN_{name} = {num};")
-            o("")
-
-        # --- Signal declarations ---
-        if signal_names or q_names:
-            o("// --- Logic signals ---")
-            for name in sorted(signal_names):
-                o(f"uint8_t {name} = 0;")
-            for q in q_names:
-                o(f"uint8_t D_{q} = 0;")
-            o("")
-
-        # Clock edge detection state
-        o("int __clk_prev = LOW;")
-        o("")
-
-        # --- setup() ---
-        o("void setup() {")
-        o("  // Initialize clock pin for edge detection")
-        o("  pinMode(PIN_CLK, INPUT);")
-        o("  __clk_prev = digitalRead(PIN_CLK);")
-        o("")
-
-        if pin_defs:
-            o("  // Configure user pins from .seq")
-            for name in sorted(pin_inputs):
-                o(f"  pinMode(PIN_{name}, INPUT);")
-            for name in sorted(pin_outputs):
-                o(f"  pinMode(PIN_{name}, OUTPUT);")
-            o("")
-
-        o("  // Start the hardware Timer1 clock on PIN_CLK if internal mode is enabled")
-        o("#if USE_INTERNAL_CLOCK")
-        o("  T1Clock_begin(PIN_CLK, CLOCK_HZ);")
-        o("#endif")
-        o("}")
-        o("")
-
-        # --- loop() ---
-        o("void loop() {")
-        o("  int clk_now = digitalRead(PIN_CLK);")
-        o("  bool rising = (__clk_prev == LOW && clk_now == HIGH);")
-        o("  __clk_prev = clk_now;")
-        o("")
-
-        # Read pin inputs (if any)
-        if pin_inputs:
-            o("  // Read input pins")
-            for name in sorted(pin_inputs):
-                o(f"  {name} = (digitalRead(PIN_{name}) == HIGH) ? 1 : 0;")
-            o("")
-
-        # Combinational logic
-        if comb_eqs:
-            o("  // Combinational logic")
-            for lhs, rhs, line_no in comb_eqs:
-                c_expr, err = self._expr_to_c(rhs, line_no)
-                if err:
-                    # In theory this should not happen if Check passed,
-                    # but fall back to 0 to keep generated code compilable.
-                    c_expr = "0"
-                o(f"  {lhs} = {c_expr};")
-            o("")
-
-        # Sequential next-state logic
-        if seq_eqs:
-            o("  // Compute D inputs for flip-flops")
-            for qname, rhs, line_no in seq_eqs:
-                c_expr, err = self._expr_to_c(rhs, line_no)
-                if err:
-                    c_expr = "0"
-                o(f"  D_{qname} = {c_expr};")
-            o("")
-            o("  if (rising) {")
-            for qname in q_names:
-                o(f"    {qname} = D_{qname};")
-            o("  }")
-            o("")
-
-        # Drive outputs
-        if pin_outputs:
-            o("  // Drive output pins")
-            for name in sorted(pin_outputs):
-                o(f"  digitalWrite(PIN_{name}, {name} ? HIGH : LOW);")
-        o("}")
-        o("")
-
-        return "\n".join(lines_out)
+        with self._span("parse"):
+            design, err = self._parse_design(raw_text)
+        if err:
+            design = Design()
+
+        with self._span("codegen"):
+            source, stats = generate_ino_source(design, self._clock_config(), self._debug_taps(),
+                                                build_id=True)
+            source, build_id = stamp_build_id(source, salt)
+        self._append_error(describe_prune_stats(stats))
+        return source, build_id
 
     # ============================================
     # Button callbacks (logic to be added later)
@@ -986,11 +1111,15 @@ class SeqEditorApp(ctk.CTk):
                 self.flash_button.configure(state="disabled")
             return
 
+        self._seq_path = path
         self.code_text.delete("1.0", "end")
         self.code_text.insert("1.0", content)
+        self._code_widget().edit_modified(False)
         self._clear_error()
         if hasattr(self, "flash_button"):
             self.flash_button.configure(state="disabled")
+        if self._watch is not None:
+            self.on_watch_toggle()  # watch the new file instead
 
     def on_save(self):
         """Save the code section to a .seq file (ask user for filename)."""
@@ -1018,10 +1147,23 @@ class SeqEditorApp(ctk.CTk):
             self._set_error(f"Error saving file: {e}")
             return
 
+        self._seq_path = path
+        self._code_widget().edit_modified(False)
         self._set_error("Saved successfully.")
+        if self._watch is not None and path not in self._watch.paths:
+            self.on_watch_toggle()  # watch the new file instead
 
     def on_check(self):
         """Check syntax; if ok, enable Flash, else show error and disable Flash."""
+        self._begin_trace()
+        try:
+            with self._span("check"):
+                self._check()
+        finally:
+            self._end_trace("check")
+
+    def _check(self):
+        """Body of on_check(), run inside its timing span."""
         ok = self.check_code_syntax()
         if hasattr(self, "flash_button"):
             if ok:
@@ -1031,6 +1173,24 @@ class SeqEditorApp(ctk.CTk):
             else:
                 self.flash_button.configure(state="disabled")
 
+    def on_states(self):
+        """Check the code, then report the reachable register states from reset."""
+        if not self.check_code_syntax():
+            return
+
+        design, _ = self._parse_design(self.code_text.get("1.0", "end"))
+        if design is None or not design.seq_eqs:
+            self._set_error("No registers (Q*.D equations) to analyze.")
+            return
+
+        try:
+            result = explore(design)
+        except (ReachError, SimError) as e:
+            self._set_error(f"Cannot explore state space: {e}", "error")
+            return
+
+        self._set_error(result.summary())
+
     def on_flash(self):
         """
         Full Flash sequence:
@@ -1038,13 +1198,99 @@ class SeqEditorApp(ctk.CTk):
           2) Ensure isrClock.h is present in the sketch_dir (copy from base_dir if needed)
           3) Generate seq_sketch.ino from the GUI config + .seq code
           4) Write it into the sketch directory
-          5) Compile with arduino-cli
+          5) Compile with arduino-cli (skipped, with upload, when the board
+             answers with the same build ID, or when the design is provably
+             equivalent to the one last flashed with the same settings;
+             'Force' disables both)
           6) Upload with arduino-cli
+        With 'Interpreter' checked, the design is downloaded as bytecode
+        instead (see _flash_vm()).
+        With 'Timing' checked, every stage is timed (see _end_trace()).
+        While a Watch rebuild is running, the native Flash is deferred until
+        it finishes (see _flash_when_idle()) so it can use its build.
         """
+        vm = hasattr(self, "vm_var") and self.vm_var.get()
+        if not vm and self._watch_jobs is not None and self._watch_jobs.busy:
+            if not self._flash_waiting:
+                self._flash_waiting = True
+                self._set_error("Waiting for the background build to finish; Flash starts after it.")
+                self.after(WATCH_POLL_MS, self._flash_when_idle)
+            return
         self._clear_error()
+        self._begin_trace()
+        try:
+            with self._span("flash"):
+                if vm:
+                    self._flash_vm()
+                else:
+                    self._flash()
+        finally:
+            self._end_trace("flash")
+
+    def _flash_when_idle(self):
+        """Tk thread: poll the rebuild worker and run the deferred Flash once it is idle."""
+        jobs = self._watch_jobs
+        if jobs is not None:
+            if jobs.busy:
+                self.after(WATCH_POLL_MS, self._flash_when_idle)
+                return
+            if self._drain_watch_queue():  # picks up "precompiled" before Flash reads it
+                self._submit_rebuild()  # a save arrived meanwhile
+                self.after(WATCH_POLL_MS, self._flash_when_idle)
+                return
+        self._flash_waiting = False
+        self.on_flash()
+
+    def _compile(self, device: str, sketch_dir: str, build_path: str, seq_text) -> bool:
+        """
+        Compile the sketch and report time and size (recorded in the size
+        history under the design in seq_text, unless it is None); False (with
+        the errors logged) on failure.
+        """
+        self._append_error(f"Compiling for device: {device}")
+
+        warm = bool(build_path) and is_warm(build_path)
+        try:
+            backend = self._arduino()
+            t0 = time.perf_counter()
+            with self._span(f"compile ({backend.name})", warm=warm):
+                compile_result = backend.compile(device, sketch_dir, progress=self._progress,
+                                                 build_path=build_path, json_output=True)
+            compile_s = time.perf_counter() - t0
+            self._backend_note()
+        except FileNotFoundError:
+            self._set_error("arduino-cli not found. Install it or add it to PATH.", "error")
+            return False
+
+        size, compile_out, compile_err = parse_compile_output(compile_result.stdout)
+        compile_err = "\n".join(t for t in (compile_err.strip(), compile_result.stderr.strip()) if t)
+        if compile_result.returncode != 0:
+            self._append_error("Compile failed.", "error")
+            if compile_out.strip():
+                self._append_error("=== compile stdout ===", "debug")
+                self._append_error(compile_out.strip(), "debug")
+            if compile_err:
+                self._append_error("=== compile stderr ===", "error")
+                self._append_error(compile_err, "error")
+            return False
+        self._append_error("Compile succeeded.")
+        if build_path:
+            self._append_error(CompileTimes(default_build_root()).record(device, warm, compile_s))
+        if size is not None and seq_text is None:
+            self._append_error(size.describe())
+        elif size is not None:
+            self._report_size(device, seq_text, size)
+        if compile_out.strip():
+            self._append_error("=== compile stdout ===", "debug")
+            self._append_error(compile_out.strip(), "debug")
+        return True
+
+    def _flash(self):
+        """Body of on_flash(), run inside its timing span."""
 
         # 1) Prepare sketch directory
-        base_dir, sketch_dir = self._prepare_sketch_dir()
+        with self._span("prepare sketch dir"):
+            base_dir, sketch_dir = self._prepare_sketch_dir()
         if not base_dir or not sketch_dir:
             return
 
@@ -1061,7 +1307,8 @@ class SeqEditorApp(ctk.CTk):
         elif os.path.isfile(base_hdr):
             # Copy from base_dir to sketch_dir
             try:
-                shutil.copy2(base_hdr, sketch_hdr)
+                with self._span("copy isrClock.h"):
+                    shutil.copy2(base_hdr, sketch_hdr)
                 lib_found = sketch_hdr
             except OSError as e:
                 self._set_error(
@@ -1082,89 +1329,222 @@ class SeqEditorApp(ctk.CTk):
 
         self._append_error(f"Library used at: {lib_found}")
 
-        # 3) Generate the .ino source based on the current clock + .seq logic
-        ino_src = self._generate_ino_source()
-
-        # 4) Write seq_sketch.ino into the sketch_dir
-        ino_path = self._write_sketch_ino(sketch_dir, ino_src)
-        if not ino_path:
-            return
-
-        self._append_error(f"Generated .ino file: {ino_path}")
-
-        # 5) Compile with arduino-cli
         device = ""
         if hasattr(self, "entry_device"):
             device = self.entry_device.get().strip()
 
         if not device:
-            self._set_error("Device (FQBN) is empty. Please fill 'Device' and try again.")
+            self._set_error("Device (FQBN) is empty. Please fill 'Device' and try again.", "error")
             return
 
-        self._append_error(f"Compiling for device: {device}")
-
-        compile_cmd = ["arduino-cli", "compile", "--fqbn", device, sketch_dir]
-
+        # 3) Generate the .ino source based on the current clock + .seq logic;
+        #    the build ID also covers the device and the isrClock.h in use
         try:
-            compile_result = subprocess.run(
-                compile_cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-        except FileNotFoundError:
-            self._set_error("arduino-cli not found. Install it or add it to PATH.")
-            return
+            with open(lib_found, "r", encoding="utf-8", errors="replace") as f:
+                salt = device + "\0" + f.read()
+        except OSError:
+            salt = device
+        with self._span("generate .ino"):
+            ino_src, build_id = self._generate_ino_source(salt)
 
-        if compile_result.returncode != 0:
-            self._append_error("Compile failed.")
-            if compile_result.stdout.strip():
-                self._append_error("=== compile stdout ===")
-                self._append_error(compile_result.stdout.strip())
-            if compile_result.stderr.strip():
-                self._append_error("=== compile stderr ===")
-                self._append_error(compile_result.stderr.strip())
+        # 4) Write seq_sketch.ino into the sketch_dir
+        with self._span("write .ino", bytes=len(ino_src)):
+            ino_path = self._write_sketch_ino(sketch_dir, ino_src)
+        if not ino_path:
             return
-        else:
-            self._append_error("Compile succeeded.")
-            if compile_result.stdout.strip():
-                self._append_error("=== compile stdout ===")
-                self._append_error(compile_result.stdout.strip())
 
-        # 6) Upload with arduino-cli
+        self._append_error(f"Generated .ino file: {ino_path} (build ID {build_id})")
+
+        # Skip compile + upload when the board already runs this build
+        # (or an equivalent design), unless 'Force' is checked
         port = ""
         if hasattr(self, "entry_port"):
             port = self.entry_port.get().strip()
+        seq_text = self.code_text.get("1.0", "end")
+        flash_record = self._flash_record(device, port)
+        if hasattr(self, "force_var") and self.force_var.get():
+            self._append_error("Force: compiling and uploading regardless of the board state.")
+        elif self._board_up_to_date(sketch_dir, seq_text, flash_record, build_id):
+            return
 
+        # 5) Compile with arduino-cli, unless watch mode already built this
+        #    exact sketch ahead of time (see _rebuild() and on_flash())
+        build_path = self._build_path(device, sketch_dir)
+        if build_path and self._precompiled == (device, build_id, build_path) and is_warm(build_path):
+            self._append_error(f"Using the ahead-of-time build {build_id}; skipping compile.")
+        elif not self._compile(device, sketch_dir, build_path, seq_text):
+            return
+
+        # 6) Upload with arduino-cli
         if not port:
-            self._set_error("Port is empty. Please fill 'Port' and try again.")
+            self._set_error("Port is empty. Please fill 'Port' and try again.", "error")
             return
+        if self._upload(port, device, sketch_dir, build_path):
+            self._save_last_flash(sketch_dir, seq_text, flash_record, build_id)
 
+    def _upload(self, port: str, device: str, sketch_dir: str, build_path: str) -> bool:
+        """Upload a compiled sketch; False (with the output logged) on failure."""
         self._append_error(f"Uploading to port: {port}")
 
-        upload_cmd = ["arduino-cli", "upload", "-p", port, "--fqbn", device, sketch_dir]
+        if hasattr(self, "direct_upload_var") and self.direct_upload_var.get():
+            hex_path = hex_for(build_path, sketch_dir)
+            avrdude, conf = find_avrdude()
+            if hex_path and avrdude:
+                return self._upload_direct(port, hex_path, avrdude, conf)
+            missing = "avrdude was not found" if hex_path else "no compiled .hex in the build directory"
+            self._append_error(f"Direct upload unavailable ({missing}); using arduino-cli.", "warning")
 
-        upload_result = subprocess.run(
-            upload_cmd,
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+        backend = self._arduino()
+        with self._span(f"upload ({backend.name})"):
+            upload_result = backend.upload(port, device, sketch_dir, progress=self._progress,
+                                           build_path=build_path)
+        self._backend_note()
 
         if upload_result.returncode != 0:
-            self._append_error("Upload failed.")
+            self._append_error("Upload failed.", "error")
             if upload_result.stdout.strip():
-                self._append_error("=== upload stdout ===")
-                self._append_error(upload_result.stdout.strip())
+                self._append_error("=== upload stdout ===", "debug")
+                self._append_error(upload_result.stdout.strip(), "debug")
             if upload_result.stderr.strip():
-                self._append_error("=== upload stderr ===")
-                self._append_error(upload_result.stderr.strip())
+                self._append_error("=== upload stderr ===", "error")
+                self._append_error(upload_result.stderr.strip(), "error")
+            return False
+        self._append_error("Upload succeeded.")
+        if upload_result.stdout.strip():
+            self._append_error("=== upload stdout ===", "debug")
+            self._append_error(upload_result.stdout.strip(), "debug")
+        return True
+
+    def _upload_direct(self, port: str, hex_path: str, avrdude: str, conf) -> bool:
+        """Reset into the bootloader and run avrdude ourselves (see seq_upload.py)."""
+        verify = not hasattr(self, "verify_var") or self.verify_var.get()
+        uploader = FastUploader(avrdude, conf, runner=self._run)
+        with self._span("upload (avrdude)", verify=verify):
+            result = uploader.upload(port, hex_path, verify)
+        for warning in result.warnings:
+            self._append_error(warning, "warning")
+        self._append_error(result.describe(), "info" if result.ok else "error")
+        if not result.ok:
+            self._append_error(f"Upload failed: {result.message}", "error")
+            for text in (result.stdout, result.stderr):
+                if text.strip():
+                    self._append_error(text.strip(), "error")
+            return False
+        self._append_error(f"Upload succeeded. {result.message}")
+        if result.stderr.strip():  # avrdude reports progress on stderr
+            self._append_error("=== avrdude output ===", "debug")
+            self._append_error(result.stderr.strip(), "debug")
+        return True
+
+    # ============================================
+    # Interpreter target (seq_vm.py)
+    # ============================================
+    def _flash_vm(self):
+        """
+        Interpreter variant of Flash:
+          1) Compile the design to bytecode
+          2) Skip everything when the board already runs this program
+             (same build ID), unless 'Force' is checked
+          3) If the board does not answer as the interpreter, compile and
+             upload the interpreter sketch (base_dir/seq_vm) once
+          4) Download the program over the serial port (milliseconds)
+        """
+        port = self.entry_port.get().strip() if hasattr(self, "entry_port") else ""
+        if not port:
+            self._set_error("Port is empty. Please fill 'Port' and try again.", "error")
+            return
+
+        raw_text = self.code_text.get("1.0", "end")
+        with self._span("parse"):
+            design, err = self._parse_design(raw_text)
+        if err:
+            self._set_error(err, "error")
+            return
+        try:
+            with self._span("compile bytecode"):
+                program = compile_program(design, self._clock_config(), self._debug_taps())
+        except VMError as e:
+            self._set_error(f"Design does not fit the interpreter: {e}\n"
+                            "Uncheck 'Interpreter' to flash a native sketch.", "error")
             return
+        stats = program.stats
+        self._append_error(describe_prune_stats(stats))
+        self._append_error(f"Program: {stats['program_bytes']} bytes, {stats['ops']} ops, "
+                           f"{stats['slots']} slots (build ID {program.build_id})")
+
+        if hasattr(self, "force_var") and self.force_var.get():
+            self._append_error("Force: downloading regardless of the board state.")
         else:
-            self._append_error("Upload succeeded.")
-            if upload_result.stdout.strip():
-                self._append_error("=== upload stdout ===")
-                self._append_error(upload_result.stdout.strip())
+            with self._span("query build ID"):
+                board_id, _ = query_build_id(port, timeout=0.5)
+            if board_id == program.build_id:
+                self._append_error(f"The board on {port} already runs program {board_id}; "
+                                   "nothing to download.")
+                return
+
+        with self._span("interpreter hello"):
+            info, msg = vm_hello(port)
+        if info is None:
+            self._append_error(f"No interpreter on {port} ({msg}); flashing it once.")
+            if not self._flash_interpreter(port):
+                return
+        elif info["program_max"] < len(program.data):
+            self._set_error(f"The interpreter on {port} holds {info['program_max']} bytes; "
+                            f"the program needs {len(program.data)}.", "error")
+            return
+
+        with self._span("download", bytes=len(program.data)):
+            seconds, msg = download(port, program)
+        if seconds is None:
+            self._append_error(f"Download failed: {msg}", "error")
+            return
+        self._append_error(f"Downloaded to {port} in {seconds * 1000:.1f} ms.")
+
+    def _flash_interpreter(self, port: str) -> bool:
+        """Compile and upload the interpreter sketch, then wait for it to answer."""
+        base_dir, _ = self._prepare_sketch_dir()
+        if not base_dir:
+            return False
+        device = self.entry_device.get().strip() if hasattr(self, "entry_device") else ""
+        if not device:
+            self._set_error("Device (FQBN) is empty. Please fill 'Device' and try again.", "error")
+            return False
+
+        vm_dir = os.path.join(base_dir, "seq_vm")
+        try:
+            os.makedirs(vm_dir, exist_ok=True)
+            write_if_changed(os.path.join(vm_dir, "seq_vm.ino"), interpreter_ino_source())
+            vm_hdr = os.path.join(vm_dir, "isrClock.h")
+            if not os.path.isfile(vm_hdr):
+                for folder in (os.path.join(base_dir, "seq_sketch"), base_dir):
+                    if os.path.isfile(os.path.join(folder, "isrClock.h")):
+                        shutil.copy2(os.path.join(folder, "isrClock.h"), vm_hdr)
+                        break
+        except OSError as e:
+            self._set_error(f"Cannot write the interpreter sketch into '{vm_dir}': {e}", "error")
+            return False
+        if not os.path.isfile(vm_hdr):
+            self._set_error("Required library 'isrClock.h' was not found for the interpreter sketch.\n"
+                            f"Please copy 'isrClock.h' into '{base_dir}' and try Flash again.",
+                            "error")
+            return False
+
+        with self._span("flash interpreter"):
+            if not self._compile(device, vm_dir, "", None):
+                return False
+            if not self._upload(port, device, vm_dir, ""):
+                return False
+
+        # The board resets after the upload; wait until its serial port is back
+        deadline = time.monotonic() + VM_REBOOT_TIMEOUT_S
+        with self._span("wait for interpreter"):
+            while time.monotonic() < deadline:
+                info, _ = vm_hello(port)
+                if info is not None:
+                    return True
+                time.sleep(0.25)
+        self._append_error(f"The interpreter did not answer on {port} after the upload.", "error")
+        return False
 
 if __name__ == "__main__":
     app = SeqEditorApp()
@@ -0,0 +1,345 @@
+# seq_fault.py - stuck-at fault simulation and compact test generation.
+#
+# A fault is one signal (input pin, register output or combinational
+# signal, output pins included) stuck at 0 or 1. A test is a sequence of
+# input vectors applied from reset (every register 0); it detects a fault
+# when some output pin differs from the fault-free design on some cycle.
+#
+# Faulty machines are simulated bit-parallel (seq_sim.py with inject): every
+# lane of the big Python integers is one machine, and each signal is forced
+# through per-signal keep / force lane masks. Lanes are laid out in blocks:
+#
+#   block b  = candidate test b
+#   lane 0   = the fault-free machine under test b
+#   lane 1+f = fault f under test b
+#
+# so one step() call runs several candidate tests against every remaining
+# fault, and the fault-free outputs of a block are broadcast over it with a
+# single multiplication to compare all of its faulty lanes at once.
+#
+# Faults on signals outside the cone of influence of the output pins can
+# never be observed; they are reported as unobservable and not simulated.
+# generate_tests() keeps the candidates that detect new faults and drops the
+# detected faults from later simulations. The kept tests are then simulated
+# against every detected fault and compacted greedily (always the test that
+# detects the most still-uncovered faults), each trimmed to the last cycle
+# it is needed for.
+
+import random
+import time
+
+from seq_design import Design
+from seq_netlist import Netlist
+from seq_sim import BitParallelModel, SimError
+
+LANE_BUDGET = 1 << 14          # bits per simulated integer
+DEFAULT_MAX_TESTS = 1000       # candidate tests before giving up
+DEFAULT_PATIENCE = 128         # candidates in a row without new detections
+DEFAULT_SEQUENCE_LENGTH = 16   # cycles per candidate test of a sequential design
+
+
+class FaultError(Exception):
+    """Raised for designs that cannot be fault simulated (e.g. no output pins)."""
+
+
+def fault_label(fault) -> str:
+    """('n3', 1) -> 'n3/1'."""
+    return f"{fault[0]}/{fault[1]}"
+
+
+def fault_list(design):
+    """
+    Every single stuck-at fault of a design: [(signal, 0), (signal, 1), ...]
+    for the input pins, registers and combinational signals, in that order.
+    """
+    order, err = design.comb_order()
+    if err:
+        raise SimError(err)
+    names = dict.fromkeys(sorted(design.pin_inputs) + design.q_names + order)
+    return [(name, value) for name in names for value in (0, 1)]
+
+
+def observable_design(design):
+    """
+    (design reduced to the cone of influence of its output pins, set of the
+    signals in that cone). Input pins outside the cone stay declared.
+    """
+    live = design.cone_of_influence(design.pin_outputs)
+    if isinstance(design, Netlist):
+        return design.restrict(live), live  # stays on the node arrays
+    reduced = Design()
+    reduced.pin_defs = dict(design.pin_defs)
+    reduced.comb_eqs = [eq for eq in design.comb_eqs if eq[0] in live]
+    reduced.seq_eqs = [eq for eq in design.seq_eqs if eq[0] in live]
+    return reduced, live
+
+
+class FaultSimulator:
+    """
+    Simulates tests (lists of input vectors; bit i of a vector is
+    model.inputs[i]) against sets of faults.
+    """
+
+    def __init__(self, design, lane_budget: int = LANE_BUDGET):
+        self.model = BitParallelModel(design, inject=True)
+        if not self.model.outputs:
+            raise FaultError("the design has no output pins, so no fault is observable")
+        self.site_index = {name: k for k, name in enumerate(self.model.sites)}
+        self.lane_budget = max(2, lane_budget)
+        self.steps = 0
+
+    def detect(self, tests, faults):
+        """
+        [{fault index: first detecting cycle}] per test, for faults given as
+        a list of (signal, value); tests may differ in length.
+        """
+        result = [{} for _ in tests]
+        chunk = self.lane_budget - 1
+        for f0 in range(0, len(faults), chunk):
+            part = faults[f0:f0 + chunk]
+            per_block = max(1, self.lane_budget // (len(part) + 1))
+            for t0 in range(0, len(tests), per_block):
+                group = tests[t0:t0 + per_block]
+                for j, found in enumerate(self._simulate(group, part)):
+                    result[t0 + j].update((f0 + f, c) for f, c in found.items())
+        return result
+
+    def _simulate(self, tests, faults):
+        """One packed run of up to lane_budget lanes: [{fault index: cycle}] per test."""
+        model = self.model
+        width = len(faults) + 1
+        n_blocks = len(tests)
+        block = (1 << width) - 1
+        rep = sum(1 << (b * width) for b in range(n_blocks))  # lane 0 of every block
+        mask = block * rep
+
+        keep = [block] * len(model.sites)
+        force = [0] * len(model.sites)
+        for f, (name, value) in enumerate(faults):
+            k = self.site_index[name]
+            if value:
+                force[k] |= 2 << f
+            else:
+                keep[k] &= ~(2 << f)
+        masks = []
+        for k in range(len(model.sites)):
+            masks.append(keep[k] * rep)
+            masks.append(force[k] * rep)
+
+        found = [{} for _ in tests]
+        seen = 0
+        faulty = mask & ~rep
+        state = [0] * len(model.registers)
+        step = model.step
+        for cycle in range(max(len(t) for t in tests)):
+            active = 0  # blocks whose test still has a vector at this cycle
+            ins = [0] * len(model.inputs)
+            for b, test in enumerate(tests):
+                if cycle < len(test):
+                    active |= block << (b * width)
+                    vector = test[cycle]
+                    for i in range(len(ins)):
+                        if vector >> i & 1:
+                            ins[i] |= block << (b * width)
+            outs, state = step(mask, masks, *ins, *state)
+            self.steps += 1
+            diff = 0
+            for value in outs:
+                diff |= value ^ ((value & rep) * block)
+            new = diff & active & faulty & ~seen
+            if new:
+                seen |= new
+                while new:
+                    low = new & -new
+                    lane = low.bit_length() - 1
+                    b, f = divmod(lane, width)
+                    found[b][f - 1] = cycle
+                    new ^= low
+                if seen == faulty:
+                    break
+        return found
+
+
+class FaultReport:
+    """
+    Outcome of generate_tests():
+      inputs, outputs:  pin names; bit i of a test vector is inputs[i]
+      faults:           every (signal, stuck value)
+      unobservable:     faults outside the cone of influence of the outputs
+      detected:         fault -> index of the compacted test that detects it
+      tests:            compacted test set, each a list of input vectors
+      candidates:       candidate tests simulated
+      generated:        tests kept before compaction
+      exhaustive:       every input vector was tried (combinational designs)
+      steps, seconds
+    """
+
+    def __init__(self, inputs, outputs, faults):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.faults = faults
+        self.unobservable = []
+        self.detected = {}
+        self.tests = []
+        self.candidates = 0
+        self.generated = 0
+        self.exhaustive = False
+        self.steps = 0
+        self.seconds = 0.0
+
+    @property
+    def undetected(self):
+        return [f for f in self.faults if f not in self.detected]
+
+    @property
+    def coverage(self) -> float:
+        """Detected faults in percent."""
+        return 100.0 * len(self.detected) / len(self.faults) if self.faults else 100.0
+
+    @property
+    def vectors(self) -> int:
+        return sum(len(t) for t in self.tests)
+
+    def summary(self, limit: int = 20) -> str:
+        lines = [
+            f"Faults: {len(self.faults):,} stuck-at on {len(self.faults) // 2:,} signals",
+            f"Fault coverage: {len(self.detected):,}/{len(self.faults):,} ({self.coverage:.1f}%)",
+            f"Tests: {len(self.tests)} ({self.vectors} vectors), compacted from {self.generated} "
+            f"of {self.candidates:,} candidates in {self.seconds:.2f} s",
+        ]
+        if self.unobservable:
+            lines.append(f"Unobservable (no path to an output pin): {len(self.unobservable):,}")
+        unobservable = set(self.unobservable)
+        undetected = [f for f in self.undetected if f not in unobservable]
+        if undetected:
+            why = " (redundant: every input vector was tried)" if self.exhaustive else ""
+            shown = ", ".join(fault_label(f) for f in undetected[:limit])
+            more = f", ... {len(undetected) - limit} more" if len(undetected) > limit else ""
+            lines.append(f"Undetected{why}: {shown}{more}")
+        return "\n".join(lines)
+
+    def format_tests(self):
+        """Lines with one row of input values per vector, inputs[0] first."""
+        lines = ["# " + " ".join(self.inputs)]
+        for t, test in enumerate(self.tests):
+            lines.append(f"test {t}:")
+            for vector in test:
+                lines.append("  " + " ".join(str(vector >> i & 1) for i in range(len(self.inputs))))
+        return lines
+
+    def to_dict(self) -> dict:
+        return {
+            "inputs": self.inputs,
+            "outputs": self.outputs,
+            "faults": len(self.faults),
+            "detected": len(self.detected),
+            "coverage": self.coverage,
+            "unobservable": [fault_label(f) for f in self.unobservable],
+            "undetected": [fault_label(f) for f in self.undetected],
+            "tests": [[[vector >> i & 1 for i in range(len(self.inputs))] for vector in test]
+                      for test in self.tests],
+            "candidates": self.candidates,
+            "seconds": self.seconds,
+        }
+
+
+def _candidates(n_inputs: int, length: int, max_tests: int, rng):
+    """
+    Candidate tests: every vector once (shuffled) for a combinational design
+    with few enough inputs, random sequences otherwise. Returns (tests, exhaustive).
+    """
+    if length == 1 and (1 << n_inputs) <= max_tests:
+        vectors = list(range(1 << n_inputs))
+        rng.shuffle(vectors)
+        return ([[v] for v in vectors], True)
+    return (([rng.getrandbits(n_inputs) for _ in range(length)] for _ in range(max_tests)), False)
+
+
+def compact(sim: FaultSimulator, tests, faults):
+    """
+    Greedy set cover over tests: [(test, [fault indices it covers])], each test
+    trimmed to the last cycle it is needed for.
+    """
+    # similar lengths share a packed run, so short tests do not wait for long ones
+    order = sorted(range(len(tests)), key=lambda j: len(tests[j]))
+    by_length = sim.detect([tests[j] for j in order], faults)
+    detections = [None] * len(tests)
+    for j, found in zip(order, by_length):
+        detections[j] = found
+    uncovered = set().union(*detections) if detections else set()
+    chosen = []
+    while uncovered:
+        best = max(range(len(tests)),
+                   key=lambda j: (len(uncovered.intersection(detections[j])), -len(tests[j]), -j))
+        covers = uncovered.intersection(detections[best])
+        if not covers:
+            break
+        last = max(detections[best][f] for f in covers)
+        chosen.append((tests[best][:last + 1], sorted(covers)))
+        uncovered -= covers
+    return chosen
+
+
+def generate_tests(design, max_tests: int = DEFAULT_MAX_TESTS, length: int = None,
+                   patience: int = DEFAULT_PATIENCE, seed: int = 0,
+                   lane_budget: int = LANE_BUDGET, progress=None) -> FaultReport:
+    """
+    Generate a compact test set for every single stuck-at fault of a design.
+    length is the number of cycles per candidate test (default 1 for
+    combinational designs, DEFAULT_SEQUENCE_LENGTH otherwise). Generation
+    stops when every fault is detected, after max_tests candidates, or after
+    `patience` candidates in a row that detect nothing new.
+    progress(candidates, detected, observable faults) is called after every batch.
+    Raises FaultError, or seq_sim.SimError for designs that cannot be simulated.
+    """
+    t0 = time.perf_counter()
+    all_faults = fault_list(design)
+    reduced, live = observable_design(design)
+    sim = FaultSimulator(reduced, lane_budget)
+    model = sim.model
+    faults = [f for f in all_faults if f[0] in live]
+    report = FaultReport(model.inputs, model.outputs, all_faults)
+    report.unobservable = [f for f in all_faults if f[0] not in live]
+    if length is None:
+        length = DEFAULT_SEQUENCE_LENGTH if model.registers else 1
+    if length < 1:
+        raise FaultError("tests need at least one cycle")
+
+    rng = random.Random(seed)
+    candidates, report.exhaustive = _candidates(len(model.inputs), length, max_tests, rng)
+    candidates = iter(candidates)
+
+    remaining = list(range(len(faults)))
+    kept = []
+    idle = 0
+    while remaining and idle < patience:
+        per_block = max(1, lane_budget // (min(len(remaining), lane_budget - 1) + 1))
+        batch = [t for _, t in zip(range(per_block), candidates)]
+        if not batch:
+            break
+        report.candidates += len(batch)
+        detections = sim.detect(batch, [faults[i] for i in remaining])
+        dropped = set()
+        for test, found in zip(batch, detections):
+            new = [f for f in found if f not in dropped]
+            if not new:
+                idle += 1
+                continue
+            idle = 0
+            dropped.update(new)
+            kept.append(test[:max(found[f] for f in new) + 1])
+        remaining = [i for j, i in enumerate(remaining) if j not in dropped]
+        if progress:
+            progress(report.candidates, len(faults) - len(remaining), len(faults))
+    report.exhaustive = report.exhaustive and report.candidates == 1 << len(model.inputs)
+    report.generated = len(kept)
+
+    undetected = set(remaining)
+    detected = [i for i in range(len(faults)) if i not in undetected]
+    for t, (test, covers) in enumerate(compact(sim, kept, [faults[i] for i in detected])):
+        report.tests.append(test)
+        for f in covers:
+            report.detected[faults[detected[f]]] = t
+    report.steps = sim.steps
+    report.seconds = time.perf_counter() - t0
+    return report
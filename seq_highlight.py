@@ -0,0 +1,390 @@
+# seq_highlight.py - incremental syntax highlighting for the .seq code editor.
+#
+# Every line is scanned on its own with the checker's tokenizer and
+# expression parser (seq_design.token_spans / parse_expr), which gives
+#   keywords    PIN, INCLUDE, MODULE, END, INST and NOT / AND / OR / XOR calls
+#   registers   Qname.D left-hand sides and reads of registers
+#   pins        declared pins, wherever they appear
+#   undefined   names that no line of the buffer defines
+#   errors      the token where the line stops parsing (squiggle)
+# Scans are cached by line text, and a SymbolIndex keeps per-line scans plus
+# counts of the names each line defines, so an edit only rescans the lines it
+# touched; the defined-name set only changes when a count crosses zero.
+#
+# Highlighter attaches to the Tk text widget of the editor. It wraps the
+# widget's Tcl command (like IDLE's redirector) to learn which lines each
+# insert / delete touched, marks them dirty and schedules one debounced pass.
+# A pass rescans the dirty lines in the viewport, then indexes the rest of the
+# buffer in slices of a few milliseconds, and only re-tags the visible lines
+# whose tags are stale. A keystroke costs a few index lookups and a list
+# splice, independent of the buffer size.
+
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+from seq_design import COMB_RE, KEYWORDS, PIN_RE, SEQ_RE, parse_expr, token_spans
+from seq_modules import END_RE, INCLUDE_RE, INST_RE, MODULE_RE
+
+HIGHLIGHT_DELAY_MS = 150   # quiet time after a keystroke before highlighting
+SCROLL_DELAY_MS = 15       # viewport repaint after scrolling
+SLICE_BUDGET_S = 0.008     # time per background indexing slice
+INDEX_CHUNK = 512          # lines fetched from the widget at once
+
+# tag -> Tk tag options (CTkTextbox does not allow fonts in tags)
+TAG_STYLES = {
+    "seq_keyword": {"foreground": "#1f4fbf"},
+    "seq_register": {"foreground": "#8a2be2"},
+    "seq_pin": {"foreground": "#b35c00"},
+    "seq_undefined": {"foreground": "red3", "underline": True},
+    "seq_error": {"background": "#ffe0e0", "underline": True, "underlinefg": "red"},
+    "seq_check_error": {"background": "#ffd0d0"},
+}
+_LINE_TAGS = ("seq_keyword", "seq_register", "seq_pin", "seq_undefined", "seq_error")
+
+_CHECK_LINE_RE = re.compile(r"^Line (\d+):")
+
+
+class LineScan:
+    """
+    Highlighting of one line (columns relative to the line start):
+      spans:    ((tag, start, end), ...) that do not depend on other lines
+      uses:     ((name, start, end), ...) tagged by what the name refers to
+      defines:  ((name, kind), ...) with kind 'pin', 'reg', 'sig' or 'inst'
+    """
+
+    __slots__ = ("spans", "uses", "defines")
+
+    def __init__(self, spans=(), uses=(), defines=()):
+        self.spans = tuple(spans)
+        self.uses = tuple(uses)
+        self.defines = tuple(defines)
+
+
+_EMPTY = LineScan()
+
+
+def _scan_expr(text: str, offset: int, spans, uses, args: bool = False):
+    """
+    Highlight an expression (or comma-separated INST arguments) starting at
+    column `offset`. Returns the (start, end) of the first syntax error, or
+    None; an empty expression is reported as (offset, offset).
+    """
+    toks = token_spans(text)
+    for i, (kind, value, start, end) in enumerate(toks):
+        if kind == "BAD":
+            return offset + start, offset + end
+        if kind == "IDENT":
+            call = i + 1 < len(toks) and toks[i + 1][0] == "LPAREN"
+            if call and value.upper() in KEYWORDS:
+                spans.append(("seq_keyword", offset + start, offset + end))
+            elif not call and value.upper() not in KEYWORDS:
+                uses.append((value, offset + start, offset + end))
+
+    tokens = [(kind, value) for kind, value, _, _ in toks]
+    pos = 0
+    while True:
+        _, pos, err = parse_expr(tokens, pos)
+        if err:
+            break
+        if pos == len(tokens):
+            return None
+        if args and tokens[pos][0] == "COMMA" and pos + 1 < len(tokens):
+            pos += 1
+            continue
+        break  # trailing token
+    if not toks:
+        return offset, offset
+    if pos >= len(toks):
+        return offset + toks[-1][2], offset + toks[-1][3]
+    return offset + toks[pos][2], offset + toks[pos][3]
+
+
+@lru_cache(maxsize=1 << 16)
+def scan_line(line: str) -> LineScan:
+    """Scan one line of .seq text; results are shared between identical lines."""
+    stripped = line.strip()
+    if not stripped:
+        return _EMPTY
+    lead = len(line) - len(line.lstrip())
+    end = lead + len(stripped)
+    spans, uses, defines = [], [], []
+    error = None
+
+    directive = None
+    for pattern in (PIN_RE, INCLUDE_RE, MODULE_RE, END_RE, INST_RE):
+        m = pattern.match(stripped)
+        if m:
+            directive = pattern
+            spans.append(("seq_keyword", lead + m.start(1), lead + m.end(1)))
+            break
+
+    if directive is PIN_RE:
+        spans.append(("seq_pin", lead + m.start(2), lead + m.end(2)))
+        defines.append((m.group(2), "pin"))
+    elif directive is MODULE_RE:
+        defines.extend((p.strip(), "sig") for p in m.group(3).split(",") if p.strip())
+    elif directive is INST_RE:
+        defines.append((m.group(2), "inst"))
+        error = _scan_expr(m.group(4), lead + m.start(4), spans, uses, args=True)
+    elif directive is None:
+        m = SEQ_RE.match(stripped)
+        if m:
+            spans.append(("seq_register", lead + m.start(1), lead + m.end(1) + 2))  # Qname.D
+            defines.append((m.group(1), "reg"))
+        else:
+            m = COMB_RE.match(stripped)
+            if m:
+                uses.append((m.group(1), lead + m.start(1), lead + m.end(1)))
+                defines.append((m.group(1), "sig"))
+        if m:
+            error = _scan_expr(m.group(2), lead + m.start(2), spans, uses)
+        else:
+            error = (lead, end)  # not a statement at all
+    if error is not None:
+        start, stop = error
+        spans.append(("seq_error", start, stop) if stop > start else ("seq_error", lead, end))
+    return LineScan(spans, uses, defines)
+
+
+class SymbolIndex:
+    """
+    Scans of every line of a buffer (None = not scanned yet) and how many
+    lines define each name. `generation` grows whenever the set of defined
+    names (or the completeness of the index) changes, which makes every
+    name-dependent tag stale.
+    """
+
+    def __init__(self):
+        self.scans = [None]
+        self.pending = 1  # lines not scanned yet
+        self.counts = Counter()
+        self.generation = 0
+        self._before = {}  # (name, kind) -> was defined before this round of edits
+        self._complete = False
+
+    def _count(self, scan, delta: int):
+        before, counts = self._before, self.counts
+        for key in scan.defines:
+            if key not in before:
+                before[key] = counts[key] > 0
+            counts[key] += delta
+
+    def splice(self, first: int, n_old: int, n_new: int):
+        """Replace lines first .. first + n_old - 1 (0-based) by n_new unscanned lines."""
+        for scan in self.scans[first:first + n_old]:
+            if scan is None:
+                self.pending -= 1
+            else:
+                self._count(scan, -1)
+        self.scans[first:first + n_old] = [None] * n_new
+        self.pending += n_new
+
+    def set_line(self, i: int, text: str):
+        old = self.scans[i]
+        if old is None:
+            self.pending -= 1
+        else:
+            self._count(old, -1)
+        scan = scan_line(text)
+        self._count(scan, 1)
+        self.scans[i] = scan
+
+    def commit(self) -> bool:
+        """Bump generation if the defined names changed since the last commit."""
+        counts = self.counts
+        changed = any((counts[key] > 0) != was for key, was in self._before.items())
+        self._before.clear()
+        complete = self.pending == 0
+        if changed or complete != self._complete:
+            self._complete = complete
+            self.generation += 1
+            return True
+        return False
+
+    def classify(self, name: str):
+        """Tag for a name read somewhere: pin, register, None (plain signal) or undefined."""
+        counts = self.counts
+        if counts[(name, "pin")] > 0:
+            return "seq_pin"
+        if counts[(name, "reg")] > 0:
+            return "seq_register"
+        if counts[(name, "sig")] > 0 or not self._complete:
+            return None
+        # t1_Qt is defined by INST t1 = ...
+        pos = name.find("_")
+        while pos > 0:
+            if counts[(name[:pos], "inst")] > 0:
+                return None
+            pos = name.find("_", pos + 1)
+        return "seq_undefined"
+
+
+class Highlighter:
+    """
+    Highlighting of a Tk / CustomTkinter text widget holding .seq code.
+
+        highlighter = Highlighter(code_text)
+        highlighter.mark_check_error("Line 12: symbol 'x' is used ...")
+
+    Edits made through the widget (typing, paste, undo, programmatic
+    insert / delete) are tracked automatically.
+    """
+
+    def __init__(self, widget, delay_ms: int = HIGHLIGHT_DELAY_MS):
+        self.widget = widget
+        self.text = getattr(widget, "_textbox", widget)  # CTkTextbox wraps a tk.Text
+        self.delay_ms = delay_ms
+        self.index = SymbolIndex()
+        self._painted = [-1]  # per line: generation its tags were computed for
+        self._scan_from = 0   # no unscanned line before this one
+        self._job = None
+
+        tk = self.text.tk
+        for tag, options in TAG_STYLES.items():
+            try:
+                self.text.tag_configure(tag, **options)
+            except Exception:  # underlinefg needs Tk 8.6.6
+                self.text.tag_configure(tag, **{k: v for k, v in options.items() if k != "underlinefg"})
+        self.text.tag_raise("seq_error")
+
+        # Route the widget's Tcl command through _dispatch
+        self._orig = self.text._w + "_seq_orig"
+        tk.call("rename", self.text._w, self._orig)
+        tk.createcommand(self.text._w, self._dispatch)
+        self._call = lambda *args: tk.call(self._orig, *args)
+
+        self._splice(0, 1, self._line_count())
+        self._schedule(0)
+
+    # ---------- edit tracking ----------
+    def _line_count(self) -> int:
+        return int(self._call("index", "end - 1 chars").split(".")[0])
+
+    def _line(self, index: str, count: int) -> int:
+        return min(int(self._call("index", index).split(".")[0]), count)
+
+    def _dispatch(self, op, *args):
+        if op not in ("insert", "delete", "replace"):
+            result = self._call(op, *args)
+            if op in ("yview", "see") and self._job is None:
+                self._schedule(SCROLL_DELAY_MS)
+            return result
+        try:
+            count = self._line_count()
+            if op == "insert":
+                first = last = self._line(args[0], count)
+            elif op == "delete" and len(args) == 1:
+                first = self._line(args[0], count)
+                last = self._line(f"{args[0]} + 1 chars", count)
+            else:
+                lines = [self._line(i, count) for i in (args[:2] if op == "replace" else args)]
+                first, last = min(lines), max(lines)
+            result = self._call(op, *args)
+        except Exception:  # bad index etc.: same as Tk, the edit does not happen
+            return ""
+        new_last = last + self._line_count() - count
+        self._call("tag", "remove", "seq_check_error", f"{first}.0", f"{max(first, new_last)}.end")
+        self._splice(first - 1, last - first + 1, new_last - first + 1)
+        self._schedule(self.delay_ms)
+        return result
+
+    def _splice(self, first: int, n_old: int, n_new: int):
+        self.index.splice(first, n_old, n_new)
+        self._painted[first:first + n_old] = [-1] * n_new
+        self._scan_from = min(self._scan_from, first)
+
+    def _schedule(self, delay_ms: int):
+        if self._job is not None:
+            self.text.after_cancel(self._job)
+        self._job = self.text.after(delay_ms, self._run)
+
+    # ---------- highlighting pass ----------
+    def _rescan(self, first: int, last: int):
+        """Scan lines first .. last (1-based, inclusive) from the widget."""
+        texts = self._call("get", f"{first}.0", f"{last}.end").split("\n")
+        set_line = self.index.set_line
+        for i, text in enumerate(texts[:last - first + 1]):
+            set_line(first - 1 + i, text)
+            self._painted[first - 1 + i] = -1
+
+    def _visible(self):
+        height = self.text.winfo_height()
+        first = int(self._call("index", "@0,0").split(".")[0])
+        last = int(self._call("index", f"@0,{max(height, 1)}").split(".")[0])
+        return first, last
+
+    def _run(self):
+        self._job = None
+        deadline = time.perf_counter() + SLICE_BUDGET_S
+        scans = self.index.scans
+        first, last = self._visible()
+        line = first
+        while line <= last:
+            if scans[line - 1] is None:
+                end = line
+                while end < last and scans[end] is None:
+                    end += 1
+                self._rescan(line, end)
+                line = end
+            line += 1
+
+        # index the rest of the buffer for the undefined-symbol check
+        while self.index.pending and time.perf_counter() < deadline:
+            try:
+                i = scans.index(None, self._scan_from)
+            except ValueError:
+                i = scans.index(None)
+            end = i
+            while end + 1 < len(scans) and end - i < INDEX_CHUNK and scans[end + 1] is None:
+                end += 1
+            self._rescan(i + 1, end + 1)
+            self._scan_from = end + 1
+
+        self.index.commit()
+        self._paint(first, last)
+        if self.index.pending:
+            self._job = self.text.after(1, self._run)
+
+    def _paint(self, first: int, last: int):
+        """Re-tag the lines first .. last whose tags are stale, with one Tcl call per tag."""
+        gen = self.index.generation
+        painted, scans, classify = self._painted, self.index.scans, self.index.classify
+        ranges = {tag: [] for tag in _LINE_TAGS}
+        runs = []
+        for line in range(first, last + 1):
+            i = line - 1
+            if painted[i] == gen or scans[i] is None:
+                continue
+            painted[i] = gen
+            if runs and runs[-1][1] == line - 1:
+                runs[-1][1] = line
+            else:
+                runs.append([line, line])
+            scan = scans[i]
+            for tag, start, end in scan.spans:
+                ranges[tag] += (f"{line}.{start}", f"{line}.{end}")
+            for name, start, end in scan.uses:
+                tag = classify(name)
+                if tag:
+                    ranges[tag] += (f"{line}.{start}", f"{line}.{end}")
+        if not runs:
+            return
+        for tag, spans in ranges.items():
+            for a, b in runs:
+                self._call("tag", "remove", tag, f"{a}.0", f"{b}.end")
+            if spans:
+                self._call("tag", "add", tag, *spans)
+
+    # ---------- checker errors ----------
+    def mark_check_error(self, message: str):
+        """Mark the line named by a checker error ('Line N: ...'); clears the previous mark."""
+        self.clear_check_error()
+        m = _CHECK_LINE_RE.match(message or "")
+        if m:
+            line = int(m.group(1))
+            self._call("tag", "add", "seq_check_error", f"{line}.0", f"{line}.0 + 1 lines")
+
+    def clear_check_error(self):
+        self._call("tag", "remove", "seq_check_error", "1.0", "end")
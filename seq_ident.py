@@ -0,0 +1,148 @@
+# seq_ident.py - build IDs embedded in the firmware and queried over USB serial.
+#
+# The generated sketch carries a 64-bit build ID: a hash of its own source
+# (with a placeholder where the ID goes), the board FQBN and isrClock.h. When
+# it reads QUERY_BYTE on the USB serial port, it answers "SEQID:<id>\n".
+# Before flashing, the editor asks the board for its ID; an identical ID
+# means the exact same firmware is already running, so compile and upload
+# (the slow bootloader step) can be skipped.
+#
+# The query uses pyserial when it is installed, else a raw termios file
+# descriptor (POSIX only). Both also work on a pty, so a stand-in device can
+# answer instead of a real board. The port is opened at 115200 baud: opening
+# it at 1200 baud would reset an ATmega32u4 into its bootloader.
+
+import hashlib
+import os
+import time
+
+try:
+    import serial
+except ImportError:  # optional dependency
+    serial = None
+
+try:
+    import termios
+except ImportError:  # not POSIX
+    termios = None
+
+QUERY_BYTE = b"\x05"  # ASCII ENQ
+REPLY_PREFIX = "SEQID:"
+BUILD_ID_PLACEHOLDER = "0" * 16
+BAUD = 115200
+
+
+def stamp_build_id(source: str, salt: str = ""):
+    """
+    Replace the build ID placeholder in a generated sketch with the hash of
+    the source and salt (FQBN, library contents). Returns (source, build_id).
+    """
+    h = hashlib.sha256(source.encode("utf-8"))
+    h.update(b"\0" + salt.encode("utf-8"))
+    build_id = h.hexdigest()[:16]
+    return source.replace(f'"{BUILD_ID_PLACEHOLDER}"', f'"{build_id}"', 1), build_id
+
+
+def parse_reply(data: bytes):
+    """The build ID in a board reply, or None."""
+    text = data.decode("ascii", "replace")
+    start = text.rfind(REPLY_PREFIX)
+    if start < 0:
+        return None
+    line = text[start + len(REPLY_PREFIX):].split("\n", 1)[0].strip()
+    if len(line) != len(BUILD_ID_PLACEHOLDER):
+        return None
+    return line.lower()
+
+
+class _TermiosPort:
+    """Minimal raw serial port on a file descriptor (what pyserial would do)."""
+
+    def __init__(self, path: str):
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            attrs = termios.tcgetattr(self.fd)
+            attrs[0] = 0                                   # iflag
+            attrs[1] = 0                                   # oflag
+            attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL
+            attrs[3] = 0                                   # lflag: raw
+            attrs[4] = attrs[5] = termios.B115200
+            termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+            termios.tcflush(self.fd, termios.TCIFLUSH)
+        except termios.error:
+            os.close(self.fd)
+            raise OSError(f"{path} is not a serial port")
+
+    def write(self, data: bytes):
+        os.write(self.fd, data)
+
+    def read_available(self) -> bytes:
+        try:
+            return os.read(self.fd, 256)
+        except BlockingIOError:
+            return b""
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PySerialPort:
+    def __init__(self, path: str):
+        self.port = serial.Serial(path, BAUD, timeout=0, write_timeout=1)
+        self.port.reset_input_buffer()
+
+    def write(self, data: bytes):
+        self.port.write(data)
+        self.port.flush()
+
+    def read_available(self) -> bytes:
+        return self.port.read(256)
+
+    def close(self):
+        self.port.close()
+
+
+def open_port(path: str):
+    """Open a serial port for the query; raises OSError when it cannot."""
+    if serial is not None:
+        try:
+            return _PySerialPort(path)
+        except serial.SerialException as e:
+            raise OSError(str(e)) from e
+    if termios is None:
+        raise OSError("pyserial is not installed")
+    return _TermiosPort(path)
+
+
+def query_build_id(port: str, timeout: float = 1.0, opener=open_port):
+    """
+    Ask the board on `port` for its build ID.
+    Returns (build_id or None, message or None): None with a message when the
+    port cannot be used or the firmware does not answer (e.g. not a SeqEditor
+    sketch, or one built before build IDs).
+    """
+    try:
+        conn = opener(port)
+    except OSError as e:
+        return None, f"cannot open {port}: {e}"
+    data = b""
+    try:
+        conn.write(QUERY_BYTE)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            chunk = conn.read_available()
+            if chunk:
+                data += chunk
+                if parse_reply(data) is not None:
+                    break
+            else:
+                time.sleep(0.01)
+    except OSError as e:
+        return None, f"serial error on {port}: {e}"
+    finally:
+        conn.close()
+
+    build_id = parse_reply(data)
+    if build_id is None:
+        return None, f"no build ID answer from {port}"
+    return build_id, None
@@ -0,0 +1,625 @@
+# seq_modules.py - INCLUDE files and parameterized MODULE instancing for .seq designs.
+#
+#   INCLUDE "blocks/counter.seq"
+#
+#   MODULE toggle(EN, RST)
+#   Qt.D = AND(NOT(RST), XOR(Qt, EN))
+#   END
+#
+#   INST t1 = toggle(X, 0)
+#   LED = t1_Qt
+#
+# A MODULE block lists its ports; INST binds them positionally to signals,
+# constants or expressions of the enclosing scope. Every signal the module
+# defines is copied into the instance with the instance name as prefix
+# (Qt -> t1_Qt), so instances nest and never clash. A file sees the modules it
+# defines and those of the files it INCLUDEs (paths are relative to the
+# including file); included files may only hold MODULE blocks and INCLUDEs.
+# load_design() flattens everything into a plain seq_design.Design, so the
+# rest of the tool chain never sees modules.
+#
+# Parsed files are cached by content hash, and flattened modules by the hash
+# of their file plus everything it includes, in memory and (optionally) on
+# disk. Re-checking a design after editing one block only re-parses that
+# block, and only re-flattens the modules that depend on it.
+
+import hashlib
+import marshal
+import os
+import re
+import sys
+
+from seq_design import (
+    LEAVES,
+    Design,
+    expr_names,
+    fold_tree,
+    parse_expr,
+    parse_statement,
+    tokenize_expr,
+)
+
+INCLUDE_RE = re.compile(r'^(include|INCLUDE)\s+"([^"]+)"\s*$')
+MODULE_RE = re.compile(r"^(module|MODULE)\s+([A-Za-z][A-Za-z0-9_]*)\s*\(([^)]*)\)\s*$")
+END_RE = re.compile(r"^(end|END)\s*$")
+INST_RE = re.compile(
+    r"^(inst|INST)\s+([A-Za-z][A-Za-z0-9_]*)\s*=\s*([A-Za-z][A-Za-z0-9_]*)\s*\((.*)\)\s*$"
+)
+IDENT_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+# Bump when the cached data layout changes; marshal data is also specific to
+# the Python version, which is part of every cache key.
+CACHE_FORMAT = 1
+
+
+# =========================
+# Parsed files
+# =========================
+class Module:
+    """
+    One MODULE block, or the top level of a file (name None):
+      params:    port names, bound positionally by INST
+      pin_defs, comb_eqs, seq_eqs: as in seq_design.Design
+      instances: [(inst_name, module_name, [arg expr nodes], line_no)]
+      used:      ident -> first line where an expression reads it
+      line:      line of the MODULE header (0 for the top level)
+    """
+
+    def __init__(self, name=None, params=(), line=0):
+        self.name = name
+        self.params = list(params)
+        self.line = line
+        self.pin_defs = {}
+        self.comb_eqs = []
+        self.seq_eqs = []
+        self.instances = []
+        self.used = {}
+
+    def use(self, node, line_no: int):
+        for ident in expr_names(node):
+            if ident not in self.used:
+                self.used[ident] = line_no
+
+    def to_data(self):
+        """Plain tuples for marshal."""
+        return (
+            self.name, tuple(self.params), self.line,
+            tuple(self.pin_defs.items()), tuple(self.comb_eqs), tuple(self.seq_eqs),
+            tuple((i, m, tuple(args), ln) for i, m, args, ln in self.instances),
+            tuple(self.used.items()),
+        )
+
+    @classmethod
+    def from_data(cls, data):
+        name, params, line, pins, comb, seq, instances, used = data
+        mod = cls(name, params, line)
+        mod.pin_defs = dict(pins)
+        mod.comb_eqs = list(comb)
+        mod.seq_eqs = list(seq)
+        mod.instances = [(i, m, list(args), ln) for i, m, args, ln in instances]
+        mod.used = dict(used)
+        return mod
+
+
+class Unit:
+    """
+    One parsed .seq file:
+      includes: [(path_as_written, line_no)]
+      modules:  name -> Module
+      top:      Module holding the statements outside MODULE blocks
+      top_line: line of the first such statement (0 if none)
+    """
+
+    def __init__(self):
+        self.includes = []
+        self.modules = {}
+        self.top = Module()
+        self.top_line = 0
+
+    def to_data(self):
+        return (
+            tuple(self.includes),
+            tuple(m.to_data() for m in self.modules.values()),
+            self.top.to_data(),
+            self.top_line,
+        )
+
+    @classmethod
+    def from_data(cls, data):
+        includes, modules, top, top_line = data
+        unit = cls()
+        unit.includes = list(includes)
+        for m in modules:
+            mod = Module.from_data(m)
+            unit.modules[mod.name] = mod
+        unit.top = Module.from_data(top)
+        unit.top_line = top_line
+        return unit
+
+
+def _parse_args(text: str, line_no: int):
+    """Parse the comma-separated INST arguments. Returns (nodes, error_message_or_None)."""
+    tokens, err = tokenize_expr(text)
+    if err:
+        return None, f"Line {line_no}: {err}"
+    args = []
+    pos = 0
+    while pos < len(tokens):
+        node, pos, err = parse_expr(tokens, pos)
+        if err:
+            return None, f"Line {line_no}: {err}"
+        args.append(node)
+        if pos < len(tokens):
+            if tokens[pos][0] != "COMMA" or pos + 1 == len(tokens):
+                return None, f"Line {line_no}: unexpected token '{tokens[pos][1]}' in instance arguments"
+            pos += 1
+    return args, None
+
+
+def parse_unit(text: str):
+    """
+    Syntax pass over one file: statements (see seq_design.parse_statement),
+    INCLUDE lines, MODULE ... END blocks and INST lines. Symbols are resolved
+    later, once the included modules are known.
+    Returns (unit, error_message_or_None).
+    """
+    unit = Unit()
+    top = current = unit.top
+
+    for i, line in enumerate(text.splitlines(), start=1):
+        text_ln = line.strip()
+        if not text_ln:
+            continue
+
+        m = INCLUDE_RE.match(text_ln)
+        if m:
+            if current is not top:
+                return None, f"Line {i}: INCLUDE is not allowed inside MODULE {current.name}"
+            unit.includes.append((m.group(2), i))
+            continue
+
+        m = MODULE_RE.match(text_ln)
+        if m:
+            name = m.group(2)
+            if current is not top:
+                return None, f"Line {i}: MODULE {name} inside MODULE {current.name} (missing END?)"
+            if name in unit.modules:
+                return None, f"Line {i}: module '{name}' is defined twice"
+            params = [p.strip() for p in m.group(3).split(",")] if m.group(3).strip() else []
+            for p in params:
+                if not IDENT_RE.match(p):
+                    return None, f"Line {i}: invalid port name '{p}'"
+            if len(set(params)) != len(params):
+                return None, f"Line {i}: duplicate port in MODULE {name}"
+            current = Module(name, params, i)
+            unit.modules[name] = current
+            continue
+
+        if END_RE.match(text_ln):
+            if current is top:
+                return None, f"Line {i}: END without MODULE"
+            current = top
+            continue
+
+        if current is top and not unit.top_line:
+            unit.top_line = i
+
+        m = INST_RE.match(text_ln)
+        if m:
+            args, err = _parse_args(m.group(4), i)
+            if err:
+                return None, err
+            current.instances.append((m.group(2), m.group(3), args, i))
+            for node in args:
+                current.use(node, i)
+            continue
+
+        kind, name, value, err = parse_statement(text_ln, i)
+        if err:
+            return None, err
+        if kind == "pin":
+            if current is not top:
+                return None, f"Line {i}: pin declarations are not allowed inside MODULE {current.name}"
+            top.pin_defs[name] = value
+            continue
+        if name in current.params:
+            return None, f"Line {i}: port '{name}' of MODULE {current.name} cannot be assigned"
+        target = current.seq_eqs if kind == "seq" else current.comb_eqs
+        target.append((name, value, i))
+        current.use(value, i)
+
+    if current is not top:
+        return None, f"Line {current.line}: MODULE {current.name} has no END"
+    return unit, None
+
+
+# =========================
+# Cache (memory + disk)
+# =========================
+def _digest(*parts) -> str:
+    h = hashlib.sha256(f"{CACHE_FORMAT}:{sys.implementation.cache_tag}".encode())
+    for part in parts:
+        h.update(b"\0")
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()
+
+
+def default_cache_dir():
+    """$SEQEDITOR_CACHE (empty = memory only), else ~/.cache/seqeditor."""
+    env = os.environ.get("SEQEDITOR_CACHE")
+    if env is not None:
+        return env or None
+    return os.path.join(os.path.expanduser("~"), ".cache", "seqeditor")
+
+
+def default_cache_cap() -> int:
+    """Size cap in bytes for the module cache on disk ($SEQEDITOR_CACHE_CAP_MB, default 64)."""
+    try:
+        mb = int(os.environ.get("SEQEDITOR_CACHE_CAP_MB", "64"))
+    except ValueError:
+        mb = 64
+    return mb * 1024 * 1024
+
+
+class ModuleCache:
+    """
+    Content-addressed store for parsed files and flattened modules.
+    Entries live in a dict (the oldest half is dropped past max_entries) and,
+    when cache_dir is set, as one marshal file per key on disk. Disk errors
+    only cost a cache miss. Once the files pass max_bytes, the least
+    recently written or read ones are deleted down to 3/4 of it.
+    """
+
+    def __init__(self, cache_dir=None, max_entries: int = 4096, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = default_cache_cap() if max_bytes is None else max_bytes
+        self._disk_bytes = None  # size of the cache files, scanned on the first write
+        self._mem = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.parses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".bin")
+
+    def get(self, key: str):
+        data = self._mem.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = marshal.load(f)
+                os.utime(path)  # recently used: pruned last
+            except (OSError, EOFError, ValueError, TypeError):
+                data = None
+            if data is not None:
+                self.disk_hits += 1
+                self._remember(key, data)
+                return data
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data):
+        self._remember(key, data)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            blob = marshal.dumps(data)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except (OSError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+        else:
+            self._disk_bytes += len(blob)
+        if self._disk_bytes > self.max_bytes:
+            self.prune(self.max_bytes * 3 // 4)
+
+    def _disk_entries(self):
+        """(mtime, path, size) of every cache file; other files under cache_dir are ignored."""
+        entries = []
+        try:
+            subdirs = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for sub in subdirs:
+            if len(sub) != 2 or sub.strip("0123456789abcdef"):
+                continue
+            folder = os.path.join(self.cache_dir, sub)
+            try:
+                names = os.listdir(folder)
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def prune(self, max_bytes: int = None) -> int:
+        """
+        Delete the least recently used cache files until they total at most
+        max_bytes (default: self.max_bytes). Returns the number of bytes freed.
+        """
+        if not self.cache_dir:
+            return 0
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._disk_entries()
+        total = sum(size for _, _, size in entries)
+        freed = 0
+        for _, path, size in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+        self._disk_bytes = total
+        return freed
+
+    def _remember(self, key: str, data):
+        if len(self._mem) >= self.max_entries:
+            for old in list(self._mem)[: len(self._mem) // 2]:
+                del self._mem[old]
+        self._mem[key] = data
+
+    def parse(self, text: str):
+        """parse_unit() through the cache. Returns (unit, key, error_message_or_None)."""
+        key = _digest("unit", text)
+        data = self.get(key)
+        if data is not None:
+            return Unit.from_data(data), key, None
+        self.parses += 1
+        unit, err = parse_unit(text)
+        if err:
+            return None, key, err
+        self.put(key, unit.to_data())
+        return unit, key, None
+
+    def stats(self) -> str:
+        return (f"module cache: {self.hits} memory hits, {self.disk_hits} disk hits, "
+                f"{self.misses} misses, {self.parses} files parsed")
+
+
+# =========================
+# Loading + flattening
+# =========================
+class _Loader:
+    """State of one load_design() call."""
+
+    def __init__(self, base_dir, cache, sources):
+        self.base_dir = base_dir
+        self.cache = cache
+        self.sources = sources or {}
+        self.files = {}     # path -> (text, key, unit); None is the top-level text
+        self.deps = {}      # path -> [included paths]
+        self.closure = {}   # path -> key covering the file and all its includes
+        self.registry = {}  # module name -> (Module, defining path)
+        self.flat = {}      # (path, module name) -> flattened body
+
+    def where(self, path) -> str:
+        """Error message prefix for a file ('' for the top-level text)."""
+        if path is None:
+            return ""
+        return os.path.relpath(path, self.base_dir) + ": "
+
+    def read(self, path):
+        if path in self.sources:
+            return self.sources[path]
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def load_files(self, text):
+        """Parse the top-level text and every file it includes. Returns an error or None."""
+        unit, key, err = self.cache.parse(text)
+        if err:
+            return err
+        self.files[None] = (text, key, unit)
+
+        # Depth-first over INCLUDE lines; `open_` holds the current include chain
+        stack = [(None, iter(unit.includes))]
+        open_ = [None]
+        self.deps[None] = []
+        while stack:
+            path, includes = stack[-1]
+            for rel, line in includes:
+                folder = os.path.dirname(path) if path else self.base_dir
+                inc = os.path.normpath(os.path.join(folder, rel))
+                self.deps[path].append(inc)
+                if inc in open_:
+                    chain = " -> ".join(self.where(p)[:-2] or "<design>" for p in open_ + [inc])
+                    return f"{self.where(path)}Line {line}: include cycle: {chain}"
+                if inc in self.files:
+                    continue
+                try:
+                    inc_text = self.read(inc)
+                except OSError as e:
+                    return f"{self.where(path)}Line {line}: cannot read included file '{rel}': {e.strerror}"
+                inc_unit, inc_key, err = self.cache.parse(inc_text)
+                if err:
+                    return self.where(inc) + err
+                if inc_unit.top_line:
+                    return (f"{self.where(inc)}Line {inc_unit.top_line}: only MODULE blocks "
+                            f"and INCLUDE lines are allowed in an included file")
+                self.files[inc] = (inc_text, inc_key, inc_unit)
+                self.deps[inc] = []
+                stack.append((inc, iter(inc_unit.includes)))
+                open_.append(inc)
+                break
+            else:
+                stack.pop()
+                open_.pop()
+                self.closure[path] = _digest(
+                    "closure", self.files[path][1], *sorted(self.closure[d] for d in self.deps[path])
+                )
+
+        for path, (_, _, unit) in self.files.items():
+            for name, mod in unit.modules.items():
+                if name in self.registry:
+                    other_mod, other_path = self.registry[name]
+                    return (f"{self.where(path)}Line {mod.line}: module '{name}' is already "
+                            f"defined ({self.where(other_path)}Line {other_mod.line})")
+                self.registry[name] = (mod, path)
+        return None
+
+    def visible(self, path):
+        """Names of the modules a file can instantiate: its own and its includes'."""
+        names = set()
+        todo = [path]
+        seen = set()
+        while todo:
+            p = todo.pop()
+            if p in seen:
+                continue
+            seen.add(p)
+            names.update(self.files[p][2].modules)
+            todo.extend(self.deps[p])
+        return names
+
+    def flatten(self, mod, path, active=()):
+        """
+        Flattened body of a module: (comb_eqs, seq_eqs, defined_names) with
+        every instance expanded, or (None, error_message). Ports stay free
+        names; the body is cached under the module's closure key.
+        """
+        memo_key = (path, mod.name)
+        body = self.flat.get(memo_key)
+        if body is not None:
+            return body, None
+        key = _digest("flat", self.closure[path], mod.name or "")
+        data = self.cache.get(key)
+        if data is not None:
+            body = (list(data[0]), list(data[1]), set(data[2]))
+            self.flat[memo_key] = body
+            return body, None
+
+        where = self.where(path)
+        comb = list(mod.comb_eqs)
+        seq = list(mod.seq_eqs)
+        defined = set(mod.pin_defs) | {n for n, _, _ in comb} | {q for q, _, _ in seq}
+        visible = self.visible(path) if mod.instances else ()
+        active = active + (memo_key,)
+
+        for inst, mod_name, args, line in mod.instances:
+            if mod_name not in visible:
+                return None, f"{where}Line {line}: unknown module '{mod_name}'"
+            child, child_path = self.registry[mod_name]
+            if (child_path, mod_name) in active:
+                return None, f"{where}Line {line}: module '{mod_name}' instantiates itself"
+            if len(args) != len(child.params):
+                return None, (f"{where}Line {line}: module '{mod_name}' takes "
+                              f"{len(child.params)} arguments, got {len(args)}")
+            child_body, err = self.flatten(child, child_path, active)
+            if err:
+                return None, err
+            c_comb, c_seq, c_defined = child_body
+
+            # Ports bound to a signal or constant are substituted; expression
+            # arguments get a wire named like any other instance signal.
+            subst = {}
+            wires = []
+            for port, arg in zip(child.params, args):
+                if arg[0] in LEAVES:
+                    subst[port] = arg
+                else:
+                    wire = f"{inst}_{port}"
+                    subst[port] = ("VAR", wire)
+                    wires.append((wire, arg, line))
+            for name in c_defined:
+                subst[name] = ("VAR", f"{inst}_{name}")
+
+            new_names = {subst[n][1] for n in c_defined} | {w for w, _, _ in wires}
+            clash = sorted(new_names & defined)
+            if clash:
+                return None, (f"{where}Line {line}: instance '{inst}' signal "
+                              f"'{clash[0]}' clashes with an existing signal")
+            defined |= new_names
+
+            def leaf(n, subst=subst):
+                return subst[n[1]] if n[0] == "VAR" else n
+
+            def gate(op, a):
+                return (op, *a)
+
+            comb.extend(wires)
+            comb.extend((subst[n][1], fold_tree(node, leaf, gate), line) for n, node, _ in c_comb)
+            seq.extend((subst[q][1], fold_tree(node, leaf, gate), line) for q, node, _ in c_seq)
+
+        if mod.instances:
+            # Keep the textual order: instance equations sit at their INST line
+            comb.sort(key=lambda eq: eq[2])
+            seq.sort(key=lambda eq: eq[2])
+
+        # Symbol resolution, as in seq_design.parse_design()
+        known = defined | set(mod.params)
+        for ident, line_no in mod.used.items():
+            if ident not in known:
+                if mod.name is None:
+                    return None, (f"{where}Line {line_no}: symbol '{ident}' is used but never "
+                                  f"declared as a pin or defined on the left-hand side")
+                return None, (f"{where}Line {line_no}: symbol '{ident}' is used but is neither "
+                              f"a port of MODULE {mod.name} nor defined in it")
+
+        body = (comb, seq, defined)
+        self.flat[memo_key] = body
+        self.cache.put(key, (tuple(comb), tuple(seq), tuple(sorted(defined))))
+        return body, None
+
+
+def load_design(text: str, base_dir: str = ".", cache=None, sources=None):
+    """
+    Parse a .seq design with INCLUDE / MODULE / INST support and flatten it.
+
+    base_dir resolves INCLUDE paths of the top-level text; `sources`
+    ({absolute path: text}) overrides file contents, e.g. to re-load a design
+    exactly as it was saved. A text without directives gives the same Design
+    and error messages as seq_design.parse_design().
+    Returns (design, error_message_or_None); design.sources holds the text of
+    every included file.
+    """
+    if cache is None:
+        cache = ModuleCache()
+    loader = _Loader(os.path.abspath(base_dir), cache, sources)
+    err = loader.load_files(text)
+    if err:
+        return None, err
+
+    unit = loader.files[None][2]
+    # Modules of the design itself are checked even when not instantiated
+    for mod in unit.modules.values():
+        _, err = loader.flatten(mod, None)
+        if err:
+            return None, err
+
+    top = unit.top
+    body, err = loader.flatten(top, None)
+    if err:
+        return None, err
+
+    design = Design()
+    design.pin_defs = dict(top.pin_defs)
+    design.comb_eqs = list(body[0])
+    design.seq_eqs = list(body[1])
+    design.sources = {p: t for p, (t, _, _) in loader.files.items() if p is not None}
+    return design, None
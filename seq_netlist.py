@@ -0,0 +1,422 @@
+# seq_netlist.py - compact array-backed netlist IR and its binary file format.
+#
+# A Netlist stores a design as a struct of flat arrays instead of nested
+# tuples: one opcode per node, operand indices in one shared array (CSR
+# layout, node i owns args[start[i]:start[i + 1]]), and every signal name
+# interned once. Identical subexpressions are shared (hash-consing), and node
+# indices are topologically ordered: operands always come before their users.
+#
+# The .seqn file holds the same arrays, aligned, after a versioned header, so
+# Netlist.load() can mmap it and use the arrays in place without re-parsing.
+# Netlist subclasses seq_design.Design: name-level queries (pins, registers,
+# combinational order, cone of influence) run on the arrays; comb_eqs /
+# seq_eqs are decoded to expression tuples on first use, so every analysis
+# and codegen accepts it.
+
+import mmap
+import struct
+import sys
+from array import array
+from itertools import chain, repeat
+from operator import add, ge, gt, lt, mul, sub
+
+from seq_design import Design, fold_tree
+
+OPS = ("VAR", "CONST", "NOT", "AND", "OR", "XOR")
+OP_CODES = {op: i for i, op in enumerate(OPS)}
+VAR, CONST, NOT_CODE = 0, 1, 2
+
+COMB, SEQ = 0, 1  # equation kinds
+
+# operand count limits and gate flag per opcode (Netlist._check())
+_MIN_ARITY = (1, 1, 1, 2, 2, 2)
+_MAX_ARITY = (1, 1, 1, sys.maxsize, sys.maxsize, sys.maxsize)
+_IS_GATE = (0, 0, 1, 1, 1, 1)
+
+MAGIC = b"SEQNET\0\0"
+VERSION = 1
+# magic, version, then the element count of each section (see _SECTIONS)
+_HEADER = struct.Struct("<8sI10I")
+
+# (attribute, typecode) in file order; 'names' is the UTF-8 name table
+_SECTIONS = (
+    ("names", "B"),
+    ("op", "B"),
+    ("start", "I"),
+    ("args", "I"),
+    ("eq_kind", "B"),
+    ("eq_lhs", "I"),
+    ("eq_root", "I"),
+    ("eq_line", "I"),
+    ("pin_name", "I"),
+    ("pin_num", "I"),
+)
+
+
+class NetlistError(Exception):
+    """Raised for unreadable or incompatible .seqn files."""
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class Netlist(Design):
+    """
+    Array form of a design:
+      names:          interned signal names (list of str)
+      op:             opcode per node (index into OPS)
+      start, args:    operands of node i are args[start[i]:start[i + 1]]
+                      (a name index for VAR, the value for CONST)
+      eq_kind, eq_lhs, eq_root, eq_line:  one entry per equation (COMB / SEQ)
+      pin_name, pin_num:                  one entry per pin
+    Arrays are array.array objects, or memoryviews into the file when loaded
+    with mmap.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.name_ids = {}
+        self.op = array("B")
+        self.start = array("I", [0])
+        self.args = array("I")
+        self.eq_kind = array("B")
+        self.eq_lhs = array("I")
+        self.eq_root = array("I")
+        self.eq_line = array("I")
+        self.pin_name = array("I")
+        self.pin_num = array("I")
+        self.sources = {}
+        self._decoded = None
+        self._pins = None
+        self._lhs_sets = None
+        self._mmap = None
+
+    # ---------- building ----------
+    def intern(self, name: str) -> int:
+        idx = self.name_ids.get(name)
+        if idx is None:
+            idx = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    @classmethod
+    def from_design(cls, design):
+        """Build the arrays from a Design; shared subexpressions become one node."""
+        net = cls()
+        nodes = {}  # (op, *operands) -> node index
+        op_arr, start, args = net.op, net.start, net.args
+
+        def add(key):
+            idx = nodes.get(key)
+            if idx is None:
+                idx = nodes[key] = len(op_arr)
+                op_arr.append(OP_CODES[key[0]])
+                args.extend(key[1:])
+                start.append(len(args))
+            return idx
+
+        def leaf(n):
+            if n[0] == "VAR":
+                return add(("VAR", net.intern(n[1])))
+            return add(n)
+
+        def gate(op, a):
+            return add((op, *a))
+
+        for name, num in design.pin_defs.items():
+            net.pin_name.append(net.intern(name))
+            net.pin_num.append(num)
+        for kind, eqs in ((COMB, design.comb_eqs), (SEQ, design.seq_eqs)):
+            for lhs, node, line in eqs:
+                net.eq_kind.append(kind)
+                net.eq_lhs.append(net.intern(lhs))
+                net.eq_root.append(fold_tree(node, leaf, gate))
+                net.eq_line.append(line)
+        return net
+
+    # ---------- Design interface ----------
+    @property
+    def node_count(self) -> int:
+        return len(self.op)
+
+    @property
+    def pin_defs(self):
+        if self._pins is None:
+            self._pins = {self.names[n]: num for n, num in zip(self.pin_name, self.pin_num)}
+        return self._pins
+
+    def _lhs(self, kind):
+        if self._lhs_sets is None:
+            names = self.names
+            sets = (set(), set())
+            for k, n in zip(self.eq_kind, self.eq_lhs):
+                sets[k].add(names[n])
+            self._lhs_sets = (frozenset(sets[COMB]), frozenset(sets[SEQ]))
+        return self._lhs_sets[kind]
+
+    @property
+    def comb_lhs(self):
+        return self._lhs(COMB)
+
+    @property
+    def seq_lhs(self):
+        return self._lhs(SEQ)
+
+    def node_names(self, root: int):
+        """Name indices read by the expression rooted at node `root`."""
+        op, start, args = self.op, self.start, self.args
+        out = []
+        seen = set()
+        stack = [root]
+        while stack:
+            i = stack.pop()
+            if i in seen:
+                continue
+            seen.add(i)
+            if op[i] == VAR:
+                out.append(args[start[i]])
+            elif op[i] != CONST:
+                stack.extend(args[start[i]:start[i + 1]])
+        return out
+
+    def comb_roots(self):
+        """Map each combinational signal name index to its (last) root node."""
+        return {n: r for k, n, r in zip(self.eq_kind, self.eq_lhs, self.eq_root) if k == COMB}
+
+    def seq_roots(self):
+        """Map each register name index to the root node of its (last) D input."""
+        return {n: r for k, n, r in zip(self.eq_kind, self.eq_lhs, self.eq_root) if k == SEQ}
+
+    def cone_of_influence(self, roots):
+        """Same as Design.cone_of_influence(), walking the node arrays."""
+        ids = self.name_ids
+        defs = (self.comb_roots(), self.seq_roots())
+        known = self.signal_names
+        live = set()
+        todo = [ids[r] for r in roots if r in known]
+        while todo:
+            n = todo.pop()
+            if n in live:
+                continue
+            live.add(n)
+            for roots_of in defs:
+                root = roots_of.get(n)
+                if root is not None:
+                    todo.extend(self.node_names(root))
+        return {self.names[n] for n in live}
+
+    def restrict(self, live):
+        """
+        Netlist of the equations whose left-hand side is in `live` (and every
+        pin). Names and node arrays are shared with this netlist, so nothing
+        is decoded or copied per node; nodes only used by dropped equations
+        are never reached from the remaining roots.
+        """
+        net = type(self)()
+        net.names, net.name_ids = self.names, self.name_ids
+        net.op, net.start, net.args = self.op, self.start, self.args
+        net.pin_name, net.pin_num = self.pin_name, self.pin_num
+        net.sources = dict(self.sources)
+        net._mmap = self._mmap
+        keep = [j for j, n in enumerate(self.eq_lhs) if self.names[n] in live]
+        for attr in ("eq_kind", "eq_lhs", "eq_root", "eq_line"):
+            src = getattr(self, attr)
+            getattr(net, attr).extend(src[j] for j in keep)
+        return net
+
+    def comb_order(self):
+        """Same as Design.comb_order(), walking the node arrays."""
+        roots = self.comb_roots()
+        names = self.names
+        order = []
+        state = {}
+        for root in roots:
+            if state.get(root) == 2:
+                continue
+            stack = [(root, iter(self.node_names(roots[root])))]
+            state[root] = 1
+            while stack:
+                name, deps = stack[-1]
+                for dep in deps:
+                    if dep not in roots or state.get(dep) == 2:
+                        continue
+                    if state.get(dep) == 1:
+                        return None, f"combinational loop through '{names[dep]}'"
+                    state[dep] = 1
+                    stack.append((dep, iter(self.node_names(roots[dep]))))
+                    break
+                else:
+                    stack.pop()
+                    state[name] = 2
+                    order.append(names[name])
+        return order, None
+
+    def decode_nodes(self):
+        """Expression tuple for every node, shared exactly like the nodes are."""
+        names, op, start, args = self.names, self.op, self.start, self.args
+        out = []
+        for i in range(len(op)):
+            code = op[i]
+            lo, hi = start[i], start[i + 1]
+            if code == VAR:
+                out.append(("VAR", names[args[lo]]))
+            elif code == CONST:
+                out.append(("CONST", args[lo]))
+            else:
+                out.append((OPS[code], *[out[a] for a in args[lo:hi]]))
+        return out
+
+    def _equations(self):
+        if self._decoded is None:
+            nodes = self.decode_nodes()
+            comb, seq = [], []
+            for kind, lhs, root, line in zip(self.eq_kind, self.eq_lhs, self.eq_root, self.eq_line):
+                (comb if kind == COMB else seq).append((self.names[lhs], nodes[root], line))
+            self._decoded = (comb, seq)
+        return self._decoded
+
+    @property
+    def comb_eqs(self):
+        return self._equations()[0]
+
+    @property
+    def seq_eqs(self):
+        return self._equations()[1]
+
+    def to_design(self):
+        """Plain Design copy (expression tuples) of the netlist."""
+        design = Design()
+        design.pin_defs = dict(self.pin_defs)
+        design.comb_eqs = list(self.comb_eqs)
+        design.seq_eqs = list(self.seq_eqs)
+        design.sources = dict(self.sources)
+        return design
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays plus the UTF-8 name table."""
+        total = sum(len(n.encode("utf-8")) + 1 for n in self.names)
+        for attr, _ in _SECTIONS[1:]:
+            arr = getattr(self, attr)
+            total += len(arr) * (arr.itemsize if hasattr(arr, "itemsize") else 1)
+        return total
+
+    # ---------- binary format ----------
+    def save(self, path: str):
+        """Write the versioned .seqn file (little-endian, 8-byte aligned sections)."""
+        blob = b"".join(n.encode("utf-8") + b"\0" for n in self.names)
+        sections = [blob]
+        for attr, code in _SECTIONS[1:]:
+            arr = array(code, getattr(self, attr))
+            if sys.byteorder != "little":
+                arr.byteswap()
+            sections.append(arr.tobytes())
+        counts = [len(blob)] + [len(getattr(self, attr)) for attr, _ in _SECTIONS[1:]]
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, *counts))
+            f.write(bytes(_align(_HEADER.size) - _HEADER.size))
+            for data in sections:
+                f.write(data)
+                f.write(bytes(_align(len(data)) - len(data)))
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True, check: bool = True):
+        """
+        Read a .seqn file. With use_mmap (and a little-endian host) the arrays
+        are memoryviews into the mapped file: nothing is parsed or copied.
+        Every index is checked (NetlistError for a damaged file); check=False
+        skips the per-node part of that, which is the only load cost that
+        grows with the number of gates, for files this process wrote itself.
+        """
+        with open(path, "rb") as f:
+            if use_mmap and sys.byteorder == "little":
+                try:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:  # empty file
+                    buf = f.read()
+            else:
+                buf = f.read()
+
+        if len(buf) < _HEADER.size:
+            raise NetlistError(f"{path}: not a netlist file")
+        magic, version, *counts = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise NetlistError(f"{path}: not a netlist file")
+        if version != VERSION:
+            raise NetlistError(f"{path}: unsupported netlist version {version} (expected {VERSION})")
+
+        net = cls()
+        view = memoryview(buf)
+        offset = _align(_HEADER.size)
+        for (attr, code), count in zip(_SECTIONS, counts):
+            size = count * (4 if code == "I" else 1)
+            if offset + size > len(buf):
+                raise NetlistError(f"{path}: truncated netlist file")
+            chunk = view[offset:offset + size]
+            if attr == "names":
+                try:
+                    net.names = bytes(chunk).decode("utf-8").split("\0")[:-1] if count else []
+                except UnicodeDecodeError as e:
+                    raise NetlistError(f"{path}: corrupt netlist file ({e})") from e
+            elif isinstance(buf, mmap.mmap):
+                setattr(net, attr, chunk.cast(code))
+            else:
+                arr = array(code)
+                arr.frombytes(chunk)
+                if code == "I" and sys.byteorder != "little":
+                    arr.byteswap()
+                setattr(net, attr, arr)
+            offset += _align(size)
+
+        net.name_ids = {n: i for i, n in enumerate(net.names)}
+        err = net._check(nodes=check)
+        if err:
+            raise NetlistError(f"{path}: corrupt netlist file ({err})")
+        if isinstance(buf, mmap.mmap):
+            net._mmap = buf
+        return net
+
+    def _check(self, nodes: bool = True):
+        """
+        Why the arrays are not a well-formed netlist, or None. Section sizes
+        and the equation / pin indices are always checked; with nodes, so are
+        the opcode, operand count and operands of every node (a name index,
+        0/1 or an earlier node), so that decoding and code generation cannot
+        fail or loop on a damaged file.
+        """
+        n, n_names = len(self.op), len(self.names)
+        if len(self.name_ids) != n_names:
+            return "duplicate signal names"
+        op, start, args = self.op, self.start, self.args
+        if len(start) != n + 1 or start[0] != 0 or start[n] != len(args):
+            return "operand offsets do not match the node and operand counts"
+        n_eqs = len(self.eq_kind)
+        if not len(self.eq_lhs) == len(self.eq_root) == len(self.eq_line) == n_eqs:
+            return "equation sections differ in length"
+        if n_eqs and (max(self.eq_kind) > SEQ or max(self.eq_lhs) >= n_names
+                      or max(self.eq_root) >= n):
+            return "equation index out of range"
+        if len(self.pin_num) != len(self.pin_name):
+            return "pin sections differ in length"
+        if self.pin_name and max(self.pin_name) >= n_names:
+            return "pin name index out of range"
+        if not nodes or not n:
+            return None
+
+        # map() passes instead of a loop over the nodes
+        if max(op) >= len(OPS):
+            return "unknown opcode"
+        # every node has at least one operand, so the offsets increase
+        arity = list(map(sub, start[1:], start[:-1]))
+        if any(map(lt, arity, map(_MIN_ARITY.__getitem__, op))) or \
+                any(map(gt, arity, map(_MAX_ARITY.__getitem__, op))):
+            return "wrong operand count"
+        # bound per node (name count, 2 or the node's own index), repeated
+        # for each of its operands
+        leaf_bound = (n_names, 2) + (0,) * (len(OPS) - 2)
+        bound = map(add, map(leaf_bound.__getitem__, op),
+                    map(mul, map(_IS_GATE.__getitem__, op), range(n)))
+        if any(map(ge, args, chain.from_iterable(map(repeat, bound, arity)))):
+            return "operand index out of range"
+        return None
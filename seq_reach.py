@@ -0,0 +1,241 @@
+# seq_reach.py - reachable state-space exploration for the Q registers.
+#
+# Starting from the reset state (every register 0, as in the generated
+# `uint8_t ... = 0` declarations), a breadth-first search applies every input
+# combination to every frontier state. Frontier batches are evaluated
+# bit-parallel: each (state, input) pair is one 32- or 64-bit field of a big
+# Python integer, so one bitwise operation evaluates a gate for the whole
+# batch. The visited set is a bitset with one bit per register state.
+
+import json
+import sys
+from array import array
+
+from seq_sim import BitParallelModel
+
+
+class ReachError(Exception):
+    """Raised when a design is too large for explicit state exploration."""
+
+
+class ReachResult:
+    """
+    Outcome of explore():
+      registers:   register names; bit j of a state index is registers[j]
+      reachable:   number of reachable states (including reset)
+      total:       2 ** len(registers)
+      depth:       number of BFS levels (longest shortest path from reset)
+      visited:     bytearray bitset over all states
+      edges:       set of (state, next_state), only when collected
+    """
+
+    def __init__(self, registers, visited, reachable, depth, edges=None):
+        self.registers = registers
+        self.visited = visited
+        self.reachable = reachable
+        self.depth = depth
+        self.edges = edges
+        self.total = 1 << len(registers)
+
+    @property
+    def unreachable(self) -> int:
+        return self.total - self.reachable
+
+    def is_reachable(self, state: int) -> bool:
+        return bool(self.visited[state >> 3] >> (state & 7) & 1)
+
+    def state_label(self, state: int) -> str:
+        """Readable form of a state index, e.g. 'Q0=1 Q1=0'."""
+        return " ".join(f"{q}={state >> j & 1}" for j, q in enumerate(self.registers))
+
+    def unreachable_states(self, limit: int = 100):
+        """Return up to `limit` unreachable state indices."""
+        out = []
+        for i, byte in enumerate(self.visited):
+            if byte == 0xFF:
+                continue
+            for bit in range(8):
+                state = (i << 3) | bit
+                if state >= self.total:
+                    return out
+                if not byte >> bit & 1:
+                    out.append(state)
+                    if len(out) >= limit:
+                        return out
+        return out
+
+    def dead_states(self):
+        """
+        Reachable states the machine can never leave (every input combination
+        leads back to the same state). Requires collected edges.
+        """
+        if self.edges is None:
+            return None
+        leaves = {s for (s, t) in self.edges if s != t}
+        return sorted({s for (s, _) in self.edges} - leaves)
+
+    def summary(self) -> str:
+        lines = [
+            f"Registers: {len(self.registers)} ({', '.join(self.registers) or 'none'})",
+            f"Reachable states: {self.reachable} of {self.total}"
+            f" (unreachable: {self.unreachable}), BFS depth {self.depth}",
+        ]
+        if self.edges is not None:
+            lines.append(f"Transitions: {len(self.edges)}")
+            dead = self.dead_states()
+            if dead:
+                shown = ", ".join(self.state_label(s) for s in dead[:5])
+                lines.append(f"Dead states: {len(dead)} (e.g. {shown})")
+        if self.unreachable:
+            shown = "; ".join(self.state_label(s) for s in self.unreachable_states(5))
+            lines.append(f"Unreachable examples: {shown}")
+        return "\n".join(lines)
+
+    # ---------- export ----------
+    def write_dot(self, path: str):
+        """Write the state-transition graph in Graphviz DOT format."""
+        if self.edges is None:
+            raise ReachError("transition edges were not collected")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("digraph seq_states {\n  rankdir=LR;\n")
+            f.write('  s0 [shape=doublecircle];\n')
+            for s, t in sorted(self.edges):
+                f.write(f"  s{s} -> s{t};\n")
+            f.write("}\n")
+
+    def write_json(self, path: str):
+        """Write registers, reachable count and edge list as JSON."""
+        data = {
+            "registers": self.registers,
+            "reachable": self.reachable,
+            "total": self.total,
+            "depth": self.depth,
+        }
+        if self.edges is not None:
+            data["edges"] = sorted(self.edges)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def _field_ones(lanes: int, width: int) -> int:
+    """Integer with bit 0 of each of `lanes` fields of `width` bits set."""
+    return int.from_bytes((b"\x01" + bytes(width // 8 - 1)) * lanes, "little")
+
+
+def _next_states(step, lane_vals, k: int, m: int, width: int, typecode: str):
+    """
+    Evaluate the next-state functions for a batch of lanes.
+    lane_vals is an array of field values s | (x << k) (register state s,
+    input combination x); returns the array of next states, one per lane.
+    """
+    byteorder = sys.byteorder
+    lanes = len(lane_vals)
+    ones = _field_ones(lanes, width)
+    packed = int.from_bytes(lane_vals.tobytes(), byteorder)
+
+    args = [(packed >> (k + i)) & ones for i in range(m)]
+    args += [(packed >> j) & ones for j in range(k)]
+    _, nexts = step(ones, *args)
+
+    target = 0
+    for j, plane in enumerate(nexts):
+        target |= plane << j
+    targets = array(typecode)
+    targets.frombytes(target.to_bytes(lanes * width // 8, byteorder))
+    return targets
+
+
+def explore(design, max_registers: int = 28, max_inputs: int = 16,
+            table_bits: int = 24, batch_lanes: int = 1 << 16,
+            collect_edges: bool = False):
+    """
+    Breadth-first search of the register state space from the reset state.
+
+    When states x input combinations fit in 2 ** table_bits lanes, the full
+    transition table is evaluated first (in bit-parallel batches) and the BFS
+    only does table lookups, which keeps long chains (counters) fast.
+    Larger spaces evaluate each BFS frontier in batches instead.
+    Returns a ReachResult; raises ReachError / seq_sim.SimError when the
+    design cannot be explored.
+    """
+    model = BitParallelModel(design)
+    k = len(model.registers)
+    m = len(model.inputs)
+    if k > max_registers:
+        raise ReachError(f"{k} registers exceed the limit of {max_registers}")
+    if m > max_inputs:
+        raise ReachError(f"{m} input pins exceed the limit of {max_inputs}")
+
+    width = 32 if k + m <= 32 else 64
+    typecode = "I" if width == 32 else "Q"
+    n_inputs = 1 << m
+    step = model.step
+
+    table = None
+    if k + m <= table_bits:
+        table = array(typecode)
+        for lo in range(0, 1 << (k + m), batch_lanes):
+            hi = min(lo + batch_lanes, 1 << (k + m))
+            table.extend(_next_states(step, array(typecode, range(lo, hi)),
+                                      k, m, width, typecode))
+
+    visited = bytearray((1 << k) // 8 + 1)
+    visited[0] = 1  # reset state
+    edges = set() if collect_edges else None
+    depth = 0
+
+    if table is not None:
+        # FIFO over one growing array; level_end marks the BFS level boundary.
+        # Table lookups are cheap enough to stay per state, which keeps long
+        # chains (counters, one new state per level) fast.
+        queue = array(typecode, [0])
+        offsets = [x << k for x in range(n_inputs)]
+        head = 0
+        level_end = 1
+        while head < len(queue):
+            if head == level_end:
+                depth += 1
+                level_end = len(queue)
+            s = queue[head]
+            head += 1
+            for off in offsets:
+                t = table[off | s]
+                if collect_edges:
+                    edges.add((s, t))
+                byte = t >> 3
+                bit = 1 << (t & 7)
+                if not visited[byte] & bit:
+                    visited[byte] |= bit
+                    queue.append(t)
+        return ReachResult(model.registers, visited, len(queue), depth, edges)
+
+    reachable = 1
+    frontier = array(typecode, [0])
+    # Frontier states per batch, so that states x inputs ~ batch_lanes
+    per_batch = max(1, batch_lanes // n_inputs)
+
+    while frontier:
+        next_frontier = array(typecode)
+        for start in range(0, len(frontier), per_batch):
+            states = frontier[start:start + per_batch]
+            # Lane layout: input combination x, then frontier state s
+            lane_vals = array(typecode)
+            for x in range(n_inputs):
+                lane_vals.extend(s | (x << k) for s in states)
+            targets = _next_states(step, lane_vals, k, m, width, typecode)
+
+            if collect_edges:
+                edges.update(zip(states * n_inputs, targets))
+
+            for t in set(targets):
+                byte = t >> 3
+                bit = 1 << (t & 7)
+                if not visited[byte] & bit:
+                    visited[byte] |= bit
+                    next_frontier.append(t)
+        reachable += len(next_frontier)
+        frontier = next_frontier
+        if frontier:
+            depth += 1
+
+    return ReachResult(model.registers, visited, reachable, depth, edges)
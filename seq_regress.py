@@ -0,0 +1,352 @@
+# seq_regress.py - sharded multi-process regression simulation.
+#
+# A regression runs `lanes` independent random stimulus streams ("lanes")
+# through a design for `cycles` clock cycles and, with a reference design
+# (e.g. the last released version), reports every cycle where an output
+# differs. Lanes are evaluated bit-parallel (seq_sim.BitParallelModel): a
+# shard of shard_words * 64 lanes is one Python int per signal.
+#
+# Shards are spread over a process pool. The state carried from one batch of
+# batch_cycles cycles to the next lives in one multiprocessing.shared_memory
+# block, one row of `words` 64-bit little-endian words per signal:
+#
+#   state      [register][word]
+#   ref_state  [reference register][word]
+#   last       [signal][word]                  last cycle's values (coverage only)
+#
+# Workers read and write their word range in place (int.from_bytes on a
+# memoryview slice, no pickling of vectors); only small per-shard reports
+# travel back to the parent, which merges them. Stimulus and outputs are not
+# stored at all: each shard generates its stimulus, which is seeded from
+# (seed, batch, shard) so results do not depend on the number of workers,
+# and compares the outputs itself.
+#
+# With coverage, every shard also collects toggle / state / transition
+# coverage (seq_coverage.py) of the design; the databases are merged like
+# the mismatch counts.
+
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+from seq_coverage import CoverageCollector
+from seq_sim import BitParallelModel
+
+WORD_BYTES = 8
+LANES_PER_WORD = 64
+DEFAULT_SHARD_WORDS = 64  # 4096 lanes per shard
+DEFAULT_BATCH_CYCLES = 256
+MAX_REPORTED = 20  # mismatches kept in detail (all are counted)
+
+
+class RegressionError(Exception):
+    """Raised when a design and its reference cannot be compared."""
+
+
+class _Layout:
+    """Word offsets of the arrays in the shared block."""
+
+    def __init__(self, n_inputs: int, n_regs: int, n_ref_regs: int, words: int, n_last: int = 0):
+        self.n_inputs = n_inputs
+        self.words = words
+        self.state = 0
+        self.ref_state = self.state + n_regs * words
+        self.last = self.ref_state + n_ref_regs * words
+        self.size = (self.last + n_last * words) * WORD_BYTES
+
+    def state_row(self, r: int) -> int:
+        return self.state + r * self.words
+
+    def ref_state_row(self, r: int) -> int:
+        return self.ref_state + r * self.words
+
+    def last_row(self, i: int) -> int:
+        return self.last + i * self.words
+
+
+class RegressionReport:
+    """
+    Merged result of a regression:
+      cycles, lanes, vector_cycles   work done
+      mismatches                     (lane, cycle) pairs where an output differed
+      per_output                     output name -> mismatch count
+      ones                           output name -> lanes*cycles the output was 1
+      first                          first MAX_REPORTED mismatches as dicts
+                                     (cycle, lane, output, got, expected, inputs)
+      coverage                       seq_coverage.CoverageDB, when collected
+      seconds, workers, shards
+    """
+
+    def __init__(self, outputs, compared, lanes: int, workers: int, shards: int):
+        self.outputs = list(outputs)
+        self.compared = list(compared)
+        self.lanes = lanes
+        self.workers = workers
+        self.shards = shards
+        self.cycles = 0
+        self.vector_cycles = 0
+        self.mismatches = 0
+        self.per_output = {name: 0 for name in self.compared}
+        self.ones = {name: 0 for name in self.outputs}
+        self.first = []
+        self.coverage = None
+        self.seconds = 0.0
+
+    def merge(self, shard: dict):
+        """Add one shard report (see _run_shard())."""
+        self.vector_cycles += shard["vector_cycles"]
+        self.mismatches += shard["mismatches"]
+        for name, n in shard["per_output"].items():
+            self.per_output[name] += n
+        for name, n in shard["ones"].items():
+            self.ones[name] += n
+        if shard.get("coverage") is not None:
+            db = shard["coverage"]
+            if self.coverage is None:
+                self.coverage = db
+            else:
+                self.coverage.merge(db)
+        if shard["first"]:
+            self.first = sorted(self.first + shard["first"],
+                                key=lambda m: (m["cycle"], m["lane"], m["output"]))[:MAX_REPORTED]
+
+    @property
+    def throughput(self) -> float:
+        """Vector-cycles per second."""
+        return self.vector_cycles / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        lines = [f"{self.vector_cycles:,} vector-cycles ({self.lanes:,} lanes x {self.cycles:,} cycles) "
+                 f"in {self.seconds:.2f} s: {self.throughput / 1e6:,.2f} M vector-cycles/s "
+                 f"({self.workers} worker{'s' if self.workers != 1 else ''}, "
+                 f"{self.shards} shard{'s' if self.shards != 1 else ''})"]
+        if not self.compared:
+            lines.append("No reference design: outputs were simulated, not compared.")
+        elif self.mismatches == 0:
+            lines.append(f"No mismatches on {len(self.compared)} compared outputs.")
+        else:
+            lines.append(f"{self.mismatches:,} mismatching lane-cycles: " + ", ".join(
+                f"{name} {n:,}" for name, n in self.per_output.items() if n))
+            for m in self.first:
+                ins = " ".join(f"{k}={v}" for k, v in sorted(m["inputs"].items()))
+                lines.append(f"  cycle {m['cycle']} lane {m['lane']}: {m['output']} = {m['got']}, "
+                             f"expected {m['expected']} ({ins})")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "cycles": self.cycles,
+            "lanes": self.lanes,
+            "vector_cycles": self.vector_cycles,
+            "seconds": self.seconds,
+            "workers": self.workers,
+            "shards": self.shards,
+            "mismatches": self.mismatches,
+            "per_output": self.per_output,
+            "ones": self.ones,
+            "first": self.first,
+        }
+
+
+# =========================
+# Worker side
+# =========================
+_worker = {}
+
+
+def _init_worker(shm_name: str, layout: _Layout, design, reference, shard_words: int, seed: int,
+                 coverage: bool = False):
+    """Pool initializer: attach the shared block and compile the models once per process."""
+    _worker.clear()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,
+        layout=layout,
+        model=BitParallelModel(design, probe=coverage),
+        coverage=coverage,
+        design_hash=design.fingerprint() if coverage and hasattr(design, "fingerprint") else "",
+        ref=BitParallelModel(reference) if reference is not None else None,
+        shard_words=shard_words,
+        seed=seed,
+    )
+
+
+def _release_worker():
+    shm = _worker.pop("shm", None)
+    if shm is not None:
+        shm.close()
+    _worker.clear()
+
+
+def _run_shard(task):
+    """
+    Simulate cycles [cycle0, cycle0 + n_cycles) of one batch for the lanes of
+    shard `shard`, in place in the shared block. Returns a small report dict.
+    """
+    batch, shard, cycle0, n_cycles = task
+    buf = _worker["shm"].buf
+    lay = _worker["layout"]
+    model, ref = _worker["model"], _worker["ref"]
+    sw = _worker["shard_words"]
+    lo = shard * sw
+    hi = min(lo + sw, lay.words)
+    lanes = (hi - lo) * LANES_PER_WORD
+    nbytes = lanes // 8
+    mask = (1 << lanes) - 1
+    lane0 = lo * LANES_PER_WORD
+
+    def read(row):
+        return int.from_bytes(buf[(row + lo) * WORD_BYTES:(row + hi) * WORD_BYTES], "little")
+
+    def write(row, value):
+        buf[(row + lo) * WORD_BYTES:(row + hi) * WORD_BYTES] = value.to_bytes(nbytes, "little")
+
+    n_regs = len(model.registers)
+    state = [read(lay.state_row(r)) for r in range(n_regs)]
+    if ref is not None:
+        ref_state = [read(lay.ref_state_row(r)) for r in range(len(ref.registers))]
+        in_index = {name: i for i, name in enumerate(model.inputs)}
+        ref_in = [in_index[name] for name in ref.inputs]
+        out_index = {name: i for i, name in enumerate(model.outputs)}
+        pairs = [(out_index[name], j, name) for j, name in enumerate(ref.outputs)
+                 if name in out_index]
+    else:
+        pairs = []
+
+    rng = random.Random(f"{_worker['seed']}:{batch}:{shard}")
+    report = {
+        "vector_cycles": lanes * n_cycles,
+        "mismatches": 0,
+        "per_output": {name: 0 for _, _, name in pairs},
+        "ones": {name: 0 for name in model.outputs},
+        "first": [],
+    }
+    collector = None
+    if _worker["coverage"]:
+        collector = CoverageCollector(model, _worker["design_hash"])
+        signals = collector.db.signals
+        if batch > 0:  # continue from the last cycle of the previous batch
+            last = [read(lay.last_row(i)) for i in range(len(signals))]
+            collector.prev = (last, [last[signals.index(q)] for q in model.registers])
+    ones = [0] * len(model.outputs)
+    step = model.step
+    for c in range(n_cycles):
+        ins = [rng.getrandbits(lanes) for _ in range(lay.n_inputs)]
+        if collector is not None:
+            outs, nxt, probes = step(mask, *ins, *state)
+            collector.sample(mask, ins, state, probes)
+            state = nxt
+        else:
+            outs, state = step(mask, *ins, *state)
+        for k, value in enumerate(outs):
+            ones[k] += value.bit_count()
+        if ref is None:
+            continue
+        ref_outs, ref_state = ref.step(mask, *[ins[i] for i in ref_in], *ref_state)
+        bad = 0
+        for k, j, name in pairs:
+            diff = outs[k] ^ ref_outs[j]
+            if diff:
+                report["per_output"][name] += diff.bit_count()
+                bad |= diff
+                if len(report["first"]) < MAX_REPORTED:
+                    bit = (diff & -diff).bit_length() - 1
+                    report["first"].append({
+                        "cycle": cycle0 + c,
+                        "lane": lane0 + bit,
+                        "output": name,
+                        "got": (outs[k] >> bit) & 1,
+                        "expected": (ref_outs[j] >> bit) & 1,
+                        "inputs": {n: (ins[i] >> bit) & 1 for i, n in enumerate(model.inputs)},
+                    })
+        report["mismatches"] += bad.bit_count()
+
+    for r, value in enumerate(state):
+        write(lay.state_row(r), value)
+    if ref is not None:
+        for r, value in enumerate(ref_state):
+            write(lay.ref_state_row(r), value)
+    report["ones"] = dict(zip(model.outputs, ones))
+    if collector is not None:
+        for i, value in enumerate(collector.prev[0]):
+            write(lay.last_row(i), value)
+        report["coverage"] = collector.db  # pickled as is: no sorting as in to_dict()
+    return report
+
+
+# =========================
+# Parent side
+# =========================
+def run_regression(design, reference=None, cycles: int = 1000, lanes: int = 65536,
+                   workers: int = None, seed: int = 0, shard_words: int = DEFAULT_SHARD_WORDS,
+                   batch_cycles: int = DEFAULT_BATCH_CYCLES, progress=None,
+                   coverage: bool = False) -> RegressionReport:
+    """
+    Simulate `lanes` random stimulus streams (rounded up to a multiple of 64)
+    for `cycles` cycles from the all-zero register state, on `workers`
+    processes (default: all CPUs; 1 runs in this process). With a reference
+    design, outputs present in both are compared every cycle; both must have
+    the same input pins. progress(done_cycles, cycles) is called after every
+    batch. With coverage, report.coverage holds the merged coverage of the
+    design. Raises RegressionError, or seq_sim.SimError for designs that
+    cannot be simulated.
+    """
+    model = BitParallelModel(design, probe=coverage)
+    ref_model = None
+    compared = []
+    if reference is not None:
+        ref_model = BitParallelModel(reference)
+        if set(ref_model.inputs) != set(model.inputs):
+            raise RegressionError(
+                "the design and the reference have different input pins: "
+                f"{', '.join(sorted(set(ref_model.inputs) ^ set(model.inputs)))}")
+        compared = [name for name in ref_model.outputs if name in model.outputs]
+        if not compared:
+            raise RegressionError("the design and the reference have no output pin in common")
+
+    words = max(1, -(-lanes // LANES_PER_WORD))
+    shard_words = max(1, min(shard_words, words))
+    n_shards = -(-words // shard_words)
+    workers = max(1, min(workers or os.cpu_count() or 1, n_shards))
+    batch_cycles = max(1, min(batch_cycles, cycles))
+    layout = _Layout(len(model.inputs), len(model.registers),
+                     len(ref_model.registers) if ref_model else 0, words,
+                     len(set(model.inputs + model.registers + model.probes)))
+
+    report = RegressionReport(model.outputs, compared, words * LANES_PER_WORD, workers, n_shards)
+    shm = shared_memory.SharedMemory(create=True, size=max(layout.size, 1))
+    pool = None
+    try:
+        shm.buf[:layout.size] = bytes(layout.size)  # reset state
+        initargs = (shm.name, layout, design, reference, shard_words, seed, coverage)
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+            run = pool.imap_unordered
+        else:
+            _init_worker(*initargs)
+            run = map
+
+        t0 = time.perf_counter()
+        done = 0
+        batch = 0
+        while done < cycles:
+            n = min(batch_cycles, cycles - done)
+            for shard_report in run(_run_shard, [(batch, s, done, n) for s in range(n_shards)]):
+                report.merge(shard_report)
+            done += n
+            batch += 1
+            if progress is not None:
+                progress(done, cycles)
+        report.seconds = time.perf_counter() - t0
+        report.cycles = cycles
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            _release_worker()
+        shm.close()
+        shm.unlink()
+    return report
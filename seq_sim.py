@@ -0,0 +1,175 @@
+# seq_sim.py - bit-parallel evaluation of .seq designs.
+# A design is compiled once into a straight-line Python function that works on
+# Python integers used as bit vectors: bit i of every argument belongs to
+# "lane" i, so a single call evaluates as many input/state combinations as
+# there are bits in the lane mask.
+
+from seq_design import fold_tree
+from seq_netlist import CONST, NOT_CODE, OPS, VAR, Netlist
+
+
+class SimError(Exception):
+    """Raised when a design cannot be simulated (e.g. combinational loop)."""
+
+
+_PY_OPS = {"AND": " & ", "OR": " | ", "XOR": " ^ "}
+
+
+def _emit_py(node, mask_name: str, names, src, temps):
+    """
+    Append straight-line bitwise Python for an expression tree to src, one
+    temporary per gate, and return the name holding the result. No nested
+    Python expressions are produced, so arbitrarily deep .seq expressions
+    compile in linear time.
+    """
+    def leaf(n):
+        if n[0] == "CONST":
+            return mask_name if n[1] else "0"
+        return names[n[1]]
+
+    def gate(op, args):
+        temps[0] += 1
+        tmp = f"t{temps[0]}"
+        if op == "NOT":
+            src.append(f"    {tmp} = {args[0]} ^ {mask_name}")
+        else:
+            src.append(f"    {tmp} = {_PY_OPS[op].join(args)}")
+        return tmp
+
+    return fold_tree(node, leaf, gate)
+
+
+def _fault_line(var: str, site: int) -> str:
+    """Force the lanes of a signal: F[2k] clears stuck-at-0 lanes, F[2k + 1] sets stuck-at-1 lanes."""
+    return f"    {var} = {var} & F[{2 * site}] | F[{2 * site + 1}]"
+
+
+def _emit_netlist_py(net, order, registers, names, mask_name: str, src, sites=None):
+    """
+    Straight-line bitwise Python for a Netlist: one temporary per gate node,
+    emitted once even when several equations share the node. Appends the
+    combinational assignments (in `order`) to src and returns the names
+    holding the next-state values of `registers`. With sites (name -> fault
+    site index), every assignment is followed by its fault injection.
+    """
+    op, start, args = net.op, net.start, net.args
+    ids = net.name_ids
+    comb_roots = net.comb_roots()
+    seq_roots = net.seq_roots()
+    value = {}  # node index -> Python expression
+
+    def emit(root):
+        # Nodes are topologically ordered, so emitting the missing nodes
+        # below root by increasing index defines every operand first.
+        need = []
+        stack = [root]
+        while stack:
+            i = stack.pop()
+            if i in value:
+                continue
+            value[i] = None
+            need.append(i)
+            if op[i] > CONST:
+                stack.extend(args[start[i]:start[i + 1]])
+        for i in sorted(need):
+            code = op[i]
+            lo, hi = start[i], start[i + 1]
+            if code == VAR:
+                value[i] = names[net.names[args[lo]]]
+            elif code == CONST:
+                value[i] = mask_name if args[lo] else "0"
+            else:
+                tmp = f"n{i}"
+                if code == NOT_CODE:
+                    src.append(f"    {tmp} = {value[args[lo]]} ^ {mask_name}")
+                else:
+                    operands = [value[a] for a in args[lo:hi]]
+                    src.append(f"    {tmp} = {_PY_OPS[OPS[code]].join(operands)}")
+                value[i] = tmp
+        return value[root]
+
+    for name in order:
+        src.append(f"    {names[name]} = {emit(comb_roots[ids[name]])}")
+        if sites is not None:
+            src.append(_fault_line(names[name], sites[name]))
+    return [emit(seq_roots[ids[q]]) for q in registers]
+
+
+class BitParallelModel:
+    """
+    A design (seq_design.Design or seq_netlist.Netlist) compiled for
+    bit-parallel simulation.
+
+      inputs:    sorted input pin names
+      registers: sorted register names (current state)
+      outputs:   sorted output pin names
+
+    step(mask, *inputs, *registers) returns (outputs_tuple, next_state_tuple)
+    where every value is an int whose lanes are selected by mask; NOT is
+    implemented as XOR with the mask so unused high bits stay 0.
+    With probe, step() also returns a third tuple with the values of the
+    combinational signals listed in `probes` (evaluation order).
+
+    With inject, step(mask, F, *inputs, *registers) forces every signal in
+    `sites` (inputs, registers, combinational signals) as soon as it is
+    read or computed: site k becomes value & F[2k] | F[2k + 1]. Passing
+    (mask, 0) per site leaves the design fault-free (see seq_fault.py).
+    """
+
+    def __init__(self, design, probe: bool = False, inject: bool = False):
+        order, err = design.comb_order()
+        if err:
+            raise SimError(err)
+
+        both = design.comb_lhs & design.seq_lhs
+        if both:
+            raise SimError(
+                f"'{sorted(both)[0]}' is defined both as a combinational signal and a register"
+            )
+
+        self.design = design
+        self.inputs = sorted(design.pin_inputs)
+        self.registers = design.q_names
+        self.outputs = sorted(design.pin_outputs)
+        self.probes = list(order) if probe else []
+        self.sites = list(dict.fromkeys(self.inputs + self.registers + order)) if inject else []
+
+        # Map signal names to local variable names (s0, s1, ...) so that any
+        # .seq identifier is safe to use in generated Python code.
+        names = {}
+        for name in self.inputs + self.registers + order:
+            names.setdefault(name, f"s{len(names)}")
+
+        params = ", ".join(["M"] + (["F"] if inject else [])
+                           + [names[n] for n in self.inputs + self.registers])
+        src = [f"def _step({params}):"]
+        sites = {name: k for k, name in enumerate(self.sites)} if inject else None
+        if inject:
+            for name in dict.fromkeys(self.inputs + self.registers):
+                src.append(_fault_line(names[name], sites[name]))
+
+        if isinstance(design, Netlist):
+            # Shared subexpressions are evaluated once
+            next_vals = _emit_netlist_py(design, order, self.registers, names, "M", src, sites)
+        else:
+            comb = design.comb_defs()
+            nxt = design.next_state_defs()
+            temps = [0]
+            for name in order:
+                result = _emit_py(comb[name], "M", names, src, temps)
+                src.append(f"    {names[name]} = {result}")
+                if inject:
+                    src.append(_fault_line(names[name], sites[name]))
+            next_vals = [_emit_py(nxt[q], "M", names, src, temps) for q in self.registers]
+        outs = "".join(f"{names[n]}, " for n in self.outputs)
+        nexts = "".join(f"{v}, " for v in next_vals)
+        if probe:
+            probes = "".join(f"{names[n]}, " for n in self.probes)
+            src.append(f"    return ({outs}), ({nexts}), ({probes})")
+        else:
+            src.append(f"    return ({outs}), ({nexts})")
+        self.source = "\n".join(src) + "\n"
+
+        namespace = {}
+        exec(compile(self.source, "<seq_sim>", "exec"), namespace)
+        self.step = namespace["_step"]
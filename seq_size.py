@@ -0,0 +1,197 @@
+# seq_size.py - firmware size reports and size history.
+#
+# `arduino-cli compile --format json` reports the size of every executable
+# section in builder_result.executable_sections_size: "text" is the program
+# storage (flash) and "data" the statically allocated SRAM (.data + .bss).
+# The remaining SRAM is all the stack gets, so a build that leaves little of
+# it may compile and upload fine and still crash on the board.
+#
+# Every successful build is recorded in a small JSON history keyed by the
+# design fingerprint (Design.fingerprint()) and the codegen options, so a
+# build can be compared with the previous one and with the last build of the
+# same design and options (a toolchain or codegen change).
+
+import hashlib
+import json
+import os
+import re
+import time
+
+from seq_build import update_json
+
+# ATmega32u4 (Leonardo, Micro): 32 KiB flash minus the 4 KiB Caterina
+# bootloader, 2.5 KiB SRAM. Used when arduino-cli does not report a maximum.
+ATMEGA32U4_FLASH = 28672
+ATMEGA32U4_SRAM = 2560
+
+# Warn when less SRAM than this (bytes) is left for the stack
+DEFAULT_MIN_SRAM_FREE = 512
+
+# Text output of `arduino-cli compile` (without --format json, older daemons)
+_FLASH_RE = re.compile(r"Sketch uses (\d+) bytes.*?Maximum is (\d+) bytes")
+_SRAM_RE = re.compile(r"Global variables use (\d+) bytes.*?Maximum is (\d+) bytes")
+
+
+class FirmwareSize:
+    """Flash and static SRAM usage of one build, in bytes."""
+
+    def __init__(self, flash: int, sram: int,
+                 flash_max: int = ATMEGA32U4_FLASH, sram_max: int = ATMEGA32U4_SRAM):
+        self.flash = flash
+        self.sram = sram
+        self.flash_max = flash_max or ATMEGA32U4_FLASH
+        self.sram_max = sram_max or ATMEGA32U4_SRAM
+
+    @property
+    def sram_free(self) -> int:
+        return self.sram_max - self.sram
+
+    def to_dict(self) -> dict:
+        return {"flash": self.flash, "sram": self.sram,
+                "flash_max": self.flash_max, "sram_max": self.sram_max}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["flash"], data["sram"], data.get("flash_max", 0), data.get("sram_max", 0))
+
+    def describe(self) -> str:
+        return (f"Flash: {self.flash} / {self.flash_max} bytes "
+                f"({100 * self.flash / self.flash_max:.0f}%), "
+                f"SRAM: {self.sram} / {self.sram_max} bytes "
+                f"({100 * self.sram / self.sram_max:.0f}%, {self.sram_free} free)")
+
+
+def parse_compile_output(stdout: str):
+    """
+    Split the stdout of `arduino-cli compile --format json` into
+    (FirmwareSize or None, compiler output, compiler errors). Plain text
+    output is accepted too: it is returned as is, with the size taken from
+    the "Sketch uses ..." / "Global variables use ..." lines.
+    """
+    try:
+        data = json.loads(stdout)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return _size_from_text(stdout), stdout, ""
+
+    out = data.get("compiler_out") or ""
+    err = data.get("compiler_err") or data.get("error") or ""
+    result = data.get("builder_result") or {}
+    sections = result.get("executable_sections_size") or data.get("executable_sections_size") or []
+    by_name = {s.get("name"): s for s in sections}
+    text, dat = by_name.get("text"), by_name.get("data")
+    if text is None or dat is None:
+        return _size_from_text(out), out, err
+    size = FirmwareSize(text.get("size", 0), dat.get("size", 0),
+                        text.get("max_size", 0), dat.get("max_size", 0))
+    return size, out, err
+
+
+def _size_from_text(text: str):
+    flash = _FLASH_RE.search(text)
+    sram = _SRAM_RE.search(text)
+    if flash is None or sram is None:
+        return None
+    return FirmwareSize(int(flash.group(1)), int(sram.group(1)),
+                        int(flash.group(2)), int(sram.group(2)))
+
+
+def size_warnings(size: FirmwareSize, min_sram_free: int = DEFAULT_MIN_SRAM_FREE):
+    """Warning messages for a build that is close to the memory limits."""
+    warnings = []
+    if size.sram_free < min_sram_free:
+        warnings.append(f"Low SRAM headroom: {size.sram_free} bytes left for the stack "
+                        f"(threshold {min_sram_free} bytes); the firmware may crash.")
+    if size.flash > size.flash_max:
+        warnings.append(f"Program too big: {size.flash} bytes of flash, "
+                        f"maximum is {size.flash_max} bytes.")
+    return warnings
+
+
+def _delta(new: int, old: int) -> str:
+    return f"{new - old:+d}" if new != old else "±0"
+
+
+# =========================
+# Size history
+# =========================
+class SizeHistory:
+    """
+    Sizes of past builds in <root>/size_history.json, one entry per
+    (design fingerprint, codegen options) key; the oldest entries are
+    dropped beyond max_entries.
+    """
+
+    def __init__(self, root: str, max_entries: int = 500):
+        self.path = os.path.join(root, "size_history.json")
+        self.max_entries = max_entries
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.data = {}
+        self.data.setdefault("builds", 0)
+        self.data.setdefault("entries", {})
+
+    @staticmethod
+    def key(design_hash: str, options: dict) -> str:
+        """History key of a design fingerprint and codegen options (clock, keep, FQBN)."""
+        text = json.dumps({"design": design_hash, "options": options}, sort_keys=True)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def last(self):
+        """Entry of the most recent build, or None."""
+        entries = self.data["entries"].values()
+        return max(entries, key=lambda e: e["build"], default=None)
+
+    def record(self, design_hash: str, options: dict, size: FirmwareSize):
+        """
+        Store one build and return report lines comparing it with the
+        previous build and with the last build of the same design + options.
+        The file is re-read under update_json()'s lock, so builds recorded
+        meanwhile by another thread are kept.
+        """
+        self.data, lines = update_json(
+            self.path, lambda data: self._record(data, design_hash, options, size))
+        return lines
+
+    def _record(self, data: dict, design_hash: str, options: dict, size: FirmwareSize):
+        self.data = data
+        data.setdefault("builds", 0)
+        entries = data.setdefault("entries", {})
+        key = self.key(design_hash, options)
+        previous = self.last()
+        same = entries.get(key)
+
+        lines = []
+        if previous is not None:
+            lines.append(self._compare(size, previous, "previous build"))
+        if same is not None and same is not previous:
+            lines.append(self._compare(size, same, "last build of this design and options"))
+
+        self.data["builds"] += 1
+        entries[key] = dict(size.to_dict(), design=design_hash, options=options,
+                            build=self.data["builds"], time=time.strftime("%Y-%m-%d %H:%M:%S"))
+        if len(entries) > self.max_entries:
+            for old in sorted(entries, key=lambda k: entries[k]["build"])[:len(entries) - self.max_entries]:
+                del entries[old]
+        return lines
+
+    @staticmethod
+    def _compare(size: FirmwareSize, entry: dict, what: str) -> str:
+        return (f"vs. {what} ({entry['time']}): flash {_delta(size.flash, entry['flash'])} bytes, "
+                f"SRAM {_delta(size.sram, entry['sram'])} bytes")
+
+
+def size_report(size: FirmwareSize, design_hash: str, options: dict, history: SizeHistory = None,
+                min_sram_free: int = DEFAULT_MIN_SRAM_FREE):
+    """
+    [(message, level)] lines for a successful build: usage, deltas from the
+    history (where the build is recorded), and low-memory warnings.
+    """
+    lines = [(size.describe(), "info")]
+    if history is not None:
+        lines += [(line, "info") for line in history.record(design_hash, options, size)]
+    lines += [(w, "warning") for w in size_warnings(size, min_sram_free)]
+    return lines
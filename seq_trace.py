@@ -0,0 +1,157 @@
+# seq_trace.py - lightweight timing instrumentation for the SeqEditor pipeline.
+#
+# A Tracer records nested spans (wall time, plus CPU time for subprocesses)
+# around each stage of Check / Flash. The spans can be summarized as an
+# indented text tree or exported as a Chrome / Perfetto trace file
+# (chrome://tracing, https://ui.perfetto.dev). Optionally, Python stages run
+# under cProfile so the hot functions inside a slow stage can be listed.
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import subprocess
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Span:
+    """One timed region: name, start/end (perf_counter seconds), depth and extra args."""
+
+    def __init__(self, name, start, depth, args):
+        self.name = name
+        self.start = start
+        self.end = None
+        self.depth = depth
+        self.args = args
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Tracer:
+    """
+    Collects nested spans for one pipeline run.
+
+        tr = Tracer(profile=False)
+        with tr.span("generate"):
+            ...
+        result = tr.run(["arduino-cli", "compile", ...], name="compile")
+        print(tr.summary())
+        tr.write_chrome_trace("trace.json")
+
+    With profile=True, spans opened with python=True (the default) run under
+    a shared cProfile.Profile; subprocess spans are not profiled.
+    """
+
+    def __init__(self, profile: bool = False):
+        self.spans = []
+        self._depth = 0
+        self._t0 = time.perf_counter()
+        self._profiler = cProfile.Profile() if profile else None
+        self._profiling = 0
+
+    # ---------- recording ----------
+    @contextmanager
+    def span(self, name: str, python: bool = True, **args):
+        """Time the enclosed block as a span nested inside the current one."""
+        sp = Span(name, time.perf_counter(), self._depth, dict(args))
+        self.spans.append(sp)
+        self._depth += 1
+        profiling = self._profiler is not None and python
+        if profiling:
+            if self._profiling == 0:
+                self._profiler.enable()
+            self._profiling += 1
+        try:
+            yield sp
+        finally:
+            if profiling:
+                self._profiling -= 1
+                if self._profiling == 0:
+                    self._profiler.disable()
+            self._depth -= 1
+            sp.end = time.perf_counter()
+
+    def run(self, cmd, name: str = None, **kwargs):
+        """
+        subprocess.run() inside a span named `name` (default: the command).
+        Records the exit code and the child's user+system CPU time; wall vs
+        CPU shows whether a tool was computing or waiting (I/O, USB, sleeps).
+        """
+        name = name or " ".join(cmd[:2])
+        with self.span(name, python=False, cmd=" ".join(cmd)) as sp:
+            before = os.times()
+            result = subprocess.run(cmd, **kwargs)
+            after = os.times()
+            sp.args["cpu_s"] = round(
+                (after.children_user - before.children_user)
+                + (after.children_system - before.children_system), 4
+            )
+            sp.args["returncode"] = result.returncode
+        return result
+
+    # ---------- reporting ----------
+    def summary(self, min_ms: float = 0.0) -> str:
+        """Indented tree of span durations in milliseconds."""
+        lines = ["=== timing ==="]
+        for sp in self.spans:
+            ms = sp.duration * 1e3
+            if ms < min_ms:
+                continue
+            extra = ""
+            if "cpu_s" in sp.args:
+                extra = f"  (cpu {sp.args['cpu_s'] * 1e3:.0f} ms)"
+            lines.append(f"{'  ' * sp.depth}{sp.name:<{32 - 2 * sp.depth}} {ms:9.1f} ms{extra}")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> dict:
+        """Spans as Chrome trace 'complete' events (microseconds)."""
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = []
+        for sp in self.spans:
+            events.append({
+                "name": sp.name,
+                "cat": "subprocess" if "cmd" in sp.args else "python",
+                "ph": "X",
+                "ts": (sp.start - self._t0) * 1e6,
+                "dur": sp.duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": sp.args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    # ---------- profiling ----------
+    @property
+    def profiling_enabled(self) -> bool:
+        return self._profiler is not None
+
+    def write_profile(self, path: str):
+        """Dump raw cProfile stats (open with pstats or snakeviz)."""
+        if self._profiler is not None:
+            self._profiler.dump_stats(path)
+
+    def profile_summary(self, limit: int = 15) -> str:
+        """Top functions by cumulative time from the Python stages."""
+        if self._profiler is None:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+def maybe_span(tracer, name: str, **args):
+    """tracer.span(name) when a tracer is active, otherwise a no-op context."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, **args)
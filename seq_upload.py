@@ -0,0 +1,254 @@
+# seq_upload.py - direct upload to ATmega32u4 boards (Caterina bootloader).
+#
+# `arduino-cli upload` resets the board into its bootloader with a 1200-baud
+# "touch" of the sketch's serial port, waits for the bootloader port to
+# appear, runs avrdude and only reports at the end. FastUploader does the
+# same steps itself with the .hex that arduino-cli compile left in the build
+# directory:
+#
+#   touch      open + close the port at 1200 baud (the sketch reboots into
+#              Caterina, which stays in the bootloader for about 8 s)
+#   bootloader poll the serial device list until a port appears that was not
+#              there before (on Linux it often reuses the vanished name)
+#   avrdude    avr109 programmer at 57600 baud, flash write with -D, with or
+#              without read-back verification
+#
+# Every phase is timed, so the upload takes as long as the hardware needs
+# instead of fixed sleeps. The port enumerator, touch, runner and clock are
+# parameters, so the port tracking can be driven by a fake enumerator.
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+try:
+    import serial
+    from serial.tools import list_ports
+except ImportError:  # optional dependency
+    serial = None
+
+try:
+    import termios
+except ImportError:  # not POSIX
+    termios = None
+
+BOOTLOADER_TIMEOUT_S = 10.0  # Caterina waits ~8 s for the upload
+POLL_INTERVAL_S = 0.05
+AVR109_BAUD = 57600
+MCU = "atmega32u4"
+
+# Device names of USB CDC ports when pyserial is not installed
+_PORT_GLOBS = ("/dev/ttyACM*", "/dev/ttyUSB*", "/dev/cu.usbmodem*")
+
+
+def list_serial_ports():
+    """Set of serial port device names currently present."""
+    if serial is not None:
+        return {p.device for p in list_ports.comports()}
+    return {path for pattern in _PORT_GLOBS for path in glob.glob(pattern)}
+
+
+def touch_1200(port: str):
+    """
+    Open and close `port` at 1200 baud, which makes a running 32u4 sketch
+    reboot into its bootloader. Raises OSError when the port cannot be opened.
+    """
+    if serial is not None:
+        try:
+            conn = serial.Serial(port, 1200)
+            conn.dtr = False
+            conn.close()
+        except serial.SerialException as e:
+            raise OSError(str(e)) from e
+        return
+    if termios is None:
+        raise OSError("pyserial is not installed")
+    fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        attrs = termios.tcgetattr(fd)
+        attrs[2] |= termios.HUPCL  # drop DTR on close
+        attrs[4] = attrs[5] = termios.B1200
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except termios.error as e:
+        raise OSError(f"{port} is not a serial port") from e
+    finally:
+        os.close(fd)
+
+
+def wait_for_new_port(before, enumerate_ports=list_serial_ports, timeout: float = BOOTLOADER_TIMEOUT_S,
+                      poll: float = POLL_INTERVAL_S, clock=time.monotonic, sleep=time.sleep):
+    """
+    Poll enumerate_ports() until a port shows up that is not in `before`.
+    A port that disappears and comes back under the same name counts as
+    new. Returns the port, or None after `timeout` seconds.
+    """
+    known = set(before)
+    deadline = clock() + timeout
+    while True:
+        now = set(enumerate_ports())
+        new = now - known
+        if new:
+            return sorted(new)[0]
+        known &= now  # forget vanished ports so that their return is seen
+        if clock() >= deadline:
+            return None
+        sleep(poll)
+
+
+# =========================
+# avrdude
+# =========================
+def _arduino_data_dirs():
+    home = os.path.expanduser("~")
+    if sys.platform == "darwin":
+        return [os.path.join(home, "Library", "Arduino15")]
+    if os.name == "nt":
+        return [os.path.join(os.environ.get("LOCALAPPDATA", home), "Arduino15")]
+    return [os.path.join(home, ".arduino15")]
+
+
+def find_avrdude():
+    """
+    (avrdude executable, avrdude.conf or None), or (None, None).
+    SEQEDITOR_AVRDUDE overrides; otherwise the newest avrdude installed by
+    arduino-cli, then one on PATH (with its own configuration).
+    """
+    override = os.environ.get("SEQEDITOR_AVRDUDE")
+    if override:
+        conf = os.path.join(os.path.dirname(os.path.dirname(override)), "etc", "avrdude.conf")
+        return override, conf if os.path.isfile(conf) else None
+    exe = "avrdude.exe" if os.name == "nt" else "avrdude"
+    for data_dir in _arduino_data_dirs():
+        tools = os.path.join(data_dir, "packages", "arduino", "tools", "avrdude")
+        for version_dir in sorted(glob.glob(os.path.join(tools, "*")), reverse=True):
+            path = os.path.join(version_dir, "bin", exe)
+            if os.path.isfile(path):
+                conf = os.path.join(version_dir, "etc", "avrdude.conf")
+                return path, conf if os.path.isfile(conf) else None
+    path = shutil.which("avrdude")
+    return (path, None) if path else (None, None)
+
+
+def avrdude_command(avrdude: str, conf, hex_path: str, port: str, verify: bool = True):
+    """avrdude arguments for a Caterina (avr109) upload, as in the Leonardo board definition."""
+    cmd = [avrdude]
+    if conf:
+        cmd += ["-C", conf]
+    cmd += ["-p", MCU, "-c", "avr109", "-P", port, "-b", str(AVR109_BAUD), "-D"]
+    if not verify:
+        cmd.append("-V")
+    return cmd + [f"-Uflash:w:{hex_path}:i"]
+
+
+def hex_for(build_path: str, sketch_dir: str):
+    """The .hex that `arduino-cli compile --build-path` wrote for a sketch, or None."""
+    if not build_path:
+        return None
+    name = os.path.basename(os.path.normpath(sketch_dir))
+    path = os.path.join(build_path, f"{name}.ino.hex")
+    return path if os.path.isfile(path) else None
+
+
+def _default_runner(cmd, name, **kwargs):
+    return subprocess.run(cmd, **kwargs)
+
+
+class UploadResult:
+    """
+    Outcome of FastUploader.upload():
+      ok, message
+      warnings:         non-fatal problems (e.g. the touch failed)
+      bootloader_port:  port avrdude talked to (None if it never appeared)
+      phases:           [(name, seconds)] in order
+      stdout, stderr:   avrdude output
+    """
+
+    def __init__(self):
+        self.ok = False
+        self.message = ""
+        self.warnings = []
+        self.bootloader_port = None
+        self.phases = []
+        self.stdout = ""
+        self.stderr = ""
+
+    @property
+    def total(self) -> float:
+        return sum(s for _, s in self.phases)
+
+    def describe(self) -> str:
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases)
+        return f"Upload phases: {parts} (total {self.total:.2f} s)"
+
+
+class FastUploader:
+    """
+    1200-baud touch, bootloader port detection and a direct avrdude run.
+    runner(cmd, name, **subprocess_kwargs) runs avrdude (the GUI passes its
+    tracing wrapper, like for arduino-cli).
+    """
+
+    def __init__(self, avrdude: str, conf=None, enumerate_ports=list_serial_ports, touch=touch_1200,
+                 runner=None, timeout: float = BOOTLOADER_TIMEOUT_S, poll: float = POLL_INTERVAL_S,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.avrdude = avrdude
+        self.conf = conf
+        self.enumerate_ports = enumerate_ports
+        self.touch = touch
+        self.runner = runner or _default_runner
+        self.timeout = timeout
+        self.poll = poll
+        self.clock = clock
+        self.sleep = sleep
+
+    def reset_to_bootloader(self, port: str, result: UploadResult):
+        """
+        Touch `port` and return the bootloader port; phases go to result.
+        When the touch fails, `port` itself is used if it is still present
+        (the board is most likely in its bootloader already); otherwise
+        there is nothing to wait for, and None is returned at once with
+        result.message set. None after the timeout too.
+        """
+        before = set(self.enumerate_ports())
+        t0 = self.clock()
+        try:
+            self.touch(port)
+        except OSError as e:
+            result.phases.append(("touch", self.clock() - t0))
+            if port in set(self.enumerate_ports()):
+                result.warnings.append(f"1200-baud touch of {port} failed ({e}); "
+                                       "assuming it is the bootloader port.")
+                return port
+            result.message = (f"1200-baud touch of {port} failed ({e}) and the port is gone; "
+                              "check the Port setting, or press the board's reset button "
+                              "and retry.")
+            return None
+        t1 = self.clock()
+        result.phases.append(("touch", t1 - t0))
+        found = wait_for_new_port(before, self.enumerate_ports, self.timeout, self.poll,
+                                  self.clock, self.sleep)
+        result.phases.append(("bootloader", self.clock() - t1))
+        return found
+
+    def upload(self, port: str, hex_path: str, verify: bool = True) -> UploadResult:
+        result = UploadResult()
+        boot_port = self.reset_to_bootloader(port, result)
+        if boot_port is None:
+            result.message = result.message or (
+                f"No bootloader port appeared within {self.timeout:.0f} s after resetting {port}.")
+            return result
+        result.bootloader_port = boot_port
+
+        cmd = avrdude_command(self.avrdude, self.conf, hex_path, boot_port, verify)
+        t0 = self.clock()
+        proc = self.runner(cmd, "avrdude", capture_output=True, text=True, check=False)
+        result.phases.append(("avrdude (write + verify)" if verify else "avrdude (write)",
+                              self.clock() - t0))
+        result.stdout, result.stderr = proc.stdout or "", proc.stderr or ""
+        result.ok = proc.returncode == 0
+        result.message = (f"Uploaded through bootloader port {boot_port}." if result.ok
+                          else f"avrdude failed with exit code {proc.returncode}.")
+        return result
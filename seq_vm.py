@@ -0,0 +1,838 @@
+# seq_vm.py - bytecode target: a flashed-once interpreter sketch plus downloadable designs.
+#
+# Instead of generating, compiling and uploading a new sketch for every design
+# change, the board can run a fixed interpreter (interpreter_ino_source(),
+# flashed once like any sketch). compile_program() turns a design into a
+# compact bytecode program that download() sends over USB serial in a few
+# milliseconds; the interpreter checks it (CRC-16 and a full operand check),
+# runs it from SRAM and copies it to EEPROM in the background, so it also
+# survives a reset.
+#
+# Program layout (little-endian):
+#   header  "SV", version, flags, clock pin, slot count, clock Hz (uint32),
+#           8-byte build ID (answered on the seq_ident.py query byte)
+#   code    one opcode byte, then its operands (slot indices / pin numbers)
+# Every signal, register D input and expression temporary is one byte "slot";
+# the code mirrors the loop() that seq_codegen.py generates: read inputs,
+# combinational equations in file order, D inputs, latch on a rising clock
+# edge, drive outputs.
+#
+# Serial protocol (115200 baud, USB CDC):
+#   'V'                                  -> "SEQVM:<version> <max program bytes>"
+#   'L' <len:u16> <program> <crc16:u16>  -> "K", or "E<n>" (1 timeout, 2 too big,
+#                                           3 checksum, 4 invalid program)
+#   'B'                                  -> "T:<microseconds for 1000 loops>"
+#   0x05                                 -> "SEQID:<build id>" (seq_ident.py)
+
+import binascii
+import hashlib
+import os
+import select
+import struct
+import threading
+import time
+
+from seq_codegen import fold_design, prune_design
+from seq_design import fold_tree
+from seq_ident import QUERY_BYTE, REPLY_PREFIX, open_port
+
+(OP_END, OP_IN, OP_OUT, OP_MOV, OP_CONST, OP_NOT,
+ OP_AND, OP_OR, OP_XOR, OP_LATCH) = range(10)
+OP_NAMES = ("END", "IN", "OUT", "MOV", "CONST", "NOT", "AND", "OR", "XOR", "LATCH")
+_GATE_OPS = {"AND": OP_AND, "OR": OP_OR, "XOR": OP_XOR}
+
+MAGIC = b"SV"
+VERSION = 1
+FLAG_INTERNAL = 0x01
+FLAG_MIRROR = 0x02
+# magic, version, flags, clock pin, slot count, clock Hz, build ID
+_HEADER = struct.Struct("<2sBBBBI8s")
+
+PROGRAM_MAX = 1020  # EEPROM (1 KiB on the ATmega32u4) minus length + CRC
+MAX_SLOTS = 255
+MAX_FANIN = 255
+
+CMD_HELLO = b"V"
+CMD_LOAD = b"L"
+CMD_BENCH = b"B"
+HELLO_PREFIX = "SEQVM:"
+LOAD_ERRORS = {
+    "1": "timeout while receiving",
+    "2": "program too big",
+    "3": "checksum mismatch",
+    "4": "invalid program",
+}
+
+
+class VMError(Exception):
+    """Raised when a design does not fit the interpreter, or for a malformed program."""
+
+
+def checksum(data: bytes) -> int:
+    """CRC-16/XMODEM, as computed on the board by avr-libc's _crc_xmodem_update()."""
+    return binascii.crc_hqx(data, 0)
+
+
+# =========================
+# Design -> bytecode
+# =========================
+class Program:
+    """
+    A compiled design:
+      data:      header + code (what is downloaded)
+      build_id:  16 hex chars, also in the header
+      slots:     signal name -> slot index (registers' D inputs as "D_<q>")
+      stats:     prune_design() stats plus ops, program_bytes, slots, temps
+    """
+
+    def __init__(self, data: bytes, slots: dict, stats: dict):
+        self.data = data
+        self.slots = slots
+        self.stats = stats
+
+    @property
+    def build_id(self) -> str:
+        return _HEADER.unpack_from(self.data, 0)[6].hex()
+
+    def frame(self) -> bytes:
+        """The load command for this program."""
+        return (CMD_LOAD + struct.pack("<H", len(self.data)) + self.data
+                + struct.pack("<H", checksum(self.data)))
+
+    def disassemble(self):
+        """One text line per instruction, with slot names."""
+        names = {i: n for n, i in self.slots.items()}
+
+        def name(s):
+            return names.get(s) or f"t{s - len(names)}"  # temporaries after the named slots
+
+        out = []
+        for pc, op, operands in decode(self.data):
+            if op in (OP_IN, OP_OUT):
+                text = f"{name(operands[0])}, pin {operands[1]}"
+            elif op == OP_CONST:
+                text = f"{name(operands[0])}, {operands[1]}"
+            elif op == OP_LATCH:
+                pairs = zip(operands[0::2], operands[1::2])
+                text = ", ".join(f"{name(q)} <- {name(d)}" for q, d in pairs)
+            elif op in (OP_AND, OP_OR, OP_XOR):
+                text = ", ".join(name(s) for s in operands[:1] + operands[2:])
+            else:
+                text = ", ".join(name(s) for s in operands)
+            out.append(f"{pc:4d}  {OP_NAMES[op]:<6}{text}".rstrip())
+        return out
+
+
+class _Emitter:
+    """Bytecode of one program; named slots first, then expression temporaries."""
+
+    def __init__(self, names):
+        self.code = bytearray()
+        self.slots = {name: i for i, name in enumerate(names)}
+        self.n_temps = 0  # temporaries needed by the largest equation
+        self.ops = 0
+
+    def op(self, code: int, *operands):
+        bad = [v for v in operands if not 0 <= v <= 255]
+        if bad:
+            raise VMError(f"{OP_NAMES[code]} operand {bad[0]} does not fit in a byte")
+        self.code.append(code)
+        self.code.extend(operands)
+        self.ops += 1
+
+    def equation(self, dst: int, node):
+        """dst = node; temporaries are reused by the next equation."""
+        ops = []
+        memo = {}  # (op, *arg slots) -> temp, shares repeated subexpressions
+        base = len(self.slots)
+
+        def temp():
+            t = base + len(ops)
+            if t >= MAX_SLOTS:
+                raise VMError(f"equation needs more than {MAX_SLOTS - base} temporaries, "
+                              f"the interpreter has {MAX_SLOTS} slots")
+            return t
+
+        def leaf(n):
+            if n[0] == "VAR":
+                return self.slots[n[1]]
+            t = temp()
+            ops.append((OP_CONST, t, n[1]))
+            return t
+
+        def gate(op, args):
+            key = (op, *args)
+            hit = memo.get(key)
+            if hit is not None:
+                return hit
+            if op == "NOT":
+                t = temp()
+                ops.append((OP_NOT, t, args[0]))
+            else:
+                args = list(args)
+                while len(args) > MAX_FANIN:  # split very wide gates
+                    t = temp()
+                    ops.append((_GATE_OPS[op], t, MAX_FANIN, *args[:MAX_FANIN]))
+                    args = [t] + args[MAX_FANIN:]
+                t = temp()
+                ops.append((_GATE_OPS[op], t, len(args), *args))
+            memo[key] = t
+            return t
+
+        result = fold_tree(node, leaf, gate)
+        if ops and ops[-1][1] == result:
+            ops[-1] = (ops[-1][0], dst, *ops[-1][2:])  # the root writes dst directly
+            self.n_temps = max(self.n_temps, len(ops) - 1)
+        else:
+            self.n_temps = max(self.n_temps, len(ops))
+            ops.append((OP_MOV, dst, result))
+        for code, *operands in ops:
+            self.op(code, *operands)
+
+
+def compile_program(design, clock, keep=()):
+    """
+    Compile a design (after the same constant folding and dead-logic
+    elimination as seq_codegen.generate_ino_source()) and the clock dict
+    (use_internal, clk_pin, freq_hz, mirror) into a Program.
+    Raises VMError when the design needs more than MAX_SLOTS slots or
+    PROGRAM_MAX bytes, uses a pin number above 255, or the clock pin or
+    frequency does not fit the header.
+    """
+    if not 0 <= clock["clk_pin"] <= 255:
+        raise VMError(f"clock pin {clock['clk_pin']} is not in 0..255")
+    if not 0 <= clock["freq_hz"] <= 0xFFFFFFFF:
+        raise VMError(f"clock frequency {clock['freq_hz']} Hz does not fit in 32 bits")
+    design, _, _ = fold_design(design)
+    live, stats = prune_design(design, keep)
+    comb_eqs = [eq for eq in design.comb_eqs if eq[0] in live]
+    seq_eqs = [eq for eq in design.seq_eqs if eq[0] in live]
+    q_names = [q for q in design.q_names if q in live]
+    pins = design.pin_defs
+    bad = sorted(n for n, num in pins.items() if not 0 <= num <= 255)
+    if bad:
+        raise VMError(f"pin numbers outside 0..255: {', '.join(bad)}")
+
+    names = sorted(design.signal_names & live) + [f"D_{q}" for q in q_names]
+    if len(names) > MAX_SLOTS:
+        raise VMError(f"design needs {len(names)} signal slots, the interpreter has {MAX_SLOTS}")
+    em = _Emitter(names)
+    slot = em.slots
+
+    for name in sorted(design.pin_inputs & live):
+        em.op(OP_IN, slot[name], pins[name])
+    for lhs, node, _ in comb_eqs:
+        em.equation(slot[lhs], node)
+    for q, node, _ in seq_eqs:
+        em.equation(slot[f"D_{q}"], node)
+    if seq_eqs:
+        if len(q_names) > 255:
+            raise VMError(f"{len(q_names)} registers, one LATCH holds at most 255")
+        em.op(OP_LATCH, len(q_names), *[s for q in q_names for s in (slot[q], slot[f"D_{q}"])])
+    for name in sorted(design.pin_outputs):
+        em.op(OP_OUT, slot[name], pins[name])
+    em.op(OP_END)
+
+    n_slots = len(names) + em.n_temps
+    if n_slots > MAX_SLOTS:
+        raise VMError(f"design needs {n_slots} slots, the interpreter has {MAX_SLOTS}")
+    flags = (FLAG_INTERNAL if clock["use_internal"] else 0) | (FLAG_MIRROR if clock["mirror"] else 0)
+    fields = (MAGIC, VERSION, flags, clock["clk_pin"], n_slots, clock["freq_hz"])
+    code = bytes(em.code)
+    build_id = hashlib.sha256(_HEADER.pack(*fields, bytes(8)) + code).digest()[:8]
+    data = _HEADER.pack(*fields, build_id) + code
+    if len(data) > PROGRAM_MAX:
+        raise VMError(f"program is {len(data)} bytes, the interpreter holds {PROGRAM_MAX}")
+
+    stats.update(ops=em.ops, program_bytes=len(data), slots=n_slots, temps=em.n_temps)
+    return Program(data, dict(slot), stats)
+
+
+def decode(data: bytes):
+    """
+    Yield (offset, opcode, operands) for every instruction of a program,
+    checking operands the same way the interpreter does. Raises VMError.
+    """
+    if len(data) < _HEADER.size + 1 or len(data) > PROGRAM_MAX:
+        raise VMError("bad program size")
+    magic, version, _, _, n_slots, _, _ = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise VMError("not a program for this interpreter version")
+    pc = _HEADER.size
+    end = len(data)
+
+    def take(n):
+        nonlocal pc
+        if pc + n > end:
+            raise VMError(f"truncated instruction at {pc}")
+        chunk = data[pc:pc + n]
+        pc += n
+        return list(chunk)
+
+    while pc < end:
+        at = pc
+        op = take(1)[0]
+        if op == OP_END:
+            if pc != end:
+                raise VMError(f"code after END at {at}")
+            yield at, op, []
+            return
+        if op in (OP_IN, OP_OUT, OP_MOV, OP_NOT, OP_CONST):
+            operands = take(2)
+            slots = operands[:1] if op in (OP_IN, OP_OUT, OP_CONST) else operands
+            if op == OP_CONST and operands[1] > 1:
+                raise VMError(f"bad constant at {at}")
+        elif op in (OP_AND, OP_OR, OP_XOR):
+            dst, n = take(2)
+            if n == 0:
+                raise VMError(f"empty gate at {at}")
+            operands = [dst, n] + take(n)
+            slots = [dst] + operands[2:]
+        elif op == OP_LATCH:
+            n = take(1)[0]
+            operands = take(2 * n)
+            slots = operands
+        else:
+            raise VMError(f"unknown opcode {op} at {at}")
+        if any(s >= n_slots for s in slots):
+            raise VMError(f"slot out of range at {at}")
+        yield at, op, operands
+    raise VMError("missing END")
+
+
+# =========================
+# Reference interpreter
+# =========================
+class VM:
+    """
+    Python version of the interpreter loop (what the stand-in board runs).
+    Set input levels in `pins` (pin -> 0/1, including the clock pin) and call
+    step(); output pins are written back into `pins`.
+    """
+
+    def __init__(self, data: bytes):
+        self.code = list(decode(data))
+        _, _, self.flags, self.clk_pin, n_slots, self.freq_hz, raw_id = _HEADER.unpack_from(data, 0)
+        self.build_id = raw_id.hex()
+        self.slots = bytearray(n_slots)
+        self.pins = {}
+        self.clk_prev = 0
+
+    def step(self):
+        slots, pins = self.slots, self.pins
+        clk_now = pins.get(self.clk_pin, 0)
+        rising = self.clk_prev == 0 and clk_now == 1
+        self.clk_prev = clk_now
+        for _, op, a in self.code:
+            if op == OP_IN:
+                slots[a[0]] = 1 if pins.get(a[1], 0) else 0
+            elif op == OP_OUT:
+                pins[a[1]] = 1 if slots[a[0]] else 0
+            elif op == OP_MOV:
+                slots[a[0]] = slots[a[1]]
+            elif op == OP_CONST:
+                slots[a[0]] = a[1]
+            elif op == OP_NOT:
+                slots[a[0]] = 0 if slots[a[1]] else 1
+            elif op == OP_AND:
+                slots[a[0]] = 1 if all(slots[s] for s in a[2:]) else 0
+            elif op == OP_OR:
+                slots[a[0]] = 1 if any(slots[s] for s in a[2:]) else 0
+            elif op == OP_XOR:
+                v = 0
+                for s in a[2:]:
+                    v ^= slots[s]
+                slots[a[0]] = v
+            elif op == OP_LATCH:
+                if rising:
+                    for i in range(0, len(a), 2):
+                        slots[a[i]] = slots[a[i + 1]]
+
+
+# =========================
+# Loop cost estimate
+# =========================
+# Rough AVR cycle costs (16 MHz, avr-gcc -Os, Arduino core). digitalRead()
+# and digitalWrite() dominate both versions; the interpreter adds an opcode
+# dispatch per instruction and an indirect slot access per operand.
+_IO_CYCLES = 70
+_NATIVE_OPERAND = 3
+_NATIVE_STORE = 2
+_VM_DISPATCH = 14
+_VM_OPERAND = 8
+_VM_STORE = 6
+_LOOP_OVERHEAD = 90  # clock read + edge detection + Arduino main loop
+
+
+def estimate_loop_cycles(program: Program):
+    """Estimated cycles per loop() for (interpreter, native sketch) running this design."""
+    vm = native = _LOOP_OVERHEAD
+    for _, op, a in decode(program.data):
+        if op in (OP_IN, OP_OUT):
+            vm += _VM_DISPATCH + _VM_OPERAND + _IO_CYCLES
+            native += _IO_CYCLES
+        elif op in (OP_MOV, OP_NOT, OP_CONST):
+            vm += _VM_DISPATCH + _VM_OPERAND + _VM_STORE
+            native += _NATIVE_OPERAND + _NATIVE_STORE
+        elif op in (OP_AND, OP_OR, OP_XOR):
+            vm += _VM_DISPATCH + a[1] * _VM_OPERAND + _VM_STORE
+            native += a[1] * _NATIVE_OPERAND + _NATIVE_STORE
+        elif op == OP_LATCH:
+            vm += _VM_DISPATCH + len(a) // 2 * (_VM_OPERAND + _VM_STORE)
+            native += len(a) // 2 * (_NATIVE_OPERAND + _NATIVE_STORE)
+        else:
+            vm += _VM_DISPATCH
+    return vm, native
+
+
+# =========================
+# Serial client
+# =========================
+def _exchange(port: str, payload: bytes, prefix: str, timeout: float, opener):
+    """Send payload, return (first reply line starting with prefix, None) or (None, message)."""
+    try:
+        conn = opener(port)
+    except OSError as e:
+        return None, f"cannot open {port}: {e}"
+    data = b""
+    try:
+        conn.write(payload)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            chunk = conn.read_available()
+            if not chunk:
+                time.sleep(0.001)
+                continue
+            data += chunk
+            for line in data.decode("ascii", "replace").splitlines(keepends=True):
+                if line.endswith("\n") and line.startswith(prefix):
+                    return line.strip(), None
+    except OSError as e:
+        return None, f"serial error on {port}: {e}"
+    finally:
+        conn.close()
+    return None, f"no answer from {port}"
+
+
+def vm_hello(port: str, timeout: float = 0.5, opener=open_port):
+    """
+    (info, None) when the interpreter runs on `port` - info is
+    {"version", "program_max"} - else (None, message).
+    """
+    line, err = _exchange(port, CMD_HELLO, HELLO_PREFIX, timeout, opener)
+    if line is None:
+        return None, err
+    try:
+        version, size = line[len(HELLO_PREFIX):].split()
+        return {"version": int(version), "program_max": int(size)}, None
+    except ValueError:
+        return None, f"unexpected answer '{line}'"
+
+
+def download(port: str, program: Program, timeout: float = 2.0, opener=open_port):
+    """Load `program` into the interpreter. Returns (seconds, None) or (None, message)."""
+    t0 = time.perf_counter()
+    frame = program.frame()
+    try:
+        conn = opener(port)
+    except OSError as e:
+        return None, f"cannot open {port}: {e}"
+    data = b""
+    try:
+        conn.write(frame)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            chunk = conn.read_available()
+            if not chunk:
+                time.sleep(0.001)
+                continue
+            data += chunk
+            for line in data.decode("ascii", "replace").splitlines(keepends=True):
+                if not line.endswith("\n"):
+                    continue
+                line = line.strip()
+                if line == "K":
+                    return time.perf_counter() - t0, None
+                if line.startswith("E"):
+                    return None, f"board rejected the program: {LOAD_ERRORS.get(line[1:], line)}"
+    except OSError as e:
+        return None, f"serial error on {port}: {e}"
+    finally:
+        conn.close()
+    return None, f"no answer from {port}"
+
+
+def bench_board(port: str, timeout: float = 5.0, opener=open_port):
+    """Measured interpreter loop time on the board: (microseconds per loop, None) or (None, message)."""
+    line, err = _exchange(port, CMD_BENCH, "T:", timeout, opener)
+    if line is None:
+        return None, err
+    try:
+        return int(line[2:]) / 1000.0, None
+    except ValueError:
+        return None, f"unexpected answer '{line}'"
+
+
+# =========================
+# Stand-in board (pty)
+# =========================
+class StandInBoard:
+    """
+    The interpreter firmware protocol served on a pseudo-terminal, with the
+    reference VM in place of the AVR: pass `port` to download(),
+    vm_hello() or seq_ident.query_build_id(). POSIX only.
+
+        with StandInBoard() as board:
+            download(board.port, program)
+            board.vm.pins[2] = 1
+            board.vm.step()
+    """
+
+    def __init__(self, byte_timeout: float = 0.2):
+        import pty
+        import tty
+
+        self.byte_timeout = byte_timeout
+        self.master, self._slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.vm = None
+        self.loads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="seq-vm-standin", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, n: int):
+        """n bytes, or None if they do not arrive in time."""
+        data = b""
+        while len(data) < n:
+            ready, _, _ = select.select([self.master], [], [], self.byte_timeout)
+            if not ready:
+                return None
+            data += os.read(self.master, n - len(data))
+        return data
+
+    def _reply(self, text: str):
+        os.write(self.master, (text + "\r\n").encode("ascii"))
+
+    def _serve(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                cmd = os.read(self.master, 1)
+            except OSError:
+                return
+            if cmd == CMD_HELLO:
+                self._reply(f"{HELLO_PREFIX}{VERSION} {PROGRAM_MAX}")
+            elif cmd == QUERY_BYTE:
+                self._reply(REPLY_PREFIX + (self.vm.build_id if self.vm else "0" * 16))
+            elif cmd == CMD_BENCH:
+                t0 = time.perf_counter()
+                for _ in range(1000):
+                    if self.vm is not None:
+                        self.vm.step()
+                self._reply(f"T:{int((time.perf_counter() - t0) * 1e6)}")
+            elif cmd == CMD_LOAD:
+                self._reply(self._load())
+
+    def _load(self) -> str:
+        size = self._read(2)
+        if size is None:
+            return "E1"
+        n = struct.unpack("<H", size)[0]
+        if n > PROGRAM_MAX:
+            while self._read(1) is not None:  # drain
+                pass
+            return "E2"
+        data = self._read(n)
+        crc = self._read(2)
+        if data is None or crc is None:
+            return "E1"
+        if checksum(data) != struct.unpack("<H", crc)[0]:
+            return "E3"
+        try:
+            self.vm = VM(data)
+        except VMError:
+            self.vm = None
+            return "E4"
+        self.loads += 1
+        return "K"
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self._slave)
+
+
+# =========================
+# Interpreter sketch
+# =========================
+def interpreter_ino_source() -> str:
+    """The interpreter sketch (needs isrClock.h next to it); flash it once."""
+    return _INTERPRETER_INO
+
+
+_INTERPRETER_INO = r"""// SeqEditor bytecode interpreter for ATmega32u4 boards (generated by seq_vm.py).
+// Flash once; designs are then downloaded over USB serial and kept in EEPROM.
+
+#define USE_INTERNAL_CLOCK   1      // Timer1 clock available; each program selects it
+#define CLOCK_HZ             2
+#define PIN_CLK              4
+#define CLOCK_LED_MIRROR     0
+
+#include "isrClock.h"
+#include <avr/eeprom.h>
+#include <util/crc16.h>
+
+#define VM_VERSION      __VERSION__
+#define PROG_MAX        __PROGRAM_MAX__
+#define HEADER_SIZE     __HEADER_SIZE__
+#define FLAG_INTERNAL   0x01
+#define FLAG_MIRROR     0x02
+#define LOAD_TIMEOUT_MS 200
+
+enum { OP_END, OP_IN, OP_OUT, OP_MOV, OP_CONST, OP_NOT, OP_AND, OP_OR, OP_XOR, OP_LATCH };
+
+static uint8_t prog[PROG_MAX];
+static uint16_t prog_len = 0;       // 0 = no program running
+static uint16_t prog_crc = 0;
+static uint8_t slot[256];
+static uint8_t clk_pin = PIN_CLK;
+static uint8_t flags = 0;
+static bool timer_on = false;
+static int clk_prev = LOW;
+static uint32_t out_mask = 0;       // output pins of the running program
+static int16_t persist_i = -1;      // next step of the EEPROM copy, -1 = idle
+
+static uint16_t crc16(const uint8_t *p, uint16_t n) {
+  uint16_t crc = 0;
+  while (n--) crc = _crc_xmodem_update(crc, *p++);
+  return crc;
+}
+
+// Walk the code once: check every operand; with apply, also set pin modes.
+static bool check_program(uint16_t len, bool apply) {
+  if (len < HEADER_SIZE + 1 || prog[0] != 'S' || prog[1] != 'V' || prog[2] != VM_VERSION) return false;
+  uint8_t n_slots = prog[5];
+  uint16_t pc = HEADER_SIZE;
+  while (pc < len) {
+    uint8_t op = prog[pc++];
+    uint16_t n;
+    switch (op) {
+      case OP_END:
+        return pc == len;
+      case OP_IN: case OP_OUT:
+        if (pc + 2 > len || prog[pc] >= n_slots || prog[pc + 1] >= NUM_DIGITAL_PINS) return false;
+        if (apply) {
+          pinMode(prog[pc + 1], op == OP_IN ? INPUT : OUTPUT);
+          if (op == OP_OUT) out_mask |= 1UL << prog[pc + 1];
+        }
+        pc += 2;
+        break;
+      case OP_MOV: case OP_NOT:
+        if (pc + 2 > len || prog[pc] >= n_slots || prog[pc + 1] >= n_slots) return false;
+        pc += 2;
+        break;
+      case OP_CONST:
+        if (pc + 2 > len || prog[pc] >= n_slots || prog[pc + 1] > 1) return false;
+        pc += 2;
+        break;
+      case OP_AND: case OP_OR: case OP_XOR:
+        if (pc + 2 > len || prog[pc] >= n_slots || prog[pc + 1] == 0) return false;
+        n = prog[pc + 1];
+        pc += 2;
+        if (pc + n > len) return false;
+        for (uint16_t i = 0; i < n; i++) if (prog[pc + i] >= n_slots) return false;
+        pc += n;
+        break;
+      case OP_LATCH:
+        if (pc + 1 > len) return false;
+        n = 2 * prog[pc++];
+        if (pc + n > len) return false;
+        for (uint16_t i = 0; i < n; i++) if (prog[pc + i] >= n_slots) return false;
+        pc += n;
+        break;
+      default:
+        return false;
+    }
+  }
+  return false;
+}
+
+static void start_program(uint16_t len) {
+  for (uint8_t pin = 0; pin < 32; pin++) {
+    if (out_mask & (1UL << pin)) pinMode(pin, INPUT);   // release the old outputs
+  }
+  out_mask = 0;
+  if (timer_on) {
+    T1Clock_end();
+    timer_on = false;
+  }
+  pinMode(clk_pin, INPUT);   // the previous program's clock pin
+  flags = prog[3];
+  clk_pin = prog[4];
+  uint32_t hz = prog[6] | ((uint32_t)prog[7] << 8) | ((uint32_t)prog[8] << 16) | ((uint32_t)prog[9] << 24);
+  memset(slot, 0, sizeof(slot));
+  pinMode(clk_pin, INPUT);
+  check_program(len, true);
+  if (flags & FLAG_INTERNAL) {
+    T1Clock_begin(clk_pin, hz);
+    timer_on = true;
+    if (flags & FLAG_MIRROR) pinMode(13, OUTPUT);
+  }
+  clk_prev = digitalRead(clk_pin);
+  prog_len = len;
+}
+
+static void load_from_eeprom() {
+  uint16_t len = eeprom_read_word((const uint16_t *)0);
+  if (len < HEADER_SIZE + 1 || len > PROG_MAX) return;
+  eeprom_read_block(prog, (const void *)4, len);
+  uint16_t crc = eeprom_read_word((const uint16_t *)2);
+  if (crc16(prog, len) != crc || !check_program(len, false)) return;
+  prog_crc = crc;
+  start_program(len);
+}
+
+// Copy the running program to EEPROM one byte per loop, without waiting for
+// the EEPROM: invalidate the length, write the code, then CRC and length.
+static void persist_step() {
+  if (persist_i < 0 || !eeprom_is_ready()) return;
+  uint16_t n = prog_len;
+  uint16_t i = persist_i++;
+  if (i < 2) eeprom_update_byte((uint8_t *)i, 0xFF);
+  else if (i < 2 + n) eeprom_update_byte((uint8_t *)(4 + i - 2), prog[i - 2]);
+  else if (i < 4 + n) eeprom_update_byte((uint8_t *)(i - n), i == 2 + n ? prog_crc & 0xFF : prog_crc >> 8);
+  else if (i < 6 + n) eeprom_update_byte((uint8_t *)(i - n - 4), i == 4 + n ? n & 0xFF : n >> 8);
+  else persist_i = -1;
+}
+
+static void run_program() {
+  int clk_now = digitalRead(clk_pin);
+  bool rising = (clk_prev == LOW && clk_now == HIGH);
+  clk_prev = clk_now;
+  if ((flags & (FLAG_INTERNAL | FLAG_MIRROR)) == (FLAG_INTERNAL | FLAG_MIRROR)) digitalWrite(13, clk_now);
+
+  const uint8_t *pc = prog + HEADER_SIZE;
+  for (;;) {
+    uint8_t d, n, v;
+    switch (*pc++) {
+      case OP_IN:    slot[pc[0]] = (digitalRead(pc[1]) == HIGH) ? 1 : 0; pc += 2; break;
+      case OP_OUT:   digitalWrite(pc[1], slot[pc[0]] ? HIGH : LOW); pc += 2; break;
+      case OP_MOV:   slot[pc[0]] = slot[pc[1]]; pc += 2; break;
+      case OP_CONST: slot[pc[0]] = pc[1]; pc += 2; break;
+      case OP_NOT:   slot[pc[0]] = !slot[pc[1]]; pc += 2; break;
+      case OP_AND:
+        d = *pc++; n = *pc++; v = 1;
+        while (n--) v &= slot[*pc++];
+        slot[d] = v;
+        break;
+      case OP_OR:
+        d = *pc++; n = *pc++; v = 0;
+        while (n--) v |= slot[*pc++];
+        slot[d] = v;
+        break;
+      case OP_XOR:
+        d = *pc++; n = *pc++; v = 0;
+        while (n--) v ^= slot[*pc++];
+        slot[d] = v;
+        break;
+      case OP_LATCH:
+        n = *pc++;
+        if (rising) {
+          while (n--) { slot[pc[0]] = slot[pc[1]]; pc += 2; }
+        } else {
+          pc += 2 * n;
+        }
+        break;
+      default:
+        return;   // OP_END
+    }
+  }
+}
+
+static void print_hex(uint8_t b) {
+  const char *digits = "0123456789abcdef";
+  Serial.write(digits[b >> 4]);
+  Serial.write(digits[b & 15]);
+}
+
+static void drain() {
+  unsigned long t0 = millis();
+  while (millis() - t0 < LOAD_TIMEOUT_MS) {
+    if (Serial.available()) {
+      Serial.read();
+      t0 = millis();
+    }
+  }
+}
+
+static void load_failed(uint8_t code) {
+  drain();
+  Serial.print('E');
+  Serial.println(code);
+  load_from_eeprom();   // back to the last stored program, if any
+}
+
+static void cmd_load() {
+  uint8_t buf[2];
+  prog_len = 0;         // stop the running program while its buffer is replaced
+  persist_i = -1;
+  if (Serial.readBytes(buf, 2) != 2) return load_failed(1);
+  uint16_t len = buf[0] | (buf[1] << 8);
+  if (len > PROG_MAX) return load_failed(2);
+  if (Serial.readBytes(prog, len) != len || Serial.readBytes(buf, 2) != 2) return load_failed(1);
+  uint16_t crc = buf[0] | (buf[1] << 8);
+  if (crc16(prog, len) != crc) return load_failed(3);
+  if (!check_program(len, false)) return load_failed(4);
+  prog_crc = crc;
+  start_program(len);
+  persist_i = 0;
+  Serial.println('K');
+}
+
+static void handle_command(int cmd) {
+  if (cmd == 'V') {
+    Serial.print(F("SEQVM:"));
+    Serial.print(VM_VERSION);
+    Serial.print(' ');
+    Serial.println(PROG_MAX);
+  } else if (cmd == 'L') {
+    cmd_load();
+  } else if (cmd == 0x05) {
+    Serial.print(F("SEQID:"));
+    for (uint8_t i = 0; i < 8; i++) print_hex(prog_len ? prog[10 + i] : 0);
+    Serial.println();
+  } else if (cmd == 'B') {
+    unsigned long t0 = micros();
+    if (prog_len) {
+      for (uint16_t i = 0; i < 1000; i++) run_program();
+    }
+    Serial.print(F("T:"));
+    Serial.println(micros() - t0);
+  }
+}
+
+void setup() {
+  Serial.begin(115200);
+  Serial.setTimeout(LOAD_TIMEOUT_MS);
+  load_from_eeprom();
+}
+
+void loop() {
+  if (Serial.available() > 0) handle_command(Serial.read());
+  if (prog_len) run_program();
+  persist_step();
+}
+""".replace("__VERSION__", str(VERSION)).replace(
+    "__PROGRAM_MAX__", str(PROGRAM_MAX)).replace("__HEADER_SIZE__", str(_HEADER.size))
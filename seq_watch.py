@@ -0,0 +1,367 @@
+# seq_watch.py - file watching and cancellable background rebuilds.
+#
+# Watch mode re-checks and regenerates a design whenever its .seq file (or
+# one of its INCLUDEd files) is saved from an external editor. On Linux the
+# directories holding the files are watched with inotify (through ctypes, no
+# extra package); elsewhere, or when inotify is unavailable, the files are
+# polled for mtime / size changes. Editors often save in several steps
+# (truncate + write, or write a temp file + rename), so events are collected
+# until the files have been quiet for the debounce interval.
+#
+# Rebuilds run on one worker thread (LatestJob). Submitting a new rebuild
+# cancels the one in flight - its arduino-cli process group is killed - and
+# replaces any rebuild still waiting, so a burst of saves costs one build.
+
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+# inotify constants (<sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (then the name)
+
+
+class WatchUnavailable(Exception):
+    """Raised when inotify cannot be used (not Linux, no libc, limits reached)."""
+
+
+def _norm(paths):
+    return {os.path.abspath(p) for p in paths}
+
+
+class InotifyWatcher:
+    """
+    Watches the directories of `paths` with inotify and reports events on
+    the watched files only (so saves by rename are seen too).
+    """
+
+    name = "inotify"
+
+    def __init__(self, paths):
+        if not sys.platform.startswith("linux"):
+            raise WatchUnavailable("inotify is Linux only")
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            self._libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise WatchUnavailable(f"no inotify in libc: {e}") from e
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise WatchUnavailable(os.strerror(ctypes.get_errno()))
+        self._dirs = {}  # directory -> watch descriptor
+        self._wd_dirs = {}  # watch descriptor -> directory
+        self.paths = set()
+        try:
+            self.set_paths(paths)
+        except WatchUnavailable:
+            self.close()
+            raise
+
+    def set_paths(self, paths):
+        """Watch exactly these files (adds / removes directory watches)."""
+        self.paths = _norm(paths)
+        dirs = {os.path.dirname(p) for p in self.paths}
+        for d in set(self._dirs) - dirs:
+            self._libc.inotify_rm_watch(self.fd, self._dirs.pop(d))
+        for d in dirs - set(self._dirs):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), _WATCH_MASK)
+            if wd < 0:
+                raise WatchUnavailable(f"cannot watch {d}: {os.strerror(ctypes.get_errno())}")
+            self._dirs[d] = wd
+            self._wd_dirs[wd] = d
+
+    def wait(self, timeout: float):
+        """Block up to `timeout` seconds; return the set of watched files that changed."""
+        changed = set()
+        deadline = time.monotonic() + timeout
+        while not changed:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], left)
+            if not ready:
+                break
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            pos = 0
+            while pos + _EVENT.size <= len(buf):
+                wd, mask, _, length = _EVENT.unpack_from(buf, pos)
+                name = buf[pos + _EVENT.size:pos + _EVENT.size + length].split(b"\0", 1)[0]
+                pos += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed |= self.paths
+                    continue
+                d = self._wd_dirs.get(wd)
+                if d is not None and name:
+                    path = os.path.join(d, os.fsdecode(name))
+                    if path in self.paths:
+                        changed.add(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Stats the files every `interval` seconds and reports mtime / size changes."""
+
+    name = "polling"
+
+    def __init__(self, paths, interval: float = 0.25):
+        self.interval = interval
+        self._stamps = {}
+        self.set_paths(paths)
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def set_paths(self, paths):
+        self.paths = _norm(paths)
+        self._stamps = {p: self._stamps.get(p, self._stamp(p)) for p in self.paths}
+
+    def wait(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, old in self._stamps.items():
+                new = self._stamp(path)
+                if new != old:
+                    self._stamps[path] = new
+                    changed.add(path)
+            left = deadline - time.monotonic()
+            if changed or left <= 0:
+                return changed
+            time.sleep(min(self.interval, left))
+
+    def close(self):
+        pass
+
+
+def open_watcher(paths, use_inotify: bool = True):
+    """Return (watcher, note): inotify when possible, else polling with the reason."""
+    if use_inotify:
+        try:
+            return InotifyWatcher(paths), None
+        except WatchUnavailable as e:
+            return PollingWatcher(paths), f"inotify unavailable ({e}); polling for changes."
+    return PollingWatcher(paths), None
+
+
+class FileWatch:
+    """
+    Background thread calling on_change(changed_paths) once a burst of
+    changes to `paths` has been quiet for `debounce` seconds. on_change runs
+    on the watch thread. set_paths() never blocks: the watch thread picks the
+    new paths up between two waits (within 0.2 s, or `debounce` during a burst).
+    """
+
+    def __init__(self, paths, on_change, debounce: float = 0.3, use_inotify: bool = True):
+        self.watcher, self.note = open_watcher(paths, use_inotify)
+        self.on_change = on_change
+        self.debounce = debounce
+        self._wanted = _norm(paths)
+        self._pending = None  # paths set_paths() asked for, not yet applied
+        self._pending_lock = threading.Lock()  # only held to swap _pending
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="seq-watch", daemon=True)
+        self._thread.start()
+
+    @property
+    def paths(self):
+        return set(self._wanted)
+
+    def set_paths(self, paths):
+        """Change the watched files (e.g. after an INCLUDE was added)."""
+        paths = _norm(paths)
+        if paths == self._wanted:
+            return
+        self._wanted = paths
+        with self._pending_lock:
+            self._pending = paths
+
+    def _apply_pending(self):
+        """Watch thread: switch to the paths of the last set_paths() call."""
+        with self._pending_lock:
+            paths, self._pending = self._pending, None
+        if paths is None:
+            return
+        try:
+            self.watcher.set_paths(paths)
+        except WatchUnavailable:
+            old = self.watcher
+            self.watcher = PollingWatcher(paths)
+            self.note = "inotify watch limit reached; polling for changes."
+            old.close()
+
+    def _wait(self, timeout):
+        self._apply_pending()
+        return self.watcher.wait(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            changed = self._wait(0.2)
+            if not changed:
+                continue
+            # Coalesce: keep collecting until quiet for the debounce interval
+            while not self._stop.is_set():
+                more = self._wait(self.debounce)
+                if not more:
+                    break
+                changed |= more
+            if not self._stop.is_set():
+                self.on_change(changed)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.watcher.close()
+
+
+# =========================
+# Cancellable background jobs
+# =========================
+class JobCancelled(Exception):
+    """Raised inside a job once a newer job replaced it."""
+
+
+class Job:
+    """
+    Cancellation token handed to each LatestJob task. run() has the runner
+    signature of seq_arduino.SubprocessBackend, so a backend built with
+    `runner=job.run` has its arduino-cli process killed on cancel().
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._proc = None
+
+    def check(self):
+        """Raise JobCancelled if the job was cancelled."""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._lock:
+            proc = self._proc
+        if proc is not None and proc.poll() is None:
+            try:
+                if os.name == "posix":
+                    os.killpg(proc.pid, signal.SIGKILL)  # arduino-cli and its compilers
+                else:
+                    proc.kill()
+            except OSError:
+                pass
+
+    def run(self, cmd, name, capture_output=False, text=False, check=False, **kwargs):
+        """subprocess.run() replacement that cancel() can interrupt."""
+        self.check()
+        if capture_output:
+            kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+        with self._lock:
+            self.check()  # cancel() may have run since the check above
+            self._proc = subprocess.Popen(cmd, text=text, start_new_session=(os.name == "posix"),
+                                          **kwargs)
+            proc = self._proc
+        try:
+            out, err = proc.communicate()
+        finally:
+            with self._lock:
+                self._proc = None
+        self.check()
+        return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+
+class LatestJob:
+    """
+    One worker thread running task(job) for the most recently submitted task
+    only: submit() cancels the running task and drops any waiting one.
+    """
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error  # called with unexpected exceptions from tasks
+        self._cond = threading.Condition()
+        self._pending = None
+        self._current = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="seq-rebuild", daemon=True)
+        self._thread.start()
+
+    def submit(self, task):
+        with self._cond:
+            if self._current is not None:
+                self._current.cancel()
+            self._pending = task
+            self._cond.notify_all()
+
+    def cancel(self, wait: bool = True, timeout: float = 10.0):
+        """Cancel the running and waiting tasks; with wait, until the worker is idle."""
+        with self._cond:
+            self._pending = None
+            if self._current is not None:
+                self._current.cancel()
+            if wait:
+                self._cond.wait_for(lambda: self._current is None, timeout)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until no task is running or waiting; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._current is None and self._pending is None, timeout)
+
+    @property
+    def busy(self) -> bool:
+        with self._cond:
+            return self._current is not None or self._pending is not None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                task, self._pending = self._pending, None
+                job = self._current = Job()
+            try:
+                task(job)
+            except JobCancelled:
+                pass
+            except Exception as e:  # keep the worker alive
+                if self.on_error is not None:
+                    self.on_error(e)
+            finally:
+                with self._cond:
+                    self._current = None
+                    self._cond.notify_all()
+
+    def close(self):
+        self.cancel(wait=False)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
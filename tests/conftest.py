@@ -0,0 +1,6 @@
+# The seq_* modules live at the repository root; make them importable when
+# pytest is started from anywhere.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,129 @@
+# Tests for seq_arduino: DaemonBackend against a fake gRPC client, and the
+# fallbacks to SubprocessBackend.
+
+import os
+import stat
+import subprocess
+import time
+
+import pytest
+
+import seq_arduino
+from seq_arduino import DaemonBackend, DaemonUnavailable, SubprocessBackend, open_backend
+
+
+class FakeClient:
+    """Stands in for GrpcClient; compile/upload stream progress before returning."""
+
+    def __init__(self, fail=None):
+        self.fail = fail  # method name that raises DaemonUnavailable
+        self.calls = []
+        self.closed = False
+
+    def _enter(self, name):
+        self.calls.append(name)
+        if name == self.fail:
+            raise DaemonUnavailable("connection reset")
+
+    def board_list(self):
+        self._enter("board_list")
+        return {"detected_ports": [{"port": {"address": "/dev/ttyACM0"}}]}
+
+    def compile(self, fqbn, sketch_dir, progress, build_path, json_output):
+        self._enter("compile")
+        for pct in (25, 50, 100):
+            if progress:
+                progress(f"Compiling {pct}%", "info")
+        return 0, "Sketch uses 924 bytes\n", ""
+
+    def upload(self, port, fqbn, sketch_dir, progress, build_path):
+        self._enter("upload")
+        if progress:
+            progress("Uploading...", "info")
+        return 0, "", "avrdude done.\n"
+
+    def close(self):
+        self.closed = True
+
+
+class Runner:
+    """Records SubprocessBackend commands instead of running them."""
+
+    def __init__(self):
+        self.cmds = []
+
+    def __call__(self, cmd, name, **kwargs):
+        self.cmds.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, "from subprocess", "")
+
+
+def test_daemon_streams_progress():
+    client = FakeClient()
+    backend = DaemonBackend(client, SubprocessBackend("arduino-cli", Runner()))
+    seen = []
+    res = backend.compile("arduino:avr:uno", "/tmp/sketch", lambda msg, lvl: seen.append(msg))
+    assert res.returncode == 0
+    assert res.stdout == "Sketch uses 924 bytes\n"
+    assert seen == ["Compiling 25%", "Compiling 50%", "Compiling 100%"]
+    res = backend.upload("/dev/ttyACM0", "arduino:avr:uno", "/tmp/sketch", lambda m, l: seen.append(m))
+    assert res.stderr == "avrdude done.\n"
+    assert seen[-1] == "Uploading..."
+    assert backend.note is None
+
+
+def test_daemon_board_list_is_cli_json():
+    backend = DaemonBackend(FakeClient(), SubprocessBackend("arduino-cli", Runner()))
+    res = backend.board_list()
+    assert "/dev/ttyACM0" in res.stdout
+
+
+def test_client_error_falls_back_to_subprocess():
+    client = FakeClient(fail="compile")
+    runner = Runner()
+    backend = DaemonBackend(client, SubprocessBackend("arduino-cli", runner))
+    res = backend.compile("arduino:avr:uno", "/tmp/sketch")
+    assert res.stdout == "from subprocess"
+    assert runner.cmds == [["arduino-cli", "compile", "--fqbn", "arduino:avr:uno", "/tmp/sketch"]]
+    assert "daemon lost" in backend.note
+    assert client.closed and backend.client is None
+    # later calls go straight to the subprocess backend
+    backend.upload("/dev/ttyACM0", "arduino:avr:uno", "/tmp/sketch")
+    assert client.calls == ["compile"]
+    assert runner.cmds[-1][:2] == ["arduino-cli", "upload"]
+
+
+def test_missing_cli_falls_back():
+    runner = Runner()
+    backend, note = open_backend(True, runner, cli="/nonexistent/arduino-cli",
+                                 connect=lambda addr, timeout: FakeClient())
+    assert isinstance(backend, SubprocessBackend)
+    assert "unavailable" in note
+    backend.board_list()
+    assert runner.cmds[0][0] == "/nonexistent/arduino-cli"
+
+
+def test_without_grpc_falls_back(monkeypatch):
+    monkeypatch.setattr(seq_arduino, "grpc", None)
+    backend, note = open_backend(True, Runner())
+    assert isinstance(backend, SubprocessBackend)
+    assert "not installed" in note
+
+
+def test_connect_failure_reaps_daemon(tmp_path):
+    pidfile = tmp_path / "pid"
+    cli = tmp_path / "arduino-cli"
+    cli.write_text(f"#!/bin/sh\necho $$ > {pidfile}\nexec sleep 60\n")
+    cli.chmod(cli.stat().st_mode | stat.S_IXUSR)
+
+    def connect(addr, timeout):
+        deadline = time.monotonic() + 5
+        while not pidfile.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        raise DaemonUnavailable(f"no answer on {addr}")
+
+    backend, note = open_backend(True, Runner(), cli=str(cli), connect=connect)
+    assert isinstance(backend, SubprocessBackend)
+    assert "no answer" in note
+    pid = int(pidfile.read_text())
+    with pytest.raises(ProcessLookupError):  # terminated and waited for, not a zombie
+        os.kill(pid, 0)
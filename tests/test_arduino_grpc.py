@@ -0,0 +1,206 @@
+# Tests for seq_arduino.GrpcClient against an in-process gRPC server that
+# implements the ArduinoCoreService calls the editor uses. Skipped unless
+# grpcio and the arduino-cli Python stubs are installed.
+
+import os
+import subprocess
+import sys
+from concurrent import futures
+
+import pytest
+
+import seq_arduino
+from seq_arduino import DaemonBackend, DaemonUnavailable, GrpcClient, SubprocessBackend
+
+if seq_arduino.grpc is None:
+    pytest.skip("grpcio or the arduino-cli gRPC stubs are not installed", allow_module_level=True)
+
+import grpc
+from cc.arduino.cli.commands.v1 import (
+    board_pb2,
+    commands_pb2,
+    commands_pb2_grpc,
+    common_pb2,
+    compile_pb2,
+    port_pb2,
+    upload_pb2,
+)
+
+
+class FakeDaemon(commands_pb2_grpc.ArduinoCoreServiceServicer):
+    """The subset of `arduino-cli daemon` used by GrpcClient; records requests."""
+
+    def __init__(self, abort=None):
+        self.abort = abort  # method name that aborts with UNAVAILABLE
+        self.requests = []
+        self.destroyed = False
+
+    def _enter(self, name, request, context):
+        self.requests.append((name, request))
+        if name == self.abort:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "daemon shutting down")
+
+    def Create(self, request, context):
+        self._enter("Create", request, context)
+        return commands_pb2.CreateResponse(instance=common_pb2.Instance(id=7))
+
+    def Init(self, request, context):
+        self._enter("Init", request, context)
+        yield commands_pb2.InitResponse()
+
+    def Destroy(self, request, context):
+        self._enter("Destroy", request, context)
+        self.destroyed = True
+        return commands_pb2.DestroyResponse()
+
+    def BoardList(self, request, context):
+        self._enter("BoardList", request, context)
+        port = port_pb2.Port(address="/dev/ttyACM0", label="/dev/ttyACM0",
+                             protocol="serial", protocol_label="Serial Port (USB)")
+        board = board_pb2.BoardListItem(name="Arduino Uno", fqbn="arduino:avr:uno")
+        return board_pb2.BoardListResponse(ports=[board_pb2.DetectedPort(port=port, matching_boards=[board])])
+
+    def Compile(self, request, context):
+        self._enter("Compile", request, context)
+        for pct in (25.0, 25.0, 100.0):  # the repeated step is reported once
+            yield compile_pb2.CompileResponse(
+                progress=common_pb2.TaskProgress(name="Compiling sketch", percent=pct))
+        yield compile_pb2.CompileResponse(out_stream=b"Sketch uses 924 bytes\n")
+        yield compile_pb2.CompileResponse(err_stream=b"warning: unused variable\n")
+        if request.fqbn == "bad:avr:uno":
+            context.abort(grpc.StatusCode.NOT_FOUND, "platform not installed")
+        size = compile_pb2.ExecutableSectionSize(name="text", size=924, max_size=32256)
+        yield compile_pb2.CompileResponse(
+            result=compile_pb2.BuilderResult(executable_sections_size=[size]))
+
+    def Upload(self, request, context):
+        self._enter("Upload", request, context)
+        yield upload_pb2.UploadResponse(err_stream=b"avrdude done.\n")
+
+
+def serve(daemon, address="127.0.0.1:0"):
+    """Start `daemon` on address; returns (server, port)."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    commands_pb2_grpc.add_ArduinoCoreServiceServicer_to_server(daemon, server)
+    port = server.add_insecure_port(address)
+    server.start()
+    return server, port
+
+
+@pytest.fixture
+def daemon():
+    daemon = FakeDaemon()
+    server, port = serve(daemon)
+    daemon.address = f"127.0.0.1:{port}"
+    yield daemon
+    server.stop(None)
+
+
+def test_session_create_and_destroy(daemon):
+    client = GrpcClient(daemon.address, timeout=5)
+    assert [name for name, _ in daemon.requests] == ["Create", "Init"]
+    assert daemon.requests[1][1].instance.id == 7
+    client.close()
+    assert daemon.destroyed
+
+
+def test_compile_streams_progress_and_output(daemon):
+    client = GrpcClient(daemon.address, timeout=5)
+    seen = []
+    code, out, err = client.compile("arduino:avr:uno", "/tmp/sketch",
+                                    lambda msg, lvl: seen.append((msg, lvl)), "/tmp/build")
+    assert (code, out, err) == (0, "Sketch uses 924 bytes\n", "warning: unused variable\n")
+    assert seen == [("Compiling sketch 25%", "debug"), ("Compiling sketch 100%", "debug")]
+    req = daemon.requests[-1][1]
+    assert (req.instance.id, req.fqbn, req.sketch_path, req.build_path) == \
+        (7, "arduino:avr:uno", "/tmp/sketch", "/tmp/build")
+    client.close()
+
+
+def test_compile_json_output_has_section_sizes(daemon):
+    client = GrpcClient(daemon.address, timeout=5)
+    code, out, _ = client.compile("arduino:avr:uno", "/tmp/sketch", json_output=True)
+    doc = seq_arduino.json.loads(out)
+    assert code == 0 and doc["success"]
+    assert doc["builder_result"]["executable_sections_size"] == \
+        [{"name": "text", "size": 924, "max_size": 32256}]
+    assert doc["compiler_out"] == "Sketch uses 924 bytes\n"
+    client.close()
+
+
+def test_compile_error_status_is_a_failed_build(daemon):
+    client = GrpcClient(daemon.address, timeout=5)
+    code, out, err = client.compile("bad:avr:uno", "/tmp/sketch")
+    assert code == 1
+    assert out == "Sketch uses 924 bytes\n"
+    assert err.endswith("platform not installed")
+    client.close()
+
+
+def test_upload_request_and_output(daemon):
+    client = GrpcClient(daemon.address, timeout=5)
+    assert client.upload("/dev/ttyACM0", "arduino:avr:uno", "/tmp/sketch", None, "/tmp/build") == \
+        (0, "", "avrdude done.\n")
+    req = daemon.requests[-1][1]
+    assert (req.port.address, req.port.protocol, req.import_dir) == ("/dev/ttyACM0", "serial", "/tmp/build")
+    client.close()
+
+
+def test_board_list_is_cli_json(daemon):
+    backend = DaemonBackend(GrpcClient(daemon.address, timeout=5), SubprocessBackend())
+    data = seq_arduino.json.loads(backend.board_list().stdout)
+    assert data == {"detected_ports": [{
+        "port": {"address": "/dev/ttyACM0", "label": "/dev/ttyACM0",
+                 "protocol": "serial", "protocol_label": "Serial Port (USB)"},
+        "matching_boards": [{"name": "Arduino Uno", "fqbn": "arduino:avr:uno"}],
+    }]}
+    backend.close()
+
+
+def test_unavailable_daemon_falls_back_to_subprocess():
+    daemon = FakeDaemon(abort="Compile")
+    server, port = serve(daemon)
+    cmds = []
+
+    def runner(cmd, name, **kwargs):
+        cmds.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, "from subprocess", "")
+
+    backend = DaemonBackend(GrpcClient(f"127.0.0.1:{port}", timeout=5), SubprocessBackend("arduino-cli", runner))
+    res = backend.compile("arduino:avr:uno", "/tmp/sketch")
+    assert res.stdout == "from subprocess"
+    assert "daemon lost" in backend.note and "shutting down" in backend.note
+    assert backend.client is None and daemon.destroyed
+    server.stop(None)
+
+
+def test_no_daemon_is_unavailable():
+    server, port = serve(FakeDaemon())
+    server.stop(None)  # nothing listens on the port any more
+    with pytest.raises(DaemonUnavailable):
+        GrpcClient(f"127.0.0.1:{port}", timeout=0.5)
+
+
+def test_start_spawns_daemon_and_connects(tmp_path):
+    # A stand-in `arduino-cli` whose `daemon --port N` subcommand serves FakeDaemon.
+    tests = os.path.dirname(os.path.abspath(__file__))
+    cli = tmp_path / "arduino-cli"
+    cli.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, threading\n"
+        f"sys.path[:0] = {[tests, os.path.dirname(tests)] + sys.path!r}\n"
+        "from test_arduino_grpc import FakeDaemon, serve\n"
+        "assert sys.argv[1:3] == ['daemon', '--port']\n"
+        "server, _ = serve(FakeDaemon(), '127.0.0.1:' + sys.argv[3])\n"
+        "threading.Event().wait()\n"
+    )
+    cli.chmod(0o755)
+    backend = DaemonBackend.start(SubprocessBackend(str(cli)), cli=str(cli), timeout=10)
+    try:
+        assert isinstance(backend.client, GrpcClient)
+        assert backend.compile("arduino:avr:uno", "/tmp/sketch").stdout == "Sketch uses 924 bytes\n"
+        assert backend.note is None
+        proc = backend.proc
+    finally:
+        backend.close()
+    assert proc.returncode is not None
@@ -0,0 +1,48 @@
+# Tests for seq_build: per-board, per-sketch build directories.
+
+import os
+
+from seq_build import build_path_for, clean_build_dirs
+
+
+def test_build_path_depends_on_board_and_sketch(tmp_path):
+    root = str(tmp_path)
+    a = build_path_for("arduino:avr:uno", root, "/work/a/seq_sketch")
+    assert a == build_path_for("arduino:avr:uno", root, "/work/a/seq_sketch")
+    assert a != build_path_for("arduino:avr:uno", root, "/work/b/seq_sketch")
+    assert a != build_path_for("arduino:avr:mega", root, "/work/a/seq_sketch")
+    assert os.path.basename(a).startswith("arduino_avr_uno-")
+
+
+def test_clean_removes_every_sketch_of_one_board(tmp_path):
+    root = str(tmp_path)
+    uno = [build_path_for("arduino:avr:uno", root, d) for d in ("/a", "/b")]
+    mega = build_path_for("arduino:avr:mega", root, "/a")
+    for path in uno + [mega]:
+        os.makedirs(path)
+        with open(os.path.join(path, "core.a"), "wb") as f:
+            f.write(b"x" * 10)
+    assert clean_build_dirs(root, "arduino:avr:uno") == 20
+    assert sorted(os.listdir(root)) == [os.path.basename(mega)]
+
+
+def test_concurrent_records_are_all_kept(tmp_path):
+    import threading
+
+    from seq_build import CompileTimes
+    from seq_size import FirmwareSize, SizeHistory
+
+    root = str(tmp_path)
+
+    def work(i):
+        CompileTimes(root).record(f"board:{i}", i % 2 == 0, 1.0 + i)
+        SizeHistory(root).record(f"design{i}", {}, FirmwareSize(1000 + i, 100))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(CompileTimes(root).data) == 16
+    history = SizeHistory(root)
+    assert history.data["builds"] == 16 and len(history.data["entries"]) == 16
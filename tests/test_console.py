@@ -0,0 +1,56 @@
+# Tests for seq_console.LogConsole search highlighting, on a stand-in for the
+# Tk text widget.
+
+from seq_console import LogConsole
+
+
+class FakeText:
+    """Records the 'match' tag ranges; other Text calls are accepted and ignored."""
+
+    def __init__(self):
+        self.matches = []
+
+    def tag_add(self, tag, start, end):
+        if tag == "match":
+            self.matches.append((start, end))
+
+    def tag_remove(self, tag, start, end):
+        if tag == "match":
+            self.matches = []
+
+    def tag_config(self, *args, **kwargs):
+        pass
+
+    def after(self, ms, fn):
+        pass
+
+    def insert(self, *args):
+        pass
+
+    def delete(self, *args):
+        pass
+
+    def see(self, index):
+        pass
+
+
+def test_match_columns_with_unicode_case():
+    widget = FakeText()
+    console = LogConsole(widget)
+    # 'İ'.lower() is two characters, which used to shift every later match
+    console.log("İstanbul: pin undefined, UNDEFINED again")
+    assert console.search("undefined") == 2
+    assert widget.matches == [("1.14", "1.23"), ("1.25", "1.34")]
+
+
+def test_trimmed_lines_take_their_matches_along():
+    widget = FakeText()
+    console = LogConsole(widget, max_lines=3)
+    for line in ("İİ Error one", "error two ERROR", "fine"):
+        console.log(line)
+    assert console.search("error") == 3
+    console.log("last error")
+    console.log("done")
+    console.flush()
+    assert console.text() == "fine\nlast error\ndone"
+    assert console._matches == 1
@@ -0,0 +1,79 @@
+# Tests for seq_coverage: per-lane state codes, capped tables and the
+# collector's fast path.
+
+import random
+
+from seq_coverage import (
+    CoverageCollector,
+    CoverageDB,
+    coverage_report,
+    lane_counts,
+    partition_counts,
+    state_codes,
+)
+from seq_design import parse_design
+from seq_sim import BitParallelModel
+
+
+def test_state_codes_match_partition():
+    rng = random.Random(1)
+    for k in (1, 7, 8, 9, 16, 33, 64, 65, 130):
+        width = 300
+        bits = [rng.getrandbits(width + 5) for _ in range(k)]  # bits past width are ignored
+        codes = state_codes(bits, width)
+        assert len(codes) == width
+        assert codes[5] == sum(((b >> 5) & 1) << j for j, b in enumerate(bits))
+        mask = (1 << width) - 1
+        assert dict(lane_counts(bits, mask)) == partition_counts(bits, mask)
+
+
+def test_tables_are_capped():
+    db = CoverageDB([], ["Q0", "Q1", "Q2", "Q3"], max_entries=3)
+    db.add_state_codes([0, 1, 2, 3, 3, 0], prev_codes=[0, 0, 0, 0, 1, 2])
+    assert len(db.states) == 3 and db.dropped[0] == 2  # both samples of state 3
+    assert db.states[0] == 2 and db.samples == 6
+    assert len(db.transitions) == 3 and db.dropped[1] == 3
+    db.add_state_codes([0, 2])  # existing keys are still counted when full
+    assert db.states[0] == 3 and db.states[2] == 2 and db.dropped[0] == 2
+    again = CoverageDB.from_dict(db.to_dict())
+    assert again.dropped == db.dropped and again.states == db.states
+
+
+def _collect(text, lanes, cycles, **kwargs):
+    design, err = parse_design(text)
+    assert err is None
+    model = BitParallelModel(design, probe=True)
+    collector = CoverageCollector(model, **kwargs)
+    rng = random.Random(3)
+    mask = (1 << lanes) - 1
+    state = [0] * len(model.registers)
+    for _ in range(cycles):
+        ins = [rng.getrandbits(lanes) for _ in model.inputs]
+        _, nxt, probes = model.step(mask, *ins, *state)
+        collector.sample(mask, ins, state, probes)
+        state = list(nxt)
+    return collector.db
+
+
+def _shift_register(n):
+    text = "pin I = 2\npin Y = 9\nQ0.D = I\n"
+    text += "".join(f"Q{i}.D = Q{i - 1}\n" for i in range(1, n))
+    return text + f"Y = Q{n - 1}\n"
+
+
+def test_wide_design_transitions():
+    db = _collect(_shift_register(10), lanes=256, cycles=12)  # every lane by default
+    assert db.samples == 256 * 12 and db.unsampled == 0
+    assert sum(db.states.values()) == db.samples
+    assert sum(db.transitions.values()) == 256 * 11
+    for s, t in db.transitions:  # a shift register moves every bit up by one
+        assert t >> 1 == s & 0x1FF
+
+
+def test_state_lanes_bound_state_samples():
+    db = _collect(_shift_register(10), lanes=256, cycles=12, state_lanes=64)
+    assert db.samples == 64 * 12
+    assert db.unsampled == 192 * 12
+    assert db.toggles["I"][0] > 64  # toggles still use every lane
+    assert any("sampled from 768 of 3,072 lane-cycles" in line for line in coverage_report(db))
+    assert CoverageDB.from_dict(db.to_dict()).unsampled == db.unsampled
@@ -0,0 +1,22 @@
+# Tests for seq_design: the checker's operand rules.
+
+import pytest
+
+from seq_design import parse_design
+
+
+@pytest.mark.parametrize("rhs, message", [
+    ("and", "Line 3: AND requires arguments, e.g. AND(a, b)"),
+    ("OR(A, Xor)", "Line 3: XOR requires arguments, e.g. XOR(a, b)"),
+    ("AND(A, not)", "Line 3: NOT requires arguments, e.g. NOT(a)"),
+])
+def test_bare_keyword_operand_is_an_error(rhs, message):
+    design, err = parse_design(f"pin A = 2\npin Y = 9\nY = {rhs}\n")
+    assert design is None
+    assert err == message
+
+
+def test_keyword_calls_in_any_case():
+    design, err = parse_design("pin A = 2\npin B = 3\npin Y = 9\nY = or(A, Not(B))\n")
+    assert err is None
+    assert design.comb_eqs == [("Y", ("OR", ("VAR", "A"), ("NOT", ("VAR", "B"))), 4)]
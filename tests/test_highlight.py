@@ -0,0 +1,74 @@
+# Tests for seq_highlight: line scanning and name classification, without Tk.
+
+import pytest
+
+from seq_highlight import SymbolIndex, scan_line
+
+
+@pytest.mark.parametrize("line, spans", [
+    ("PIN A = 2", (("seq_keyword", 0, 3), ("seq_pin", 4, 5))),
+    ("Y = AND(A, xor)", (("seq_keyword", 4, 7), ("seq_error", 11, 14))),  # bare keyword
+    ("Y = AND(A, B", (("seq_keyword", 4, 7), ("seq_error", 11, 12))),    # missing ")"
+    ("Z = ", (("seq_error", 0, 3),)),
+])
+def test_scan_line_spans(line, spans):
+    assert scan_line(line).spans == spans
+
+
+def test_scan_line_uses_and_defines():
+    scan = scan_line("Q0.D = OR(A, n1)")
+    assert [u[0] for u in scan.uses] == ["A", "n1"]
+    assert scan.defines == (("Q0", "reg"),)
+    assert scan_line("INST t1 = counter(A)").defines == (("t1", "inst"),)
+    assert scan_line("Y = NOT(ghost)").uses == (("Y", 0, 1), ("ghost", 8, 13))
+
+
+def _index(lines):
+    index = SymbolIndex()
+    index.splice(0, 1, len(lines))
+    for i, text in enumerate(lines):
+        index.set_line(i, text)
+    index.commit()
+    return index
+
+
+DESIGN = [
+    "PIN A = 2",
+    "PIN Y = 13",
+    "Q0.D = NOT(Q0)",
+    "INST t1 = counter(A)",
+    "n1 = AND(A, Q0)",
+    "Y = OR(n1, t1_Qt, t2_Qt, ghost)",
+]
+
+
+def test_classify_names():
+    index = _index(DESIGN)
+    assert index.classify("A") == "seq_pin"
+    assert index.classify("Q0") == "seq_register"
+    assert index.classify("n1") is None
+    assert index.classify("t1_Qt") is None  # defined by INST t1
+    assert index.classify("t2_Qt") == "seq_undefined"
+    assert index.classify("ghost") == "seq_undefined"
+
+
+def test_undefined_only_once_every_line_is_scanned():
+    index = SymbolIndex()
+    index.splice(0, 1, len(DESIGN))
+    for i in range(len(DESIGN) - 1):
+        index.set_line(i, DESIGN[i])
+    index.commit()
+    assert index.classify("ghost") is None  # the last line might define it
+    index.set_line(len(DESIGN) - 1, DESIGN[-1])
+    assert index.commit()
+    assert index.classify("ghost") == "seq_undefined"
+
+
+def test_removing_a_definition_bumps_generation():
+    index = _index(DESIGN)
+    generation = index.generation
+    index.splice(3, 1, 1)  # retype the INST line
+    index.set_line(3, "# gone")
+    assert index.commit()
+    assert index.generation > generation
+    assert index.classify("t1_Qt") == "seq_undefined"
@@ -0,0 +1,52 @@
+# Tests for seq_ident.query_build_id against the pty stand-in board.
+
+import os
+import pty
+import tty
+
+import pytest
+
+from seq_design import parse_design
+from seq_ident import query_build_id
+from seq_vm import StandInBoard, compile_program, download
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="needs a pseudo-terminal")
+
+CLOCK = {"use_internal": 1, "clk_pin": 4, "freq_hz": 2, "mirror": 1}
+
+
+def _program(text):
+    design, err = parse_design(text)
+    assert err is None
+    return compile_program(design, CLOCK)
+
+
+def test_matching_build_id():
+    program = _program("pin A = 2\npin Y = 9\nY = NOT(A)\n")
+    with StandInBoard() as board:
+        _, err = download(board.port, program)
+        assert err is None
+        assert query_build_id(board.port) == (program.build_id, None)
+
+
+def test_different_build_id():
+    flashed = _program("pin A = 2\npin Y = 9\nY = NOT(A)\n")
+    wanted = _program("pin A = 2\npin Y = 9\nY = A\n")
+    assert flashed.build_id != wanted.build_id
+    with StandInBoard() as board:
+        download(board.port, flashed)
+        board_id, err = query_build_id(board.port)
+    assert err is None
+    assert board_id == flashed.build_id != wanted.build_id
+
+
+def test_silent_board_times_out():
+    master, slave = pty.openpty()  # nothing answers on the other end
+    try:
+        tty.setraw(master)
+        board_id, err = query_build_id(os.ttyname(slave), timeout=0.2)
+    finally:
+        os.close(master)
+        os.close(slave)
+    assert board_id is None
+    assert "no build ID answer" in err
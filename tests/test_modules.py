@@ -0,0 +1,43 @@
+# Tests for seq_modules.ModuleCache: the on-disk cache stays under its size cap.
+
+import hashlib
+import os
+
+from seq_modules import ModuleCache
+
+
+def _key(i):
+    return hashlib.sha256(str(i).encode()).hexdigest()
+
+
+def _age(cache, key, seconds_ago):
+    t = os.path.getmtime(cache._path(key)) - seconds_ago
+    os.utime(cache._path(key), (t, t))
+
+
+def test_disk_cache_prunes_least_recently_used(tmp_path):
+    other = tmp_path / "build" / "size_history.json"  # shares the directory with the cache
+    other.parent.mkdir()
+    other.write_text("{}")
+    blob = b"x" * 1000
+    cache = ModuleCache(str(tmp_path), max_bytes=10_000)
+    for i in range(8):
+        cache.put(_key(i), blob)
+        _age(cache, _key(i), 100 - i)  # key 0 is the oldest
+    assert ModuleCache(str(tmp_path)).get(_key(0)) == blob  # a read makes key 0 recent
+
+    for i in range(8, 12):
+        cache.put(_key(i), blob)
+    kept = {i for i in range(12) if os.path.exists(cache._path(_key(i)))}
+    assert sum(os.path.getsize(cache._path(_key(i))) for i in kept) <= 10_000
+    assert 0 in kept and 11 in kept
+    assert 1 not in kept and 2 not in kept  # oldest unread entries went first
+    assert other.exists()
+
+
+def test_prune_to_zero_and_memory_only(tmp_path):
+    cache = ModuleCache(str(tmp_path))
+    cache.put(_key(1), (1, 2, 3))
+    assert cache.prune(0) > 0
+    assert not os.path.exists(cache._path(_key(1)))
+    assert ModuleCache(None).prune(0) == 0
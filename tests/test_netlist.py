@@ -0,0 +1,84 @@
+# Tests for seq_netlist: array-level queries on a netlist loaded from disk, and
+# rejection of damaged files.
+
+import pytest
+
+from seq_design import parse_design
+from seq_fault import generate_tests
+from seq_netlist import OP_CODES, Netlist, NetlistError
+
+TEXT = (
+    "pin A = 2\npin B = 3\npin C = 4\npin Y = 9\n"
+    "n1 = AND(A, B)\nn2 = XOR(n1, Q1)\nunused = OR(C, n1)\n"
+    "Q1.D = n2\nQ2.D = unused\nY = OR(n2, NOT(n1))\n"
+)
+
+
+@pytest.fixture
+def loaded(tmp_path):
+    design, err = parse_design(TEXT)
+    assert err is None
+    path = str(tmp_path / "design.seqn")
+    Netlist.from_design(design).save(path)
+    return design, Netlist.load(path)
+
+
+def test_cone_of_influence_on_arrays(loaded):
+    design, net = loaded
+    assert net.cone_of_influence(["Y"]) == design.cone_of_influence(["Y"]) == {"Y", "n1", "n2", "Q1", "A", "B"}
+    assert net._decoded is None
+
+
+def test_fault_tests_without_decoding(loaded):
+    design, net = loaded
+    from_text = generate_tests(design, max_tests=64, seed=2)
+    from_net = generate_tests(net, max_tests=64, seed=2)
+    assert from_net.tests == from_text.tests
+    assert from_net.unobservable == from_text.unobservable
+    assert {name for name, _ in from_net.unobservable} == {"C", "unused", "Q2"}
+    assert net._decoded is None
+
+
+def _damaged(tmp_path, damage):
+    design, _ = parse_design(TEXT)
+    net = Netlist.from_design(design)
+    damage(net)
+    path = str(tmp_path / "damaged.seqn")
+    net.save(path)
+    return path
+
+
+def _first(net, op):
+    return net.op.index(OP_CODES[op])
+
+
+def _set_arg(net, op, value):
+    net.args[net.start[_first(net, op)]] = value
+
+
+@pytest.mark.parametrize("damage, message", [
+    (lambda net: net.eq_root.__setitem__(0, 10 ** 6), "equation index out of range"),
+    (lambda net: net.eq_lhs.__setitem__(1, len(net.names)), "equation index out of range"),
+    (lambda net: net.eq_kind.__setitem__(0, 7), "equation index out of range"),
+    (lambda net: net.pin_name.__setitem__(0, 99), "pin name index out of range"),
+    (lambda net: net.eq_line.pop(), "equation sections differ in length"),
+    (lambda net: net.start.__setitem__(-1, len(net.args) + 1), "operand offsets"),
+    (lambda net: net.op.__setitem__(0, 9), "unknown opcode"),
+    (lambda net: net.start.__setitem__(1, 0), "wrong operand count"),
+    (lambda net: _set_arg(net, "VAR", len(net.names)), "operand index out of range"),
+    (lambda net: _set_arg(net, "AND", _first(net, "AND")), "operand index out of range"),
+])
+def test_damaged_file_is_rejected(tmp_path, damage, message):
+    path = _damaged(tmp_path, damage)
+    with pytest.raises(NetlistError, match=message):
+        Netlist.load(path)
+    with pytest.raises(NetlistError):
+        Netlist.load(path, use_mmap=False)
+
+
+def test_unchecked_load_skips_only_node_checks(tmp_path):
+    cycle = _damaged(tmp_path, lambda net: _set_arg(net, "AND", _first(net, "AND")))
+    assert Netlist.load(cycle, check=False).node_count > 0
+    bad_root = _damaged(tmp_path, lambda net: net.eq_root.__setitem__(0, 10 ** 6))
+    with pytest.raises(NetlistError):
+        Netlist.load(bad_root, check=False)
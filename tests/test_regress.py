@@ -0,0 +1,28 @@
+# Tests for seq_regress: results must not depend on how lanes are sharded.
+
+from seq_design import parse_design
+from seq_regress import run_regression
+
+NEW = "pin A = 2\npin B = 3\npin Y = 9\npin Z = 10\nQ1.D = XOR(A, Q2)\nQ2.D = AND(Q1, B)\nY = OR(Q1, A)\nZ = Q2\n"
+OLD = NEW.replace("Q2.D = AND(Q1, B)", "Q2.D = OR(Q1, B)")
+
+
+def _run(**kwargs):
+    design, _ = parse_design(NEW)
+    reference, _ = parse_design(OLD)
+    report = run_regression(design, reference, cycles=300, lanes=256, seed=7, shard_words=1,
+                            batch_cycles=64, **kwargs)
+    result = report.to_dict()
+    del result["seconds"], result["workers"]
+    return result
+
+
+def test_mismatches_found():
+    result = _run(workers=1)
+    assert result["mismatches"] > 0
+    assert result["per_output"]["Z"] > 0
+    assert result["vector_cycles"] == 256 * 300
+
+
+def test_independent_of_worker_count():
+    assert _run(workers=1) == _run(workers=2)
@@ -0,0 +1,100 @@
+# Tests for seq_upload: bootloader port tracking with a scripted port
+# enumerator and a fake clock.
+
+import subprocess
+
+from seq_upload import FastUploader, wait_for_new_port
+
+
+class FakeClock:
+    """clock() / sleep() pair; sleeping advances the time."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Ports:
+    """Enumerator returning scripted port sets, one per call; the last one repeats."""
+
+    def __init__(self, *states):
+        self.states = [set(s) for s in states]
+        self.calls = 0
+
+    def __call__(self):
+        state = self.states[min(self.calls, len(self.states) - 1)]
+        self.calls += 1
+        return state
+
+
+def _uploader(ports, clock, touch=lambda port: None, runs=None):
+    def runner(cmd, name, **kwargs):
+        if runs is not None:
+            runs.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, "", "avrdude done.")
+
+    return FastUploader("avrdude", None, enumerate_ports=ports, touch=touch, runner=runner,
+                        timeout=10.0, poll=0.05, clock=clock, sleep=clock.sleep)
+
+
+def test_new_port_name():
+    clock = FakeClock()
+    ports = Ports({"/dev/ttyACM0"}, {"/dev/ttyACM0"}, {"/dev/ttyACM0", "/dev/ttyACM1"})
+    assert wait_for_new_port({"/dev/ttyACM0"}, ports, 10.0, 0.05, clock, clock.sleep) == "/dev/ttyACM1"
+    assert clock.now < 0.2
+
+
+def test_same_name_vanishes_and_returns():
+    clock = FakeClock()
+    ports = Ports({"/dev/ttyACM0"}, set(), set(), {"/dev/ttyACM0"})
+    assert wait_for_new_port({"/dev/ttyACM0"}, ports, 10.0, 0.05, clock, clock.sleep) == "/dev/ttyACM0"
+
+
+def test_timeout():
+    clock = FakeClock()
+    ports = Ports({"/dev/ttyACM0"})
+    assert wait_for_new_port({"/dev/ttyACM0"}, ports, 1.0, 0.05, clock, clock.sleep) is None
+    assert 1.0 <= clock.now < 1.1
+
+
+def test_upload_through_new_port():
+    clock, runs = FakeClock(), []
+    ports = Ports({"/dev/ttyACM0"}, set(), {"/dev/ttyACM1"})
+    result = _uploader(ports, clock, runs=runs).upload("/dev/ttyACM0", "/b/s.ino.hex")
+    assert result.ok and result.bootloader_port == "/dev/ttyACM1"
+    assert runs[0][runs[0].index("-P") + 1] == "/dev/ttyACM1"
+    assert [name for name, _ in result.phases] == ["touch", "bootloader", "avrdude (write + verify)"]
+
+
+def test_upload_timeout_message():
+    clock = FakeClock()
+    result = _uploader(Ports({"/dev/ttyACM0"}), clock).upload("/dev/ttyACM0", "/b/s.ino.hex")
+    assert not result.ok and result.bootloader_port is None
+    assert "No bootloader port appeared within 10 s" in result.message
+
+
+def _failing_touch(port):
+    raise OSError("device busy")
+
+
+def test_failing_touch_uses_present_port():
+    clock, runs = FakeClock(), []
+    uploader = _uploader(Ports({"/dev/ttyACM0"}), clock, touch=_failing_touch, runs=runs)
+    result = uploader.upload("/dev/ttyACM0", "/b/s.ino.hex")
+    assert result.ok and result.bootloader_port == "/dev/ttyACM0"
+    assert "assuming it is the bootloader port" in result.warnings[0]
+    assert clock.now == 0.0  # no waiting for a port that will not appear
+
+
+def test_failing_touch_on_missing_port_fails_fast():
+    clock, runs = FakeClock(), []
+    uploader = _uploader(Ports({"/dev/ttyACM1"}), clock, touch=_failing_touch, runs=runs)
+    result = uploader.upload("/dev/ttyACM0", "/b/s.ino.hex")
+    assert not result.ok and not runs
+    assert "device busy" in result.message and "gone" in result.message
+    assert clock.now == 0.0
@@ -0,0 +1,97 @@
+# Tests for seq_vm: bytecode compilation limits and the serial protocol,
+# exercised against the pty stand-in board.
+
+import os
+
+import pytest
+
+from seq_design import parse_design
+from seq_vm import (
+    PROGRAM_MAX,
+    VERSION,
+    Program,
+    StandInBoard,
+    VMError,
+    compile_program,
+    download,
+    vm_hello,
+)
+
+CLOCK = {"use_internal": 1, "clk_pin": 4, "freq_hz": 2, "mirror": 1}
+
+needs_pty = pytest.mark.skipif(os.name != "posix", reason="needs a pseudo-terminal")
+
+
+def _design(text):
+    design, err = parse_design(text)
+    assert err is None
+    return design
+
+
+def _oversize_text():
+    text = "".join(f"pin I{i} = {i}\n" for i in range(120))
+    for i in range(120):
+        text += f"pin O{i} = {i + 120}\nO{i} = AND(I{i}, I{(i + 1) % 120})\n"
+    return text
+
+
+@pytest.mark.parametrize("clock, message", [
+    (dict(CLOCK, clk_pin=300), "clock pin"),
+    (dict(CLOCK, clk_pin=-1), "clock pin"),
+    (dict(CLOCK, freq_hz=2 ** 32), "frequency"),
+])
+def test_clock_outside_header_range(clock, message):
+    with pytest.raises(VMError, match=message):
+        compile_program(_design("pin A = 2\npin Y = 9\nY = A\n"), clock)
+
+
+def test_too_many_temporaries():
+    expr = "A"
+    for _ in range(130):
+        expr = f"XOR(NOT({expr}), B)"
+    design = _design(f"pin A = 2\npin B = 3\npin Y = 9\nY = {expr}\n")
+    with pytest.raises(VMError, match="temporaries"):
+        compile_program(design, CLOCK)
+
+
+def test_oversize_design_is_refused():
+    with pytest.raises(VMError, match="bytes"):
+        compile_program(_design(_oversize_text()), CLOCK)
+
+
+@needs_pty
+def test_hello():
+    with StandInBoard() as board:
+        info, err = vm_hello(board.port)
+    assert err is None
+    assert info == {"version": VERSION, "program_max": PROGRAM_MAX}
+
+
+@needs_pty
+def test_download_and_run():
+    program = compile_program(_design("pin A = 2\npin Y = 9\nQ1.D = NOT(A)\nY = Q1\n"), CLOCK)
+    with StandInBoard() as board:
+        seconds, err = download(board.port, program)
+        assert err is None and seconds >= 0
+        assert board.loads == 1
+        assert board.vm.build_id == program.build_id
+        vm = board.vm
+        vm.pins.update({2: 0, 4: 0})
+        vm.step()
+        vm.pins[4] = 1  # rising clock edge latches NOT(A)
+        vm.step()
+        vm.step()
+        assert vm.pins[9] == 1
+
+
+@needs_pty
+def test_board_rejects_oversize_program():
+    small = compile_program(_design("pin A = 2\npin Y = 9\nY = A\n"), CLOCK)
+    big = Program(small.data + bytes(PROGRAM_MAX), small.slots, small.stats)
+    with StandInBoard() as board:
+        seconds, err = download(board.port, big)
+        assert seconds is None
+        assert "program too big" in err
+        assert board.loads == 0
+        _, err = download(board.port, small)  # the board still accepts a good one
+        assert err is None
@@ -0,0 +1,39 @@
+# Tests for seq_watch.FileWatch: changing the watched paths from another thread.
+
+import os
+import queue
+import threading
+import time
+
+from seq_watch import FileWatch
+
+
+def test_set_paths_does_not_wait_for_the_watch_thread(tmp_path):
+    first, second = tmp_path / "a.seq", tmp_path / "b.seq"
+    first.write_text("pin A = 2\n")
+    second.write_text("pin B = 3\n")
+    changes = queue.Queue()
+    watch = FileWatch([str(first)], changes.put, debounce=0.05, use_inotify=False)
+    try:
+        inner = watch.watcher.wait
+        waiting = threading.Event()
+
+        def slow_wait(timeout):  # a watch thread stuck in a long wait
+            waiting.set()
+            return inner(max(timeout, 0.5))
+
+        watch.watcher.wait = slow_wait
+        assert waiting.wait(2)
+        t0 = time.monotonic()
+        watch.set_paths([str(first), str(second)])
+        assert time.monotonic() - t0 < 0.1
+        assert watch.paths == {str(first), str(second)}
+
+        deadline = time.monotonic() + 5
+        while str(second) not in watch.watcher.paths and time.monotonic() < deadline:
+            time.sleep(0.01)
+        second.write_text("pin B = 4\n")
+        os.utime(second, ns=(1, 1))  # mtime differs even on coarse clocks
+        assert changes.get(timeout=5) == {str(second)}
+    finally:
+        watch.stop()